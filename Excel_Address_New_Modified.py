@@ -346,9 +346,17 @@ print(f"数据库检查后，剩余 {len(df)} 条新记录需要分析\n")
 # 4. 读取MTM映射表
 # -----------------------------
 if use_mtm_mapping:
-    mtm_df = pd.read_excel(mtm_file_path, sheet_name=sheet_name, header=None)
-    mtm_df.columns = ['MTM', '机型名称']
-    mtm_mapping = dict(zip(mtm_df['MTM'], mtm_df['机型名称']))
+    try:
+        # 优先复用 qcr_analysis 的持久化MTM映射缓存（与CLI/Web进程共享）
+        sys.path.append(str(Path(__file__).parent / "qcr_analysis"))
+        from data.mtm_cache import load_mtm_mappings
+        mtm_mapping = load_mtm_mappings(mtm_file_path, sheet_name=sheet_name)
+    except Exception as e:
+        # 缓存模块不可用、缓存目录不可写或解析失败时，退回直接读取映射表
+        print(f"MTM映射缓存不可用，直接读取映射表: {e}")
+        mtm_df = pd.read_excel(mtm_file_path, sheet_name=sheet_name, header=None)
+        mtm_df.columns = ['MTM', '机型名称']
+        mtm_mapping = dict(zip(mtm_df['MTM'], mtm_df['机型名称']))
     
     # 映射MTM到机型名称
     df['机型名称'] = df['MTM'].map(mtm_mapping).fillna(df['MTM'])
@@ -47,6 +47,22 @@ DEFAULT_OUTPUT_DIR = "output"
 DEFAULT_MTM_FILE = "mtm.xlsx"
 DEFAULT_PPT_PATH = "report.pptx"
 
+# 缓存目录（MTM编译映射等持久化产物，多进程共享）
+CACHE_DIR = os.getenv("QCR_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"))
+
+# -----------------------------
+# MTM映射缓存配置
+# -----------------------------
+MTM_CACHE_ENABLED = os.getenv("QCR_MTM_CACHE", "1") != "0"
+MTM_CACHE_MAX_ENTRIES = int(os.getenv("QCR_MTM_CACHE_MAX_ENTRIES", "16"))
+
+# 未映射MTM按系列前缀解析时要求的最小公共前缀长度（联想MTM前4位为机器类型）
+MTM_FAMILY_MIN_PREFIX = int(os.getenv("QCR_MTM_FAMILY_MIN_PREFIX", "4"))
+
+# Web常驻MTM映射：标准映射文件路径与变化轮询间隔（秒）
+MTM_CANONICAL_FILE = os.getenv("QCR_MTM_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "MTM.xlsx"))
+MTM_WATCH_INTERVAL = float(os.getenv("QCR_MTM_WATCH_INTERVAL", "5"))
+
 # -----------------------------
 # PPT样式配置
 # -----------------------------
@@ -57,6 +73,9 @@ PPT_STYLE = {
     'body_font_size': 14,
 }
 
+# PPT原生图表：由分布表直接构建可编辑的柱状图/饼图，不嵌入matplotlib生成的PNG（CLI: --native-charts）
+PPT_NATIVE_CHARTS = os.getenv("QCR_PPT_NATIVE_CHARTS", "0") != "0"
+
 # -----------------------------
 # 图表样式配置
 # -----------------------------
@@ -64,8 +83,28 @@ CHART_STYLE = {
     'pie_chart_size': (8, 8),
     'bar_chart_size': (12, 6),
     'reason_chart_size': (6, 6),
+    # 渲染配置档：只覆盖列出的字段，未列出的沿用各图表自身设置（report 与原有输出完全一致）
+    # - dpi / bbox_inches / tight_layout: 分辨率、是否裁去空白边距、是否自动调整子图边距
+    # - max_categories: 每个坐标系最多显示的类别数（柱状图截断，饼图其余合并为"其他"）
+    # - annotate: 是否绘制柱端数值标签
+    # - format: 输出格式（png / svg / webp）
+    'profiles': {
+        'draft': {
+            'dpi': 60,
+            'bbox_inches': None,
+            'tight_layout': False,
+            'max_categories': 12,
+            'annotate': False,
+            'format': os.getenv("QCR_CHART_DRAFT_FORMAT", "png"),
+        },
+        'report': {},
+        'print': {'dpi': 300},
+    },
 }
 
+# 默认渲染配置档（draft / report / print）；Web "快速预览" 与 CLI --chart-profile 可按次覆盖
+CHART_PROFILE = os.getenv("QCR_CHART_PROFILE", "report")
+
 # -----------------------------
 # 数据处理配置
 # -----------------------------
@@ -75,6 +114,60 @@ AUDIT_REASONS = ["15天质量换新", "180天只换不修", "7天无理由", "
 # 分类后缀
 CATEGORY_SUFFIXES = ["7天无理由", "非7天无理由"]
 
+# 分类后缀对应的审核原因
+SUFFIX_AUDIT_REASONS = {
+    "7天无理由": ["7天无理由"],
+    "非7天无理由": ["15天质量换新", "180天只换不修", "质量维修"],
+}
+
+# 聚合立方体进程内缓存数量（同一数据集跨请求复用）
+CUBE_CACHE_MAX_ENTRIES = int(os.getenv("QCR_CUBE_CACHE_MAX_ENTRIES", "8"))
+
+# 分片并行构建聚合立方体：工作进程数（0 表示使用全部CPU，1 表示不分片，默认关闭：耗时主要在字符串编码，
+# 分片只能并行组合编码的计数，实测无加速）与启用分片的最少记录数
+CUBE_SHARD_WORKERS = int(os.getenv("QCR_CUBE_SHARD_WORKERS", "1"))
+CUBE_SHARD_MIN_ROWS = int(os.getenv("QCR_CUBE_SHARD_MIN_ROWS", "500000"))
+
+# 近似Top N（--approx）：流式读取的每块行数、SpaceSaving 草图的相对误差（误差 ≤ epsilon × 记录数）
+STREAM_CHUNK_ROWS = int(os.getenv("QCR_STREAM_CHUNK_ROWS", "50000"))
+APPROX_SKETCH_EPSILON = float(os.getenv("QCR_APPROX_SKETCH_EPSILON", "0.001"))
+# 近似Top Model：每个机型分类数 HyperLogLog 的寄存器位数（每机型 2^p 字节，相对误差约 1.04/sqrt(2^p)）
+APPROX_HLL_PRECISION = int(os.getenv("QCR_APPROX_HLL_PRECISION", "12"))
+
+# 逐机型Excel/图表生成的工作进程数（0 表示使用全部CPU，1 表示串行）
+ANALYSIS_WORKERS = int(os.getenv("QCR_ANALYSIS_WORKERS", "0"))
+
+# 图表渲染进程池：工作进程数（0 表示使用全部CPU，1 表示在当前进程串行）与启用进程池的最少图表数
+CHART_WORKERS = int(os.getenv("QCR_CHART_WORKERS", "0"))
+CHART_PARALLEL_MIN = int(os.getenv("QCR_CHART_PARALLEL_MIN", "8"))
+
+# 图表内容哈希缓存：图表描述（数据、标签、样式、dpi）不变时复用已有图片，不再重新栅格化；
+# 每个输出目录保存一份清单，跨目录复用的图片存放在 CACHE_DIR/charts，按最近使用淘汰
+CHART_CACHE_ENABLED = os.getenv("QCR_CHART_CACHE", "1") != "0"
+CHART_CACHE_MAX_ENTRIES = int(os.getenv("QCR_CHART_CACHE_MAX_ENTRIES", "2048"))
+
+# 分析产物格式：纯计算完成后按需写出；默认不含PPT（由 --generate-ppt 单独控制）
+ARTIFACT_FORMATS = ("excel", "png", "txt", "ppt")
+DEFAULT_ARTIFACT_FORMATS = ("excel", "png", "txt")
+
+# 全量分析（--mode all）并行生成PPT的线程数
+COMBINED_DECK_WORKERS = int(os.getenv("QCR_COMBINED_DECK_WORKERS", "3"))
+
+# 周趋势分析：滚动合计窗口周数、上升榜本周最少记录数、趋势图显示的周数
+TREND_ROLLING_WEEKS = int(os.getenv("QCR_TREND_ROLLING_WEEKS", "4"))
+TREND_MIN_COUNT = int(os.getenv("QCR_TREND_MIN_COUNT", "3"))
+TREND_CHART_WEEKS = int(os.getenv("QCR_TREND_CHART_WEEKS", "12"))
+
+# 异常检测：EWMA平滑系数、z值告警阈值、当日最少记录数、序列预热天数
+ANOMALY_EWMA_ALPHA = float(os.getenv("QCR_ANOMALY_EWMA_ALPHA", "0.1"))
+ANOMALY_Z_THRESHOLD = float(os.getenv("QCR_ANOMALY_Z_THRESHOLD", "3.0"))
+ANOMALY_MIN_COUNT = int(os.getenv("QCR_ANOMALY_MIN_COUNT", "3"))
+ANOMALY_WARMUP_DAYS = int(os.getenv("QCR_ANOMALY_WARMUP_DAYS", "14"))
+
+# 出货量归一化（--shipments）：数据库中的出货量表名、比率基数（每万台）
+SHIPMENT_TABLE = os.getenv("QCR_SHIPMENT_TABLE", "shipment_volumes")
+SHIPMENT_RATE_BASE = int(os.getenv("QCR_SHIPMENT_RATE_BASE", "10000"))
+
 # 数据库字段映射
 DB_COLUMN_MAPPING = {
     '服务单号': 'service_order_id',
@@ -3,15 +3,25 @@
 =============================================================================
 数据层模块
 =============================================================================
-提供统一的数据访问接口
+提供统一的数据访问接口；导出项在首次访问时才导入对应子模块（PEP 562）
 """
 
-from .data_manager import DataManager, load_data
-from modules.mtm_manager import MTMManager
+from utils.lazy import lazy_exports
 
-__all__ = [
-    'DataManager',
-    'MTMManager',
-    'load_data'
-]
+# 导出名 → 所在模块
+_EXPORTS = {
+    'DataManager': '.data_manager',
+    'MTMManager': 'modules.mtm_manager',
+    'load_data': '.data_manager',
+    'load_mtm_mappings': '.mtm_cache',
+    'DailyPartialStore': '.daily_partials',
+    'source_namespace': '.daily_partials',
+    'LazyDataset': '.lazy_dataset',
+    'stream_collect': '.lazy_dataset',
+    'ShipmentVolumes': '.shipment_volumes',
+    'data_window': '.shipment_volumes',
+}
 
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
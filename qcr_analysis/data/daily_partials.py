@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+按天预聚合分片
+=============================================================================
+将明细数据按天聚合为 (MTM, 审核原因, 分类) 计数分片并持久化，
+滚动窗口分析时直接合并已有分片，只对新增或内容变化的日期重新聚合；
+输入日期范围内、新输入中已没有记录的日期（如更正后的导出删除了当天全部记录）删除其分片；
+MTM→机型名称映射在合并后的聚合结果上进行，映射表更新无需重建分片
+=============================================================================
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import CACHE_DIR
+from modules.aggregate_cube import AggregateCube, CUBE_DIMENSIONS
+from modules.mtm_manager import MTMManager
+
+# 分片格式变化时递增，使历史分片全部失效
+_PARTIAL_FORMAT_VERSION = 1
+_INDEX_FILE = "index.pkl"
+
+PARTIAL_DIMENSIONS = ("MTM", "审核原因", "分类")
+COUNT_COLUMN = "数量"
+
+
+def atomic_pickle(obj, path: Path):
+    """原子写入pickle文件（先写临时文件再替换）"""
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def source_namespace(source) -> str:
+    """
+    由数据源生成分片命名空间：同一数据源的多次运行共享分片，不同导出文件互不混合
+
+    Args:
+        source: 数据文件路径，或数据库表名等其他数据源标识
+
+    Returns:
+        可用作目录名的命名空间（可读前缀 + 完整标识的哈希）
+    """
+    path = Path(str(source))
+    identity = str(path.resolve()) if path.exists() else str(source)
+    label = re.sub(r"[^0-9A-Za-z_\-\u4e00-\u9fff]+", "_", path.stem or str(source))[:40]
+    return f"{label}_{hashlib.sha1(identity.encode('utf-8')).hexdigest()[:12]}"
+
+
+class DailyPartialStore:
+    """按天预聚合分片存储"""
+
+    def __init__(self, namespace: str = "default", store_dir: Optional[Path] = None):
+        """
+        初始化分片存储
+
+        Args:
+            namespace: 数据源命名空间（见 source_namespace），不同数据源的分片互不干扰
+            store_dir: 存储根目录，默认 CACHE_DIR/daily_partials
+        """
+        root = Path(store_dir) if store_dir else Path(CACHE_DIR) / "daily_partials"
+        self.store_dir = root / f"v{_PARTIAL_FORMAT_VERSION}" / namespace
+        self._index = self._read_index()
+        self._frames: Dict[str, pd.DataFrame] = {}
+        # 最近一次 update 输入数据的日期范围，build_cube 未指定窗口时以此为默认
+        self.input_range: Optional[Tuple[date, date]] = None
+
+    # ================================================================
+    # 索引与分片文件
+    # ================================================================
+
+    def _read_index(self) -> Dict[str, Dict]:
+        """读取分片索引 {日期: {"fingerprint": 指纹, "rows": 记录数}}"""
+        index_path = self.store_dir / _INDEX_FILE
+        if not index_path.exists():
+            return {}
+        try:
+            with open(index_path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return {}
+
+    def _day_path(self, day_key: str) -> Path:
+        return self.store_dir / f"{day_key}.pkl"
+
+    def _load_day(self, day_key: str) -> Optional[pd.DataFrame]:
+        """读取单日分片（进程内缓存）"""
+        frame = self._frames.get(day_key)
+        if frame is not None:
+            return frame
+        try:
+            with open(self._day_path(day_key), "rb") as f:
+                payload = pickle.load(f)
+        except Exception:
+            return None
+        if payload.get("fingerprint") != self._index.get(day_key, {}).get("fingerprint"):
+            return None
+        self._frames[day_key] = payload["counts"]
+        return payload["counts"]
+
+    def days(self) -> List[date]:
+        """已存储分片的日期（升序）"""
+        return sorted(date.fromisoformat(k) for k in self._index)
+
+    def fingerprints(self) -> Dict[str, str]:
+        """各日期分片的内容指纹 {日期: 指纹}"""
+        return {day_key: entry["fingerprint"] for day_key, entry in self._index.items()}
+
+    # ================================================================
+    # 增量更新
+    # ================================================================
+
+    @staticmethod
+    def _day_fingerprints(df: pd.DataFrame, day_keys: pd.Series) -> pd.Series:
+        """
+        每天记录的内容指纹：行哈希按天求和（与行顺序无关）
+
+        Returns:
+            以日期为索引、"记录数:哈希和"为值的Series
+        """
+        row_hashes = pd.util.hash_pandas_object(
+            df[list(PARTIAL_DIMENSIONS)], index=False
+        ).to_numpy()
+        codes, uniques = pd.factorize(day_keys, sort=True)
+        order = np.argsort(codes, kind="stable")
+        sizes = np.bincount(codes, minlength=len(uniques))
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        # uint64 求和按模 2^64 回绕，足以识别内容变化
+        sums = np.add.reduceat(row_hashes[order], starts) if len(order) else np.array([], dtype=np.uint64)
+        return pd.Series(
+            [f"{n}:{s}" for n, s in zip(sizes, sums)],
+            index=pd.Index(uniques)
+        )
+
+    def update(self, df: pd.DataFrame, date_column: Optional[str] = None) -> List[date]:
+        """
+        用明细数据更新分片：只聚合新增或内容变化的日期，
+        输入日期范围内已不再出现的日期删除其分片（输入视为该范围的完整数据）
+
+        Args:
+            df: 包含日期列及 MTM / 审核原因 / 分类 列的明细数据
+            date_column: 日期列名，为None时使用第一列
+
+        Returns:
+            本次重新聚合或删除的日期列表
+        """
+        if df.empty:
+            return []
+        if date_column is None:
+            date_column = df.columns[0]
+
+        day_keys = pd.to_datetime(df[date_column], errors="coerce").dt.strftime("%Y-%m-%d")
+        valid = day_keys.notna()
+        dropped = int((~valid).sum())
+        if dropped:
+            print(f"⚠️ {dropped} 条记录的日期为空或无法解析，未计入按天分片")
+        df = df[valid]
+        day_keys = day_keys[valid]
+        if day_keys.empty:
+            return []
+        self.input_range = (date.fromisoformat(day_keys.min()), date.fromisoformat(day_keys.max()))
+
+        fingerprints = self._day_fingerprints(df, day_keys)
+        changed = [
+            day_key for day_key, fingerprint in fingerprints.items()
+            if self._index.get(day_key, {}).get("fingerprint") != fingerprint
+        ]
+        first_key, last_key = self.input_range[0].isoformat(), self.input_range[1].isoformat()
+        removed = [
+            day_key for day_key in self._index
+            if first_key <= day_key <= last_key and day_key not in fingerprints
+        ]
+        if not changed and not removed:
+            return []
+
+        for day_key in removed:
+            del self._index[day_key]
+            self._frames.pop(day_key, None)
+            try:
+                self._day_path(day_key).unlink()
+            except OSError:
+                pass
+
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        changed_rows = day_keys.isin(changed)
+        subset = df.loc[changed_rows, list(PARTIAL_DIMENSIONS)]
+        subset.insert(0, "_day", day_keys[changed_rows].to_numpy())
+
+        # 天内按首次出现顺序聚合，保证合并后并列项的先后次序稳定
+        grouped = subset.groupby("_day", sort=False)
+        for day_key, day_rows in grouped:
+            counts = (
+                day_rows.groupby(list(PARTIAL_DIMENSIONS), sort=False, dropna=False)
+                .size()
+                .reset_index(name=COUNT_COLUMN)
+            )
+            fingerprint = fingerprints[day_key]
+            atomic_pickle(
+                {"fingerprint": fingerprint, "counts": counts},
+                self._day_path(day_key)
+            )
+            self._frames[day_key] = counts
+            self._index[day_key] = {"fingerprint": fingerprint, "rows": len(day_rows)}
+
+        atomic_pickle(self._index, self.store_dir / _INDEX_FILE)
+        message = f"✓ 按天分片已更新: {len(changed)} 天重新聚合"
+        if removed:
+            message += f"，{len(removed)} 天在新数据中已无记录、分片已删除"
+        print(f"{message}，共 {len(self._index)} 天")
+        return sorted(date.fromisoformat(k) for k in changed + removed)
+
+    # ================================================================
+    # 窗口合并
+    # ================================================================
+
+    def load_counts(self, start_date: Optional[date] = None,
+                    end_date: Optional[date] = None) -> pd.DataFrame:
+        """
+        合并窗口内的分片
+
+        Args:
+            start_date: 开始日期（含），为None时不限
+            end_date: 结束日期（含），为None时不限
+
+        Returns:
+            (MTM, 审核原因, 分类, 数量) 计数表，按时间先后的首次出现排序
+        """
+        frames = []
+        for day in self.days():
+            if (start_date and day < start_date) or (end_date and day > end_date):
+                continue
+            frame = self._load_day(day.isoformat())
+            if frame is None:
+                print(f"警告：{day} 的分片缺失或已损坏，请用原始数据重新更新")
+                continue
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=[*PARTIAL_DIMENSIONS, COUNT_COLUMN])
+        merged = pd.concat(frames, ignore_index=True)
+        return (
+            merged.groupby(list(PARTIAL_DIMENSIONS), sort=False, dropna=False)[COUNT_COLUMN]
+            .sum()
+            .reset_index()
+        )
+
+    def load_daily_counts(self, days: Optional[List[date]] = None) -> pd.DataFrame:
+        """
+        按天读取分片（不跨天合并）
+
+        Args:
+            days: 需要的日期，为None时读取全部分片
+
+        Returns:
+            (日期, MTM, 审核原因, 分类, 数量) 计数表，按日期升序
+        """
+        frames = []
+        for day in (self.days() if days is None else sorted(days)):
+            frame = self._load_day(day.isoformat())
+            if frame is None:
+                print(f"警告：{day} 的分片缺失或已损坏，请用原始数据重新更新")
+                continue
+            frames.append(frame.assign(日期=day))
+
+        columns = ["日期", *PARTIAL_DIMENSIONS, COUNT_COLUMN]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    def build_cube(
+        self,
+        mtm_manager: MTMManager,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        filter_unmapped: bool = False,
+        resolve_family: bool = False
+    ) -> AggregateCube:
+        """
+        合并窗口分片并映射机型，构建聚合立方体
+
+        Args:
+            mtm_manager: MTM管理器
+            start_date: 开始日期（含），为None时使用最近一次 update 输入数据的首日
+            end_date: 结束日期（含），为None时使用最近一次 update 输入数据的末日
+            filter_unmapped: 是否过滤未映射的MTM
+            resolve_family: 是否将未映射MTM按系列前缀解析
+
+        Returns:
+            AggregateCube
+        """
+        if self.input_range is not None:
+            # 只统计本次输入覆盖的日期，不混入同一数据源以往导入的其他日期
+            start_date = start_date or self.input_range[0]
+            end_date = end_date or self.input_range[1]
+        counts = self.load_counts(start_date, end_date)
+        counts = mtm_manager.map_dataframe(counts, resolve_family=resolve_family, verbose=False)
+        if filter_unmapped:
+            counts = counts[counts["机型名称"] != counts["MTM"]]
+
+        counts = (
+            counts.groupby(list(CUBE_DIMENSIONS), sort=False, dropna=False)[COUNT_COLUMN]
+            .sum()
+            .reset_index()
+        )
+        return AggregateCube.from_counts(counts, COUNT_COLUMN)
@@ -8,7 +8,7 @@
 
 import pandas as pd
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, Iterator, List, Tuple
 from datetime import date, datetime
 import sys
 
@@ -16,6 +16,7 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 from modules.database import DatabaseManager as DBManager
 from config import DB_CONFIG
+from utils.memory import detached
 
 
 class DataManager:
@@ -49,11 +50,62 @@ class DataManager:
         """
         try:
             df = pd.read_excel(file_path, sheet_name=sheet_name)
-            self._last_df = df.copy()
+            # 写时复制开启（入口调用 enable_copy_on_write）时与返回值共享数据，否则保存副本
+            self._last_df = detached(df)
             return df
         except Exception as e:
             raise IOError(f"读取Excel文件失败: {e}")
     
+    def iter_excel(
+        self,
+        file_path: str,
+        chunk_rows: int = 50000,
+        columns: Optional[List[str]] = None,
+        sheet_name: int = 0
+    ) -> Iterator[pd.DataFrame]:
+        """
+        按块流式读取Excel（openpyxl 只读模式），内存占用与文件大小无关
+
+        Args:
+            file_path: Excel文件路径
+            chunk_rows: 每块行数
+            columns: 只保留的列（首列日期总会保留），为None时保留全部列
+            sheet_name: 工作表索引，默认第一个
+
+        Yields:
+            每块数据的DataFrame（不写入 _last_df 缓存）
+        """
+        from openpyxl import load_workbook
+
+        try:
+            workbook = load_workbook(file_path, read_only=True, data_only=True)
+        except Exception as e:
+            raise IOError(f"读取Excel文件失败: {e}")
+        try:
+            rows = workbook.worksheets[sheet_name].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+            keep = [
+                i for i, name in enumerate(header)
+                if columns is None or i == 0 or name in columns
+            ]
+            names = [header[i] for i in keep]
+
+            chunk = []
+            for row in rows:
+                if row is None or all(v is None for v in row):
+                    continue
+                chunk.append([row[i] if i < len(row) else None for i in keep])
+                if len(chunk) >= chunk_rows:
+                    yield pd.DataFrame(chunk, columns=names)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=names)
+        finally:
+            workbook.close()
+
     def write_excel(self, df: pd.DataFrame, file_path: str, sheet_name: str = "Sheet1"):
         """
         将数据写入Excel文件
@@ -108,7 +160,7 @@ class DataManager:
         
         try:
             df = self.db_manager.read_data_by_date_range(start_date, end_date)
-            self._last_df = df.copy()
+            self._last_df = detached(df)
             return df
         except Exception as e:
             raise RuntimeError(f"从数据库读取数据失败: {e}")
@@ -199,7 +251,7 @@ class DataManager:
         else:
             return df
         
-        return df[mask].copy()
+        return detached(df[mask])
     
     def filter_by_audit_reason(
         self,
@@ -220,15 +272,15 @@ class DataManager:
             cond_7d = df["审核原因"] == "7天无理由"
             cond_non_7d = df["审核原因"].isin(["15天质量换新", "180天只换不修", "质量维修"])
             
-            df_7d = df[cond_7d].copy()
-            df_non_7d = df[cond_non_7d].copy()
+            df_7d = detached(df[cond_7d])
+            df_non_7d = detached(df[cond_non_7d])
             
             return df_7d, df_non_7d
         else:
             # 返回按审核原因分组的字典
             grouped = {}
             for reason in df["审核原因"].unique():
-                grouped[reason] = df[df["审核原因"] == reason].copy()
+                grouped[reason] = detached(df[df["审核原因"] == reason])
             return grouped
     
     def filter_unmapped_mtm(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -246,7 +298,7 @@ class DataManager:
             return df
         
         # 机型名称 != MTM 表示已映射
-        return df[df["机型名称"] != df["MTM"]].copy()
+        return detached(df[df["机型名称"] != df["MTM"]])
     
     # ================================================================
     # 数据统计
@@ -301,7 +353,7 @@ class DataManager:
     
     def get_last_dataframe(self) -> Optional[pd.DataFrame]:
         """获取最后加载的DataFrame"""
-        return self._last_df.copy() if self._last_df is not None else None
+        return detached(self._last_df) if self._last_df is not None else None
     
     def validate_columns(self, df: pd.DataFrame, required_columns: List[str]) -> bool:
         """
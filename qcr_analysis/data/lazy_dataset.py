@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+惰性数据集 - 融合筛选计划
+=============================================================================
+记录 日期筛选 → MTM映射 → 过滤未映射 → 审核原因筛选 这条处理链，
+在 collect() 时一次性求出合并后的布尔掩码，只物化下游实际读取的列：
+- 日期比较在 datetime64 上向量化完成，只对保留的行转换为日期对象
+- MTM映射只对去重后的MTM执行一次，再按编码广播到保留的行
+结果与依次调用 DataManager / MTMManager 的逐步处理一致；
+stream_collect 对流式读取的数据块逐块执行同样的处理
+=============================================================================
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from modules.mtm_manager import MTMManager
+from modules.mtm_prefix_index import MATCH_FAMILY
+
+
+class LazyDataset:
+    """惰性数据集：记录筛选与映射操作，collect() 时融合执行"""
+
+    def __init__(self, df: pd.DataFrame, date_column: Optional[str] = None):
+        """
+        初始化惰性数据集
+
+        Args:
+            df: 原始明细数据（不会被修改）
+            date_column: 日期列名，为None时使用第一列
+        """
+        self.df = df
+        self.date_column = date_column if date_column is not None else (
+            df.columns[0] if len(df.columns) else None
+        )
+        self._date_range = None
+        self._mtm_manager = None
+        self._resolve_family = False
+        self._filter_unmapped = False
+        self._audit_reasons = None
+
+    # ================================================================
+    # 记录操作
+    # ================================================================
+
+    def filter_date_range(self, start_date: Optional[date] = None,
+                          end_date: Optional[date] = None) -> "LazyDataset":
+        """
+        按日期范围筛选（含首尾两天）
+
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+
+        Returns:
+            self（支持链式调用）
+        """
+        if start_date or end_date:
+            self._date_range = (start_date, end_date)
+        return self
+
+    def map_mtm(self, mtm_manager: MTMManager, resolve_family: bool = False) -> "LazyDataset":
+        """
+        添加机型名称列（等价于 MTMManager.map_dataframe）
+
+        Args:
+            mtm_manager: MTM管理器
+            resolve_family: 是否将未映射MTM按系列前缀解析
+
+        Returns:
+            self
+        """
+        self._mtm_manager = mtm_manager
+        self._resolve_family = resolve_family
+        return self
+
+    def filter_unmapped(self, enabled: bool = True) -> "LazyDataset":
+        """
+        过滤未映射的MTM记录（需先调用 map_mtm）
+
+        Args:
+            enabled: 是否过滤
+
+        Returns:
+            self
+        """
+        self._filter_unmapped = enabled
+        return self
+
+    def filter_audit_reasons(self, reasons: Iterable[str]) -> "LazyDataset":
+        """
+        只保留指定审核原因的记录
+
+        Args:
+            reasons: 审核原因列表
+
+        Returns:
+            self
+        """
+        self._audit_reasons = list(reasons)
+        return self
+
+    # ================================================================
+    # 执行
+    # ================================================================
+
+    def _date_stamps(self, values: pd.Series) -> pd.Series:
+        """日期列转换为datetime64（已是datetime64时直接使用，避免逐元素探测）"""
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values
+        return pd.to_datetime(values)
+
+    def _date_mask(self) -> np.ndarray:
+        """日期范围掩码：在datetime64上比较，结束日期按当天末尾计"""
+        start_date, end_date = self._date_range
+        stamps = self._date_stamps(self.df[self.date_column])
+        mask = np.ones(len(self.df), dtype=bool)
+        if start_date:
+            mask &= (stamps >= pd.Timestamp(start_date)).to_numpy()
+        if end_date:
+            mask &= (stamps < pd.Timestamp(end_date + timedelta(days=1))).to_numpy()
+        return mask
+
+    def _map_uniques(self):
+        """
+        对去重后的MTM执行映射
+
+        Returns:
+            (每行的MTM编码, 去重MTM的映射结果表)
+        """
+        codes, uniques = pd.factorize(self.df["MTM"], use_na_sentinel=False)
+        lookup = pd.DataFrame({"MTM": uniques})
+        lookup = self._mtm_manager.map_dataframe(
+            lookup, resolve_family=self._resolve_family, verbose=False
+        )
+        return codes, lookup
+
+    def collect(self, columns: Optional[Sequence[str]] = None,
+                verbose: bool = True) -> pd.DataFrame:
+        """
+        融合执行全部操作并物化结果
+
+        Args:
+            columns: 需要的原始列（映射列总会附加），为None时保留全部列
+            verbose: 是否输出各步骤保留的记录数
+
+        Returns:
+            处理后的DataFrame
+        """
+        df = self.df
+        mapping = self._mtm_manager is not None and "MTM" in df.columns
+        if self._mtm_manager is not None and not mapping:
+            print("警告：DataFrame中未找到'MTM'列")
+
+        steps: List[tuple] = [("原始", len(df))]
+        mask = np.ones(len(df), dtype=bool)
+
+        if self._date_range is not None and self.date_column is not None and len(df):
+            mask &= self._date_mask()
+            steps.append(("日期", int(mask.sum())))
+
+        codes = lookup = None
+        if mapping:
+            codes, lookup = self._map_uniques()
+            mapped = (lookup["机型名称"] != lookup["MTM"]).to_numpy()[codes]
+            if verbose:
+                kept = int(mask.sum())
+                mapped_count = int(mapped[mask].sum())
+                print(f"✓ MTM映射完成: {mapped_count}/{kept} 条记录已映射")
+                if self._resolve_family:
+                    family = (lookup["映射方式"] == MATCH_FAMILY).to_numpy()[codes]
+                    print(f"  其中 {int(family[mask].sum())} 条记录按系列前缀解析")
+            if self._filter_unmapped:
+                mask &= mapped
+                steps.append(("已映射", int(mask.sum())))
+
+        if self._audit_reasons is not None and "审核原因" in df.columns:
+            mask &= df["审核原因"].isin(self._audit_reasons).to_numpy()
+            steps.append(("审核原因", int(mask.sum())))
+
+        # 只物化需要的列与保留的行（一次take）
+        keep = list(df.columns) if columns is None else [c for c in df.columns if c in set(columns)]
+        rows = np.flatnonzero(mask)
+        result = df[keep].take(rows)
+
+        if self._date_range is not None and self.date_column in result.columns:
+            result[self.date_column] = self._date_stamps(result[self.date_column]).dt.date
+
+        if mapping:
+            row_codes = codes[rows]
+            for column in lookup.columns.drop("MTM"):
+                values = lookup[column]
+                result[column] = pd.Series(
+                    values.to_numpy()[row_codes], index=result.index, dtype=values.dtype
+                )
+
+        if verbose:
+            plan = " → ".join(f"{name} {count}" for name, count in steps)
+            print(f"✓ 筛选计划: {plan}，物化 {len(result.columns)} 列")
+        return result
+
+
+def stream_collect(
+    chunks: Iterable[pd.DataFrame],
+    mtm_manager: MTMManager,
+    columns: Optional[Sequence[str]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    filter_unmapped: bool = False,
+    resolve_family: bool = False
+) -> Iterator[pd.DataFrame]:
+    """
+    对数据块逐块执行 日期筛选 → MTM映射 → 过滤未映射（流式处理使用）
+
+    Args:
+        chunks: 原始明细数据块（如 DataManager.iter_excel 的结果）
+        mtm_manager: MTM管理器
+        columns: 需要的原始列，为None时保留全部列
+        start_date: 开始日期
+        end_date: 结束日期
+        filter_unmapped: 是否过滤未映射的MTM
+        resolve_family: 是否将未映射MTM按系列前缀解析
+
+    Yields:
+        处理后的数据块
+    """
+    for chunk in chunks:
+        yield (
+            LazyDataset(chunk)
+            .filter_date_range(start_date, end_date)
+            .map_mtm(mtm_manager, resolve_family)
+            .filter_unmapped(filter_unmapped)
+            .collect(columns, verbose=False)
+        )
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+MTM映射编译缓存
+=============================================================================
+将MTM.xlsx解析后的映射字典持久化为二进制产物（pickle），
+以 源文件内容哈希 + 工作表 为键，CLI、Web进程与旧脚本共享同一份缓存；
+表格内容变化后哈希随之变化，旧缓存自动失效
+=============================================================================
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import pandas as pd
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import CACHE_DIR, MTM_CACHE_ENABLED, MTM_CACHE_MAX_ENTRIES
+
+# 解析逻辑或缓存键变化时递增，使历史缓存全部失效
+_CACHE_FORMAT_VERSION = 2
+_CACHE_PREFIX = "mtm_"
+_CACHE_SUFFIX = ".pkl"
+
+
+def compute_file_hash(file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    计算文件内容的SHA-256哈希
+
+    Args:
+        file_path: 文件路径
+        chunk_size: 分块读取大小
+
+    Returns:
+        十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_mtm_file(file_path: Path, sheet_name: Union[int, str] = 0) -> Dict[str, str]:
+    """
+    解析MTM.xlsx为映射字典（自动识别有无表头）
+
+    Args:
+        file_path: MTM映射表路径
+        sheet_name: 工作表索引或名称，默认第一个
+
+    Returns:
+        {MTM: 机型名称} 字典
+
+    Raises:
+        ValueError: 文件列数不足时抛出
+    """
+    # 只读取一次原始数据，再判断首行是否为表头
+    raw_df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+    if raw_df.shape[1] < 2:
+        raise ValueError("MTM文件格式不正确，至少需要两列")
+
+    # 首行首列包含"MTM"时视为表头
+    if len(raw_df) > 0 and 'MTM' in str(raw_df.iat[0, 0]).upper():
+        raw_df = raw_df.iloc[1:]
+
+    mtm_df = raw_df.iloc[:, :2]
+    mtm_df.columns = ['MTM', '机型名称']
+
+    # 过滤掉表头行（如果MTM列的值就是"MTM"或"机型名称"）
+    mtm_df = mtm_df[~mtm_df['MTM'].isin(['MTM', '机型名称'])]
+
+    return dict(zip(mtm_df['MTM'], mtm_df['机型名称']))
+
+
+def _cache_dir() -> Path:
+    return Path(CACHE_DIR) / "mtm"
+
+
+def _cache_path(source_hash: str, sheet_name: Union[int, str] = 0) -> Path:
+    # 工作表名可能含中文或空格，与类型一起哈希后放入文件名（0 与 "0" 不是同一个工作表）
+    sheet_key = hashlib.sha256(repr(sheet_name).encode("utf-8")).hexdigest()[:12]
+    return _cache_dir() / f"{_CACHE_PREFIX}v{_CACHE_FORMAT_VERSION}_{source_hash}_{sheet_key}{_CACHE_SUFFIX}"
+
+
+def read_cached_mappings(source_hash: str, sheet_name: Union[int, str] = 0) -> Optional[Dict[str, str]]:
+    """
+    读取指定哈希与工作表对应的缓存映射
+
+    Args:
+        source_hash: 源文件内容哈希
+        sheet_name: 工作表索引或名称
+
+    Returns:
+        映射字典；缓存不存在或已损坏时返回None
+    """
+    cache_path = _cache_path(source_hash, sheet_name)
+    if not cache_path.exists():
+        return None
+    try:
+        with open(cache_path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("source_hash") != source_hash or payload.get("sheet_name") != sheet_name:
+            return None
+        # 更新访问时间，供淘汰策略使用
+        os.utime(cache_path, None)
+        return payload["mappings"]
+    except Exception:
+        return None
+
+
+def write_cached_mappings(source_hash: str, mappings: Dict[str, str],
+                          sheet_name: Union[int, str] = 0) -> Optional[Path]:
+    """
+    原子写入缓存映射（先写临时文件再替换，避免并发进程读到半截文件）
+
+    Args:
+        source_hash: 源文件内容哈希
+        mappings: 映射字典
+        sheet_name: 工作表索引或名称
+
+    Returns:
+        缓存文件路径；写入失败返回None
+    """
+    cache_dir = _cache_dir()
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": _CACHE_FORMAT_VERSION,
+            "source_hash": source_hash,
+            "sheet_name": sheet_name,
+            "mappings": mappings,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=str(cache_dir), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        cache_path = _cache_path(source_hash, sheet_name)
+        os.replace(tmp_path, cache_path)
+        _evict_old_entries(cache_dir)
+        return cache_path
+    except Exception as e:
+        print(f"警告：写入MTM映射缓存失败: {e}")
+        return None
+
+
+def _evict_old_entries(cache_dir: Path):
+    """按访问时间淘汰超出上限的旧缓存"""
+    entries = sorted(
+        cache_dir.glob(f"{_CACHE_PREFIX}*{_CACHE_SUFFIX}"),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True
+    )
+    for stale in entries[MTM_CACHE_MAX_ENTRIES:]:
+        try:
+            stale.unlink()
+        except OSError:
+            pass
+
+
+def load_mtm_mappings(file_path: Path, use_cache: bool = MTM_CACHE_ENABLED,
+                      sheet_name: Union[int, str] = 0) -> Dict[str, str]:
+    """
+    加载MTM映射：命中缓存直接返回，否则解析Excel并写入缓存
+
+    Args:
+        file_path: MTM映射表路径
+        use_cache: 是否使用持久化缓存
+        sheet_name: 工作表索引或名称，默认第一个
+
+    Returns:
+        {MTM: 机型名称} 字典
+    """
+    file_path = Path(file_path)
+    if not use_cache:
+        return parse_mtm_file(file_path, sheet_name)
+
+    source_hash = compute_file_hash(file_path)
+    mappings = read_cached_mappings(source_hash, sheet_name)
+    if mappings is not None:
+        return mappings
+
+    mappings = parse_mtm_file(file_path, sheet_name)
+    write_cached_mappings(source_hash, mappings, sheet_name)
+    return mappings
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+出货量与每万台比率
+=============================================================================
+可选的出货量/销量输入（Excel 或数据库表），按 MTM 或机型名称 + 期间记录：
+- 先在出货量表上按窗口筛选期间、按 MTM 汇总，再映射为机型名称并合计，
+  得到 机型名称 → 出货量 的小表
+- 比率在聚合结果（立方体计数、机型 × 分类 稀疏矩阵）上按机型名称哈希连接计算，
+  与明细行数无关
+期间列支持月份（2025-01、202501、2025年1月）或日期（日期归入所在月份），按月与分析窗口取交集；
+窗口只覆盖某月的一部分时，该月出货量按覆盖天数 / 当月天数折算；没有期间列时视为窗口内总量。
+未指定的窗口端点取明细数据的最早 / 最晚日期（见 data_window），与计数的实际范围一致
+=============================================================================
+"""
+
+from datetime import date
+from pathlib import Path
+from typing import Optional, Tuple
+import re
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import SHIPMENT_TABLE, SHIPMENT_RATE_BASE
+
+# 列名别名（按顺序匹配第一个存在的列）
+KEY_COLUMNS = ("机型名称", "MTM")
+VOLUME_COLUMNS = ("出货量", "销量", "数量", "volume", "shipments")
+PERIOD_COLUMNS = ("期间", "月份", "日期", "period", "month")
+
+VOLUME_COLUMN = "出货量"
+# 比率 = 窗口内计数 / 窗口内出货量 × 基数；窗口的首尾月份只覆盖一部分时，出货量按天数折算（见 ShipmentVolumes.volumes）
+RATE_COLUMN = "每万台" if SHIPMENT_RATE_BASE == 10000 else f"每{SHIPMENT_RATE_BASE}台"
+
+# 期间格式：年月（202501 / 2025-01 / 2025年1月），年月日（20250115 / 2025-01-15 / 2025年1月15日，可带时间）
+_MONTH_PATTERNS = (
+    re.compile(r"^(\d{4})(\d{2})$"),
+    re.compile(r"^(\d{4})\s*[年\-/.]\s*(\d{1,2})\s*月?$"),
+    re.compile(r"^(\d{4})(\d{2})\d{2}$"),
+    re.compile(r"^(\d{4})\s*[年\-/.]\s*(\d{1,2})\s*[月\-/.]\s*\d{1,2}\s*日?(?:[\sT].*)?$"),
+)
+
+
+def _pick_column(df: pd.DataFrame, candidates) -> Optional[str]:
+    return next((c for c in candidates if c in df.columns), None)
+
+
+def _parse_month(value) -> Optional[pd.Period]:
+    """单个期间值转为月份，无法解析时返回None"""
+    if isinstance(value, (pd.Timestamp, date)):
+        return pd.Period(value, "M")
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    for pattern in _MONTH_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            year, month = int(match.group(1)), int(match.group(2))
+            return pd.Period(year=year, month=month, freq="M") if 1 <= month <= 12 else None
+    return None
+
+
+def parse_periods(values: pd.Series) -> pd.Series:
+    """
+    期间列转为月份（按不同取值解析一次再映射回各行）
+
+    Args:
+        values: 期间列
+
+    Returns:
+        Period[M] Series，无法解析或为空的为NaT
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.to_period("M")
+    uniques = values.dropna().unique()
+    months = {value: _parse_month(value) for value in uniques}
+    return pd.Series(
+        pd.PeriodIndex([months.get(value) for value in values], freq="M"),
+        index=values.index
+    )
+
+
+def data_window(df: pd.DataFrame, start_date: Optional[date] = None,
+                end_date: Optional[date] = None,
+                date_column: Optional[str] = None) -> Tuple[Optional[date], Optional[date]]:
+    """
+    出货量的汇总窗口：指定的端点原样使用，未指定的端点取明细数据的最早 / 最晚日期
+
+    不指定日期时计数覆盖全部明细，出货量也应只取数据实际覆盖的月份（首尾月份按天折算），
+    而不是出货量表中的全部期间（与 DailyPartialStore.input_range 的默认窗口一致）
+
+    Args:
+        df: 明细数据
+        start_date: 指定的开始日期
+        end_date: 指定的结束日期
+        date_column: 日期列名，为None时使用第一列
+
+    Returns:
+        (开始日期, 结束日期)；数据为空或日期无法解析时未指定的端点仍为None
+    """
+    if (start_date and end_date) or df is None or df.empty:
+        return start_date, end_date
+    if date_column is None:
+        date_column = df.columns[0]
+    values = df[date_column]
+    stamps = values if pd.api.types.is_datetime64_any_dtype(values) else pd.to_datetime(values, errors="coerce")
+    first, last = stamps.min(), stamps.max()
+    if pd.isna(first):
+        return start_date, end_date
+    return start_date or first.date(), end_date or last.date()
+
+
+class ShipmentVolumes:
+    """出货量表（按 MTM 或机型名称 + 期间）"""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        由出货量明细构建
+
+        Args:
+            df: 至少包含 机型名称/MTM 之一与 出货量（或别名）列的DataFrame
+
+        Raises:
+            ValueError: 缺少键列或出货量列
+        """
+        key = _pick_column(df, KEY_COLUMNS)
+        volume = _pick_column(df, VOLUME_COLUMNS)
+        if key is None or volume is None:
+            raise ValueError(
+                f"出货量表需要 {'/'.join(KEY_COLUMNS)} 之一与 {'/'.join(VOLUME_COLUMNS)} 之一"
+            )
+        period = _pick_column(df, PERIOD_COLUMNS)
+
+        frame = pd.DataFrame({
+            key: df[key].astype(str).str.strip(),
+            VOLUME_COLUMN: pd.to_numeric(df[volume], errors="coerce").fillna(0),
+        })
+        if period is not None:
+            frame["月份"] = parse_periods(df[period])
+            invalid = frame["月份"].isna()
+            if invalid.all() and len(frame):
+                raise ValueError(f"出货量表的期间列 {period} 无法解析（支持 202501 / 2025-01 / 2025年1月 / 日期）")
+            if invalid.any():
+                examples = ", ".join(map(str, df.loc[invalid, period].drop_duplicates().head(3)))
+                print(f"⚠️ 出货量表 {invalid.sum()} 行的期间为空或无法解析（如 {examples}），按窗口筛选时不计入")
+        self.key = key
+        self.frame = frame
+
+    @classmethod
+    def from_excel(cls, file_path, sheet_name: int = 0) -> "ShipmentVolumes":
+        """
+        从Excel读取出货量表
+
+        Args:
+            file_path: Excel文件路径
+            sheet_name: 工作表索引
+
+        Returns:
+            ShipmentVolumes
+        """
+        try:
+            df = pd.read_excel(file_path, sheet_name=sheet_name)
+        except Exception as e:
+            raise IOError(f"读取出货量文件失败: {e}")
+        return cls(df)
+
+    @classmethod
+    def from_database(cls, table_name: str = SHIPMENT_TABLE,
+                      db_config: Optional[dict] = None) -> "ShipmentVolumes":
+        """
+        从数据库表读取出货量
+
+        Args:
+            table_name: 表名，默认使用配置 SHIPMENT_TABLE
+            db_config: 数据库配置，为None时使用默认配置
+
+        Returns:
+            ShipmentVolumes
+        """
+        from modules.database import DatabaseManager
+
+        db = DatabaseManager(db_config)
+        if not db.connect():
+            raise RuntimeError("数据库连接失败，无法读取出货量")
+        try:
+            df = pd.read_sql(f"SELECT * FROM {table_name}", db.engine)
+        except Exception as e:
+            raise RuntimeError(f"读取出货量表 {table_name} 失败: {e}")
+        finally:
+            db.close()
+        return cls(df)
+
+    @classmethod
+    def load(cls, source: str, db_config: Optional[dict] = None) -> "ShipmentVolumes":
+        """
+        按来源加载："database" 读取数据库表，否则视为Excel路径
+
+        Args:
+            source: Excel文件路径 或 "database"
+            db_config: 数据库配置
+
+        Returns:
+            ShipmentVolumes
+        """
+        if source.lower() == "database":
+            return cls.from_database(db_config=db_config)
+        return cls.from_excel(source)
+
+    def volumes(self, mtm_manager=None, start_date: Optional[date] = None,
+                end_date: Optional[date] = None, resolve_family: bool = False) -> pd.Series:
+        """
+        分析窗口内各机型的出货量
+
+        窗口只覆盖某月的一部分时，该月出货量乘以 窗口内天数 / 当月天数，
+        使部分月份窗口的比率与整月窗口可比
+
+        Args:
+            mtm_manager: MTM管理器（出货量按MTM记录时用于映射机型名称）
+            start_date: 窗口开始日期（按所在月份筛选并折算）
+            end_date: 窗口结束日期（按所在月份筛选并折算）
+            resolve_family: 未映射MTM是否按系列前缀解析
+
+        Returns:
+            以机型名称为索引的出货量Series（int64，只含出货量大于0的机型）
+        """
+        frame = self.frame
+        if "月份" in frame.columns and (start_date or end_date):
+            frame = frame[frame["月份"].notna()]
+            months = frame["月份"]
+            # 各月与窗口重叠的天数（窗口一端未指定时按整月计）
+            month_start = months.dt.start_time
+            month_end = months.dt.end_time.dt.normalize()
+            overlap_start = month_start.clip(lower=pd.Timestamp(start_date)) if start_date else month_start
+            overlap_end = month_end.clip(upper=pd.Timestamp(end_date)) if end_date else month_end
+            days = ((overlap_end - overlap_start).dt.days + 1).clip(lower=0)
+            weight = days / months.dt.days_in_month
+            frame = frame[weight > 0].assign(**{VOLUME_COLUMN: frame[VOLUME_COLUMN] * weight})
+
+        # 先按键汇总再映射：映射只作用于不同 MTM 的小表
+        totals = frame.groupby(self.key, sort=False)[VOLUME_COLUMN].sum().reset_index()
+        if self.key == "MTM":
+            if mtm_manager is None:
+                raise ValueError("出货量按MTM记录，需要提供MTM映射")
+            totals = mtm_manager.map_dataframe(totals, resolve_family, verbose=False)
+        volumes = totals.groupby("机型名称", sort=False)[VOLUME_COLUMN].sum()
+        volumes = volumes[volumes > 0].round().astype(np.int64)
+        volumes.name = VOLUME_COLUMN
+        return volumes
+
+
+# ================================================================
+# 每万台比率（在聚合结果上计算）
+# ================================================================
+
+def per_units(counts, units) -> np.ndarray:
+    """
+    计数 / 出货量 × 基数（出货量缺失或为0时为NaN）
+
+    Args:
+        counts: 计数数组
+        units: 对应的出货量数组（可含NaN）
+
+    Returns:
+        保留2位小数的比率数组
+    """
+    units = np.asarray(units, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.asarray(counts, dtype=np.float64) / np.where(units > 0, units, np.nan)
+    return np.round(rates * SHIPMENT_RATE_BASE, 2)
+
+
+def issue_rates(matrix, volumes: pd.Series) -> pd.Series:
+    """
+    各分类的每万台比率：有出货量的机型上该分类的计数合计 / 这些机型的出货量合计
+
+    Args:
+        matrix: 机型 × 分类 稀疏计数矩阵
+        volumes: 机型出货量（ShipmentVolumes.volumes 的结果）
+
+    Returns:
+        以分类为索引的比率Series；没有任何机型有出货量时全部为NaN
+    """
+    units = volumes.reindex(matrix.row_labels).to_numpy(dtype=np.float64)
+    covered = units > 0
+    covered_units = units[covered].sum()
+
+    # 只累加有出货量机型的单元格，分母为这些机型的出货量合计
+    entry_covered = covered[matrix.entry_rows]
+    counts = np.bincount(
+        matrix.indices[entry_covered], weights=matrix.data[entry_covered],
+        minlength=len(matrix.col_labels)
+    )
+    return pd.Series(
+        per_units(counts, np.full(len(counts), covered_units)),
+        index=pd.Index(matrix.col_labels), name=RATE_COLUMN
+    )
@@ -16,21 +16,14 @@ from datetime import date
 
 sys.path.append(str(Path(__file__).parent))
 
-from data import DataManager
-from modules.mtm_manager import MTMManager
-from services import (
-    run_weekly_analysis,
-    run_top_issue_analysis,
-    run_top_model_analysis,
-    generate_weekly_report,
-    generate_top_issue_report,
-    generate_top_model_report
-)
+# 顶层只导入参数解析所需的配置；数据层、分析服务（pandas 等）在各模式函数内按需导入，
+# 使 --help、参数错误等路径无需加载重型依赖
+from config import CATEGORY_SUFFIXES, STREAM_CHUNK_ROWS, DEFAULT_ARTIFACT_FORMATS, CHART_STYLE, CHART_PROFILE
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="QCR v4.0")
     parser.add_argument("--cli", action="store_true", help="命令行模式")
-    parser.add_argument("--mode", choices=['weekly', 'top-issue', 'top-model'], help="分析模式")
+    parser.add_argument("--mode", choices=['weekly', 'top-issue', 'top-model', 'trend', 'anomaly', 'all'], help="分析模式（trend: ISO周环比趋势；anomaly: 日计数EWMA异常检测；all: 一次加载完成全部分析）")
     parser.add_argument("--data", dest="data_file", help="数据文件")
     parser.add_argument("--mtm", dest="mtm_file", help="MTM文件")
     parser.add_argument("--output", dest="output_dir", default="output", help="输出目录")
@@ -38,8 +31,21 @@ def parse_arguments():
     parser.add_argument("--end-date", dest="end_date", help="结束日期")
     parser.add_argument("--batch-name", dest="batch_name", default="2024-2025", help="批次名称")
     parser.add_argument("--top-n", dest="top_n", type=int, default=10, help="Top N")
+    parser.add_argument("--week", help="趋势分析对比的ISO周（如 2025-W07），默认数据中的最后一周")
+    parser.add_argument("--suffix", choices=CATEGORY_SUFFIXES, help="异常检测只统计该分类后缀对应的审核原因，默认不区分")
     parser.add_argument("--filter-unmapped", action="store_true", help="过滤未映射")
+    parser.add_argument("--resolve-family", action="store_true", help="未映射MTM按系列前缀解析")
+    parser.add_argument("--incremental", action="store_true", help="按天分片增量聚合（top-issue / top-model）")
+    parser.add_argument("--approx", action="store_true", help="近似统计：流式读取 + 草图（top-issue: SpaceSaving；top-model: 每机型HyperLogLog），内存与数据量无关")
+    parser.add_argument("--shipments", help="出货量来源（Excel路径或 database），top-issue / top-model 附每万台比率")
+    parser.add_argument("--stats-only", action="store_true", help="仅统计，不写出任何文件")
     parser.add_argument("--generate-ppt", action="store_true", help="生成PPT")
+    parser.add_argument("--native-charts", action="store_true", help="PPT使用原生图表（由分布表生成、可编辑），不再渲染PNG")
+    parser.add_argument("--chart-profile", choices=list(CHART_STYLE['profiles']), default=CHART_PROFILE,
+                        help="图表渲染配置档（draft: 低分辨率快速预览；report: 默认；print: 300dpi）")
+    parser.add_argument("--profile-memory", action="store_true", help="按阶段输出内存占用（RSS / 峰值 / 分配峰值）")
+    parser.add_argument("--measure-baseline", action="store_true",
+                        help="all 模式结束后按相同参数实际运行三次单项分析（输出到 <output>/_baseline），对比耗时")
     parser.add_argument("--port", type=int, default=5000, help="Web端口")
     return parser.parse_args()
 
@@ -58,47 +64,236 @@ def run_cli_mode(args):
         print("错误：命令行模式需要 --mode 和 --data 参数")
         sys.exit(1)
     
-    data_manager = DataManager()
-    df = data_manager.read_excel(args.data_file)
-    
     start_date = parse_date(args.start_date)
     end_date = parse_date(args.end_date)
-    if start_date or end_date:
-        df = data_manager.filter_by_date_range(df, start_date, end_date)
+    formats = () if args.stats_only else None
+    generate_ppt = args.generate_ppt and not args.stats_only
+    if generate_ppt and args.native_charts:
+        # 图表直接在PPT中由分布表构建，整个流程不再调用matplotlib
+        formats = tuple(fmt for fmt in DEFAULT_ARTIFACT_FORMATS if fmt != "png")
+        print("✓ 原生图表模式：PPT图表由分布表直接生成，跳过PNG渲染")
+    elif generate_ppt and args.chart_profile == 'draft':
+        # 草稿图表只用于预览，PPT改用原生图表保持完整质量
+        args.native_charts = True
+        print("✓ 草稿图表：PPT改用原生图表")
+
+    from utils.memory import MemoryTracker
+    from services.chart_service import chart_profile
+
+    memory = MemoryTracker(enabled=args.profile_memory)
+    try:
+        with chart_profile(args.chart_profile):
+            _run_cli_analysis(args, start_date, end_date, formats, generate_ppt, memory)
+    finally:
+        memory.report()
+        memory.stop()
+
+def _run_cli_analysis(args, start_date, end_date, formats, generate_ppt, memory):
+    """命令行分析流程（各阶段计入内存统计）"""
+    from data import DataManager, DailyPartialStore, LazyDataset, ShipmentVolumes, data_window, source_namespace
+    from modules.mtm_manager import MTMManager
+    from services import (
+        run_top_issue_approx,
+        run_top_model_approx,
+        run_anomaly_detection,
+        run_all_analysis,
+    )
+
+    if args.mode == 'all':
+        results = run_all_analysis(
+            data_source=args.data_file,
+            mtm_file=args.mtm_file,
+            output_dir=args.output_dir,
+            start_date=start_date,
+            end_date=end_date,
+            filter_unmapped=args.filter_unmapped,
+            resolve_family=args.resolve_family,
+            top_n=args.top_n,
+            generate_ppt=generate_ppt,
+            batch_name=args.batch_name,
+            formats=formats,
+            memory_tracker=memory,
+            shipments=args.shipments,
+            native_charts=args.native_charts
+        )
+        if args.measure_baseline:
+            from services.combined_analysis import print_baseline_comparison
+            print_baseline_comparison(results["timings"], _measure_separate_runs(args))
+        return
+    
+    if args.approx:
+        if args.mode not in ('top-issue', 'top-model'):
+            print("错误：--approx 仅支持 --mode top-issue / top-model")
+            sys.exit(1)
+        # 逐块读取并更新草图，不保留明细
+        with memory.stage("approx"):
+            chunks = DataManager().iter_excel(
+                args.data_file, STREAM_CHUNK_ROWS, columns=['MTM', '审核原因', '分类']
+            )
+            run_approx = run_top_issue_approx if args.mode == 'top-issue' else run_top_model_approx
+            run_approx(
+                chunks, MTMManager(Path(args.mtm_file)), args.output_dir, args.top_n,
+                start_date, end_date,
+                filter_unmapped=args.filter_unmapped,
+                resolve_family=args.resolve_family,
+                formats=formats
+            )
+        if generate_ppt:
+            print("提示：近似模式暂不生成PPT")
+        if args.shipments:
+            print("提示：近似模式暂不计算每万台比率")
+        return
+    
+    data_manager = DataManager()
+    with memory.stage("load"):
+        df = data_manager.read_excel(args.data_file)
+        mtm_manager = MTMManager(Path(args.mtm_file))
+        # 出货量窗口：未指定的端点取数据的最早 / 最晚日期（df 随后会被筛选或释放）
+        shipment_window = data_window(df, start_date, end_date)
     
-    mtm_manager = MTMManager(Path(args.mtm_file))
-    df = mtm_manager.map_dataframe(df)
+    if args.mode == 'anomaly':
+        # 分片只聚合新增或变化的日期，基线只推进新增日期
+        with memory.stage("anomaly"):
+            store = DailyPartialStore()
+            store.update(df)
+            run_anomaly_detection(
+                store, mtm_manager, args.output_dir, args.suffix,
+                filter_unmapped=args.filter_unmapped,
+                resolve_family=args.resolve_family,
+                formats=formats
+            )
+        return
     
-    if args.filter_unmapped:
-        df = data_manager.filter_unmapped_mtm(df)
+    cube = None
+    if args.incremental and args.mode in ('top-issue', 'top-model'):
+        # 只聚合新增或变化的日期，窗口统计由按天分片合并得到；分片按数据文件分开存放
+        with memory.stage("daily_partials"):
+            store = DailyPartialStore(source_namespace(args.data_file))
+            store.update(df)
+            cube = store.build_cube(
+                mtm_manager, start_date, end_date,
+                filter_unmapped=args.filter_unmapped,
+                resolve_family=args.resolve_family
+            )
+            df = None
+    else:
+        if args.incremental:
+            print("提示：Weekly Report / 趋势分析需要明细数据，--incremental 仅对 top-issue / top-model 生效")
+        with memory.stage("filter_map"):
+            # 日期筛选 + MTM映射 + 过滤未映射融合为一次掩码求值，只物化该分析读取的列
+            df = (
+                LazyDataset(df)
+                .filter_date_range(start_date, end_date)
+                .map_mtm(mtm_manager, args.resolve_family)
+                .filter_unmapped(args.filter_unmapped)
+                .collect(_required_columns(args.mode))
+            )
+    
+    volumes = None
+    if args.shipments and args.mode in ('top-issue', 'top-model'):
+        # 出货量按窗口汇总为 机型名称 → 出货量 的小表，比率在聚合结果上计算
+        volumes = ShipmentVolumes.load(args.shipments).volumes(
+            mtm_manager, *shipment_window, args.resolve_family
+        )
+        print(f"✓ 出货量：{len(volumes)} 个机型")
     
+    with memory.stage("analysis"):
+        _run_single_analysis(args, df, cube, start_date, end_date, formats, generate_ppt, volumes)
+
+def _measure_separate_runs(args):
+    """
+    以相同参数依次运行 weekly / top-issue / top-model 三个单项命令（子进程），返回各自的实测耗时
+
+    输出写入 <output>/_baseline/<模式>，日志保存在同目录的 <模式>.log；与合并运行共用缓存目录
+    """
+    import subprocess
+
+    baseline_root = Path(args.output_dir) / "_baseline"
+    baseline_root.mkdir(parents=True, exist_ok=True)
+    options = ["--batch-name", args.batch_name, "--top-n", str(args.top_n), "--chart-profile", args.chart_profile]
+    for flag, value in (("--mtm", args.mtm_file), ("--start-date", args.start_date),
+                        ("--end-date", args.end_date), ("--shipments", args.shipments)):
+        if value:
+            options += [flag, value]
+    for flag, enabled in (("--filter-unmapped", args.filter_unmapped), ("--resolve-family", args.resolve_family),
+                          ("--stats-only", args.stats_only), ("--generate-ppt", args.generate_ppt),
+                          ("--native-charts", args.native_charts)):
+        if enabled:
+            options.append(flag)
+
+    timings = {}
+    for mode in ("weekly", "top-issue", "top-model"):
+        print(f"\n🔄 基线：单独运行 {mode} ...")
+        command = [sys.executable, str(Path(__file__).resolve()), "--cli", "--mode", mode,
+                   "--data", args.data_file, "--output", str(baseline_root / mode), *options]
+        start = time.perf_counter()
+        with open(baseline_root / f"{mode}.log", "w", encoding="utf-8") as log:
+            code = subprocess.call(command, stdout=log, stderr=subprocess.STDOUT)
+        timings[mode] = time.perf_counter() - start
+        if code != 0:
+            print(f"⚠️ 单独运行 {mode} 失败（退出码 {code}），见 {baseline_root / f'{mode}.log'}")
+    return timings
+
+def _required_columns(mode):
+    """分析模式需要读取的原始列（None 表示全部）"""
+    if mode == 'top-issue':
+        from services.top_issue_analysis import TopIssueAnalysisService
+        return TopIssueAnalysisService.REQUIRED_COLUMNS
+    if mode == 'top-model':
+        from services.top_model_analysis import TopModelAnalysisService
+        return TopModelAnalysisService.REQUIRED_COLUMNS
+    return None
+
+def _run_single_analysis(args, df, cube, start_date, end_date, formats, generate_ppt, volumes=None):
+    """执行单项分析并按需生成PPT"""
+    from services import (
+        run_top_issue_analysis,
+        run_top_model_analysis,
+        run_trend_analysis,
+        generate_weekly_report,
+        generate_top_issue_report,
+        generate_top_model_report,
+    )
+
     if args.mode == 'weekly':
         from services.weekly_analysis import WeeklyAnalysisService
         service = WeeklyAnalysisService(args.output_dir)
         service.print_model_list(df)
-        results = service.analyze(df, start_date, end_date)
-        if args.generate_ppt:
+        results = service.analyze(df, start_date, end_date, formats=formats)
+        if generate_ppt:
             payload = service.get_ppt_payload()
-            ppt_path = generate_weekly_report(payload, args.output_dir, args.batch_name)
+            ppt_path = generate_weekly_report(payload, args.output_dir, args.batch_name,
+                                              native_charts=args.native_charts)
             print(f"✓ PPT: {ppt_path}")
     
     elif args.mode == 'top-issue':
-        results = run_top_issue_analysis(df, args.output_dir, args.top_n)
-        if args.generate_ppt:
+        results = run_top_issue_analysis(df, args.output_dir, args.top_n, cube=cube, formats=formats,
+                                         volumes=volumes)
+        if generate_ppt:
             from services.top_issue_analysis import TopIssueAnalysisService
             service = TopIssueAnalysisService(args.output_dir)
+            service.results = results  # 注入结果
             payload = service.get_ppt_payload()
-            ppt_path = generate_top_issue_report(payload, args.output_dir, args.batch_name)
+            ppt_path = generate_top_issue_report(payload, args.output_dir, args.batch_name,
+                                                 native_charts=args.native_charts)
             print(f"✓ PPT: {ppt_path}")
     
     elif args.mode == 'top-model':
-        results = run_top_model_analysis(df, args.output_dir, args.top_n)
-        if args.generate_ppt:
+        results = run_top_model_analysis(df, args.output_dir, args.top_n, cube=cube, formats=formats,
+                                         volumes=volumes)
+        if generate_ppt:
             from services.top_model_analysis import TopModelAnalysisService
             service = TopModelAnalysisService(args.output_dir)
+            service.results = results  # 注入结果
             payload = service.get_ppt_payload()
-            ppt_path = generate_top_model_report(payload, args.output_dir, args.batch_name)
+            ppt_path = generate_top_model_report(payload, args.output_dir, args.batch_name,
+                                                 native_charts=args.native_charts)
             print(f"✓ PPT: {ppt_path}")
+    
+    elif args.mode == 'trend':
+        results = run_trend_analysis(df, args.output_dir, args.top_n, args.week, formats=formats)
+        if generate_ppt:
+            print("提示：趋势分析暂不生成PPT")
 
 def run_web_mode(args):
     """Web模式"""
@@ -126,6 +321,9 @@ def run_web_mode(args):
 
 def main():
     args = parse_arguments()
+    # 写时复制：筛选结果与缓存共享底层数据，修改时才复制（全局选项，只在入口开启）
+    from utils.memory import enable_copy_on_write
+    enable_copy_on_write()
     if args.cli:
         run_cli_mode(args)
     else:
@@ -1,18 +1,18 @@
 # -*- coding: utf-8 -*-
-"""QCR分析工具 - 模块包"""
+"""QCR分析工具 - 模块包（导出项在首次访问时才导入，避免启动时加载 sqlalchemy / python-pptx / requests）"""
 
-from .database import DatabaseManager
-from .mtm_manager import MTMManager
-from .llm_service import LLMService, LLMGenerationError
-from .data_analyzer import DataAnalyzer
-from .ppt_generator import PPTGenerator
+from utils.lazy import lazy_exports
 
-__all__ = [
-    'DatabaseManager',
-    'MTMManager',
-    'LLMService',
-    'LLMGenerationError',
-    'DataAnalyzer',
-    'PPTGenerator',
-]
+# 导出名 → 所在子模块
+_EXPORTS = {
+    'DatabaseManager': '.database',
+    'MTMManager': '.mtm_manager',
+    'LLMService': '.llm_service',
+    'LLMGenerationError': '.llm_service',
+    'DataAnalyzer': '.data_analyzer',
+    'PPTGenerator': '.ppt_generator',
+}
 
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+聚合立方体
+=============================================================================
+对数据集一次性计算 (机型名称, 审核原因, 分类) 计数表（整数编码数组），
+Weekly / Top Issue / Top Model 各项统计表均由其切片求和得到，
+同一数据集的立方体可跨请求缓存复用；
+可选按行切分为连续分片，在进程池中从共享内存读取编码并行计数后合并（默认关闭）
+=============================================================================
+"""
+
+import hashlib
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from threading import Lock
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import CUBE_CACHE_MAX_ENTRIES, CUBE_SHARD_WORKERS, CUBE_SHARD_MIN_ROWS
+from modules.parallel_executor import ParallelExecutor, resolve_worker_count
+from modules.sparse_matrix import SparseCountMatrix
+
+
+CUBE_DIMENSIONS = ("机型名称", "审核原因", "分类")
+
+
+class AggregateCube:
+    """(机型名称, 审核原因, 分类) 计数立方体"""
+
+    def __init__(self, labels: Dict[str, np.ndarray], codes: Dict[str, np.ndarray],
+                 counts: np.ndarray, total_records: int):
+        """
+        初始化立方体（通常通过 from_dataframe / build_cube 构建）
+
+        Args:
+            labels: 各维度的取值标签数组（按首次出现顺序）
+            codes: 各维度的单元格编码数组，-1 表示空值
+            counts: 单元格计数数组
+            total_records: 原始记录总数
+        """
+        self.labels = labels
+        self.codes = codes
+        self.counts = counts
+        self.total_records = total_records
+        self._label_positions = {}
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "AggregateCube":
+        """
+        由明细数据构建立方体
+
+        Args:
+            df: 包含 机型名称 / 审核原因 / 分类 列的DataFrame
+
+        Returns:
+            AggregateCube
+        """
+        labels, combined, sizes = _encode_rows(df)
+        cell_keys, counts, _ = _count_combined(combined)
+        return cls(labels, _decode_cells(cell_keys, sizes), counts, len(df))
+
+    @classmethod
+    def from_dataframe_sharded(cls, df: pd.DataFrame, workers: Optional[int] = None) -> "AggregateCube":
+        """
+        分片并行构建立方体，结果与 from_dataframe 完全一致
+
+        字符串维度在当前进程中编码一次，得到每行一个 int64 组合编码；组合编码放入共享内存，
+        工作进程按连续行区间直接读取（不序列化明细数据），只回传很小的局部计数表。
+        进程池使用 forkserver（不支持时用 spawn）启动，不从多线程进程中 fork；
+        进程池启动失败（如调用脚本缺少 if __name__ == "__main__" 保护）或分片出错时回退为串行计数。
+        工作进程数为1时退化为 from_dataframe
+
+        注意：构建耗时主要在字符串编码（200万行约占九成），只有组合编码的计数可以分片，
+        单机上并行不会明显加速，因此 CUBE_SHARD_WORKERS 默认为1（关闭）
+
+        Args:
+            df: 包含 机型名称 / 审核原因 / 分类 列的DataFrame
+            workers: 工作进程数，None 使用配置 CUBE_SHARD_WORKERS
+
+        Returns:
+            AggregateCube
+        """
+        workers = resolve_worker_count(CUBE_SHARD_WORKERS if workers is None else workers)
+        if workers == 1 or len(df) < 2:
+            return cls.from_dataframe(df)
+
+        labels, combined, sizes = _encode_rows(df)
+        bounds = np.linspace(0, len(df), min(workers, len(df)) + 1).astype(np.int64).tolist()
+
+        buffer = shared_memory.SharedMemory(create=True, size=combined.nbytes)
+        try:
+            np.ndarray(combined.shape, dtype=combined.dtype, buffer=buffer.buf)[:] = combined
+            shards = [(buffer.name, len(combined), start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+            with ParallelExecutor(workers, chunk_size=1) as executor:
+                results = executor.map(_count_shard, shards)
+        finally:
+            buffer.close()
+            buffer.unlink()
+
+        failed = [r for r in results if not r.ok]
+        if failed:
+            print(f"⚠️ 分片聚合失败，改为串行计数: {failed[0].error.splitlines()[0]}")
+            parts = [_count_combined(combined)]
+        else:
+            parts = [r.value for r in results]
+        cell_keys, counts = _merge_cells(parts)
+        return cls(labels, _decode_cells(cell_keys, sizes), counts, len(df))
+
+    @classmethod
+    def from_counts(cls, counts_df: pd.DataFrame, count_column: str = "数量",
+                    total_records: Optional[int] = None) -> "AggregateCube":
+        """
+        由已聚合的计数表构建立方体（合并分片或预聚合结果时使用）
+
+        Args:
+            counts_df: 包含三个维度列和计数列的DataFrame
+            count_column: 计数列名
+            total_records: 原始记录总数，默认为计数之和
+
+        Returns:
+            AggregateCube
+        """
+        labels, codes = {}, {}
+        for dim in CUBE_DIMENSIONS:
+            dim_codes, uniques = pd.factorize(counts_df[dim])
+            labels[dim] = np.asarray(uniques, dtype=object)
+            codes[dim] = dim_codes.astype(np.int64)
+        counts = counts_df[count_column].to_numpy(dtype=np.int64)
+        total = int(counts.sum()) if total_records is None else total_records
+        return cls(labels, codes, counts, total)
+
+    def to_counts_frame(self, count_column: str = "数量") -> pd.DataFrame:
+        """
+        导出为 (三个维度, 计数) 的长表
+
+        Args:
+            count_column: 计数列名
+
+        Returns:
+            DataFrame
+        """
+        data = {}
+        for dim in CUBE_DIMENSIONS:
+            data[dim] = self._decode(dim, self.codes[dim])
+        data[count_column] = self.counts
+        return pd.DataFrame(data)
+
+    # ================================================================
+    # 查询
+    # ================================================================
+
+    def _decode(self, dim: str, codes: np.ndarray) -> np.ndarray:
+        """编码转回标签，空值编码还原为None"""
+        labels = np.append(self.labels[dim], None)
+        return labels[np.where(codes >= 0, codes, len(labels) - 1)]
+
+    def _label_code(self, dim: str, label) -> int:
+        if dim not in self._label_positions:
+            self._label_positions[dim] = {v: i for i, v in enumerate(self.labels[dim])}
+        return self._label_positions[dim].get(label, -2)
+
+    def _mask(self, where: Optional[Dict[str, Iterable]]) -> np.ndarray:
+        """按维度取值筛选单元格"""
+        mask = np.ones(len(self.counts), dtype=bool)
+        if not where:
+            return mask
+        for dim, values in where.items():
+            if isinstance(values, str) or not isinstance(values, Iterable):
+                values = [values]
+            wanted = [self._label_code(dim, v) for v in values]
+            mask &= np.isin(self.codes[dim], wanted)
+        return mask
+
+    def count(self, where: Optional[Dict[str, Iterable]] = None) -> int:
+        """
+        满足条件的记录数
+
+        Args:
+            where: 筛选条件 {维度: 取值或取值列表}
+
+        Returns:
+            记录数
+        """
+        if not where:
+            return int(self.total_records)
+        return int(self.counts[self._mask(where)].sum())
+
+    def value_counts(self, by: str, where: Optional[Dict[str, Iterable]] = None) -> pd.Series:
+        """
+        按维度计数，等价于对筛选后明细数据执行 df[by].value_counts()
+
+        Args:
+            by: 计数维度
+            where: 筛选条件 {维度: 取值或取值列表}
+
+        Returns:
+            以维度取值为索引、按计数降序的Series
+        """
+        mask = self._mask(where) & (self.codes[by] >= 0)
+        by_codes = self.codes[by][mask]
+        counts = self.counts[mask]
+        if len(by_codes) == 0:
+            return pd.Series([], dtype=np.int64, name="count", index=pd.Index([], name=by))
+
+        # 单元格按首次出现排列，取每个取值最早的单元格位置作为并列时的次序
+        uniq, first_pos, inverse = np.unique(by_codes, return_index=True, return_inverse=True)
+        totals = np.bincount(inverse, weights=counts, minlength=len(uniq)).astype(np.int64)
+        order = np.lexsort((first_pos, -totals))
+        return pd.Series(
+            totals[order],
+            index=pd.Index(self.labels[by][uniq[order]], name=by),
+            name="count"
+        )
+
+    def nunique(self, by: str, of: str, where: Optional[Dict[str, Iterable]] = None) -> pd.Series:
+        """
+        每个 by 取值下 of 维度的不同取值个数（空值不计）
+
+        Args:
+            by: 分组维度
+            of: 去重计数维度
+            where: 筛选条件
+
+        Returns:
+            以 by 取值为索引的Series（按标签首次出现顺序）
+        """
+        mask = self._mask(where) & (self.codes[by] >= 0)
+        by_codes = self.codes[by][mask]
+        of_codes = self.codes[of][mask]
+        present = np.unique(by_codes)
+
+        valid = of_codes >= 0
+        pairs = np.unique(by_codes[valid] * (len(self.labels[of]) + 1) + of_codes[valid])
+        distinct = np.bincount(pairs // (len(self.labels[of]) + 1), minlength=len(self.labels[by]))
+        return pd.Series(distinct[present], index=pd.Index(self.labels[by][present], name=by))
+
+    def matrix(self, row: str, col: str, where: Optional[Dict[str, Iterable]] = None) -> SparseCountMatrix:
+        """
+        两个维度的稀疏交叉计数矩阵（在单元格上合并第三个维度）
+
+        Args:
+            row: 行维度（如"机型名称"）
+            col: 列维度（如"分类"）
+            where: 筛选条件
+
+        Returns:
+            SparseCountMatrix，两个轴的编码与立方体维度编码一致；
+            行/列内计数相同时按单元格首次出现排序，与 value_counts 一致
+        """
+        mask = self._mask(where)
+        return SparseCountMatrix.from_codes(
+            self.codes[row][mask], self.codes[col][mask],
+            self.labels[row], self.labels[col], weights=self.counts[mask]
+        )
+
+    def dimension_labels(self, dim: str) -> np.ndarray:
+        """维度的全部取值（按首次出现顺序，不含空值）"""
+        return self.labels[dim]
+
+
+# ================================================================
+# 单元格计数（全量与分片共用）
+# ================================================================
+
+def _encode_rows(df: pd.DataFrame):
+    """
+    对三个维度做字符串编码，并组合为每行一个 int64 编码
+
+    Returns:
+        (各维度标签, 每行组合编码, 各维度编码数（含空值）)
+    """
+    labels, row_codes, sizes = {}, [], []
+    for dim in CUBE_DIMENSIONS:
+        codes, uniques = pd.factorize(df[dim])
+        labels[dim] = np.asarray(uniques, dtype=object)
+        # 空值(-1)平移为0，便于组合编码
+        row_codes.append(codes.astype(np.int64) + 1)
+        sizes.append(len(uniques) + 1)
+
+    combined = (row_codes[0] * sizes[1] + row_codes[1]) * sizes[2] + row_codes[2]
+    return labels, combined, sizes
+
+
+def _count_combined(combined: np.ndarray, offset: int = 0):
+    """
+    对组合编码计数
+
+    Args:
+        combined: 每行组合编码
+        offset: 首行在全量数据中的行号（分片计数时换算为全局行号）
+
+    Returns:
+        (单元格组合编码, 单元格计数, 各单元格首次出现的行号)，单元格按首次出现排列
+    """
+    # 单元格按首次出现排序，分组计数时可据此复现 value_counts 的并列顺序
+    cell_codes, cell_keys = pd.factorize(combined)
+    counts = np.bincount(cell_codes, minlength=len(cell_keys))
+    # 编码按首次出现递增分配：累计最大值每增加1处即为一个单元格的首行
+    running = np.maximum.accumulate(cell_codes) if len(cell_codes) else cell_codes
+    first_rows = np.flatnonzero(np.diff(running, prepend=-1) > 0) + offset
+    return np.asarray(cell_keys, dtype=np.int64), counts.astype(np.int64), first_rows
+
+
+def _merge_cells(parts):
+    """
+    合并按行顺序排列的分片计数（各分片共用同一套维度编码）
+
+    单元格按全局首次出现的行号排序，与 from_dataframe 的单元格顺序一致
+
+    Returns:
+        (单元格组合编码, 单元格计数)
+    """
+    keys = np.concatenate([part[0] for part in parts])
+    counts = np.concatenate([part[1] for part in parts])
+    first_rows = np.concatenate([part[2] for part in parts])
+    order = np.argsort(first_rows, kind="stable")
+    merged_codes, merged_keys = pd.factorize(keys[order])
+    merged_counts = np.bincount(merged_codes, weights=counts[order], minlength=len(merged_keys))
+    return np.asarray(merged_keys, dtype=np.int64), merged_counts.astype(np.int64)
+
+
+def _decode_cells(cell_keys: np.ndarray, sizes) -> Dict[str, np.ndarray]:
+    """单元格组合编码拆回各维度编码（-1 表示空值）"""
+    rest = cell_keys // sizes[2]
+    return {
+        CUBE_DIMENSIONS[0]: rest // sizes[1] - 1,
+        CUBE_DIMENSIONS[1]: rest % sizes[1] - 1,
+        CUBE_DIMENSIONS[2]: cell_keys % sizes[2] - 1,
+    }
+
+
+def _count_shard(shard):
+    """工作进程：从共享内存读取 [start, stop) 行的组合编码并计数"""
+    name, length, start, stop = shard
+    buffer = shared_memory.SharedMemory(name=name)
+    combined = np.ndarray((length,), dtype=np.int64, buffer=buffer.buf)
+    try:
+        return _count_combined(combined[start:stop], start)
+    finally:
+        # 释放对共享内存的引用后才能关闭
+        del combined
+        buffer.close()
+
+
+# ================================================================
+# 跨请求缓存
+# ================================================================
+
+_CUBE_CACHE: "OrderedDict[str, AggregateCube]" = OrderedDict()
+_CUBE_CACHE_LOCK = Lock()
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """
+    数据集指纹：对立方体维度列做向量化哈希
+
+    Args:
+        df: 数据DataFrame
+
+    Returns:
+        十六进制指纹
+    """
+    hashed = pd.util.hash_pandas_object(df[list(CUBE_DIMENSIONS)], index=False)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()
+
+
+def build_cube(df: pd.DataFrame, use_cache: bool = True) -> AggregateCube:
+    """
+    构建（或从缓存获取）数据集的聚合立方体
+
+    Args:
+        df: 数据DataFrame
+        use_cache: 是否使用进程内LRU缓存
+
+    Returns:
+        AggregateCube
+    """
+    if not use_cache:
+        return _build(df)
+
+    key = dataset_fingerprint(df)
+    with _CUBE_CACHE_LOCK:
+        cube = _CUBE_CACHE.get(key)
+        if cube is not None:
+            _CUBE_CACHE.move_to_end(key)
+            return cube
+
+    cube = _build(df)
+    with _CUBE_CACHE_LOCK:
+        _CUBE_CACHE[key] = cube
+        while len(_CUBE_CACHE) > CUBE_CACHE_MAX_ENTRIES:
+            _CUBE_CACHE.popitem(last=False)
+    return cube
+
+
+def _build(df: pd.DataFrame) -> AggregateCube:
+    """记录数达到 CUBE_SHARD_MIN_ROWS 时分片并行构建，否则串行构建"""
+    if len(df) >= CUBE_SHARD_MIN_ROWS:
+        return AggregateCube.from_dataframe_sharded(df)
+    return AggregateCube.from_dataframe(df)
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+分析结果类型
+=============================================================================
+纯计算阶段返回的结果对象，不包含任何文件I/O；
+产物（Excel/PNG/TXT/PPT）由各服务的写出器按需生成，路径记录在 artifacts 中。
+to_dict() 输出与原有结果字典一致的结构，供PPT生成与Web接口使用
+=============================================================================
+"""
+
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from modules.sparse_matrix import SparseCountMatrix
+from modules.pareto import pareto_table
+from config import LLM_COVERAGE_THRESHOLD, LLM_FOCUS_THRESHOLD
+
+
+def frame_records(df: Optional[pd.DataFrame]) -> List[Dict]:
+    """DataFrame转为可JSON序列化的记录列表"""
+    if df is None or df.empty:
+        return []
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+@dataclass
+class ModelIssues:
+    """单个机型的问题分类统计（Weekly，分类计数引用共享的 机型 × 分类 稀疏矩阵中的一行）"""
+    model: str
+    clean_model: str
+    suffix: str
+    matrix: SparseCountMatrix
+    row: int
+    source: pd.DataFrame
+    rows: np.ndarray
+    chart_path: Optional[Path] = None
+
+    @property
+    def category_df(self) -> pd.DataFrame:
+        """分类频次表 [分类, 次数, 占比]（从矩阵行切片，用时才生成）"""
+        category_df = self.matrix.row_frame(self.row, "分类", "次数")
+        total = category_df["次数"].sum()
+        if total > 0:
+            category_df["占比"] = (category_df["次数"] / total * 100).round(1)
+        else:
+            category_df["占比"] = 0
+        return category_df
+
+    @property
+    def model_data(self) -> pd.DataFrame:
+        """机型明细数据（按行号从源数据中取出，用时才生成）"""
+        return self.source.take(self.rows)
+
+    @property
+    def total_records(self) -> int:
+        return len(self.rows)
+
+    def to_dict(self) -> Dict:
+        return {
+            "model": self.model,
+            "clean_model": self.clean_model,
+            "suffix": self.suffix,
+            "category_df": self.category_df,
+            "matrix": self.matrix,
+            "row": self.row,
+            "chart_path": str(self.chart_path) if self.chart_path else None,
+            "total_records": self.total_records,
+        }
+
+
+@dataclass
+class WeeklyResult:
+    """Weekly Report 分析结果（7天 / 非7天数据只保存行号，不复制明细）"""
+    total_df: pd.DataFrame
+    rows_7d: np.ndarray
+    rows_non_7d: np.ndarray
+    reason_stats: pd.DataFrame
+    model_7d_dist: pd.DataFrame
+    model_non_7d_dist: pd.DataFrame
+    model_issues_7d: List[ModelIssues]
+    model_issues_non7d: List[ModelIssues]
+    report_lines: List[str]
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    cube: Any = None
+    artifacts: Dict[str, Path] = field(default_factory=dict)
+
+    kind = "weekly"
+
+    @property
+    def df_7d(self) -> pd.DataFrame:
+        return self.total_df.take(self.rows_7d)
+
+    @property
+    def df_non_7d(self) -> pd.DataFrame:
+        return self.total_df.take(self.rows_non_7d)
+
+    @property
+    def matrix_7d(self) -> Optional[SparseCountMatrix]:
+        """7天无理由的 机型 × 分类 稀疏矩阵（各机型的分类统计共用）"""
+        return self.model_issues_7d[0].matrix if self.model_issues_7d else None
+
+    @property
+    def matrix_non7d(self) -> Optional[SparseCountMatrix]:
+        """非7天无理由的 机型 × 分类 稀疏矩阵"""
+        return self.model_issues_non7d[0].matrix if self.model_issues_non7d else None
+
+    def pareto(self, coverage_threshold: float = LLM_COVERAGE_THRESHOLD,
+               focus_threshold: float = LLM_FOCUS_THRESHOLD) -> pd.DataFrame:
+        """
+        全部 机型 × 审核类型 切片的覆盖度汇总（每个切片矩阵一次向量计算）
+
+        Args:
+            coverage_threshold: 覆盖度阈值（百分比）
+            focus_threshold: 重点拦截阈值（百分比）
+
+        Returns:
+            DataFrame[审核类型, 机型名称, 合计, 非零数, 覆盖数, 覆盖占比(%), 重点数]
+        """
+        frames = []
+        for suffix, matrix in (("7天无理由", self.matrix_7d), ("非7天无理由", self.matrix_non7d)):
+            if matrix is None:
+                continue
+            frame = pareto_table(matrix, coverage_threshold, focus_threshold).to_frame("机型名称")
+            frame.insert(0, "审核类型", suffix)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def to_dict(self) -> Dict:
+        return {
+            "total_df": self.total_df,
+            "records_7d": len(self.rows_7d),
+            "records_non_7d": len(self.rows_non_7d),
+            "reason_stats": self.reason_stats,
+            "reason_chart": self.artifacts.get("reason_chart"),
+            "model_7d_dist": self.model_7d_dist,
+            "model_7d_chart": self.artifacts.get("model_7d_chart"),
+            "model_non_7d_dist": self.model_non_7d_dist,
+            "model_non_7d_chart": self.artifacts.get("model_non_7d_chart"),
+            "summaries_7d": [m.to_dict() for m in self.model_issues_7d],
+            "summaries_non7d": [m.to_dict() for m in self.model_issues_non7d],
+            "matrix_7d": self.matrix_7d,
+            "matrix_non7d": self.matrix_non7d,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "cube": self.cube,
+        }
+
+    def to_summary(self) -> Dict:
+        """Web接口使用的统计摘要"""
+        return {
+            "total_records": len(self.total_df),
+            "records_7d": len(self.rows_7d),
+            "records_non_7d": len(self.rows_non_7d),
+            "reason_stats": frame_records(self.reason_stats),
+            "model_7d_dist": frame_records(self.model_7d_dist),
+            "model_non_7d_dist": frame_records(self.model_non_7d_dist),
+            "pareto": frame_records(self.pareto()),
+        }
+
+
+@dataclass
+class IssueDetail:
+    """单个Issue的机型分布（Top Issue）"""
+    rank: int
+    issue_name: str
+    count: int
+    percentage: float
+    model_distribution: pd.DataFrame
+    model_dist_path: Optional[Path] = None
+    chart_path: Optional[Path] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "rank": self.rank,
+            "issue_name": self.issue_name,
+            "count": self.count,
+            "percentage": self.percentage,
+            "model_count": len(self.model_distribution),
+            "model_distribution": self.model_distribution,
+            "model_dist_path": self.model_dist_path,
+            "chart_path": self.chart_path,
+        }
+
+
+@dataclass
+class TopIssueResult:
+    """Top Issue 分析结果"""
+    issue_stats: pd.DataFrame
+    issue_details: List[IssueDetail]
+    total_records: int
+    top_n: int
+    # 近似模式（SpaceSaving草图）：Top N机型与全局误差上界；精确统计时为None
+    model_stats: Optional[pd.DataFrame] = None
+    error_bound: Optional[int] = None
+    # 机型 × 分类 稀疏矩阵（各Issue的机型分布即矩阵的列）；近似模式下为None
+    matrix: Optional[SparseCountMatrix] = None
+    artifacts: Dict[str, Path] = field(default_factory=dict)
+
+    kind = "top_issue"
+
+    @property
+    def approximate(self) -> bool:
+        return self.error_bound is not None
+
+    @property
+    def concentration(self) -> Optional[pd.DataFrame]:
+        """Top Issue 在机型间的集中度（涉及机型数、前3机型占比、HHI）"""
+        if self.matrix is None:
+            return None
+        stats = self.matrix.concentration("col", 3, "Issue名称").set_index("Issue名称")
+        return stats.reindex(self.issue_stats["Issue名称"]).reset_index()
+
+    def to_dict(self) -> Dict:
+        return {
+            "issue_stats": self.issue_stats,
+            "issue_details": [d.to_dict() for d in self.issue_details],
+            "summary_chart": self.artifacts.get("summary_chart"),
+            "report_path": self.artifacts.get("report_path"),
+            "total_records": self.total_records,
+            "top_n": self.top_n,
+            "model_stats": self.model_stats,
+            "error_bound": self.error_bound,
+            "matrix": self.matrix,
+        }
+
+    def to_summary(self) -> Dict:
+        """Web接口使用的统计摘要"""
+        summary = {
+            "total_records": self.total_records,
+            "top_n": self.top_n,
+            "issue_stats": frame_records(self.issue_stats),
+        }
+        if self.approximate:
+            summary["model_stats"] = frame_records(self.model_stats)
+            summary["error_bound"] = self.error_bound
+        if self.matrix is not None:
+            summary["concentration"] = frame_records(self.concentration)
+        return summary
+
+
+@dataclass
+class ModelDetail:
+    """单个机型的分类分布（Top Model）"""
+    rank: int
+    model_name: str
+    category_count: int
+    total_records: int
+    avg_per_category: float
+    category_distribution: pd.DataFrame
+    return_7day_count: int
+    return_7day_pct: float
+    quality_count: int
+    quality_pct: float
+    detail_path: Optional[Path] = None
+    chart_path: Optional[Path] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "rank": self.rank,
+            "model_name": self.model_name,
+            "category_count": self.category_count,
+            "total_records": self.total_records,
+            "avg_per_category": self.avg_per_category,
+            "category_distribution": self.category_distribution,
+            "return_7day_count": self.return_7day_count,
+            "return_7day_pct": self.return_7day_pct,
+            "quality_count": self.quality_count,
+            "quality_pct": self.quality_pct,
+            "detail_path": self.detail_path,
+            "chart_path": self.chart_path,
+        }
+
+
+@dataclass
+class TopModelResult:
+    """Top Model 分析结果"""
+    model_stats: pd.DataFrame
+    top_models: pd.DataFrame
+    model_details: List[ModelDetail]
+    total_records: int
+    top_n: int
+    # 近似模式（HyperLogLog）：分类数的相对标准误差；精确统计时为None
+    relative_error: Optional[float] = None
+    # 机型 × 分类 稀疏矩阵（各机型的分类分布即矩阵的行）；近似模式下为None
+    matrix: Optional[SparseCountMatrix] = None
+    artifacts: Dict[str, Path] = field(default_factory=dict)
+
+    kind = "top_model"
+
+    @property
+    def approximate(self) -> bool:
+        return self.relative_error is not None
+
+    @property
+    def concentration(self) -> Optional[pd.DataFrame]:
+        """Top 机型的分类集中度（分类数、前3分类占比、HHI）"""
+        if self.matrix is None:
+            return None
+        stats = self.matrix.concentration("row", 3, "机型名称").set_index("机型名称")
+        return stats.reindex(self.top_models["机型名称"]).reset_index()
+
+    @property
+    def total_models(self) -> int:
+        return len(self.model_stats)
+
+    def to_dict(self) -> Dict:
+        return {
+            "model_stats": self.model_stats,
+            "top_models": self.top_models,
+            "model_details": [d.to_dict() for d in self.model_details],
+            "overall_chart": self.artifacts.get("overall_chart"),
+            "comparison_chart": self.artifacts.get("comparison_chart"),
+            "report_path": self.artifacts.get("report_path"),
+            "total_records": self.total_records,
+            "total_models": self.total_models,
+            "top_n": self.top_n,
+            "relative_error": self.relative_error,
+            "matrix": self.matrix,
+        }
+
+    def to_summary(self) -> Dict:
+        """Web接口使用的统计摘要"""
+        summary = {
+            "total_records": self.total_records,
+            "total_models": self.total_models,
+            "top_n": self.top_n,
+            "top_models": frame_records(self.top_models),
+        }
+        if self.approximate:
+            summary["relative_error"] = self.relative_error
+        if self.matrix is not None:
+            summary["concentration"] = frame_records(self.concentration)
+        return summary
+
+
+@dataclass
+class TrendResult:
+    """周趋势分析结果（机型 / 分类两个维度）"""
+    model_trend: Any
+    category_trend: Any
+    weekly_totals: pd.DataFrame
+    model_risers: pd.DataFrame
+    category_risers: pd.DataFrame
+    current_week: Optional[str]
+    previous_week: Optional[str]
+    total_records: int
+    top_n: int
+    artifacts: Dict[str, Path] = field(default_factory=dict)
+
+    kind = "trend"
+
+    def to_dict(self) -> Dict:
+        return {
+            "weekly_totals": self.weekly_totals,
+            "model_risers": self.model_risers,
+            "category_risers": self.category_risers,
+            "current_week": self.current_week,
+            "previous_week": self.previous_week,
+            "total_records": self.total_records,
+            "top_n": self.top_n,
+            "totals_chart": self.artifacts.get("totals_chart"),
+            "model_risers_chart": self.artifacts.get("model_risers_chart"),
+            "category_risers_chart": self.artifacts.get("category_risers_chart"),
+            "report_path": self.artifacts.get("report_path"),
+        }
+
+    def to_summary(self) -> Dict:
+        """Web接口使用的统计摘要"""
+        return {
+            "total_records": self.total_records,
+            "current_week": self.current_week,
+            "previous_week": self.previous_week,
+            "weekly_totals": frame_records(self.weekly_totals),
+            "model_risers": frame_records(self.model_risers),
+            "category_risers": frame_records(self.category_risers),
+        }
+
+
+@dataclass
+class AnomalyResult:
+    """异常检测结果（EWMA基线，按天增量更新）"""
+    alerts: pd.DataFrame
+    history: pd.DataFrame
+    processed_days: List[date]
+    rebuilt: bool
+    series_count: int
+    last_day: Optional[date]
+    suffix: Optional[str] = None
+    artifacts: Dict[str, Path] = field(default_factory=dict)
+
+    kind = "anomaly"
+
+    def to_dict(self) -> Dict:
+        return {
+            "alerts": self.alerts,
+            "history": self.history,
+            "processed_days": self.processed_days,
+            "rebuilt": self.rebuilt,
+            "series_count": self.series_count,
+            "last_day": self.last_day,
+            "suffix": self.suffix,
+            "excel_path": self.artifacts.get("excel_path"),
+            "chart_path": self.artifacts.get("chart_path"),
+            "report_path": self.artifacts.get("report_path"),
+        }
+
+    def to_summary(self) -> Dict:
+        """Web接口使用的统计摘要"""
+        return {
+            "processed_days": len(self.processed_days),
+            "rebuilt": self.rebuilt,
+            "series_count": self.series_count,
+            "last_day": self.last_day.isoformat() if self.last_day else None,
+            "alerts": frame_records(self.alerts),
+        }
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+图表内容哈希缓存
+=============================================================================
+以图表描述（数据、标签、样式、尺寸、dpi、输出格式）的哈希为键，跳过未变化图表的重新栅格化：
+- 每个输出目录保存一份清单（.chart_cache.json），记录 文件名 → 键/大小/修改时间；
+  图片仍在原位且键一致时直接复用，不做任何写入
+- 渲染结果同时存入 CACHE_DIR/charts/<键>.<格式>，其他输出目录（如Web服务的新任务目录）
+  遇到同一图表时直接复制，不必重新绘制
+- 共享存储按最近使用时间淘汰超出 CHART_CACHE_MAX_ENTRIES 的图片
+- 渲染逻辑变化时递增 _CACHE_FORMAT_VERSION，使历史缓存全部失效
+=============================================================================
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import asdict
+from importlib.metadata import version
+from pathlib import Path
+from typing import Dict, Optional
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import CACHE_DIR, MATPLOTLIB_FONTS, CHART_CACHE_MAX_ENTRIES
+
+# 图表绘制逻辑变化时递增，使历史缓存全部失效
+_CACHE_FORMAT_VERSION = 1
+MANIFEST_NAME = ".chart_cache.json"
+
+
+def _json_default(value):
+    """numpy 数组/标量等非 JSON 原生类型转为列表或数值，其余按字符串处理"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def chart_key(spec) -> str:
+    """
+    计算图表描述的内容哈希（不含输出路径，只含输出格式）
+
+    Args:
+        spec: 图表描述（ChartSpec）
+
+    Returns:
+        十六进制哈希字符串
+    """
+    # 只读取版本号，不导入 matplotlib：全部命中时整个流程无需加载绘图库
+    payload = asdict(spec)
+    path = Path(payload.pop("path"))
+    payload["format"] = path.suffix.lower()
+    payload["renderer"] = [_CACHE_FORMAT_VERSION, version("matplotlib"), list(MATPLOTLIB_FONTS)]
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _atomic_write_json(path: Path, payload: dict):
+    """先写临时文件再替换，避免并发读到半截清单"""
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class ChartManifest:
+    """单个输出目录的图表清单"""
+
+    def __init__(self, directory: Path):
+        self.path = Path(directory) / MANIFEST_NAME
+        self.entries: Dict[str, dict] = {}
+        self.dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") == _CACHE_FORMAT_VERSION:
+                self.entries = payload.get("charts", {})
+        except (OSError, ValueError):
+            pass
+
+    def matches(self, path: Path, key: str) -> bool:
+        """清单记录的键一致，且图片未被替换或改动（大小与修改时间不变）"""
+        entry = self.entries.get(path.name)
+        if not entry or entry.get("key") != key:
+            return False
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        return stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns")
+
+    def record(self, path: Path, key: str):
+        """记录当前图片对应的键"""
+        stat = path.stat()
+        self.entries[path.name] = {"key": key, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self.dirty = True
+
+    def forget(self, path: Path):
+        """移除渲染失败图表的记录"""
+        if self.entries.pop(path.name, None) is not None:
+            self.dirty = True
+
+    def save(self):
+        """写回清单（无变化时跳过）"""
+        if not self.dirty:
+            return
+        try:
+            _atomic_write_json(self.path, {"version": _CACHE_FORMAT_VERSION, "charts": self.entries})
+            self.dirty = False
+        except OSError as e:
+            print(f"  ⚠️ 写入图表缓存清单失败 {self.path}: {e}")
+
+
+class ChartCache:
+    """图表内容哈希缓存：输出目录清单 + 跨目录共享的图片存储"""
+
+    def __init__(self, store_dir: Optional[Path] = None, max_entries: int = CHART_CACHE_MAX_ENTRIES):
+        """
+        初始化缓存
+
+        Args:
+            store_dir: 共享图片存储目录，None 使用 CACHE_DIR/charts
+            max_entries: 共享存储最多保留的图片数
+        """
+        self.store_dir = Path(store_dir) if store_dir else Path(CACHE_DIR) / "charts"
+        self.max_entries = max_entries
+        self._manifests: Dict[Path, ChartManifest] = {}
+        self._lock = threading.Lock()
+
+    def _stored(self, key: str, suffix: str) -> Path:
+        return self.store_dir / f"{key}{suffix.lower()}"
+
+    def manifest(self, directory: Path) -> ChartManifest:
+        """输出目录的清单（同一批次内只读取一次）"""
+        directory = Path(directory)
+        manifest = self._manifests.get(directory)
+        if manifest is None:
+            manifest = self._manifests[directory] = ChartManifest(directory)
+        return manifest
+
+    def lookup(self, path: Path, key: str) -> bool:
+        """
+        查找图表：原位图片仍有效，或从共享存储复制到输出路径
+
+        Args:
+            path: 图表输出路径
+            key: chart_key() 计算的哈希
+
+        Returns:
+            命中返回True（输出路径上已是对应图片）
+        """
+        path = Path(path)
+        manifest = self.manifest(path.parent)
+        stored = self._stored(key, path.suffix)
+        if manifest.matches(path, key):
+            self._touch(stored)
+            return True
+        if not stored.exists():
+            return False
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(stored, path)
+            self._touch(stored)
+            manifest.record(path, key)
+            return True
+        except OSError:
+            return False
+
+    def store(self, path: Path, key: str):
+        """
+        记录新渲染的图表并存入共享存储
+
+        Args:
+            path: 已渲染的图表路径
+            key: chart_key() 计算的哈希
+        """
+        path = Path(path)
+        self.manifest(path.parent).record(path, key)
+        stored = self._stored(key, path.suffix)
+        if stored.exists():
+            self._touch(stored)
+            return
+        try:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.store_dir), suffix=".tmp")
+            os.close(fd)
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, stored)
+        except OSError as e:
+            print(f"  ⚠️ 写入图表缓存失败 {path.name}: {e}")
+
+    def forget(self, path: Path):
+        """渲染失败时移除清单记录"""
+        path = Path(path)
+        self.manifest(path.parent).forget(path)
+
+    def flush(self):
+        """写回本批次修改过的清单，并淘汰共享存储中最久未使用的图片"""
+        with self._lock:
+            for manifest in self._manifests.values():
+                manifest.save()
+            self._manifests.clear()
+            self._evict_old_entries()
+
+    @staticmethod
+    def _touch(stored: Path):
+        """更新访问时间，供淘汰策略使用"""
+        try:
+            os.utime(stored, None)
+        except OSError:
+            pass
+
+    def _evict_old_entries(self):
+        """按最近使用时间淘汰超出上限的图片"""
+        if not self.store_dir.exists():
+            return
+        entries = []
+        for candidate in self.store_dir.iterdir():
+            if candidate.suffix == ".tmp":
+                continue
+            try:
+                entries.append((candidate.stat().st_mtime, candidate))
+            except OSError:
+                pass
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(reverse=True)
+        for _, stale in entries[self.max_entries:]:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
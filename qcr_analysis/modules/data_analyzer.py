@@ -7,10 +7,8 @@
 =============================================================================
 """
 
+import numpy as np
 import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 from datetime import date, datetime, timedelta
@@ -20,17 +18,13 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 from config import (
     AUDIT_REASONS,
-    MATPLOTLIB_FONTS,
-    CHART_STYLE
+    CHART_STYLE,
+    SUFFIX_AUDIT_REASONS
 )
-
-# 设置中文字体
-matplotlib.rcParams['font.family'] = MATPLOTLIB_FONTS
-matplotlib.rcParams['axes.unicode_minus'] = False
-
-# 处理字体警告
-import warnings
-warnings.filterwarnings("ignore", category=UserWarning, message=".*Glyph.*missing.*")
+from modules.grouped_engine import GroupedFrame
+from modules.aggregate_cube import AggregateCube
+from modules.parallel_executor import ParallelExecutor
+from modules.analysis_results import ModelIssues
 
 
 def sanitize_filename(filename: str) -> str:
@@ -98,99 +92,448 @@ def determine_coverage_range(df: pd.DataFrame, date_column: str,
     return actual_start.strftime("%Y/%m/%d"), actual_end.strftime("%Y/%m/%d")
 
 
+# ================================================================
+# 纯计算（无文件I/O）
+# ================================================================
+
+def compute_audit_reasons(df: Optional[pd.DataFrame],
+                          cube: Optional[AggregateCube] = None) -> pd.DataFrame:
+    """
+    统计审核原因
+    
+    Args:
+        df: 数据DataFrame（提供cube时可为None）
+        cube: 数据集的聚合立方体，提供时直接切片求和
+        
+    Returns:
+        审核原因统计表（审核原因、数量、占比）
+    """
+    if cube is not None:
+        counts = {r: cube.count({"审核原因": r}) for r in AUDIT_REASONS}
+    else:
+        counts = {r: int((df["审核原因"] == r).sum()) for r in AUDIT_REASONS}
+    
+    summary_df = pd.DataFrame(list(counts.items()), columns=["审核原因", "数量"])
+    total_count = summary_df["数量"].sum()
+    summary_df["占比"] = (summary_df["数量"] / total_count * 100).round(2)
+    
+    print(f"✓ 审核原因统计完成，共 {total_count} 条记录")
+    return summary_df
+
+
+def compute_model_distribution(df: pd.DataFrame, suffix: str,
+                               cube: Optional[AggregateCube] = None) -> pd.DataFrame:
+    """
+    统计机型分布
+    
+    Args:
+        df: 该后缀的数据DataFrame
+        suffix: 分类后缀（7天无理由 或 非7天无理由）
+        cube: 完整数据集的聚合立方体，提供时按后缀对应的审核原因切片
+        
+    Returns:
+        机型分布表（机型名称、数量、占比），数据为空时返回空表
+    """
+    if len(df) == 0:
+        print(f"警告：{suffix}数据为空")
+        return pd.DataFrame()
+    
+    if cube is not None:
+        model_counts = cube.value_counts("机型名称", {"审核原因": SUFFIX_AUDIT_REASONS[suffix]})
+    else:
+        model_counts = df["机型名称"].value_counts()
+    
+    model_dist = (
+        model_counts
+        .rename_axis("机型名称")
+        .reset_index(name="数量")
+        .assign(占比=lambda x: (x["数量"] / x["数量"].sum() * 100).round(1))
+    )
+    
+    print(f"✓ {suffix}机型分布统计完成，共 {len(df)} 条记录，{len(model_dist)} 个机型")
+    return model_dist
+
+
+def compute_model_issues(df: pd.DataFrame, suffix: str,
+                         rows: Optional[np.ndarray] = None) -> List[ModelIssues]:
+    """
+    按机型统计问题分类
+    
+    Args:
+        df: 数据DataFrame
+        suffix: 分类后缀（7天无理由 或 非7天无理由）
+        rows: 该后缀数据在 df 中的行号，为None时使用全部行
+        
+    Returns:
+        机型问题统计列表（按机型首次出现顺序，明细以行号引用 df）
+    """
+    if rows is None:
+        rows = np.arange(len(df))
+    if len(rows) == 0:
+        print(f"警告：{suffix}数据为空，跳过机型分析")
+        return []
+    
+    # 非7天无理由数据：过滤掉问题描述为空的行
+    if suffix == "非7天无理由" and "问题描述" in df.columns:
+        original_len = len(rows)
+        desc = df["问题描述"].take(rows)
+        rows = rows[(desc.notna() & (desc != "")).to_numpy()]
+        print(f"已过滤空问题描述行，从 {original_len} 条减少到 {len(rows)} 条记录")
+    
+    # 只取分组所需的两列：一次分区 + 一次 机型×分类 计数，逐机型只取行号
+    groups = GroupedFrame(df[["机型名称", "分类"]].take(rows), "机型名称", "分类")
+    
+    # 各机型的分类频次共用同一个稀疏矩阵，逐机型只保存行编码
+    matrix = groups.matrix
+    category_counts = matrix.row_nnz
+    model_issues = []
+    for i, model in enumerate(groups.keys):
+        model_rows = rows[groups.positions(i)]
+        model_issues.append(ModelIssues(
+            model=model,
+            clean_model=sanitize_filename(str(model)),
+            suffix=suffix,
+            matrix=matrix,
+            row=i,
+            source=df,
+            rows=model_rows
+        ))
+        print(f"  - {model}: {category_counts[i]} 个分类，{len(model_rows)} 条记录")
+    
+    print(f"✓ {suffix}机型问题分析完成，共 {len(model_issues)} 个机型")
+    return model_issues
+
+
+def build_text_report(cube: AggregateCube, start_date: Optional[date],
+                      end_date: Optional[date]) -> List[str]:
+    """
+    生成文本分析报告内容
+    
+    Args:
+        cube: 完整数据集的聚合立方体
+        start_date: 开始日期
+        end_date: 结束日期
+        
+    Returns:
+        报告文本行
+    """
+    total = cube.total_records
+    
+    report_lines = []
+    
+    # 1. 基本统计
+    report_lines.append("="*60)
+    report_lines.append("QCR 数据分析报告")
+    report_lines.append("="*60)
+    report_lines.append(f"分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    report_lines.append(f"数据范围: {start_date or '最早'} 至 {end_date or '最新'}")
+    report_lines.append(f"数据总量: {total} 条记录")
+    report_lines.append("")
+    
+    # 2. 机型统计
+    unique_models = cube.dimension_labels('机型名称')
+    report_lines.append(f"涉及机型数: {len(unique_models)} 款")
+    report_lines.append(f"机型列表: {', '.join(unique_models[:10])}")
+    if len(unique_models) > 10:
+        report_lines.append(f"          ... 等共 {len(unique_models)} 款")
+    report_lines.append("")
+    
+    # 3. 审核原因统计
+    report_lines.append("审核原因统计:")
+    for reason in AUDIT_REASONS:
+        count = cube.count({'审核原因': reason})
+        percentage = (count / total * 100) if total > 0 else 0
+        report_lines.append(f"  {reason}: {count} 条 ({percentage:.2f}%)")
+    report_lines.append("")
+    
+    # 4. 7天无理由分析
+    total_7d = cube.count({'审核原因': SUFFIX_AUDIT_REASONS['7天无理由']})
+    if total_7d > 0:
+        report_lines.append("七天无理由机型TOP5:")
+        model_7d_dist = cube.value_counts('机型名称', {'审核原因': SUFFIX_AUDIT_REASONS['7天无理由']}).head(5)
+        for model, count in model_7d_dist.items():
+            percentage = (count / total_7d * 100)
+            report_lines.append(f"  {model}: {count} 条 ({percentage:.1f}%)")
+        report_lines.append("")
+    
+    # 5. 非7天无理由分析
+    total_non_7d = cube.count({'审核原因': SUFFIX_AUDIT_REASONS['非7天无理由']})
+    if total_non_7d > 0:
+        report_lines.append("非七天无理由机型TOP5:")
+        model_non_7d_dist = cube.value_counts('机型名称', {'审核原因': SUFFIX_AUDIT_REASONS['非7天无理由']}).head(5)
+        for model, count in model_non_7d_dist.items():
+            percentage = (count / total_non_7d * 100)
+            report_lines.append(f"  {model}: {count} 条 ({percentage:.1f}%)")
+        report_lines.append("")
+    
+    report_lines.append("="*60)
+    report_lines.append("报告结束")
+    report_lines.append("="*60)
+    return report_lines
+
+
+# ================================================================
+# 产物写出
+# ================================================================
+
+def _write_model_artifacts(task) -> None:
+    """
+    写出单个机型的分类频次表和详细数据表（进程池工作单元）
+    
+    Args:
+        task: (机型目录, 清理后机型名, 分类后缀, 分类频次表, 机型明细数据)
+    """
+    model_dir, clean_model, suffix, category_stats, model_data = task
+    model_dir.mkdir(parents=True, exist_ok=True)
+    
+    # 保存频次统计
+    category_stats.to_excel(model_dir / f"{clean_model}_{suffix}_分类频次.xlsx", index=False)
+    
+    # 保存详细数据
+    model_data.to_excel(model_dir / f"{clean_model}_{suffix}_详细数据.xlsx", index=False)
+
+
+def _write_model_batch(batch) -> List[Optional[str]]:
+    """
+    写出一批机型的产物（进程池工作单元）
+
+    一批机型的明细合并为一张表随任务发送一次，各机型只携带在表中的行区间，
+    不为每个机型单独序列化一个DataFrame
+
+    Args:
+        batch: (合并明细, [(机型目录, 清理后机型名, 分类后缀, 分类频次表, 起始行, 结束行), ...])
+
+    Returns:
+        与机型顺序一致的错误信息列表，成功为None
+    """
+    frame, items = batch
+    errors = []
+    for model_dir, clean_model, suffix, category_stats, start, stop in items:
+        try:
+            _write_model_artifacts((model_dir, clean_model, suffix, category_stats, frame.iloc[start:stop]))
+            errors.append(None)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+    return errors
+
+
+def _model_batches(model_issues: List[ModelIssues], model_dirs: List[Path], n_batches: int) -> List[Tuple]:
+    """按顺序把机型切分为 n_batches 批，每批的明细按行号从源数据中一次取出"""
+    bounds = np.linspace(0, len(model_issues), min(n_batches, len(model_issues)) + 1).astype(int)
+    batches = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        members = model_issues[lo:hi]
+        sources = {id(issues.source) for issues in members}
+        if len(sources) == 1:
+            frame = members[0].source.take(np.concatenate([issues.rows for issues in members]))
+        else:
+            frame = pd.concat([issues.model_data for issues in members], ignore_index=True)
+        ends = np.cumsum([len(issues.rows) for issues in members])
+        items = [
+            (model_dirs[lo + k], issues.clean_model, issues.suffix, issues.category_df, int(end - len(issues.rows)), int(end))
+            for k, (issues, end) in enumerate(zip(members, ends))
+        ]
+        batches.append((frame, items))
+    return batches
+
+
+def model_issues_chart_spec(issues: ModelIssues, model_dir: Path):
+    """单个机型分类频次柱状图的图表描述"""
+    from services.chart_service import ChartPanel, ChartSpec
+    
+    category_stats = issues.category_df
+    counts = category_stats["次数"].tolist()
+    return ChartSpec(
+        path=model_dir / f"{issues.clean_model}_{issues.suffix}_柱状图.png",
+        panels=[ChartPanel(
+            kind="bar",
+            values=counts,
+            labels=category_stats["分类"].astype(str).tolist(),
+            title=f"{issues.model} - {issues.suffix} - 分类频次",
+            tick_rotation=45,
+            tick_align="right",
+            annotations=[f'{int(count)}' for count in counts],
+        )],
+        figsize=CHART_STYLE['bar_chart_size'],
+        dpi=None,
+        bbox_inches=None,
+    )
+
+
 class DataAnalyzer:
-    """数据分析器"""
+    """数据分析器：Weekly 统计的产物写出（目录在写出时创建）"""
     
-    def __init__(self, output_dir: Path):
+    def __init__(self, output_dir: Path, workers: Optional[int] = None):
         """
         初始化数据分析器
         
         Args:
             output_dir: 输出目录路径
+            workers: 逐机型文件生成的工作进程数，None 使用配置 ANALYSIS_WORKERS
         """
         self.output_dir = output_dir
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
         
-        # 创建详细数据目录
+        # 详细数据目录
         self.detailed_dir_7d = output_dir / "详细数据" / "7天无理由"
         self.detailed_dir_non7d = output_dir / "详细数据" / "非7天无理由"
-        self.detailed_dir_7d.mkdir(parents=True, exist_ok=True)
-        self.detailed_dir_non7d.mkdir(parents=True, exist_ok=True)
     
-    def analyze_audit_reasons(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Path]:
+    # ================================================================
+    # 写出器
+    # ================================================================
+    
+    def write_audit_reasons_excel(self, summary_df: pd.DataFrame) -> Path:
+        """保存审核原因统计表"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / "审核原因统计.xlsx"
+        summary_df.to_excel(path, index=False)
+        return path
+    
+    def audit_reasons_chart_spec(self, summary_df: pd.DataFrame):
+        """审核原因饼图的图表描述"""
+        from services.chart_service import ChartPanel, ChartSpec
+        return ChartSpec(
+            path=self.output_dir / "审核原因占比.png",
+            panels=[ChartPanel(
+                kind="pie",
+                values=summary_df["数量"].tolist(),
+                labels=summary_df["审核原因"].tolist(),
+                title="审核原因占比",
+            )],
+            figsize=CHART_STYLE['reason_chart_size'],
+            dpi=None,
+            bbox_inches=None,
+        )
+    
+    def write_model_distribution_excel(self, model_dist: pd.DataFrame, suffix: str) -> Optional[Path]:
+        """保存机型分布表（空表不写出）"""
+        if model_dist.empty:
+            return None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"{suffix}_机型分布.xlsx"
+        model_dist.to_excel(path, index=False)
+        return path
+
+    def model_distribution_chart_spec(self, model_dist: pd.DataFrame, suffix: str):
+        """机型分布饼图的图表描述（空表返回None）"""
+        from services.chart_service import ChartPanel, ChartSpec
+        if model_dist.empty:
+            return None
+        return ChartSpec(
+            path=self.output_dir / f"{suffix}_机型分布.png",
+            panels=[ChartPanel(
+                kind="pie",
+                values=model_dist["数量"].tolist(),
+                labels=model_dist["机型名称"].astype(str).tolist(),
+                title=f"{suffix} - 机型分布",
+            )],
+            figsize=CHART_STYLE['pie_chart_size'],
+            dpi=None,
+            bbox_inches=None,
+        )
+    
+    def plot_audit_reasons(self, summary_df: pd.DataFrame) -> Path:
+        """生成审核原因饼图"""
+        from services.chart_service import render_charts
+        return render_charts([self.audit_reasons_chart_spec(summary_df)])[0]
+    
+    def plot_model_distribution(self, model_dist: pd.DataFrame, suffix: str) -> Optional[Path]:
+        """生成机型分布饼图（空表不生成）"""
+        from services.chart_service import render_charts
+        spec = self.model_distribution_chart_spec(model_dist, suffix)
+        return render_charts([spec])[0] if spec else None
+    
+    def write_model_issues(self, model_issues: List[ModelIssues],
+                           write_excel: bool = True, write_png: bool = True):
         """
-        统计审核原因
+        写出逐机型的Excel和柱状图（Excel由进程池并行写出，图表交给图表渲染服务，路径回填到 chart_path）
+        
+        Args:
+            model_issues: 机型问题统计列表（可混合两种后缀）
+            write_excel: 是否写出分类频次表和详细数据表
+            write_png: 是否生成柱状图
+        """
+        if not model_issues or not (write_excel or write_png):
+            return
+        
+        model_dirs = [
+            (self.detailed_dir_7d if issues.suffix == "7天无理由" else self.detailed_dir_non7d) / issues.clean_model
+            for issues in model_issues
+        ]
+        
+        failed = set()
+        if write_excel:
+            with ParallelExecutor(self.workers) as executor:
+                # 每个工作进程约4批：明细按批发送一次，各机型只携带行区间
+                batches = _model_batches(model_issues, model_dirs, executor.workers * 4)
+                outcomes = executor.map(_write_model_batch, batches)
+            i = 0
+            for (_, items), outcome in zip(batches, outcomes):
+                errors = outcome.value if outcome.ok else [outcome.error] * len(items)
+                for error in errors:
+                    if error is not None:
+                        print(f"  ⚠️ {model_issues[i].model}: 生成失败 - {error.splitlines()[0]}")
+                        failed.add(i)
+                    i += 1
+        
+        if write_png:
+            from services.chart_service import render_charts
+            charted = [i for i in range(len(model_issues)) if i not in failed]
+            paths = render_charts([model_issues_chart_spec(model_issues[i], model_dirs[i]) for i in charted])
+            for i, path in zip(charted, paths):
+                if path:
+                    model_issues[i].chart_path = path
+    
+    def write_text_report(self, report_lines: List[str]) -> Path:
+        """保存文本分析报告"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        report_path = self.output_dir / "分析报告.txt"
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(report_lines))
+        
+        print(f"✓ 文本分析报告已生成：{report_path}")
+        return report_path
+    
+    # ================================================================
+    # 计算 + 写出（兼容原有接口）
+    # ================================================================
+    
+    def analyze_audit_reasons(self, df: pd.DataFrame,
+                              cube: Optional[AggregateCube] = None) -> Tuple[pd.DataFrame, Path]:
+        """
+        统计审核原因并写出统计表和饼图
         
         Args:
             df: 数据DataFrame
+            cube: 数据集的聚合立方体，提供时直接切片求和
             
         Returns:
             (统计结果DataFrame, 图表路径)
         """
-        counts = {r: int((df["审核原因"] == r).sum()) for r in AUDIT_REASONS}
-        
-        summary_df = pd.DataFrame(list(counts.items()), columns=["审核原因", "数量"])
-        total_count = summary_df["数量"].sum()
-        summary_df["占比"] = (summary_df["数量"] / total_count * 100).round(2)
-        
-        # 保存Excel
-        summary_df.to_excel(self.output_dir / "审核原因统计.xlsx", index=False)
-        
-        # 生成饼图
-        plt.figure(figsize=CHART_STYLE['reason_chart_size'])
-        plt.pie(summary_df["数量"], labels=summary_df["审核原因"], autopct="%1.1f%%")
-        plt.title("审核原因占比")
-        plt.tight_layout()
-        chart_path = self.output_dir / "审核原因占比.png"
-        plt.savefig(chart_path)
-        plt.close()
-        
-        print(f"✓ 审核原因统计完成，共 {total_count} 条记录")
-        
-        return summary_df, chart_path
+        summary_df = compute_audit_reasons(df, cube)
+        self.write_audit_reasons_excel(summary_df)
+        return summary_df, self.plot_audit_reasons(summary_df)
     
-    def analyze_model_distribution(self, df: pd.DataFrame, suffix: str) -> Tuple[pd.DataFrame, Optional[Path]]:
+    def analyze_model_distribution(self, df: pd.DataFrame, suffix: str,
+                                   cube: Optional[AggregateCube] = None) -> Tuple[pd.DataFrame, Optional[Path]]:
         """
-        统计机型分布
+        统计机型分布并写出分布表和饼图
         
         Args:
             df: 数据DataFrame
             suffix: 分类后缀（7天无理由 或 非7天无理由）
+            cube: 完整数据集的聚合立方体，提供时按后缀对应的审核原因切片
             
         Returns:
             (统计结果DataFrame, 图表路径)
         """
-        if len(df) == 0:
-            print(f"警告：{suffix}数据为空")
-            return pd.DataFrame(), None
-        
-        model_dist = (
-            df["机型名称"]
-            .value_counts()
-            .rename_axis("机型名称")
-            .reset_index(name="数量")
-            .assign(占比=lambda x: (x["数量"] / x["数量"].sum() * 100).round(1))
-        )
-        
-        # 保存Excel
-        model_dist.to_excel(self.output_dir / f"{suffix}_机型分布.xlsx", index=False)
-        
-        # 生成饼图
-        plt.figure(figsize=CHART_STYLE['pie_chart_size'])
-        plt.pie(model_dist["数量"], labels=model_dist["机型名称"], autopct="%1.1f%%")
-        plt.title(f"{suffix} - 机型分布")
-        plt.tight_layout()
-        chart_path = self.output_dir / f"{suffix}_机型分布.png"
-        plt.savefig(chart_path)
-        plt.close()
-        
-        print(f"✓ {suffix}机型分布统计完成，共 {len(df)} 条记录，{len(model_dist)} 个机型")
-        
-        return model_dist, chart_path
+        model_dist = compute_model_distribution(df, suffix, cube)
+        self.write_model_distribution_excel(model_dist, suffix)
+        return model_dist, self.plot_model_distribution(model_dist, suffix)
     
     def analyze_model_issues(self, df: pd.DataFrame, suffix: str) -> List[Dict]:
         """
-        按机型分析问题分类
+        按机型分析问题分类并写出逐机型产物
         
         Args:
             df: 数据DataFrame
@@ -199,94 +542,13 @@ class DataAnalyzer:
         Returns:
             机型分析结果列表
         """
-        if len(df) == 0:
-            print(f"警告：{suffix}数据为空，跳过机型分析")
-            return []
-        
-        # 选择详细数据目录
-        detailed_dir = self.detailed_dir_7d if suffix == "7天无理由" else self.detailed_dir_non7d
-        
-        # 非7天无理由数据：过滤掉问题描述为空的行
-        if suffix == "非7天无理由" and "问题描述" in df.columns:
-            original_len = len(df)
-            df = df[df["问题描述"].notna() & (df["问题描述"] != "")]
-            print(f"已过滤空问题描述行，从 {original_len} 条减少到 {len(df)} 条记录")
-        
-        summaries = []
-        
-        for model in df["机型名称"].unique():
-            # 清理机型名称
-            clean_model = sanitize_filename(str(model))
-            
-            # 创建机型文件夹
-            model_dir = detailed_dir / clean_model
-            model_dir.mkdir(parents=True, exist_ok=True)
-            
-            # 获取该机型的所有数据
-            model_data = df[df["机型名称"] == model].copy()
-            
-            # 统计分类频次
-            category_stats = (
-                model_data["分类"]
-                .value_counts()
-                .rename_axis("分类")
-                .reset_index(name="次数")
-            )
-            
-            if "次数" in category_stats.columns and category_stats["次数"].sum() > 0:
-                category_stats["占比"] = (category_stats["次数"] / category_stats["次数"].sum() * 100).round(1)
-            else:
-                category_stats["占比"] = 0
-            
-            # 保存频次统计
-            freq_filename = f"{clean_model}_{suffix}_分类频次.xlsx"
-            freq_path = model_dir / freq_filename
-            category_stats.to_excel(freq_path, index=False)
-            
-            # 保存详细数据
-            detailed_filename = f"{clean_model}_{suffix}_详细数据.xlsx"
-            detailed_path = model_dir / detailed_filename
-            model_data.to_excel(detailed_path, index=False)
-            
-            # 生成柱状图
-            plt.figure(figsize=CHART_STYLE['bar_chart_size'])
-            bars = plt.bar(category_stats["分类"], category_stats["次数"])
-            plt.xticks(rotation=45, ha="right")
-            plt.title(f"{model} - {suffix} - 分类频次")
-            
-            # 添加数量标签
-            for bar in bars:
-                height = bar.get_height()
-                plt.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{int(height)}', ha='center', va='bottom')
-            
-            plt.tight_layout()
-            
-            chart_filename = f"{clean_model}_{suffix}_柱状图.png"
-            chart_path = model_dir / chart_filename
-            plt.savefig(chart_path)
-            plt.close()
-            
-            print(f"  - {model}: {len(category_stats)} 个分类，{len(model_data)} 条记录")
-            
-            # 保存摘要信息
-            model_summary = {
-                "model": model,
-                "clean_model": clean_model,
-                "suffix": suffix,
-                "category_df": category_stats,
-                "chart_path": str(chart_path),
-                "total_records": len(model_data)
-            }
-            summaries.append(model_summary)
-        
-        print(f"✓ {suffix}机型问题分析完成，共 {len(summaries)} 个机型")
-        
-        return summaries
+        model_issues = compute_model_issues(df, suffix)
+        self.write_model_issues(model_issues)
+        return [issues.to_dict() for issues in model_issues]
     
     def generate_text_report(self, df: pd.DataFrame, df_7d: pd.DataFrame,
                            df_non_7d: pd.DataFrame, start_date: Optional[date],
-                           end_date: Optional[date]):
+                           end_date: Optional[date], cube: Optional[AggregateCube] = None):
         """
         生成文本分析报告
         
@@ -296,62 +558,11 @@ class DataAnalyzer:
             df_non_7d: 非7天无理由数据
             start_date: 开始日期
             end_date: 结束日期
+            cube: 完整数据集的聚合立方体，提供时各项统计由其切片得到
         """
-        report_lines = []
-        
-        # 1. 基本统计
-        report_lines.append("="*60)
-        report_lines.append("QCR 数据分析报告")
-        report_lines.append("="*60)
-        report_lines.append(f"分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report_lines.append(f"数据范围: {start_date or '最早'} 至 {end_date or '最新'}")
-        report_lines.append(f"数据总量: {len(df)} 条记录")
-        report_lines.append("")
-        
-        # 2. 机型统计
-        unique_models = df['机型名称'].unique()
-        report_lines.append(f"涉及机型数: {len(unique_models)} 款")
-        report_lines.append(f"机型列表: {', '.join(unique_models[:10])}")
-        if len(unique_models) > 10:
-            report_lines.append(f"          ... 等共 {len(unique_models)} 款")
-        report_lines.append("")
-        
-        # 3. 审核原因统计
-        report_lines.append("审核原因统计:")
-        for reason in AUDIT_REASONS:
-            count = (df['审核原因'] == reason).sum()
-            percentage = (count / len(df) * 100) if len(df) > 0 else 0
-            report_lines.append(f"  {reason}: {count} 条 ({percentage:.2f}%)")
-        report_lines.append("")
-        
-        # 4. 7天无理由分析
-        if len(df_7d) > 0:
-            report_lines.append("七天无理由机型TOP5:")
-            model_7d_dist = df_7d['机型名称'].value_counts().head(5)
-            for model, count in model_7d_dist.items():
-                percentage = (count / len(df_7d) * 100)
-                report_lines.append(f"  {model}: {count} 条 ({percentage:.1f}%)")
-            report_lines.append("")
-        
-        # 5. 非7天无理由分析
-        if len(df_non_7d) > 0:
-            report_lines.append("非七天无理由机型TOP5:")
-            model_non_7d_dist = df_non_7d['机型名称'].value_counts().head(5)
-            for model, count in model_non_7d_dist.items():
-                percentage = (count / len(df_non_7d) * 100)
-                report_lines.append(f"  {model}: {count} 条 ({percentage:.1f}%)")
-            report_lines.append("")
-        
-        report_lines.append("="*60)
-        report_lines.append("报告结束")
-        report_lines.append("="*60)
-        
-        # 保存报告
-        report_path = self.output_dir / "分析报告.txt"
-        with open(report_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(report_lines))
-        
-        print(f"✓ 文本分析报告已生成：{report_path}")
+        if cube is None:
+            cube = AggregateCube.from_dataframe(df)
+        self.write_text_report(build_text_report(cube, start_date, end_date))
     
     def analyze_top_issues(self, df: pd.DataFrame, top_n: int = 10) -> Dict:
         """
@@ -390,81 +601,77 @@ class DataAnalyzer:
         
         print(f"✓ 统计了Top {len(issue_stats)} Issue")
         
-        # 2. 生成Top Issue总览图
-        plt.figure(figsize=(14, 7))
-        bars = plt.bar(range(len(issue_stats)), issue_stats['数量'],
-                      color=plt.cm.Blues(range(len(issue_stats), 0, -1)))
-        
-        plt.xlabel("Issue分类", fontsize=12)
-        plt.ylabel("数量", fontsize=12)
-        plt.title(f"Top {top_n} Issue分布", fontsize=16, fontweight='bold')
-        plt.xticks(range(len(issue_stats)), issue_stats['Issue名称'], rotation=45, ha='right')
-        
-        # 添加数量标签
-        for i, bar in enumerate(bars):
-            height = bar.get_height()
-            percentage = issue_stats.iloc[i]['占比(%)']
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                   f'{int(height)}\n({percentage:.1f}%)',
-                   ha='center', va='bottom', fontsize=10)
-        
-        plt.tight_layout()
+        # 2. Top Issue总览图（与各Issue机型分布图一起交给图表渲染服务）
+        from services.chart_service import ChartPanel, ChartSpec, render_charts
+        from matplotlib import colormaps
         summary_chart_path = charts_dir / "Top_Issue总览图.png"
-        plt.savefig(summary_chart_path, dpi=150)
-        plt.close()
-        print(f"✓ 生成Top Issue总览图")
+        chart_specs = [ChartSpec(
+            path=summary_chart_path,
+            panels=[ChartPanel(
+                kind="bar",
+                values=issue_stats['数量'].tolist(),
+                labels=issue_stats['Issue名称'].astype(str).tolist(),
+                title=f"Top {top_n} Issue分布",
+                title_size=16,
+                title_weight='bold',
+                xlabel="Issue分类",
+                ylabel="数量",
+                label_size=12,
+                tick_rotation=45,
+                tick_align='right',
+                annotations=[
+                    f'{int(count)}\n({pct:.1f}%)'
+                    for count, pct in zip(issue_stats['数量'], issue_stats['占比(%)'])
+                ],
+                annotation_size=10,
+                color=[tuple(c) for c in colormaps['Blues'](range(len(issue_stats), 0, -1))],
+            )],
+            figsize=(14, 7),
+            bbox_inches=None,
+        )]
         
         # 3. 分析每个Issue的机型分布
         issue_details = []
         
         print(f"\n📈 分析每个Issue的机型分布...")
+        chart_slots = {}  # issue_details 下标 → chart_specs 下标
+        issue_groups = GroupedFrame(df, '分类', '机型名称')
         for idx, row in issue_stats.iterrows():
             issue_name = row['Issue名称']
             issue_count = row['数量']
             
-            # 筛选该Issue的数据
-            issue_df = df[df['分类'] == issue_name]
-            
             # 统计机型分布
-            model_dist = (
-                issue_df['机型名称']
-                .value_counts()
-                .rename_axis('机型名称')
-                .reset_index(name='数量')
-            )
+            model_dist = issue_groups.value_counts(issue_groups.index_of(issue_name), '机型名称', '数量')
             model_dist['占比(%)'] = (model_dist['数量'] / issue_count * 100).round(2)
             
-            # 生成机型分布图
+            # 机型分布图（只显示前15个机型）
             if len(model_dist) >= 2:
-                fig, ax = plt.subplots(figsize=(12, 6))
-                
-                # 只显示前15个机型
                 display_data = model_dist.head(15)
-                bars = ax.barh(range(len(display_data)), display_data['数量'])
-                
-                ax.set_yticks(range(len(display_data)))
-                ax.set_yticklabels(display_data['机型名称'], fontsize=10)
-                ax.set_xlabel("数量", fontsize=12)
-                ax.set_title(f"Issue: {issue_name}\n机型分布 (共{len(model_dist)}款机型)", 
-                           fontsize=12, fontweight='bold')
-                
-                # 添加数量标签
-                for i, bar in enumerate(bars):
-                    width = bar.get_width()
-                    percentage = display_data.iloc[i]['占比(%)']
-                    ax.text(width, bar.get_y() + bar.get_height()/2.,
-                           f' {int(width)} ({percentage:.1f}%)',
-                           ha='left', va='center', fontsize=9)
-                
-                plt.tight_layout()
-                chart_filename = f"Issue{idx+1}_{sanitize_filename(issue_name)}_机型分布.png"
-                chart_path = charts_dir / chart_filename
-                plt.savefig(chart_path, dpi=150)
-                plt.close()
-            else:
-                chart_path = None
+                chart_path = charts_dir / f"Issue{idx+1}_{sanitize_filename(issue_name)}_机型分布.png"
+                chart_slots[len(issue_details)] = len(chart_specs)
+                chart_specs.append(ChartSpec(
+                    path=chart_path,
+                    panels=[ChartPanel(
+                        kind="barh",
+                        values=display_data['数量'].tolist(),
+                        labels=display_data['机型名称'].astype(str).tolist(),
+                        title=f"Issue: {issue_name}\n机型分布 (共{len(model_dist)}款机型)",
+                        title_size=12,
+                        title_weight='bold',
+                        xlabel="数量",
+                        label_size=12,
+                        tick_size=10,
+                        annotations=[
+                            f' {int(count)} ({pct:.1f}%)'
+                            for count, pct in zip(display_data['数量'], display_data['占比(%)'])
+                        ],
+                        annotation_size=9,
+                    )],
+                    figsize=(12, 6),
+                    bbox_inches=None,
+                ))
             
-            # 保存Issue详情
+            # 保存Issue详情（chart_path 在渲染后按实际输出填入）
             issue_details.append({
                 'rank': idx + 1,
                 'issue_name': issue_name,
@@ -473,11 +680,19 @@ class DataAnalyzer:
                 'cumulative_percentage': row['累计占比(%)'],
                 'model_count': len(model_dist),
                 'model_dist': model_dist,
-                'chart_path': str(chart_path) if chart_path else None
+                'chart_path': None
             })
             
             print(f"  - Issue #{idx+1}: {issue_name} ({issue_count}条) -> {len(model_dist)}款机型")
         
+        # 配置档可能改变输出格式，渲染失败的图表返回None，路径以渲染结果为准
+        chart_paths = render_charts(chart_specs)
+        summary_chart_path = chart_paths[0]
+        for detail_index, spec_index in chart_slots.items():
+            path = chart_paths[spec_index]
+            issue_details[detail_index]['chart_path'] = str(path) if path else None
+        print(f"✓ 生成Top Issue总览图及 {len(chart_specs) - 1} 张机型分布图")
+        
         # 4. 保存Excel（多sheet）
         excel_path = top_issue_dir / "Top_Issue统计汇总.xlsx"
         with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
@@ -501,7 +716,7 @@ class DataAnalyzer:
             'issue_stats': issue_stats,
             'issue_details': issue_details,
             'excel_path': str(excel_path),
-            'summary_chart_path': str(summary_chart_path),
+            'summary_chart_path': str(summary_chart_path) if summary_chart_path else None,
             'charts_dir': str(charts_dir)
         }
         
@@ -12,7 +12,6 @@
 """
 
 import pandas as pd
-from sqlalchemy import create_engine, text
 from pathlib import Path
 from typing import Optional
 
@@ -49,6 +48,9 @@ class DatabaseManager:
         Returns:
             连接是否成功
         """
+        # sqlalchemy 较重，只在真正连接数据库时导入
+        from sqlalchemy import create_engine
+
         try:
             connection_string = (
                 f"mysql+pymysql://{self.config['user']}:{self.config['password']}@"
@@ -481,6 +483,8 @@ class DatabaseManager:
             
             print(f"\n🔄 开始更新数据库表 {table_name} 中的product_name...")
             
+            from sqlalchemy import text
+
             with self.engine.begin() as conn:
                 for idx, row in mtm_df.iterrows():
                     mtm_code = row[mtm_col]
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+EWMA 基线
+=============================================================================
+为每个序列（如 机型 × 分类）维护日计数的指数加权均值与方差：
+- 状态是三个等长数组（均值 / 方差 / 已观测天数），按天推进时对全部序列做向量运算
+- 新序列从首次出现当天开始计龄，预热期内只更新基线不告警
+- 告警判定：z = (当日计数 - 均值) / 标准差，标准差下限取 sqrt(max(方差, 均值, 1))，
+  计数数据在均值附近的泊松波动不会被误报
+=============================================================================
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class EWMABaseline:
+    """全部序列的EWMA基线状态（可pickle持久化）"""
+    alpha: float
+    keys: List[Tuple] = field(default_factory=list)
+    mean: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    var: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    age: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    last_day: Optional[date] = None
+    _positions: Dict[Tuple, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        self._positions = {key: i for i, key in enumerate(self.keys)}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def positions(self, keys: Sequence[Tuple]) -> np.ndarray:
+        """
+        序列键对应的状态下标，新序列追加到状态末尾（均值、方差为0）
+
+        Args:
+            keys: 序列键列表
+
+        Returns:
+            下标数组
+        """
+        result = np.empty(len(keys), dtype=np.int64)
+        added = 0
+        for i, key in enumerate(keys):
+            position = self._positions.get(key)
+            if position is None:
+                position = len(self.keys)
+                self._positions[key] = position
+                self.keys.append(key)
+                added += 1
+            result[i] = position
+        if added:
+            self.mean = np.concatenate([self.mean, np.zeros(added)])
+            self.var = np.concatenate([self.var, np.zeros(added)])
+            self.age = np.concatenate([self.age, np.zeros(added, dtype=np.int64)])
+        return result
+
+    def advance(self, daily_counts: np.ndarray, z_threshold: float, min_count: int,
+                warmup_days: int) -> List[Tuple[int, int, int, float, float, float]]:
+        """
+        按天推进基线并检测异常
+
+        Args:
+            daily_counts: 天数 × 序列数 的计数矩阵（列与 keys 对齐，按日期升序）
+            z_threshold: z值告警阈值
+            min_count: 当日最少计数（过滤小样本）
+            warmup_days: 序列预热天数
+
+        Returns:
+            告警列表 [(天序号, 序列下标, 当日计数, 基线均值, 基线标准差, z值)]
+        """
+        alerts = []
+        alpha = self.alpha
+        for d, counts in enumerate(daily_counts):
+            active = (self.age > 0) | (counts > 0)
+            sd = np.sqrt(np.maximum(np.maximum(self.var, self.mean), 1.0))
+            z = (counts - self.mean) / sd
+
+            flagged = np.flatnonzero(
+                active & (self.age >= warmup_days) & (counts >= min_count) & (z >= z_threshold)
+            )
+            alerts.extend(
+                (d, int(i), int(counts[i]), float(self.mean[i]), float(sd[i]), float(z[i]))
+                for i in flagged
+            )
+
+            # EWMA 更新（仅已出现的序列）
+            diff = counts - self.mean
+            self.mean = np.where(active, self.mean + alpha * diff, self.mean)
+            self.var = np.where(active, (1 - alpha) * (self.var + alpha * diff * diff), self.var)
+            self.age = self.age + active
+        return alerts
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+面向对象的图表渲染器
+=============================================================================
+直接使用 matplotlib.figure.Figure + Agg 画布，不经过 pyplot 全局状态机：
+- 每个线程持有自己的渲染器，线程之间不共享任何图表对象（Flask 并发请求安全）
+- 按 (尺寸, 各坐标系的图表类型) 预建 Figure 与坐标系模板，之后每张图只清空并重绘艺术对象，
+  省去逐张创建 Figure、画布与坐标系的开销；饼图会关闭边框、固定等比例，
+  clear() 不能完全恢复，因此不同类型各用各的模板
+- 模板复用前恢复默认子图边距，tight_layout 的结果与新建 Figure 一致
+=============================================================================
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+_SUBPLOT_PARAMS = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+
+class FigureRenderer:
+    """单线程使用的 Figure 模板池"""
+
+    def __init__(self, max_templates: int = 16):
+        """
+        初始化渲染器
+
+        Args:
+            max_templates: 最多保留的模板数（超出时丢弃最早建立的模板）
+        """
+        self.max_templates = max_templates
+        self._templates: Dict[Tuple, Tuple[Figure, List]] = {}
+
+    def axes(self, figsize: Tuple[float, float], kinds: Sequence[str] = ("bar",)) -> Tuple[Figure, List]:
+        """
+        取得清空后的 Figure 与坐标系（1 行，每种类型一个坐标系）
+
+        Args:
+            figsize: 图表尺寸（英寸）
+            kinds: 并排各坐标系的图表类型（如 ("barh", "barh")）
+
+        Returns:
+            (Figure, 坐标系列表)
+        """
+        kinds = tuple(kinds) or ("bar",)
+        ncols = len(kinds)
+        key = (tuple(figsize), kinds)
+        template = self._templates.get(key)
+        if template is None:
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            template = (fig, list(fig.subplots(1, ncols, squeeze=False)[0]))
+            if len(self._templates) >= self.max_templates:
+                self._templates.pop(next(iter(self._templates)))
+            self._templates[key] = template
+            return template
+
+        fig, axes = template
+        # 恢复默认边距（上一张图的 tight_layout 会修改），再清空各坐标系的艺术对象
+        fig.subplots_adjust(**{name: rcParams[f"figure.subplot.{name}"] for name in _SUBPLOT_PARAMS})
+        for ax in axes:
+            ax.clear()
+        return template
+
+    @staticmethod
+    def save(fig: Figure, path: Path, dpi: Optional[float] = None, bbox_inches: Optional[str] = None,
+             tight_layout: bool = True):
+        """
+        紧凑布局后保存为图片（格式由路径后缀决定）
+
+        Args:
+            fig: axes() 返回的 Figure
+            path: 输出路径
+            dpi: 分辨率，None 使用默认
+            bbox_inches: "tight" 时裁去空白边距
+            tight_layout: 是否先自动调整子图边距（草稿图表可跳过）
+        """
+        if tight_layout:
+            fig.tight_layout()
+        options = {"bbox_inches": bbox_inches} if bbox_inches else {}
+        if dpi is not None:
+            options["dpi"] = dpi
+        fig.savefig(path, **options)
+
+
+_local = threading.local()
+
+
+def get_figure_renderer() -> FigureRenderer:
+    """当前线程的渲染器（首次调用时创建）"""
+    renderer = getattr(_local, "renderer", None)
+    if renderer is None:
+        renderer = _local.renderer = FigureRenderer()
+    return renderer
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+图表字体解析
+=============================================================================
+把 MATPLOTLIB_FONTS 解析为本机实际安装的字体族，每个进程只解析一次：
+- matplotlib 按 font.family 逐个查找字体，缺失的字体族在每次绘制文字时都会重新查找
+  并输出 "findfont: Font family ... not found"；只保留已安装的字体族后，渲染结果不变，
+  但不再有逐次查找和日志开销
+- 解析结果持久化在 CACHE_DIR/fonts.json，以 matplotlib 版本、MATPLOTLIB_FONTS
+  和 matplotlib 字体列表缓存的修改时间为键；安装新字体后 matplotlib 重建字体列表，结果随之失效
+=============================================================================
+"""
+
+import json
+import threading
+from importlib.metadata import version
+from pathlib import Path
+from typing import List, Optional
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import CACHE_DIR, MATPLOTLIB_FONTS
+
+FONT_CACHE_NAME = "fonts.json"
+
+_lock = threading.Lock()
+_resolved: Optional[List[str]] = None
+_configured = False
+
+
+def _fingerprint() -> dict:
+    """字体解析结果的失效键"""
+    import matplotlib
+
+    fontlists = sorted(Path(matplotlib.get_cachedir()).glob("fontlist-*.json"))
+    return {
+        "matplotlib": version("matplotlib"),
+        "fonts": list(MATPLOTLIB_FONTS),
+        "fontlist": [[path.name, path.stat().st_mtime_ns] for path in fontlists],
+    }
+
+
+def _scan_installed() -> List[str]:
+    """按 MATPLOTLIB_FONTS 的顺序保留已安装的字体族；都未安装时使用 matplotlib 默认字体"""
+    from matplotlib import font_manager
+
+    installed = {entry.name for entry in font_manager.fontManager.ttflist}
+    families = [family for family in MATPLOTLIB_FONTS if family in installed]
+    if not any(family in installed for family in MATPLOTLIB_FONTS[:-1]):
+        print(f"⚠️ 未找到中文字体（{' / '.join(MATPLOTLIB_FONTS[:-1])}），图表中的中文可能无法显示")
+    return families or ["sans-serif"]
+
+
+def resolve_fonts(cache_path: Optional[Path] = None) -> List[str]:
+    """
+    解析可用的图表字体族（进程内只解析一次，结果持久化）
+
+    Args:
+        cache_path: 持久化文件路径，None 使用 CACHE_DIR/fonts.json
+
+    Returns:
+        已安装的字体族列表（保持 MATPLOTLIB_FONTS 中的优先顺序）
+    """
+    global _resolved
+    with _lock:
+        if _resolved is not None:
+            return list(_resolved)
+
+        path = Path(cache_path) if cache_path else Path(CACHE_DIR) / FONT_CACHE_NAME
+        key = _fingerprint()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("key") == key and payload.get("families"):
+                _resolved = list(payload["families"])
+                return list(_resolved)
+        except (OSError, ValueError):
+            pass
+
+        _resolved = _scan_installed()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "families": _resolved}, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"  ⚠️ 写入字体缓存失败 {path}: {e}")
+        return list(_resolved)
+
+
+def configure_matplotlib():
+    """设置 matplotlib 字体（已解析的字体族、负号使用ASCII），进程内只执行一次"""
+    global _configured
+    if _configured:
+        return
+    import matplotlib
+
+    matplotlib.rcParams['font.family'] = resolve_fonts()
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    _configured = True
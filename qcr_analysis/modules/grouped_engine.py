@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+分组执行引擎
+=============================================================================
+一次分区 + 一次交叉计数，替代逐个分组的布尔筛选（O(分组数 × 行数)）：
+- 按分组键稳定重排一次，每个分组是重排后数据的连续切片（不再逐组复制）
+- 分组键 × 取值列的计数保存为稀疏计数矩阵（CSR），行内顺序与 value_counts 一致
+整体耗时与行数线性相关
+=============================================================================
+"""
+
+import numpy as np
+import pandas as pd
+from functools import cached_property
+from typing import Iterator, Optional, Tuple
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from modules.sparse_matrix import SparseCountMatrix
+
+
+class GroupedFrame:
+    """单次分区的分组执行引擎"""
+
+    def __init__(self, df: pd.DataFrame, key: str, value: Optional[str] = None):
+        """
+        构建分组
+
+        Args:
+            df: 数据DataFrame
+            key: 分组列名（如"机型名称"）
+            value: 需要逐组计数的取值列名（如"分类"），为None时不做交叉计数
+        """
+        self.key = key
+        self.value = value
+        self.total_rows = len(df)
+
+        # 分组编码按首次出现顺序排列，与 Series.unique() 顺序一致；空值编码为-1
+        codes, uniques = pd.factorize(df[key])
+        self.codes = codes
+        self.keys = uniques
+        self._key_positions = None
+
+        valid = codes >= 0
+        self.sizes = np.bincount(codes[valid], minlength=len(uniques))
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)])
+
+        # 稳定排序：组内保持原始行顺序；空值行排在最前并被丢弃
+        order = np.argsort(codes, kind="stable")
+        self.order = order[len(codes) - int(valid.sum()):]
+        self._df = df
+
+        if value is not None:
+            self._build_value_counts(df[value])
+
+    def _build_value_counts(self, values: pd.Series):
+        """构建 分组 × 取值 的稀疏计数矩阵（行编码即分组序号）"""
+        value_codes, value_labels = pd.factorize(values)
+        self.value_labels = value_labels
+        self.matrix = SparseCountMatrix.from_codes(
+            self.codes, value_codes, self.keys, value_labels
+        )
+
+    @cached_property
+    def frame(self) -> pd.DataFrame:
+        """按分组重排后的数据（首次访问时生成；只需行号时不复制数据）"""
+        return self._df.take(self.order)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __iter__(self) -> Iterator[Tuple[int, object, pd.DataFrame]]:
+        """按首次出现顺序遍历 (分组序号, 分组键, 分组数据切片)"""
+        for i, key in enumerate(self.keys):
+            yield i, key, self.group(i)
+
+    def index_of(self, key) -> int:
+        """
+        获取分组键的序号
+
+        Args:
+            key: 分组键
+
+        Returns:
+            分组序号；不存在时返回-1
+        """
+        if self._key_positions is None:
+            self._key_positions = {k: i for i, k in enumerate(self.keys)}
+        return self._key_positions.get(key, -1)
+
+    def group(self, i: int) -> pd.DataFrame:
+        """
+        第i个分组的数据（重排后数据的连续切片，不复制）
+
+        Args:
+            i: 分组序号
+
+        Returns:
+            分组数据DataFrame
+        """
+        return self.frame.iloc[self.offsets[i]:self.offsets[i + 1]]
+
+    def positions(self, i: int) -> np.ndarray:
+        """
+        第i个分组在原始数据中的行号（保持原始行顺序）
+
+        Args:
+            i: 分组序号
+
+        Returns:
+            行号数组
+        """
+        return self.order[self.offsets[i]:self.offsets[i + 1]]
+
+    def value_counts(self, i: int, label_name: Optional[str] = None,
+                     count_name: str = "count") -> pd.DataFrame:
+        """
+        第i个分组的取值计数，等价于 group[value].value_counts().reset_index()
+
+        Args:
+            i: 分组序号
+            label_name: 取值列名，默认与value列同名
+            count_name: 计数列名
+
+        Returns:
+            两列DataFrame（取值、计数），按计数降序
+        """
+        if self.value is None:
+            raise ValueError("未指定取值列，无法统计分组取值计数")
+        return self.matrix.row_frame(i, label_name or self.value, count_name)
+
+    def nunique(self) -> np.ndarray:
+        """每个分组的不同取值个数"""
+        return self.matrix.row_nnz
+
+    def count_where(self, mask) -> np.ndarray:
+        """
+        每个分组中满足条件的行数
+
+        Args:
+            mask: 与原始数据等长的布尔数组
+
+        Returns:
+            按分组序号排列的计数数组
+        """
+        mask = np.asarray(mask, dtype=bool) & (self.codes >= 0)
+        return np.bincount(self.codes[mask], minlength=len(self.keys))
+
+    def first(self, column: str) -> pd.Series:
+        """
+        每个分组首行的指定列取值
+
+        Args:
+            column: 列名
+
+        Returns:
+            以分组键为索引的Series
+        """
+        first_rows = self.frame[column].to_numpy()[self.offsets[:-1]]
+        return pd.Series(first_rows, index=self.keys)
@@ -8,14 +8,14 @@ LLM服务模块
 """
 
 import json
-import requests
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Optional
 from pathlib import Path
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 from config import KIMI_API_KEY, KIMI_API_URL, KIMI_MODEL
+from modules.pareto import ParetoFacts
 
 
 class LLMGenerationError(Exception):
@@ -121,6 +121,9 @@ class LLMService:
             "temperature": 0.2
         }
         
+        # requests 只在真正调用 API 时导入，不拖慢启动
+        import requests
+
         try:
             response = requests.post(
                 self.api_url,
@@ -161,23 +164,35 @@ class LLMService:
     
     def build_prompt(self, category_rows: List[Dict[str, str]], 
                     top_n: int, coverage_threshold: float, 
-                    focus_threshold: float) -> Dict[str, str]:
+                    focus_threshold: float, facts: Optional[ParetoFacts] = None) -> Dict[str, str]:
         """
         构建Prompt
         
         Args:
-            category_rows: 分类数据行
+            category_rows: 分类数据行（按频次降序）
             top_n: TopN参数
             coverage_threshold: 覆盖度阈值
             focus_threshold: 重点拦截阈值
+            facts: 预计算的覆盖度结论；提供时表格只保留结论涉及的分类（至少保留 Top-N），其余合并为一行
             
         Returns:
             Prompt消息字典
         """
         table_lines = ["分类\t频次\t占比"]
-        for row in category_rows:
+        listed = category_rows if facts is None else category_rows[:max(facts.listed, top_n, 1)]
+        for row in listed:
             table_lines.append(f"{row['Category']}\t{row['Count']}\t{row['Share']}")
+        if facts is not None and len(category_rows) > len(listed):
+            rest = facts.total - sum(int(row['Count']) for row in listed)
+            table_lines.append(
+                f"其余{len(category_rows) - len(listed)}个分类合计\t{rest}\t{rest / facts.total * 100:.1f}"
+            )
         table_text = "\n".join(table_lines)
+        if facts is not None:
+            table_text += (
+                "\n\n## 预计算结论（程序精确计算，直接引用，不要重新推算）\n"
+                + facts.describe()
+            )
         
         prompt = f"""# 角色
 你是一名PC电脑制造业的质量管理专家与用户反馈分析专家。你的任务是在严格依赖输入表格（包含列：分类、频次、占比）的前提下，不引入外部信息、不自行计算/重算占比，输出高度凝练的核心观点与可执行建议，用于问题拦截与后续复现/根因分析。
@@ -218,7 +233,7 @@ class LLMService:
     
     def generate_summary(self, category_df: pd.DataFrame, timeout: int = 60,
                         top_n: int = 3, coverage_threshold: float = 80.0,
-                        focus_threshold: float = 10.0) -> str:
+                        focus_threshold: float = 10.0, facts: Optional[ParetoFacts] = None) -> str:
         """
         生成LLM摘要
         
@@ -228,6 +243,7 @@ class LLMService:
             top_n: TopN参数
             coverage_threshold: 覆盖度阈值
             focus_threshold: 重点拦截阈值
+            facts: 预计算的覆盖度结论（见 modules.pareto），提供时提示词更短
             
         Returns:
             生成的摘要文本
@@ -239,7 +255,7 @@ class LLMService:
         if not category_rows:
             raise LLMGenerationError("分类数据为空，无法生成LLM摘要")
         
-        message = self.build_prompt(category_rows, top_n, coverage_threshold, focus_threshold)
+        message = self.build_prompt(category_rows, top_n, coverage_threshold, focus_threshold, facts)
         return self.call_api([message], timeout)
     
     def analyze_top_issue(self, issue_name: str, count: int, percentage: float,
@@ -22,53 +22,37 @@ from data.mtm_mappings import (
     get_all_mappings,
     get_mappings_count
 )
+from data.mtm_cache import load_mtm_mappings
+from modules.mtm_prefix_index import MTMPrefixIndex, MATCH_EXACT, MATCH_FAMILY, MATCH_NONE
 
 
 class MTMManager:
     """MTM映射管理器"""
     
-    def __init__(self, mtm_file_path: Optional[Path] = None):
+    def __init__(self, mtm_file_path: Optional[Path] = None, mappings: Optional[Dict[str, str]] = None):
         """
         初始化MTM管理器
         
         Args:
             mtm_file_path: MTM映射表文件路径（必需）
+            mappings: 已解析的映射（如常驻映射服务校验过的结果），提供时不再读取文件
         """
         self.mtm_file_path = mtm_file_path
         self.file_mappings = {}     # 从文件加载的映射（唯一映射来源）
+        self._prefix_index = None   # 系列前缀索引（按需构建）
         
         # 加载文件映射（如果文件存在）
-        if mtm_file_path and mtm_file_path.exists():
+        if mappings is not None:
+            self.file_mappings = mappings
+        elif mtm_file_path and mtm_file_path.exists():
             self._load_file_mappings()
         else:
             print(f"⚠️  警告：MTM映射文件不存在，无法加载映射关系")
     
     def _load_file_mappings(self):
-        """从MTM.xlsx文件加载映射关系"""
+        """从MTM.xlsx文件加载映射关系（优先命中按内容哈希持久化的编译缓存）"""
         try:
-            # 先尝试使用header=0读取（假设有表头）
-            mtm_df = pd.read_excel(self.mtm_file_path, sheet_name=0, header=0)
-            
-            # 检查第一行是否是表头
-            if mtm_df.columns[0] == 'MTM' or 'MTM' in str(mtm_df.columns[0]).upper():
-                # 有表头，直接使用
-                if len(mtm_df.columns) >= 2:
-                    mtm_df.columns = ['MTM', '机型名称']
-                else:
-                    print("警告：MTM文件格式不正确，至少需要两列")
-                    self.file_mappings = {}
-                    return
-            else:
-                # 没有表头，重新读取
-                mtm_df = pd.read_excel(self.mtm_file_path, sheet_name=0, header=None)
-                mtm_df.columns = ['MTM', '机型名称']
-            
-            # 过滤掉表头行（如果MTM列的值就是"MTM"）
-            mtm_df = mtm_df[mtm_df['MTM'] != 'MTM']
-            mtm_df = mtm_df[mtm_df['MTM'] != '机型名称']
-            
-            # 创建映射字典
-            self.file_mappings = dict(zip(mtm_df['MTM'], mtm_df['机型名称']))
+            self.file_mappings = load_mtm_mappings(self.mtm_file_path)
             print(f"✓ 从文件加载了 {len(self.file_mappings)} 条MTM映射关系")
         except Exception as e:
             print(f"警告：加载MTM文件失败: {e}")
@@ -92,12 +76,23 @@ class MTMManager:
         # 未找到映射，返回原MTM
         return mtm
     
-    def map_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+    @property
+    def prefix_index(self) -> MTMPrefixIndex:
+        """系列前缀索引（首次使用时构建）"""
+        if self._prefix_index is None:
+            self._prefix_index = MTMPrefixIndex(self.file_mappings)
+        return self._prefix_index
+    
+    def map_dataframe(self, df: pd.DataFrame, resolve_family: bool = False,
+                      verbose: bool = True) -> pd.DataFrame:
         """
         为DataFrame添加机型名称列
         
         Args:
             df: 包含MTM列的DataFrame
+            resolve_family: 是否将未映射的MTM按最长已知系列前缀解析，
+                            开启后额外添加"映射方式"和"匹配前缀"列
+            verbose: 是否输出映射统计（对聚合后的计数表映射时关闭）
             
         Returns:
             添加了"机型名称"列的DataFrame
@@ -109,18 +104,53 @@ class MTMManager:
         # 应用映射
         df['机型名称'] = df['MTM'].apply(self.get_model_name)
         
+        if resolve_family:
+            self._resolve_family(df)
+        
+        if not verbose:
+            return df
+        
         # 统计映射情况
         unmapped_count = (df['机型名称'] == df['MTM']).sum()
         total_count = len(df)
         mapped_count = total_count - unmapped_count
         
         print(f"✓ MTM映射完成: {mapped_count}/{total_count} 条记录已映射")
+        if resolve_family:
+            family_count = (df['映射方式'] == MATCH_FAMILY).sum()
+            print(f"  其中 {family_count} 条记录按系列前缀解析")
         if unmapped_count > 0:
             print(f"  注意: {unmapped_count} 条记录未找到映射关系，使用原MTM值")
             print(f"  💡 提示: 使用 --filter-unmapped-mtm 参数可以只分析已映射的机型")
         
         return df
     
+    def _resolve_family(self, df: pd.DataFrame):
+        """
+        对未精确映射的记录按系列前缀批量解析（仅对去重后的MTM做一次二分查找）
+        
+        Args:
+            df: 已添加"机型名称"列的DataFrame（原地修改）
+        """
+        exact = df['MTM'].isin(self.file_mappings.keys())
+        df['映射方式'] = MATCH_NONE
+        df.loc[exact, '映射方式'] = MATCH_EXACT
+        df['匹配前缀'] = None
+        
+        unmapped = ~exact
+        if not unmapped.any():
+            return
+        
+        resolved = self.prefix_index.resolve(df.loc[unmapped, 'MTM'].unique())
+        if resolved.empty:
+            return
+        
+        hit = unmapped & df['MTM'].isin(resolved.index)
+        hit_mtm = df.loc[hit, 'MTM']
+        df.loc[hit, '机型名称'] = hit_mtm.map(resolved['机型名称'])
+        df.loc[hit, '匹配前缀'] = hit_mtm.map(resolved['匹配前缀'])
+        df.loc[hit, '映射方式'] = MATCH_FAMILY
+    
     def get_mapped_mtms(self) -> set:
         """
         获取所有已映射的MTM集合
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+MTM系列前缀索引
+=============================================================================
+对MTM.xlsx中的MTM键建立有序数组索引，用二分查找为未映射的MTM
+找到最长的已知系列前缀，批量向量化解析，复杂度 O(n log m)
+=============================================================================
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import MTM_FAMILY_MIN_PREFIX
+
+
+# 映射方式标记
+MATCH_EXACT = "精确映射"
+MATCH_FAMILY = "系列前缀"
+MATCH_NONE = "未映射"
+
+
+def _to_code_matrix(values: np.ndarray, width: int) -> np.ndarray:
+    """将字符串数组转换为 (n, width) 的码点矩阵，便于逐列比较"""
+    fixed = values.astype(f"U{width}")
+    return fixed.view(np.uint32).reshape(len(fixed), width)
+
+
+def _common_prefix_length(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """计算两个码点矩阵逐行的公共前缀长度"""
+    diff = a != b
+    # 每行首个不同位置；全部相同时为宽度
+    first_diff = np.where(diff.any(axis=1), diff.argmax(axis=1), a.shape[1])
+    return first_diff
+
+
+class MTMPrefixIndex:
+    """MTM有序数组前缀索引"""
+
+    def __init__(self, mappings: Dict[str, str], min_prefix_len: int = MTM_FAMILY_MIN_PREFIX):
+        """
+        初始化前缀索引
+
+        Args:
+            mappings: {MTM: 机型名称} 映射字典
+            min_prefix_len: 系列前缀的最小长度，短于该长度的公共前缀不视为同系列
+        """
+        self.min_prefix_len = min_prefix_len
+
+        items = sorted(
+            (str(mtm), name) for mtm, name in mappings.items()
+            if isinstance(mtm, str) and mtm
+        )
+        self.keys = np.array([k for k, _ in items], dtype=str)
+        names = [n for _, n in items]
+        self.name_codes, self.names = pd.factorize(pd.Series(names, dtype=object))
+
+        # 相邻键机型名称变化次数的前缀和：区间[lo, hi)内名称唯一 <=> change[hi-1] == change[lo]
+        changes = (self.name_codes[1:] != self.name_codes[:-1]).astype(np.int64)
+        self._change_cumsum = np.concatenate([[0], np.cumsum(changes)])
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def resolve(self, mtms) -> pd.DataFrame:
+        """
+        批量解析MTM到最长已知系列前缀对应的机型名称
+
+        Args:
+            mtms: 待解析的MTM序列（建议传入去重后的未映射MTM）
+
+        Returns:
+            DataFrame，索引为MTM，列为 机型名称 / 匹配前缀；
+            无法唯一确定机型的MTM不出现在结果中
+        """
+        queries = pd.Series(mtms, dtype=object).dropna().astype(str).unique()
+        empty = pd.DataFrame(columns=["机型名称", "匹配前缀"])
+        if len(queries) == 0 or len(self.keys) == 0:
+            return empty
+
+        m = len(self.keys)
+        queries = np.asarray(queries, dtype=str)
+        width = max(self.keys.dtype.itemsize, queries.dtype.itemsize) // 4
+
+        # 有序数组中与查询串公共前缀最长的键必为其插入位置的左右邻居
+        pos = np.searchsorted(self.keys, queries)
+        left = self.keys[np.clip(pos - 1, 0, m - 1)]
+        right = self.keys[np.clip(pos, 0, m - 1)]
+
+        query_codes = _to_code_matrix(queries, width)
+        lcp = np.maximum(
+            _common_prefix_length(query_codes, _to_code_matrix(left, width)),
+            _common_prefix_length(query_codes, _to_code_matrix(right, width)),
+        )
+
+        candidate = lcp >= self.min_prefix_len
+        if not candidate.any():
+            return empty
+
+        queries = queries[candidate]
+        lcp = lcp[candidate]
+        # 将公共前缀之后的码点置零，再视图回字符串即得前缀（numpy会去除尾部空字符）
+        prefix_codes = query_codes[candidate].copy()
+        prefix_codes[np.arange(width) >= lcp[:, None]] = 0
+        prefixes = prefix_codes.view(f"U{width}").ravel()
+
+        # 共享该前缀的键在有序数组中构成连续区间 [lo, hi)
+        lo = np.searchsorted(self.keys, prefixes, side="left")
+        hi = np.searchsorted(self.keys, np.char.add(prefixes, "\uffff"), side="left")
+
+        # 区间内机型名称唯一才视为可解析（更长前缀只会得到子区间，无需回退）
+        unique_name = self._change_cumsum[hi - 1] == self._change_cumsum[lo]
+        resolved_names = self.names[self.name_codes[lo[unique_name]]]
+
+        return pd.DataFrame(
+            {
+                "机型名称": np.asarray(resolved_names, dtype=object),
+                "匹配前缀": prefixes[unique_name],
+            },
+            index=pd.Index(queries[unique_name], name="MTM"),
+        )
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+并行执行器
+=============================================================================
+将相互独立的工作单元（如逐机型的Excel/图表生成）分发到进程池：
+- 结果按提交顺序返回，与串行执行一致
+- 每个任务的异常单独捕获，不影响其他任务
+- 工作进程数为1时在当前进程内串行执行，代码路径相同
+- 可指定工作进程初始化函数（如预先导入绘图库、加载字体），每个进程只执行一次
+- 可被多个线程同时调用（进程池只创建一次，任务提交本身线程安全）
+- 进程池按 workers 创建（不受首批任务数限制），默认以 forkserver（不支持时 spawn）启动：
+  调用方可能是已有后台线程的Web进程，不直接 fork；工作进程异常退出后进程池在下次调用时重建
+=============================================================================
+"""
+
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import ANALYSIS_WORKERS
+
+
+@dataclass
+class TaskResult:
+    """单个任务的执行结果"""
+    index: int
+    value: Any = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def resolve_worker_count(workers: Optional[int] = None) -> int:
+    """
+    解析工作进程数：None 使用配置 ANALYSIS_WORKERS，0 表示使用全部CPU
+
+    Args:
+        workers: 指定的工作进程数
+
+    Returns:
+        实际工作进程数（至少为1）
+    """
+    if workers is None:
+        workers = ANALYSIS_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, workers)
+
+
+def default_mp_context():
+    """进程池的默认启动方式：forkserver 优先，其次 spawn（不从多线程进程中 fork）"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _run_task(func: Callable, index: int, task) -> TaskResult:
+    """执行单个任务并捕获异常（在工作进程中运行）"""
+    try:
+        return TaskResult(index, func(task))
+    except Exception as e:
+        return TaskResult(index, error=f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+
+
+def _run_chunk(func: Callable, indexed_tasks: List) -> List[TaskResult]:
+    return [_run_task(func, index, task) for index, task in indexed_tasks]
+
+
+class ParallelExecutor:
+    """进程池执行器：有序结果 + 逐任务异常捕获"""
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                 mp_context=None, initializer: Optional[Callable] = None, initargs: tuple = ()):
+        """
+        初始化执行器（进程池在首次使用时创建）
+
+        Args:
+            workers: 工作进程数，None 使用配置 ANALYSIS_WORKERS
+            chunk_size: 每次发送给工作进程的任务数，None 时按任务数自动确定
+            mp_context: 进程启动方式（multiprocessing 上下文），None 使用 default_mp_context()
+            initializer: 工作进程启动时执行的模块顶层函数；串行执行时在当前进程执行一次
+            initargs: initializer 的参数
+        """
+        self.workers = resolve_worker_count(workers)
+        self.chunk_size = chunk_size
+        self.mp_context = mp_context or default_mp_context()
+        self.initializer = initializer
+        self.initargs = initargs
+        self._pool = None
+        self._initialized_inline = False
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def map(self, func: Callable, tasks: Sequence) -> List[TaskResult]:
+        """
+        并行执行任务
+
+        Args:
+            func: 模块顶层函数（需可被pickle），接收单个任务参数
+            tasks: 任务参数序列
+
+        Returns:
+            与 tasks 顺序一致的 TaskResult 列表
+        """
+        tasks = list(tasks)
+        if self.workers == 1 or len(tasks) <= 1:
+            with self._lock:
+                if self.initializer is not None and not self._initialized_inline:
+                    self.initializer(*self.initargs)
+                    self._initialized_inline = True
+            return [_run_task(func, i, task) for i, task in enumerate(tasks)]
+
+        # 任务分块发送，减少进程间通信次数；每个工作进程约分到4块以均衡负载
+        chunk_size = self.chunk_size or max(1, len(tasks) // (self.workers * 4))
+        indexed = list(enumerate(tasks))
+        chunks = [indexed[start:start + chunk_size] for start in range(0, len(indexed), chunk_size)]
+        with self._lock:
+            if self._pool is None:
+                # 按配置的工作进程数创建：进程池被多次调用复用，不能由首批任务数决定大小
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=self.mp_context,
+                    initializer=self.initializer, initargs=self.initargs
+                )
+            pool = self._pool
+
+        try:
+            futures = [pool.submit(_run_chunk, func, chunk) for chunk in chunks]
+        except BrokenProcessPool as e:
+            self._discard(pool)
+            return [TaskResult(index, error=f"{type(e).__name__}: {e}") for index, _ in indexed]
+
+        results = []
+        broken = False
+        for chunk, future in zip(chunks, futures):
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                # 工作进程异常退出等情况：整块任务记为失败
+                broken = broken or isinstance(e, BrokenProcessPool)
+                results.extend(
+                    TaskResult(index, error=f"{type(e).__name__}: {e}") for index, _ in chunk
+                )
+        if broken:
+            self._discard(pool)
+        return results
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        """丢弃已损坏的进程池，下次调用时重建"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+Pareto 覆盖度引擎
+=============================================================================
+在稀疏计数矩阵上一次性计算每一行（或每一列）的：
+- 覆盖集合：按计数降序累加、达到 LLM_COVERAGE_THRESHOLD% 所需的最少分类
+- 重点集合：单项占比 ≥ LLM_FOCUS_THRESHOLD% 的分类
+矩阵行内已按计数降序排列，两个集合都是行内前缀，只需一次分段累加（整数运算，无舍入误差）。
+结果以预计算结论的形式交给提示词与幻灯片，LLM 不必再从整张表格中自行判断
+=============================================================================
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import LLM_COVERAGE_THRESHOLD, LLM_FOCUS_THRESHOLD
+from modules.sparse_matrix import SparseCountMatrix
+
+
+@dataclass
+class ParetoFacts:
+    """单个切片（如 机型 × 审核类型）的覆盖度结论"""
+    label: object
+    total: int
+    distinct: int
+    coverage_threshold: float
+    focus_threshold: float
+    # (名称, 计数, 占比%)，按计数降序
+    coverage: List[Tuple[str, int, float]] = field(default_factory=list)
+    focus: List[Tuple[str, int, float]] = field(default_factory=list)
+
+    @property
+    def coverage_share(self) -> float:
+        """覆盖集合的合计占比(%)"""
+        return round(sum(count for _, count, _ in self.coverage) / self.total * 100, 2) if self.total else 0.0
+
+    @property
+    def listed(self) -> int:
+        """结论涉及的前缀长度（覆盖集合与重点集合的并集）"""
+        return max(len(self.coverage), len(self.focus))
+
+    def headline(self, item: str = "分类") -> str:
+        """
+        幻灯片用的一行结论
+
+        Args:
+            item: 计数对象的称呼（分类 / 机型）
+
+        Returns:
+            如 "覆盖80%：3/12个分类；重点（≥10%）：A、B"
+        """
+        focus = "、".join(name for name, _, _ in self.focus) or "无"
+        return (
+            f"覆盖{self.coverage_threshold:g}%：{len(self.coverage)}/{self.distinct}个{item}；"
+            f"重点（≥{self.focus_threshold:g}%）：{focus}"
+        )
+
+    def describe(self, item: str = "分类") -> str:
+        """
+        提示词用的预计算结论（多行，覆盖集合以前缀长度表示，明细见随附表格）
+
+        Args:
+            item: 计数对象的称呼（分类 / 机型）
+
+        Returns:
+            结论文本
+        """
+        lines = [
+            f"- 样本：共 {self.total} 条，{self.distinct} 个{item}",
+            f"- 覆盖{self.coverage_threshold:g}%所需最少{item}：{len(self.coverage)} 个"
+            f"（按频次降序的前 {len(self.coverage)} 个），合计 {self.coverage_share:.2f}%",
+        ]
+        if self.focus:
+            focus = "、".join(f"{name}（{share:.2f}%）" for name, _, share in self.focus)
+            lines.append(f"- 重点拦截（单项占比≥{self.focus_threshold:g}%）：{focus}")
+        else:
+            lines.append(f"- 无单项占比≥{self.focus_threshold:g}%的{item}，分布较为分散")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict:
+        return {
+            "label": self.label,
+            "total": self.total,
+            "distinct": self.distinct,
+            "coverage_threshold": self.coverage_threshold,
+            "focus_threshold": self.focus_threshold,
+            "coverage": self.coverage,
+            "coverage_share": self.coverage_share,
+            "focus": self.focus,
+        }
+
+
+class ParetoTable:
+    """稀疏矩阵全部行（或列）的覆盖度计算结果"""
+
+    def __init__(self, matrix: SparseCountMatrix, coverage_threshold: float = LLM_COVERAGE_THRESHOLD,
+                 focus_threshold: float = LLM_FOCUS_THRESHOLD, by: str = "row"):
+        """
+        向量化计算全部切片的覆盖集合与重点集合
+
+        Args:
+            matrix: 稀疏计数矩阵（行如机型，列如分类）
+            coverage_threshold: 覆盖度阈值（百分比）
+            focus_threshold: 重点拦截阈值（百分比）
+            by: "row" 每行一个切片，"col" 每列一个切片
+        """
+        self.coverage_threshold = coverage_threshold
+        self.focus_threshold = focus_threshold
+        offsets, other, counts, labels, other_labels, totals = matrix.segments(by)
+        self.offsets, self.other, self.counts = offsets, other, counts
+        self.labels, self.other_labels, self.totals = labels, other_labels, totals
+
+        segment = np.repeat(np.arange(len(labels)), np.diff(offsets))
+        seg_totals = totals[segment]
+
+        # 段内累计（不含当前项）：全局累计减去段起点的累计
+        cumulative = np.concatenate([[0], np.cumsum(counts)])
+        before = cumulative[:-1] - cumulative[offsets[:-1]][segment]
+
+        # 前缀集合：累计尚未达到阈值的项即为覆盖集合（含跨过阈值的那一项）
+        in_coverage = before * 100 < coverage_threshold * seg_totals
+        in_focus = counts * 100 >= focus_threshold * seg_totals
+
+        n = len(labels)
+        self.coverage_size = np.bincount(segment[in_coverage], minlength=n)
+        self.focus_size = np.bincount(segment[in_focus], minlength=n)
+        self.coverage_counts = np.bincount(
+            segment[in_coverage], weights=counts[in_coverage], minlength=n
+        ).astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def _items(self, i: int, size: int) -> List[Tuple[str, int, float]]:
+        lo = self.offsets[i]
+        total = self.totals[i]
+        return [
+            (str(self.other_labels[self.other[k]]), int(self.counts[k]),
+             round(float(self.counts[k]) / total * 100, 2))
+            for k in range(lo, lo + size)
+        ]
+
+    def facts(self, i: int) -> ParetoFacts:
+        """
+        单个切片的覆盖度结论
+
+        Args:
+            i: 行（或列）编码；为-1时返回空结论
+
+        Returns:
+            ParetoFacts
+        """
+        if i < 0:
+            return ParetoFacts(None, 0, 0, self.coverage_threshold, self.focus_threshold)
+        return ParetoFacts(
+            label=self.labels[i],
+            total=int(self.totals[i]),
+            distinct=int(self.offsets[i + 1] - self.offsets[i]),
+            coverage_threshold=self.coverage_threshold,
+            focus_threshold=self.focus_threshold,
+            coverage=self._items(i, int(self.coverage_size[i])),
+            focus=self._items(i, int(self.focus_size[i])),
+        )
+
+    def to_frame(self, label_name: str = "标签") -> pd.DataFrame:
+        """
+        全部切片的覆盖度汇总（只包含有计数的切片）
+
+        Args:
+            label_name: 切片标签列名
+
+        Returns:
+            DataFrame[label_name, 合计, 非零数, 覆盖数, 覆盖占比(%), 重点数]
+        """
+        present = self.totals > 0
+        return pd.DataFrame({
+            label_name: self.labels[present],
+            "合计": self.totals[present],
+            "非零数": np.diff(self.offsets)[present],
+            "覆盖数": self.coverage_size[present],
+            "覆盖占比(%)": (self.coverage_counts[present] / self.totals[present] * 100).round(2),
+            "重点数": self.focus_size[present],
+        })
+
+
+def pareto_table(matrix: SparseCountMatrix, coverage_threshold: float = LLM_COVERAGE_THRESHOLD,
+                 focus_threshold: float = LLM_FOCUS_THRESHOLD, by: str = "row") -> ParetoTable:
+    """
+    获取矩阵的覆盖度计算结果（同一矩阵与阈值只计算一次，逐机型生成幻灯片时复用）
+
+    结果保存在矩阵实例上而不是进程级缓存中，矩阵释放时一并释放
+
+    Args:
+        matrix: 稀疏计数矩阵
+        coverage_threshold: 覆盖度阈值（百分比）
+        focus_threshold: 重点拦截阈值（百分比）
+        by: "row" 或 "col"
+
+    Returns:
+        ParetoTable
+    """
+    key = ("pareto", float(coverage_threshold), float(focus_threshold), by)
+    table = matrix.derived.get(key)
+    if table is None:
+        table = matrix.derived[key] = ParetoTable(matrix, key[1], key[2], by)
+    return table
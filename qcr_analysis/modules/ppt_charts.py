@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+PPT原生图表
+=============================================================================
+直接由分布表（DataFrame）构建 python-pptx 的 ChartData，在幻灯片中插入原生柱状图/饼图：
+- 不经过 matplotlib 栅格化，生成速度快、PPT体积小
+- 图表数据随PPT保存（内嵌工作簿），可在PowerPoint中直接编辑
+=============================================================================
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE, XL_LABEL_POSITION, XL_LEGEND_POSITION
+from pptx.util import Pt
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import PPT_STYLE
+
+NATIVE_CHART_TYPES = {
+    "bar": XL_CHART_TYPE.COLUMN_CLUSTERED,
+    "barh": XL_CHART_TYPE.BAR_CLUSTERED,
+    "pie": XL_CHART_TYPE.PIE,
+}
+
+
+def frame_chart_data(frame: pd.DataFrame, label_column: str, value_column: str,
+                     limit: Optional[int] = None) -> Optional[CategoryChartData]:
+    """
+    由分布表构建图表数据（单序列）
+
+    Args:
+        frame: 分布表
+        label_column: 类别列（如 机型名称 / 分类 / Issue名称）
+        value_column: 数值列（如 数量）
+        limit: 只取前若干行，None 取全部
+
+    Returns:
+        CategoryChartData；表为空或缺少列时返回None
+    """
+    if frame is None or len(frame) == 0 or label_column not in frame or value_column not in frame:
+        return None
+    if limit is not None:
+        frame = frame.head(limit)
+    chart_data = CategoryChartData()
+    chart_data.categories = frame[label_column].astype(str).tolist()
+    chart_data.add_series(value_column, frame[value_column].astype("float64").tolist())
+    return chart_data
+
+
+def add_native_chart(slide, kind: str, chart_data: Optional[CategoryChartData],
+                     left, top, width, height, title: str = "",
+                     font_name: Optional[str] = None, font_size: float = 10):
+    """
+    在幻灯片中插入原生图表
+
+    Args:
+        slide: 幻灯片对象
+        kind: 图表类型（bar 纵向柱状图 / barh 横向柱状图 / pie 饼图）
+        chart_data: frame_chart_data() 的结果，None 时不插入
+        left, top, width, height: 位置和尺寸（Inches对象）
+        title: 图表标题
+        font_name: 字体名称，None 使用 PPT_STYLE
+        font_size: 图表文字字号
+
+    Returns:
+        图表对象；chart_data 为None时返回None
+    """
+    if chart_data is None:
+        return None
+    if kind not in NATIVE_CHART_TYPES:
+        raise ValueError(f"不支持的原生图表类型: {kind}")
+
+    chart = slide.shapes.add_chart(NATIVE_CHART_TYPES[kind], left, top, width, height, chart_data).chart
+    chart.font.name = font_name or PPT_STYLE['font_name']
+    chart.font.size = Pt(font_size)
+    chart.has_title = bool(title)
+    if title:
+        chart.chart_title.text_frame.text = title
+        chart.chart_title.text_frame.paragraphs[0].font.size = Pt(font_size + 2)
+        chart.chart_title.text_frame.paragraphs[0].font.bold = True
+
+    plot = chart.plots[0]
+    plot.has_data_labels = True
+    labels = plot.data_labels
+    labels.font.size = Pt(max(font_size - 1, 6))
+    if kind == "pie":
+        # 与 matplotlib 饼图一致：扇区标注百分比，类别放在图例
+        labels.number_format = '0.0%'
+        labels.number_format_is_linked = False
+        labels.show_value = False
+        labels.show_percentage = True
+        labels.position = XL_LABEL_POSITION.BEST_FIT
+        chart.has_legend = True
+        chart.legend.position = XL_LEGEND_POSITION.RIGHT
+        chart.legend.include_in_layout = False
+    else:
+        labels.number_format = '0'
+        labels.number_format_is_linked = False
+        labels.position = XL_LABEL_POSITION.OUTSIDE_END
+        chart.has_legend = False
+        if kind == "barh":
+            # 横向柱状图默认第一类在最下方，反转后与排名顺序一致
+            chart.category_axis.reverse_order = True
+    return chart
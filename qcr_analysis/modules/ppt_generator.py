@@ -3,7 +3,7 @@
 =============================================================================
 PPT生成模块
 =============================================================================
-负责生成PowerPoint报告
+负责生成PowerPoint报告；native_charts 开启时由分布表直接插入原生图表（可编辑，不依赖PNG）
 =============================================================================
 """
 
@@ -15,19 +15,22 @@ from typing import Any, Dict, Optional
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
-from config import PPT_STYLE
+from config import PPT_STYLE, PPT_NATIVE_CHARTS, LLM_COVERAGE_THRESHOLD, LLM_FOCUS_THRESHOLD
 from modules.llm_service import LLMService, LLMGenerationError
+from modules.pareto import pareto_table
+from modules.ppt_charts import add_native_chart, frame_chart_data
 
 
 class PPTGenerator:
     """PPT生成器"""
     
-    def __init__(self, template_path: Optional[Path] = None):
+    def __init__(self, template_path: Optional[Path] = None, native_charts: bool = PPT_NATIVE_CHARTS):
         """
         初始化PPT生成器
         
         Args:
             template_path: PPT模板文件路径（可选）
+            native_charts: 是否插入原生图表（否则嵌入分析生成的PNG）
         """
         if template_path and template_path.exists():
             self.prs = Presentation(template_path)
@@ -38,6 +41,7 @@ class PPTGenerator:
         self.title_font_size = PPT_STYLE['title_font_size']
         self.subtitle_font_size = PPT_STYLE['subtitle_font_size']
         self.body_font_size = PPT_STYLE['body_font_size']
+        self.native_charts = native_charts
     
     def add_textbox(self, slide, left, top, width, height, text,
                    font_name=None, font_size=None, bold=False):
@@ -83,7 +87,32 @@ class PPTGenerator:
             width, height: 尺寸（Inches对象，可选）
         """
         if image_path and Path(image_path).exists():
-            slide.shapes.add_picture(image_path, left, top, width=width, height=height)
+            slide.shapes.add_picture(str(image_path), left, top, width=width, height=height)
+    
+    def add_chart(self, slide, kind: str, frame: Optional[pd.DataFrame], label_column: str, value_column: str,
+                  image_path: Optional[str], left, top, width, height, title: str = "",
+                  limit: Optional[int] = None):
+        """
+        在幻灯片中添加图表：原生模式由分布表构建图表，否则嵌入PNG（按宽度缩放）
+        
+        Args:
+            slide: 幻灯片对象
+            kind: 原生图表类型（bar / barh / pie）
+            frame: 分布表
+            label_column: 类别列
+            value_column: 数值列
+            image_path: 分析生成的PNG路径（非原生模式使用）
+            left, top, width, height: 位置和尺寸（Inches对象）
+            title: 原生图表标题
+            limit: 原生图表只取前若干行
+        """
+        if self.native_charts:
+            add_native_chart(
+                slide, kind, frame_chart_data(frame, label_column, value_column, limit),
+                left, top, width, height, title, self.font_name
+            )
+        else:
+            self.add_image(slide, image_path, left, top, width=width)
     
     def build_homepage(self, payload: Dict[str, Any]):
         """
@@ -173,10 +202,14 @@ class PPTGenerator:
         # 3张饼图横向排列
         chart_y = Inches(4.2)
         chart_width = Inches(2.5)
+        chart_height = Inches(2.5)
         
-        self.add_image(slide, payload.get("reason_chart_path"), Inches(1.0), chart_y, width=chart_width)
-        self.add_image(slide, payload.get("model_7d_chart_path"), Inches(4.2), chart_y, width=chart_width)
-        self.add_image(slide, payload.get("model_non7d_chart_path"), Inches(7.4), chart_y, width=chart_width)
+        self.add_chart(slide, "pie", reason_df, "审核原因", "数量", payload.get("reason_chart_path"),
+                       Inches(1.0), chart_y, chart_width, chart_height, "审核原因占比")
+        self.add_chart(slide, "pie", model_7d_df, "机型名称", "数量", payload.get("model_7d_chart_path"),
+                       Inches(4.2), chart_y, chart_width, chart_height, "7天无理由 - 机型分布")
+        self.add_chart(slide, "pie", model_non7d_df, "机型名称", "数量", payload.get("model_non7d_chart_path"),
+                       Inches(7.4), chart_y, chart_width, chart_height, "非7天无理由 - 机型分布")
         
         print("✓ PPT首页已生成")
     
@@ -211,17 +244,25 @@ class PPTGenerator:
         # ========== 正文区域 ==========
         print(f"→ 生成详情页：机型='{model_name}', 类型='{suffix}'")
         text_content = ""
+        llm_params = llm_params or {}
+        coverage = llm_params.get("coverage", LLM_COVERAGE_THRESHOLD)
+        focus = llm_params.get("focus", LLM_FOCUS_THRESHOLD)
+        
+        # 覆盖度结论：同一后缀的全部机型在首次使用时一次算出
+        facts = None
+        if entry.get("matrix") is not None:
+            facts = pareto_table(entry["matrix"], coverage, focus).facts(entry["row"])
         
         if use_llm and llm_service:
             try:
                 print(f"   调用Kimi生成观点中...")
-                llm_params = llm_params or {}
                 text_content = llm_service.generate_summary(
                     entry.get("category_df", pd.DataFrame()),
                     timeout=llm_params.get("timeout", 60),
                     top_n=llm_params.get("top_n", 3),
-                    coverage_threshold=llm_params.get("coverage", 80.0),
-                    focus_threshold=llm_params.get("focus", 10.0)
+                    coverage_threshold=coverage,
+                    focus_threshold=focus,
+                    facts=facts
                 )
                 print(f"   ✓ Kimi返回观点")
             except LLMGenerationError as exc:
@@ -240,6 +281,9 @@ class PPTGenerator:
             )
             print(f"   （未启用LLM）使用本地模板观点")
         
+        if facts is not None and facts.total > 0:
+            text_content = f"{text_content}\n{facts.headline()}"
+        
         # 添加正文文本框
         self.add_textbox(
             slide,
@@ -255,7 +299,8 @@ class PPTGenerator:
         chart_left = Inches(2.75)
         chart_top = Inches(4.5)
         
-        self.add_image(slide, entry.get("chart_path"), chart_left, chart_top, width=chart_width)
+        self.add_chart(slide, "bar", entry.get("category_df"), "分类", "次数", entry.get("chart_path"),
+                       chart_left, chart_top, chart_width, Inches(2.7), f"{model_name} - {suffix} - 分类频次")
         print(f"← 完成：机型='{model_name}', 类型='{suffix}' 的详情页\n")
     
     def build_top_issue_summary_slide(self, top_issue_result: Dict[str, Any]):
@@ -302,14 +347,12 @@ class PPTGenerator:
         )
         
         # 添加Top Issue总览图
-        summary_chart_path = top_issue_result.get('summary_chart_path')
-        if summary_chart_path and Path(summary_chart_path).exists():
-            self.add_image(
-                slide,
-                summary_chart_path,
-                Inches(1.0), Inches(2.2),
-                width=Inches(8.0)
-            )
+        self.add_chart(
+            slide, "bar", issue_stats, "Issue名称", "数量",
+            top_issue_result.get('summary_chart_path'),
+            Inches(1.0), Inches(2.2), Inches(8.0), Inches(5.0),
+            f"Top {top_n} Issue分布"
+        )
         
         print(f"✓ 生成Top Issue总结页")
     
@@ -352,13 +395,11 @@ class PPTGenerator:
         left_section_top = Inches(1.0)
         left_section_width = Inches(4.5)
         
-        if chart_path and Path(chart_path).exists():
-            self.add_image(
-                slide,
-                chart_path,
-                left_section_left, left_section_top,
-                width=left_section_width
-            )
+        self.add_chart(
+            slide, "barh", model_dist, "机型名称", "数量", chart_path,
+            left_section_left, left_section_top, left_section_width, Inches(6.0),
+            f"{issue_name} - 机型分布", limit=15
+        )
         
         # 右侧：LLM质量管理分析
         right_section_left = Inches(5.2)
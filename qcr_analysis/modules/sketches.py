@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+流式频次草图
+=============================================================================
+SpaceSaving: 固定容量的高频项追踪（heavy hitters），内存与数据量无关
+- 每个计数器记录 估计值 与 误差，保证 估计值 - 误差 ≤ 真实值 ≤ 估计值
+- 任何项的误差不超过 N / 容量（N 为已处理记录数），
+  真实频次超过 N / 容量 的项一定在追踪之列
+- 按数据块批量更新：块内先精确计数，再以加权方式并入计数器，结论不变
+HyperLogLog: 按键分组的去重计数（如每个机型的分类数），每个键固定 2^precision 字节
+- 寄存器逐元素取最大值即可合并，分片、按天的草图可任意合并
+- 相对标准误差约 1.04 / sqrt(2^precision)，基数较小时自动使用线性计数（接近精确）
+=============================================================================
+"""
+
+import math
+from typing import Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class SpaceSaving:
+    """SpaceSaving 高频项草图"""
+
+    def __init__(self, capacity: int):
+        """
+        初始化草图
+
+        Args:
+            capacity: 计数器个数（误差上界为 N / capacity）
+        """
+        if capacity < 1:
+            raise ValueError("capacity 必须为正整数")
+        self.capacity = capacity
+        self.total = 0
+        self._slots: Dict[Hashable, int] = {}
+        self._keys = np.empty(capacity, dtype=object)
+        self._counts = np.zeros(capacity, dtype=np.int64)
+        self._errors = np.zeros(capacity, dtype=np.int64)
+
+    @classmethod
+    def with_error(cls, epsilon: float) -> "SpaceSaving":
+        """
+        按相对误差创建草图
+
+        Args:
+            epsilon: 允许的相对误差（误差 ≤ epsilon × N）
+
+        Returns:
+            SpaceSaving
+        """
+        if not 0 < epsilon < 1:
+            raise ValueError("epsilon 必须在 (0, 1) 之间")
+        return cls(math.ceil(1 / epsilon))
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def error_bound(self) -> int:
+        """当前的全局误差保证（最小计数器的值；计数器未满时为0）"""
+        if len(self._slots) < self.capacity:
+            return 0
+        return int(self._counts.min())
+
+    # ================================================================
+    # 更新
+    # ================================================================
+
+    def update(self, values: Iterable) -> "SpaceSaving":
+        """
+        并入一批取值（空值不计）
+
+        Args:
+            values: 取值序列（如一个数据块中的一列）
+
+        Returns:
+            self
+        """
+        counts = pd.Series(values).value_counts(sort=False, dropna=True)
+        return self.update_counts(counts.index, counts.to_numpy())
+
+    def update_counts(self, keys: Iterable[Hashable], weights: Iterable[int]) -> "SpaceSaving":
+        """
+        加权并入（keys 不重复）
+
+        Args:
+            keys: 取值
+            weights: 对应的出现次数
+
+        Returns:
+            self
+        """
+        keys = list(keys)
+        weights = np.asarray(weights, dtype=np.int64)
+        if len(keys) == 0:
+            return self
+        self.total += int(weights.sum())
+
+        # 已追踪的项：向量化累加
+        slots = np.array([self._slots.get(key, -1) for key in keys], dtype=np.int64)
+        tracked = slots >= 0
+        np.add.at(self._counts, slots[tracked], weights[tracked])
+
+        # 新项：先占空计数器，满后替换当前最小的计数器（继承其值作为误差）
+        for i in np.flatnonzero(~tracked)[np.argsort(-weights[~tracked], kind="stable")]:
+            key, weight = keys[i], int(weights[i])
+            if len(self._slots) < self.capacity:
+                slot = len(self._slots)
+                error = 0
+            else:
+                slot = int(np.argmin(self._counts))
+                error = int(self._counts[slot])
+                del self._slots[self._keys[slot]]
+            self._slots[key] = slot
+            self._keys[slot] = key
+            self._counts[slot] = error + weight
+            self._errors[slot] = error
+        return self
+
+    # ================================================================
+    # 查询
+    # ================================================================
+
+    def top(self, n: Optional[int] = None, key_name: str = "取值") -> pd.DataFrame:
+        """
+        按估计值降序的高频项
+
+        Args:
+            n: 返回条数，为None时返回全部追踪项
+            key_name: 取值列名
+
+        Returns:
+            DataFrame[key_name, 数量, 误差上界]，真实值在 [数量 - 误差上界, 数量] 之间
+        """
+        used = len(self._slots)
+        order = np.argsort(-self._counts[:used], kind="stable")
+        if n is not None:
+            order = order[:n]
+        return pd.DataFrame({
+            key_name: self._keys[order],
+            "数量": self._counts[order],
+            "误差上界": self._errors[order],
+        })
+
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """uint64 数组的前导零个数（二分移位，全向量化）"""
+    w = values.copy()
+    zeros = np.zeros(len(w), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high_clear = w < (np.uint64(1) << np.uint64(64 - shift))
+        zeros[high_clear] += shift
+        w[high_clear] <<= np.uint64(shift)
+    zeros[values == 0] = 64
+    return zeros
+
+
+class HyperLogLog:
+    """按键分组的 HyperLogLog 去重计数草图"""
+
+    def __init__(self, precision: int = 10):
+        """
+        初始化草图
+
+        Args:
+            precision: 寄存器位数 p（每个键 2^p 个寄存器，4 ≤ p ≤ 16）
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("precision 必须在 4 到 16 之间")
+        self.precision = precision
+        self.m = 1 << precision
+        self.keys: List[Hashable] = []
+        self._rows: Dict[Hashable, int] = {}
+        self.registers = np.zeros((0, self.m), dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def relative_error(self) -> float:
+        """相对标准误差"""
+        return 1.04 / math.sqrt(self.m)
+
+    def _key_rows(self, keys: Iterable[Hashable]) -> np.ndarray:
+        """键对应的寄存器行，新键追加空寄存器"""
+        rows = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = len(self.keys)
+                self.keys.append(key)
+            rows[i] = row
+        if len(self.keys) > len(self.registers):
+            grown = np.zeros((len(self.keys), self.m), dtype=np.uint8)
+            grown[:len(self.registers)] = self.registers
+            self.registers = grown
+        return rows
+
+    def update(self, keys: Iterable, values: Iterable) -> "HyperLogLog":
+        """
+        并入一批 (键, 取值) 记录（任一为空的记录不计）
+
+        Args:
+            keys: 分组键（如机型名称）
+            values: 去重计数的取值（如分类）
+
+        Returns:
+            self
+        """
+        frame = pd.DataFrame({"key": pd.Series(keys).to_numpy(), "value": pd.Series(values).to_numpy()}).dropna()
+        if frame.empty:
+            return self
+
+        # 块内先对 (键, 取值) 去重，哈希只计算一次
+        frame = frame.drop_duplicates()
+        key_codes, key_uniques = pd.factorize(frame["key"])
+        rows = self._key_rows(list(key_uniques))[key_codes]
+
+        hashes = pd.util.hash_array(frame["value"].astype(str).to_numpy(dtype=object))
+        buckets = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = hashes << np.uint64(self.precision)
+        ranks = np.minimum(_leading_zeros(remainder), 64 - self.precision) + 1
+
+        np.maximum.at(self.registers, (rows, buckets), ranks.astype(np.uint8))
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """
+        合并另一个草图（寄存器逐元素取最大值）
+
+        Args:
+            other: 相同 precision 的草图
+
+        Returns:
+            self
+        """
+        if other.precision != self.precision:
+            raise ValueError("只能合并 precision 相同的草图")
+        rows = self._key_rows(other.keys)
+        np.maximum.at(self.registers, rows, other.registers)
+        return self
+
+    def estimate(self) -> pd.Series:
+        """
+        各键的去重计数估计
+
+        Returns:
+            以键为索引的浮点Series（按键首次出现顺序）
+        """
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        registers = self.registers.astype(np.float64)
+        raw = alpha * m * m / np.exp2(-registers).sum(axis=1)
+        empty = (self.registers == 0).sum(axis=1)
+
+        # 小基数：线性计数
+        with np.errstate(divide="ignore"):
+            linear = m * np.log(m / np.maximum(empty, 1))
+        estimates = np.where((raw <= 2.5 * m) & (empty > 0), linear, raw)
+        return pd.Series(estimates, index=pd.Index(self.keys, dtype=object))
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+稀疏计数矩阵
+=============================================================================
+行维度 × 列维度（如 机型 × 分类）的交叉计数，以 CSR 形式保存：
+- 两个轴各有一个整数字典（标签 ↔ 编码），矩阵本身只存非零单元格
+- 行内单元格按 计数降序 → 首次出现升序 排列，切片即与 value_counts 顺序一致
+- 按列访问时惰性生成一次列视图（CSC 排列），列内同样按 计数降序 → 首次出现 排列
+- 分布、Top K、占比与集中度指标直接在三个数组上向量计算，不生成逐行的小 DataFrame
+仅依赖 numpy，内存与非零单元格数成正比（不随 行数 × 列数 增长）
+=============================================================================
+"""
+
+from functools import cached_property
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+AXES = ("row", "col")
+
+
+class SparseCountMatrix:
+    """CSR 稀疏计数矩阵（行/列标签按首次出现顺序编码）"""
+
+    def __init__(self, row_labels: Sequence, col_labels: Sequence, indptr: np.ndarray,
+                 indices: np.ndarray, data: np.ndarray, first_seen: np.ndarray):
+        """
+        由 CSR 数组构建（通常使用 from_codes / from_frame）
+
+        Args:
+            row_labels: 行标签（下标即行编码）
+            col_labels: 列标签（下标即列编码）
+            indptr: 行偏移，长度为 行数 + 1
+            indices: 各单元格的列编码
+            data: 各单元格的计数
+            first_seen: 各单元格的首次出现次序（计数相同时的排序依据）
+        """
+        self.row_labels = np.asarray(row_labels)
+        self.col_labels = np.asarray(col_labels)
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.first_seen = first_seen
+        # 由矩阵派生的计算结果（如覆盖度表），挂在实例上、随矩阵一同释放
+        self.derived: Dict = {}
+
+    @classmethod
+    def from_codes(cls, row_codes: np.ndarray, col_codes: np.ndarray, row_labels: Sequence,
+                   col_labels: Sequence, weights: Optional[np.ndarray] = None) -> "SparseCountMatrix":
+        """
+        由逐条记录（或逐单元格）的编码构建，编码为负（空值）的记录不计
+
+        Args:
+            row_codes: 行编码数组
+            col_codes: 列编码数组
+            row_labels: 行标签（行数以此为准，可包含没有单元格的行）
+            col_labels: 列标签
+            weights: 每条记录的计数，为None时每条计1
+
+        Returns:
+            SparseCountMatrix；单元格的首次出现次序即其在输入中最早出现的位置
+        """
+        row_codes = np.asarray(row_codes, dtype=np.int64)
+        col_codes = np.asarray(col_codes, dtype=np.int64)
+        n_rows, n_cols = len(row_labels), max(len(col_labels), 1)
+
+        valid = (row_codes >= 0) & (col_codes >= 0)
+        pair = row_codes[valid] * n_cols + col_codes[valid]
+        pair_codes, pair_uniques = pd.factorize(pair)
+        if weights is None:
+            counts = np.bincount(pair_codes, minlength=len(pair_uniques))
+        else:
+            counts = np.bincount(
+                pair_codes, weights=np.asarray(weights)[valid], minlength=len(pair_uniques)
+            )
+        counts = counts.astype(np.int64)
+
+        rows = pair_uniques // n_cols
+        cols = pair_uniques % n_cols
+        first_seen = np.arange(len(pair_uniques))
+
+        # 排序：行升序 -> 计数降序 -> 首次出现升序
+        order = np.lexsort((first_seen, -counts, rows))
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_rows))])
+        return cls(row_labels, col_labels, indptr, cols[order], counts[order], first_seen[order])
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, row: str, col: str) -> "SparseCountMatrix":
+        """
+        对明细数据的两列做交叉计数，等价于逐行 value_counts
+
+        Args:
+            df: 明细DataFrame
+            row: 行维度列名（如"机型名称"）
+            col: 列维度列名（如"分类"）
+
+        Returns:
+            SparseCountMatrix（行/列标签按首次出现顺序）
+        """
+        row_codes, row_labels = pd.factorize(df[row])
+        col_codes, col_labels = pd.factorize(df[col])
+        return cls.from_codes(row_codes, col_codes, row_labels, col_labels)
+
+    # ================================================================
+    # 形状与字典
+    # ================================================================
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.row_labels), len(self.col_labels)
+
+    @property
+    def nnz(self) -> int:
+        """非零单元格数"""
+        return len(self.data)
+
+    @property
+    def total(self) -> int:
+        return int(self.data.sum())
+
+    @cached_property
+    def _row_positions(self) -> Dict:
+        return {label: i for i, label in enumerate(self.row_labels)}
+
+    @cached_property
+    def _col_positions(self) -> Dict:
+        return {label: j for j, label in enumerate(self.col_labels)}
+
+    def row_index(self, label) -> int:
+        """行标签的编码，不存在时返回-1"""
+        return self._row_positions.get(label, -1)
+
+    def col_index(self, label) -> int:
+        """列标签的编码，不存在时返回-1"""
+        return self._col_positions.get(label, -1)
+
+    @cached_property
+    def entry_rows(self) -> np.ndarray:
+        """各单元格的行编码（与 indices / data 对齐）"""
+        return np.repeat(np.arange(len(self.row_labels)), np.diff(self.indptr))
+
+    @cached_property
+    def _columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """列视图：(单元格重排顺序, 列偏移)，列内按 计数降序 → 首次出现 排列"""
+        order = np.lexsort((self.first_seen, -self.data, self.indices))
+        col_nnz = np.bincount(self.indices, minlength=len(self.col_labels))
+        return order, np.concatenate([[0], np.cumsum(col_nnz)])
+
+    # ================================================================
+    # 边际统计
+    # ================================================================
+
+    @cached_property
+    def row_totals(self) -> np.ndarray:
+        """各行计数合计"""
+        return np.bincount(self.entry_rows, weights=self.data, minlength=len(self.row_labels)).astype(np.int64)
+
+    @cached_property
+    def col_totals(self) -> np.ndarray:
+        """各列计数合计"""
+        return np.bincount(self.indices, weights=self.data, minlength=len(self.col_labels)).astype(np.int64)
+
+    @property
+    def row_nnz(self) -> np.ndarray:
+        """各行的非零列数（如每个机型的分类数）"""
+        return np.diff(self.indptr)
+
+    @property
+    def col_nnz(self) -> np.ndarray:
+        """各列的非零行数（如每个分类涉及的机型数）"""
+        return np.diff(self._columns[1])
+
+    # ================================================================
+    # 分布
+    # ================================================================
+
+    def segments(self, by: str):
+        """按行或按列分段：(分段偏移, 段内对方编码, 段内计数, 本轴标签, 对方标签, 本轴合计)"""
+        if by == "row":
+            return (self.indptr, self.indices, self.data,
+                    self.row_labels, self.col_labels, self.row_totals)
+        if by == "col":
+            order, offsets = self._columns
+            return (offsets, self.entry_rows[order], self.data[order],
+                    self.col_labels, self.row_labels, self.col_totals)
+        raise ValueError(f"by 必须是 {AXES} 之一: {by}")
+
+    def distribution(self, i: int, by: str = "row", label_name: str = "取值",
+                     count_name: str = "count") -> pd.DataFrame:
+        """
+        单行（或单列）的计数分布，等价于筛选后 value_counts().reset_index()
+
+        Args:
+            i: 行（或列）编码；为-1时返回空分布
+            by: "row" 取一行，"col" 取一列
+            label_name: 标签列名
+            count_name: 计数列名
+
+        Returns:
+            两列DataFrame（标签、计数），按计数降序
+        """
+        offsets, other, counts, _, other_labels, _ = self.segments(by)
+        lo, hi = (offsets[i], offsets[i + 1]) if i >= 0 else (0, 0)
+        return pd.DataFrame({
+            label_name: other_labels[other[lo:hi]],
+            count_name: counts[lo:hi],
+        })
+
+    def row_frame(self, i: int, label_name: str = "取值", count_name: str = "count") -> pd.DataFrame:
+        """第i行的分布（见 distribution）"""
+        return self.distribution(i, "row", label_name, count_name)
+
+    def col_frame(self, j: int, label_name: str = "取值", count_name: str = "count") -> pd.DataFrame:
+        """第j列的分布（见 distribution）"""
+        return self.distribution(j, "col", label_name, count_name)
+
+    def top_k(self, k: int, by: str = "row", row_name: str = "行", col_name: str = "列",
+              count_name: str = "数量") -> pd.DataFrame:
+        """
+        每行（或每列）计数最高的k个单元格
+
+        Args:
+            k: 每段保留个数
+            by: "row" 按行取Top K，"col" 按列取Top K
+            row_name: 行标签列名
+            col_name: 列标签列名
+            count_name: 计数列名
+
+        Returns:
+            长表DataFrame[row_name, col_name, 名次, count_name, 占比(%)]，
+            按段编码升序、段内计数降序；占比相对所在段的合计
+        """
+        offsets, other, counts, labels, other_labels, totals = self.segments(by)
+        segment = np.repeat(np.arange(len(labels)), np.diff(offsets))
+        rank = np.arange(len(counts)) - offsets[segment]
+        keep = rank < k
+
+        segment, other, counts, rank = segment[keep], other[keep], counts[keep], rank[keep]
+        own, opposite = labels[segment], other_labels[other]
+        return pd.DataFrame({
+            row_name: own if by == "row" else opposite,
+            col_name: opposite if by == "row" else own,
+            "名次": rank + 1,
+            count_name: counts,
+            "占比(%)": (counts / totals[segment] * 100).round(2),
+        })
+
+    def shares(self, by: str = "row") -> np.ndarray:
+        """
+        各单元格占所在行（或列）合计的比例
+
+        Args:
+            by: "row" 行内占比，"col" 列内占比
+
+        Returns:
+            与 data 对齐（CSR 存储顺序）的比例数组
+        """
+        if by == "row":
+            return self.data / self.row_totals[self.entry_rows]
+        if by == "col":
+            return self.data / self.col_totals[self.indices]
+        raise ValueError(f"by 必须是 {AXES} 之一: {by}")
+
+    def concentration(self, by: str = "row", k: int = 3, label_name: str = "标签") -> pd.DataFrame:
+        """
+        每行（或每列）的集中度指标（只包含有计数的行/列）
+
+        - 前k占比(%): 计数最高的k个单元格占合计的比例
+        - HHI: 赫芬达尔指数 Σ占比²，1 表示完全集中，1/非零数 表示完全均匀
+
+        Args:
+            by: "row" 按行，"col" 按列
+            k: 前k占比的k
+            label_name: 标签列名
+
+        Returns:
+            DataFrame[label_name, 合计, 非零数, 前k占比(%), HHI]，按编码顺序
+        """
+        offsets, _, counts, labels, _, totals = self.segments(by)
+        n = len(labels)
+        segment = np.repeat(np.arange(n), np.diff(offsets))
+        share = counts / np.maximum(totals[segment], 1)
+        rank = np.arange(len(counts)) - offsets[segment]
+
+        top_share = np.bincount(segment[rank < k], weights=share[rank < k], minlength=n)
+        hhi = np.bincount(segment, weights=share * share, minlength=n)
+        present = totals > 0
+        return pd.DataFrame({
+            label_name: labels[present],
+            "合计": totals[present],
+            "非零数": np.diff(offsets)[present],
+            f"前{k}占比(%)": (top_share[present] * 100).round(2),
+            "HHI": hhi[present].round(4),
+        })
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+周趋势引擎
+=============================================================================
+按ISO周（周一至周日）分桶，一次 周 × 键 交叉计数得到稠密计数矩阵：
+- 周占比、环比变化、滚动N周合计均由矩阵的向量运算得到
+- 没有记录的周补0，保证环比对比的是相邻自然周
+计数只扫描一遍明细，耗时与行数线性相关；但计数矩阵是稠密的 周数 × 键数，
+矩阵构建、占比、环比、滚动合计以及导出的Excel矩阵的耗时与内存都与该乘积成正比
+（键为机型 / 分类、周数为窗口内的自然周数，规模通常为数十周 × 数百键）；上升榜只取两周的行
+=============================================================================
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+
+def iso_week_start(dates: pd.Series) -> np.ndarray:
+    """
+    计算每条记录所在ISO周的周一
+
+    Args:
+        dates: 日期列（datetime64、date对象或可解析的字符串）
+
+    Returns:
+        datetime64[D] 数组，无法解析的日期为NaT
+    """
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce")
+    days = dates.to_numpy().astype("datetime64[D]")
+    # 1970-01-01 是周四（周一为0时为3）
+    weekday = (days.astype(np.int64) + 3) % 7
+    return days - weekday.astype("timedelta64[D]")
+
+
+def iso_week_label(week_start) -> str:
+    """ISO周标签，如 2025-W07"""
+    year, week, _ = pd.Timestamp(week_start).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class WeeklyTrend:
+    """单个维度（机型 / 分类）的周趋势"""
+
+    def __init__(self, week_starts: np.ndarray, keys: pd.Series, rolling_weeks: int = 4):
+        """
+        构建 周 × 键 计数矩阵
+
+        Args:
+            week_starts: 每条记录所在ISO周的周一（iso_week_start 的结果）
+            keys: 每条记录的维度取值（如机型名称）
+            rolling_weeks: 滚动合计的窗口周数
+        """
+        self.rolling_weeks = max(1, rolling_weeks)
+
+        key_codes, key_labels = pd.factorize(keys)
+        valid = ~np.isnat(week_starts) & (key_codes >= 0)
+        self.keys = pd.Index(key_labels)
+
+        if not valid.any():
+            self.weeks = np.array([], dtype="datetime64[D]")
+            self.counts = np.zeros((0, len(self.keys)), dtype=np.int64)
+            return
+
+        weeks = week_starts[valid]
+        first = weeks.min()
+        week_idx = ((weeks - first).astype(np.int64) // 7)
+        n_weeks = int(week_idx.max()) + 1
+        n_keys = len(self.keys)
+
+        flat = week_idx * n_keys + key_codes[valid]
+        self.counts = np.bincount(flat, minlength=n_weeks * n_keys).reshape(n_weeks, n_keys)
+        self.weeks = first + np.arange(n_weeks).astype("timedelta64[D]") * 7
+
+    # ================================================================
+    # 矩阵指标
+    # ================================================================
+
+    @property
+    def week_labels(self):
+        return [iso_week_label(w) for w in self.weeks]
+
+    @property
+    def totals(self) -> np.ndarray:
+        """每周记录总数"""
+        return self.counts.sum(axis=1)
+
+    def shares(self) -> np.ndarray:
+        """每周各键占比（%），空周为0"""
+        totals = self.totals[:, None].astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shares = np.where(totals > 0, self.counts / totals * 100, 0.0)
+        return shares
+
+    def deltas(self) -> np.ndarray:
+        """环比变化（首周与0比较）"""
+        previous = np.vstack([np.zeros((1, self.counts.shape[1]), dtype=self.counts.dtype), self.counts[:-1]])
+        return self.counts - previous
+
+    def rolling(self) -> np.ndarray:
+        """滚动N周合计（前缀和相减，窗口不足时按已有周数合计）"""
+        prefix = np.vstack([np.zeros((1, self.counts.shape[1]), dtype=np.int64), np.cumsum(self.counts, axis=0)])
+        upper = np.arange(1, len(self.weeks) + 1)
+        lower = np.maximum(upper - self.rolling_weeks, 0)
+        return prefix[upper] - prefix[lower]
+
+    def frame(self, values: np.ndarray) -> pd.DataFrame:
+        """矩阵转为 周 × 键 的DataFrame"""
+        return pd.DataFrame(values, index=pd.Index(self.week_labels, name="ISO周"), columns=self.keys)
+
+    # ================================================================
+    # 上升榜
+    # ================================================================
+
+    def week_position(self, week_label: Optional[str] = None) -> int:
+        """
+        周标签对应的矩阵行号
+
+        Args:
+            week_label: ISO周标签，为None时取最后一周
+
+        Returns:
+            行号；不存在时返回-1
+        """
+        if len(self.weeks) == 0:
+            return -1
+        if week_label is None:
+            return len(self.weeks) - 1
+        labels = self.week_labels
+        return labels.index(week_label) if week_label in labels else -1
+
+    def risers(self, key_name: str, week_label: Optional[str] = None,
+               min_count: int = 1, top_n: Optional[int] = None) -> pd.DataFrame:
+        """
+        指定周相对上一周记录数上升的键，按上升幅度排序
+
+        Args:
+            key_name: 键列名（如"机型名称"）
+            week_label: ISO周标签，为None时取最后一周
+            min_count: 本周最少记录数（过滤小样本波动）
+            top_n: 返回条数，为None时全部返回
+
+        Returns:
+            上升榜DataFrame
+        """
+        columns = ["排名", key_name, "本周", "上周", "环比变化", "环比变化率(%)",
+                   "本周占比(%)", "上周占比(%)", "占比变化(pp)", f"前{self.rolling_weeks}周均值"]
+        w = self.week_position(week_label)
+        if w < 0:
+            return pd.DataFrame(columns=columns)
+
+        current = self.counts[w]
+        previous = self.counts[w - 1] if w > 0 else np.zeros_like(current)
+        # 只计算本周与上周两行的占比，不生成整张占比矩阵
+        totals = self.totals
+        share_now = current / totals[w] * 100 if totals[w] > 0 else np.zeros(len(current))
+        share_prev = previous / totals[w - 1] * 100 if w > 0 and totals[w - 1] > 0 else np.zeros(len(current))
+
+        # 基线：本周之前N周的平均（不含本周）
+        prefix = np.vstack([np.zeros((1, self.counts.shape[1]), dtype=np.int64), np.cumsum(self.counts, axis=0)])
+        lo = max(w - self.rolling_weeks, 0)
+        span = w - lo
+        baseline = (prefix[w] - prefix[lo]) / span if span > 0 else np.zeros(len(current))
+
+        delta = current - previous
+        with np.errstate(invalid="ignore", divide="ignore"):
+            change_pct = np.where(previous > 0, delta / np.maximum(previous, 1) * 100, np.nan)
+
+        table = pd.DataFrame({
+            key_name: self.keys,
+            "本周": current,
+            "上周": previous,
+            "环比变化": delta,
+            "环比变化率(%)": np.round(change_pct, 1),
+            "本周占比(%)": np.round(share_now, 2),
+            "上周占比(%)": np.round(share_prev, 2),
+            "占比变化(pp)": np.round(share_now - share_prev, 2),
+            f"前{self.rolling_weeks}周均值": np.round(baseline, 1),
+        })
+        table = table[(table["环比变化"] > 0) & (table["本周"] >= min_count)]
+        table = table.sort_values(
+            ["环比变化", "占比变化(pp)", key_name], ascending=[False, False, True], kind="stable"
+        )
+        if top_n is not None:
+            table = table.head(top_n)
+        table.insert(0, "排名", range(1, len(table) + 1))
+        return table.reset_index(drop=True)[columns]
@@ -3,38 +3,42 @@
 =============================================================================
 功能层服务模块
 =============================================================================
-提供三大分析服务、可视化和报告生成服务
+提供三大分析服务、周趋势分析、异常检测、可视化和报告生成服务；
+导出项在首次访问时才导入对应子模块（PEP 562），只用到一项服务时不必加载全部依赖
 """
 
-from .weekly_analysis import WeeklyAnalysisService, run_weekly_analysis
-from .top_issue_analysis import TopIssueAnalysisService, run_top_issue_analysis
-from .top_model_analysis import TopModelAnalysisService, run_top_model_analysis
-from .visualization_service import VisualizationService, create_visualization_service
-from .report_service import (
-    ReportService,
-    create_report_service,
-    generate_weekly_report,
-    generate_top_issue_report,
-    generate_top_model_report
-)
+from utils.lazy import lazy_exports
 
-__all__ = [
+# 导出名 → 所在子模块
+_EXPORTS = {
     # 分析服务
-    'WeeklyAnalysisService',
-    'TopIssueAnalysisService',
-    'TopModelAnalysisService',
+    'WeeklyAnalysisService': '.weekly_analysis',
+    'TopIssueAnalysisService': '.top_issue_analysis',
+    'TopModelAnalysisService': '.top_model_analysis',
+    'TrendAnalysisService': '.trend_analysis',
+    'AnomalyDetectionService': '.anomaly_detection',
+    # MTM映射服务
+    'MTMMappingService': '.mtm_service',
     # 可视化服务
-    'VisualizationService',
-    'create_visualization_service',
+    'VisualizationService': '.visualization_service',
+    'create_visualization_service': '.visualization_service',
     # 报告服务
-    'ReportService',
-    'create_report_service',
+    'ReportService': '.report_service',
+    'create_report_service': '.report_service',
     # 便捷函数
-    'run_weekly_analysis',
-    'run_top_issue_analysis',
-    'run_top_model_analysis',
-    'generate_weekly_report',
-    'generate_top_issue_report',
-    'generate_top_model_report'
-]
+    'run_weekly_analysis': '.weekly_analysis',
+    'run_top_issue_analysis': '.top_issue_analysis',
+    'run_top_issue_approx': '.top_issue_analysis',
+    'run_top_model_analysis': '.top_model_analysis',
+    'run_top_model_approx': '.top_model_analysis',
+    'run_trend_analysis': '.trend_analysis',
+    'run_anomaly_detection': '.anomaly_detection',
+    'run_all_analysis': '.combined_analysis',
+    'generate_weekly_report': '.report_service',
+    'generate_top_issue_report': '.report_service',
+    'generate_top_model_report': '.report_service',
+}
 
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+Anomaly Detection Service - 异常检测服务
+=============================================================================
+基于按天预聚合分片，为每个 (机型, 分类) 序列维护日计数的EWMA基线并标记显著突增：
+- 基线状态持久化在 CACHE_DIR/anomaly 下，每次导入只推进新增的日期
+- 历史日期内容变化、MTM映射或检测参数变化时，从全部分片重建基线
+=============================================================================
+"""
+
+import hashlib
+import pickle
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import (
+    CACHE_DIR, SUFFIX_AUDIT_REASONS,
+    ANOMALY_EWMA_ALPHA, ANOMALY_Z_THRESHOLD, ANOMALY_MIN_COUNT, ANOMALY_WARMUP_DAYS
+)
+from data.daily_partials import DailyPartialStore, atomic_pickle, COUNT_COLUMN
+from modules.ewma_baseline import EWMABaseline
+from modules.mtm_manager import MTMManager
+from modules.analysis_results import AnomalyResult
+from services.artifact_writers import ArtifactWriters
+from services.chart_service import ChartPanel, ChartSpec, render_charts
+
+# 状态格式变化时递增，使历史状态全部失效
+_STATE_FORMAT_VERSION = 1
+
+ALERT_COLUMNS = ["日期", "机型名称", "分类", "当日数量", "基线均值", "基线标准差", "z值"]
+
+
+def _alerts_frame(rows: List[tuple]) -> pd.DataFrame:
+    """告警记录转为DataFrame（无告警时也保持列类型一致）"""
+    return pd.DataFrame(rows, columns=ALERT_COLUMNS).astype({
+        "日期": str, "机型名称": str, "分类": str,
+        "当日数量": "int64", "基线均值": float, "基线标准差": float, "z值": float,
+    })
+
+
+class AnomalyDetectionService:
+    """异常检测服务"""
+
+    def __init__(self, output_dir: str or Path, namespace: str = "default",
+                 state_dir: Optional[Path] = None):
+        """
+        初始化异常检测服务（不创建目录，产物写出时按需创建）
+
+        Args:
+            output_dir: 输出目录
+            namespace: 数据源命名空间（与 DailyPartialStore 一致）
+            state_dir: 基线状态根目录，默认 CACHE_DIR/anomaly
+        """
+        self.output_dir = Path(output_dir)
+        self.anomaly_dir = self.output_dir / "异常检测"
+        root = Path(state_dir) if state_dir else Path(CACHE_DIR) / "anomaly"
+        self.state_dir = root / f"v{_STATE_FORMAT_VERSION}"
+        self.namespace = namespace
+
+        self.result: Optional[AnomalyResult] = None
+        self.results = {}
+
+        self.writers = ArtifactWriters({
+            "excel": self._write_excel,
+            "png": self._write_chart,
+            "txt": self._write_text_report,
+        })
+
+    # ================================================================
+    # 状态
+    # ================================================================
+
+    def _state_path(self, suffix: Optional[str]) -> Path:
+        name = self.namespace if suffix is None else f"{self.namespace}_{suffix}"
+        return self.state_dir / f"{name}.pkl"
+
+    def _load_state(self, suffix: Optional[str]) -> Optional[Dict]:
+        try:
+            with open(self._state_path(suffix), "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _save_state(self, state: Dict, suffix: Optional[str]):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        atomic_pickle(state, self._state_path(suffix))
+
+    @staticmethod
+    def _signature(mtm_manager: MTMManager, suffix: Optional[str],
+                   filter_unmapped: bool, resolve_family: bool) -> str:
+        """基线依赖的参数指纹：MTM映射、分类后缀、过滤选项、EWMA系数"""
+        digest = hashlib.sha256()
+        for mtm, model in sorted(mtm_manager.file_mappings.items()):
+            digest.update(f"{mtm}\t{model}\n".encode("utf-8"))
+        digest.update(repr((suffix, filter_unmapped, resolve_family, ANOMALY_EWMA_ALPHA)).encode("utf-8"))
+        return digest.hexdigest()
+
+    # ================================================================
+    # 计算
+    # ================================================================
+
+    def _series_counts(self, store: DailyPartialStore, days: List[date], mtm_manager: MTMManager,
+                       suffix: Optional[str], filter_unmapped: bool, resolve_family: bool) -> pd.DataFrame:
+        """读取指定日期的分片并映射机型，得到 (日期, 机型名称, 分类, 数量)"""
+        counts = store.load_daily_counts(days)
+        if suffix is not None:
+            counts = counts[counts["审核原因"].isin(SUFFIX_AUDIT_REASONS[suffix])]
+
+        # 只对去重后的MTM执行映射
+        codes, uniques = pd.factorize(counts["MTM"], use_na_sentinel=False)
+        lookup = mtm_manager.map_dataframe(
+            pd.DataFrame({"MTM": uniques}), resolve_family=resolve_family, verbose=False
+        )
+        models = lookup["机型名称"].to_numpy()[codes]
+        counts = counts.assign(机型名称=models)
+        if filter_unmapped:
+            counts = counts[(lookup["机型名称"] != lookup["MTM"]).to_numpy()[codes]]
+        return counts
+
+    def compute(
+        self,
+        store: DailyPartialStore,
+        mtm_manager: MTMManager,
+        suffix: Optional[str] = None,
+        filter_unmapped: bool = False,
+        resolve_family: bool = False,
+        z_threshold: float = ANOMALY_Z_THRESHOLD,
+        min_count: int = ANOMALY_MIN_COUNT,
+        warmup_days: int = ANOMALY_WARMUP_DAYS
+    ) -> Optional[AnomalyResult]:
+        """
+        增量推进EWMA基线并检测新增日期中的突增，不写出任何文件
+
+        Args:
+            store: 已更新的按天分片存储
+            mtm_manager: MTM管理器
+            suffix: 分类后缀（7天无理由 / 非7天无理由），为None时不区分审核原因
+            filter_unmapped: 是否过滤未映射的MTM
+            resolve_family: 是否将未映射MTM按系列前缀解析
+            z_threshold: z值告警阈值
+            min_count: 当日最少记录数
+            warmup_days: 序列预热天数
+
+        Returns:
+            AnomalyResult；分片为空时返回None
+        """
+        all_days = store.days()
+        if not all_days:
+            print("❌ 错误：按天分片为空，请先导入数据")
+            return None
+
+        fingerprints = store.fingerprints()
+        signature = self._signature(mtm_manager, suffix, filter_unmapped, resolve_family)
+        state = self._load_state(suffix)
+
+        # 1. 判断增量 / 重建：已处理日期的内容必须保持不变
+        rebuilt = (
+            state is None
+            or state["signature"] != signature
+            or any(
+                fingerprints.get(day_key) != fingerprint
+                for day_key, fingerprint in state["fingerprints"].items()
+            )
+            or any(
+                day.isoformat() not in state["fingerprints"] and day <= state["baseline"].last_day
+                for day in all_days
+            )
+        )
+        if rebuilt:
+            baseline = EWMABaseline(alpha=ANOMALY_EWMA_ALPHA)
+            history = _alerts_frame([])
+            processed = {}
+            new_days = all_days
+        else:
+            baseline = state["baseline"]
+            history = state["alerts"]
+            processed = state["fingerprints"]
+            new_days = [day for day in all_days if day > baseline.last_day]
+
+        print(f"\n📊 {'重建' if rebuilt else '增量更新'}基线: {len(new_days)} 天待处理")
+
+        # 2. 新增日期的 天 × 序列 计数矩阵（中间无数据的日期补0）
+        alerts = _alerts_frame([])
+        if new_days:
+            counts = self._series_counts(store, new_days, mtm_manager, suffix, filter_unmapped, resolve_family)
+            series = list(zip(counts["机型名称"], counts["分类"]))
+            key_codes, key_uniques = pd.factorize(pd.Series(series, dtype=object))
+            positions = baseline.positions(list(key_uniques))
+
+            first = baseline.last_day + timedelta(days=1) if baseline.last_day else new_days[0]
+            n_days = (new_days[-1] - first).days + 1
+            day_idx = np.array([(d - first).days for d in counts["日期"]], dtype=np.int64)
+            matrix = np.zeros((n_days, len(baseline)), dtype=np.float64)
+            np.add.at(matrix, (day_idx, positions[key_codes]), counts[COUNT_COLUMN].to_numpy(dtype=np.float64))
+
+            raw = baseline.advance(matrix, z_threshold, min_count, warmup_days)
+            baseline.last_day = new_days[-1]
+            alerts = _alerts_frame([
+                ((first + timedelta(days=d)).isoformat(), *baseline.keys[i],
+                 count, round(mean, 2), round(sd, 2), round(z, 2))
+                for d, i, count, mean, sd, z in raw
+            ]).sort_values(["日期", "z值"], ascending=[True, False], kind="stable").reset_index(drop=True)
+
+            for day in new_days:
+                processed[day.isoformat()] = fingerprints[day.isoformat()]
+            if not alerts.empty:
+                history = pd.concat([history, alerts], ignore_index=True)
+            self._save_state({
+                "signature": signature,
+                "baseline": baseline,
+                "fingerprints": processed,
+                "alerts": history,
+            }, suffix)
+
+        print(f"✓ {len(baseline)} 个序列，基线截至 {baseline.last_day}，本次告警 {len(alerts)} 条")
+        for _, row in alerts.head(10).iterrows():
+            print(f"   ⚠️ {row['日期']} {row['机型名称']} / {row['分类']}: "
+                  f"{row['当日数量']} (基线 {row['基线均值']}, z={row['z值']})")
+
+        return AnomalyResult(
+            alerts=alerts,
+            history=history,
+            processed_days=new_days,
+            rebuilt=rebuilt,
+            series_count=len(baseline),
+            last_day=baseline.last_day,
+            suffix=suffix
+        )
+
+    def write(self, result: AnomalyResult, formats: Optional[Iterable[str]] = None, **options) -> Dict[str, Path]:
+        """
+        按需写出产物
+
+        Args:
+            result: compute() 的结果
+            formats: 需要的格式（excel / txt），None 使用默认，空序列表示不写出
+
+        Returns:
+            本次写出的 {产物名: 路径}
+        """
+        written = self.writers.run(result, formats, **options)
+        self.results = result.to_dict()
+        return written
+
+    def analyze(
+        self,
+        store: DailyPartialStore,
+        mtm_manager: MTMManager,
+        suffix: Optional[str] = None,
+        filter_unmapped: bool = False,
+        resolve_family: bool = False,
+        formats: Optional[Iterable[str]] = None
+    ) -> Dict:
+        """执行异常检测完整流程（增量计算 + 按需写出）"""
+        print("\n" + "="*70)
+        print("🚨 异常检测（EWMA日计数基线）")
+        print("="*70)
+
+        self.result = self.compute(store, mtm_manager, suffix, filter_unmapped, resolve_family)
+        if self.result is None:
+            return {}
+        self.write(self.result, formats)
+
+        print("\n✅ 异常检测完成")
+        return self.results
+
+    # ================================================================
+    # 写出器
+    # ================================================================
+
+    def _file_stem(self, result: AnomalyResult) -> str:
+        return "异常告警" if result.suffix is None else f"异常告警_{result.suffix}"
+
+    def _write_excel(self, result: AnomalyResult, **options) -> Dict[str, Path]:
+        """本次告警与历史告警"""
+        self.anomaly_dir.mkdir(parents=True, exist_ok=True)
+        excel_path = self.anomaly_dir / f"{self._file_stem(result)}.xlsx"
+        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
+            result.alerts.to_excel(writer, sheet_name='本次告警', index=False)
+            result.history.to_excel(writer, sheet_name='历史告警', index=False)
+        return {"excel_path": excel_path}
+
+    def _write_chart(self, result: AnomalyResult, **options) -> Dict[str, Path]:
+        """本次告警z值条形图（最多20条），无告警时不生成"""
+        if result.alerts.empty:
+            return {}
+        top = result.alerts.sort_values("z值", ascending=False, kind="stable").head(20).iloc[::-1]
+        labels = [f"{r['日期']} {str(r['机型名称'])[:24]} / {str(r['分类'])[:16]}" for _, r in top.iterrows()]
+
+        spec = ChartSpec(
+            path=self.anomaly_dir / f"{self._file_stem(result)}.png",
+            panels=[ChartPanel(
+                kind="barh",
+                values=top['z值'].tolist(),
+                labels=labels,
+                title="异常突增告警（z值）",
+                title_size=14,
+                title_weight='bold',
+                xlabel="z值",
+                label_size=12,
+                tick_size=9,
+                color='#d9534f',
+                grid='x',
+            )],
+            figsize=(14, max(4, len(top) * 0.4)),
+        )
+        return {"chart_path": render_charts([spec])[0]}
+
+    def _write_text_report(self, result: AnomalyResult, **options) -> Dict[str, Path]:
+        """生成报告"""
+        lines = ["="*70, "异常检测报告", "="*70]
+        lines.append(f"基线截至: {result.last_day}")
+        lines.append(f"序列数: {result.series_count}")
+        lines.append(f"本次处理: {len(result.processed_days)} 天（{'重建' if result.rebuilt else '增量'}）")
+        lines.append("")
+        lines.append(f"【本次告警】共 {len(result.alerts)} 条")
+        if result.alerts.empty:
+            lines.append("  无显著突增")
+        for _, row in result.alerts.iterrows():
+            lines.append(
+                f"  {row['日期']} {row['机型名称']} / {row['分类']}: {row['当日数量']} "
+                f"(基线 {row['基线均值']} ± {row['基线标准差']}, z={row['z值']})"
+            )
+
+        self.anomaly_dir.mkdir(parents=True, exist_ok=True)
+        report_path = self.anomaly_dir / f"{self._file_stem(result)}.txt"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+        return {"report_path": report_path}
+
+
+def run_anomaly_detection(store, mtm_manager, output_dir, suffix=None, filter_unmapped=False,
+                          resolve_family=False, formats=None):
+    """便捷函数：运行异常检测"""
+    service = AnomalyDetectionService(output_dir)
+    return service.analyze(store, mtm_manager, suffix, filter_unmapped, resolve_family, formats)
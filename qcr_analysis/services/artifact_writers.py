@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+产物写出器注册表
+=============================================================================
+分析服务先纯计算得到结果对象，再按需运行写出器（excel / png / txt / ppt）；
+未请求的格式不产生任何文件I/O，仅统计的请求可完全跳过写出
+=============================================================================
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import ARTIFACT_FORMATS, DEFAULT_ARTIFACT_FORMATS
+
+# 写出器签名：writer(result, **options) -> {产物名: 路径}
+Writer = Callable[..., Dict[str, Path]]
+
+
+class ArtifactWriters:
+    """按格式注册的写出器集合"""
+
+    def __init__(self, writers: Optional[Dict[str, Writer]] = None):
+        """
+        初始化写出器集合
+
+        Args:
+            writers: {格式: 写出器} 字典
+        """
+        self._writers: Dict[str, Writer] = {}
+        for fmt, writer in (writers or {}).items():
+            self.register(fmt, writer)
+
+    def register(self, fmt: str, writer: Writer):
+        """
+        注册（或替换）某个格式的写出器
+
+        Args:
+            fmt: 格式名
+            writer: 写出器
+        """
+        self._writers[fmt] = writer
+
+    @property
+    def formats(self):
+        return tuple(self._writers)
+
+    def resolve(self, formats: Optional[Iterable[str]] = None) -> tuple:
+        """
+        规范化并校验格式列表
+
+        Args:
+            formats: 需要的格式，None 使用 DEFAULT_ARTIFACT_FORMATS，空序列表示不写出
+
+        Returns:
+            按标准顺序排列的格式元组（PPT等依赖图表的写出器在最后）
+
+        Raises:
+            ValueError: 请求了未注册的格式
+        """
+        formats = DEFAULT_ARTIFACT_FORMATS if formats is None else tuple(formats)
+        unknown = [fmt for fmt in formats if fmt not in self._writers]
+        if unknown:
+            raise ValueError(f"未注册的产物格式: {unknown}（可用: {list(self._writers)}）")
+        rank = {fmt: i for i, fmt in enumerate(ARTIFACT_FORMATS)}
+        return tuple(sorted(dict.fromkeys(formats), key=lambda f: rank.get(f, len(rank))))
+
+    def run(self, result, formats: Optional[Iterable[str]] = None, **options) -> Dict[str, Path]:
+        """
+        依次运行请求的写出器，产物路径合并记录到 result.artifacts
+
+        Args:
+            result: 分析结果对象
+            formats: 需要的格式，None 使用 DEFAULT_ARTIFACT_FORMATS，空序列表示不写出
+            **options: 传给写出器的参数（如PPT的批次名称）
+
+        Returns:
+            本次写出的 {产物名: 路径}
+
+        Raises:
+            ValueError: 请求了未注册的格式
+        """
+        written = {}
+        for fmt in self.resolve(formats):
+            produced = self._writers[fmt](result, **options) or {}
+            # 逐个合并，后续写出器（如PPT）可以使用前面生成的图表
+            result.artifacts.update(produced)
+            written.update(produced)
+        return written
+
+
+def parse_formats(value: Optional[str]) -> Optional[tuple]:
+    """
+    解析逗号分隔的格式列表（命令行 / 表单参数）
+
+    Args:
+        value: 如 "excel,png"；"none" 表示不写出；为空时返回None（使用默认）
+
+    Returns:
+        格式元组或None
+    """
+    if value is None or not value.strip():
+        return None
+    if value.strip().lower() == "none":
+        return ()
+    return tuple(part.strip().lower() for part in value.split(",") if part.strip())
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+图表渲染服务
+=============================================================================
+各分析服务不再直接调用 pyplot，而是生成声明式的图表描述（ChartSpec）：
+- ChartSpec 只包含类型、数据数组、标签、标题、尺寸、dpi 等可序列化字段
+- 一批图表交给进程池渲染，工作进程启动时预先导入 matplotlib 并加载中文字体，
+  之后逐个渲染不再有初始化开销；结果路径按提交顺序返回
+- 图表数少于 CHART_PARALLEL_MIN 时在当前进程串行渲染（进程启动开销大于收益）
+- 进程池在进程内复用（Web 服务多次分析共用同一批已预热的工作进程）
+- 单张图表由 modules/figure_renderer 直接在 Figure + Agg 画布上绘制（线程安全，复用坐标系模板）
+- 渲染前按图表描述的内容哈希查 modules/chart_cache：数据与样式未变的图表直接复用已有图片，
+  增量重跑只栅格化数据变化的图表（QCR_CHART_CACHE=0 关闭）
+- 渲染配置档（CHART_STYLE['profiles']：draft / report / print）在提交前改写图表描述：
+  draft 低分辨率、不裁边、限制类别数与数值标签，可输出 svg / webp；report 与原有输出一致
+=============================================================================
+"""
+
+import contextvars
+import threading
+import warnings
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import (
+    CHART_STYLE, CHART_PROFILE, CHART_WORKERS, CHART_PARALLEL_MIN, CHART_CACHE_ENABLED
+)
+from modules.chart_cache import ChartCache, chart_key
+from modules.parallel_executor import ParallelExecutor, default_mp_context, resolve_worker_count
+
+CHART_KINDS = ("bar", "barh", "pie", "line")
+CHART_FORMATS = ("png", "svg", "webp")
+# 饼图超出类别上限时，其余类别合并的扇区标签
+OTHER_LABEL = "其他"
+
+
+@dataclass
+class ChartPanel:
+    """单个坐标系的图表描述"""
+    kind: str
+    # bar / barh / pie: 一组数值；line: 多条序列（每条与 labels 等长）
+    values: Sequence
+    # 类别标签：bar / line 为横轴刻度，barh 为纵轴刻度，pie 为扇区标签
+    labels: Sequence[str] = ()
+    title: str = ""
+    xlabel: str = ""
+    ylabel: str = ""
+    title_size: Optional[float] = None
+    title_weight: str = "normal"
+    label_size: Optional[float] = None
+    # 刻度标签：字号、旋转角度、水平对齐、间隔（多年周数据时抽稀）
+    tick_size: Optional[float] = None
+    tick_rotation: float = 0
+    tick_align: str = "center"
+    tick_step: int = 1
+    # bar / barh 的逐条数值标签，位置在柱端外 annotation_offset × 最大值处
+    annotations: Sequence[str] = ()
+    annotation_offset: float = 0.0
+    annotation_size: Optional[float] = None
+    annotation_weight: str = "normal"
+    # 单一颜色或逐条颜色，None 使用默认配色
+    color: Optional[object] = None
+    # line: 图例名称（与 values 的序列一一对应）、标记与线宽
+    series_names: Sequence[str] = ()
+    legend_size: Optional[float] = None
+    marker: Optional[str] = None
+    markersize: Optional[float] = None
+    linewidth: Optional[float] = None
+    # 网格线：None / "both" / "x" / "y"
+    grid: Optional[str] = None
+    autopct: str = "%1.1f%%"
+
+
+@dataclass
+class ChartSpec:
+    """一张图表（一个或多个并排的坐标系）"""
+    path: Path
+    panels: List[ChartPanel] = field(default_factory=list)
+    figsize: Tuple[float, float] = (12, 6)
+    # None 使用 matplotlib 默认分辨率
+    dpi: Optional[float] = 150
+    # "tight" 时裁去空白边距
+    bbox_inches: Optional[str] = "tight"
+    # 保存前是否按刻度标签/标题自动调整子图边距
+    tight_layout: bool = True
+
+
+# ================================================================
+# 渲染配置档
+# ================================================================
+
+_current_profile = contextvars.ContextVar("chart_profile", default=CHART_PROFILE)
+
+
+def resolve_profile(name: Optional[str] = None) -> dict:
+    """
+    取得渲染配置档
+
+    Args:
+        name: 配置档名称，None 使用当前上下文的配置档（默认 CHART_PROFILE）
+
+    Returns:
+        需要覆盖的图表描述字段
+
+    Raises:
+        ValueError: 未知的配置档或输出格式
+    """
+    name = name or _current_profile.get()
+    profiles = CHART_STYLE['profiles']
+    if name not in profiles:
+        raise ValueError(f"未知的渲染配置档: {name}（可用: {list(profiles)}）")
+    profile = profiles[name]
+    if profile.get('format', 'png') not in CHART_FORMATS:
+        raise ValueError(f"不支持的图表格式: {profile['format']}（可用: {list(CHART_FORMATS)}）")
+    return profile
+
+
+def current_chart_profile() -> str:
+    """当前上下文的渲染配置档名称"""
+    return _current_profile.get()
+
+
+@contextmanager
+def chart_profile(name: str):
+    """在当前上下文（线程 / 请求）内切换渲染配置档"""
+    resolve_profile(name)
+    token = _current_profile.set(name)
+    try:
+        yield
+    finally:
+        _current_profile.reset(token)
+
+
+def _cap_panel(panel: ChartPanel, limit: Optional[int], annotate: bool) -> ChartPanel:
+    """限制面板的类别数与数值标签（line 面板的横轴为时间，不截断）"""
+    changes = {}
+    if not annotate:
+        changes['annotations'] = ()
+    if limit and panel.kind != "line" and len(panel.values) > limit:
+        values, labels = list(panel.values), list(panel.labels)
+        if panel.kind == "pie":
+            changes['values'] = values[:limit - 1] + [sum(values[limit - 1:])]
+            changes['labels'] = labels[:limit - 1] + [OTHER_LABEL]
+        else:
+            changes['values'] = values[:limit]
+            changes['labels'] = labels[:limit]
+            if annotate:
+                changes['annotations'] = list(panel.annotations)[:limit]
+    return replace(panel, **changes) if changes else panel
+
+
+def apply_profile(spec: ChartSpec, profile: dict) -> ChartSpec:
+    """
+    按渲染配置档改写图表描述（只覆盖配置档中列出的字段）
+
+    Args:
+        spec: 图表描述
+        profile: resolve_profile() 的结果
+
+    Returns:
+        新的图表描述；配置档为空时原样返回
+    """
+    if not profile:
+        return spec
+    changes = {key: profile[key] for key in ('dpi', 'bbox_inches', 'tight_layout') if key in profile}
+    if profile.get('format'):
+        changes['path'] = Path(spec.path).with_suffix(f".{profile['format']}")
+    limit = profile.get('max_categories')
+    annotate = profile.get('annotate', True)
+    if limit or not annotate:
+        changes['panels'] = [_cap_panel(panel, limit, annotate) for panel in spec.panels]
+    return replace(spec, **changes)
+
+
+# ================================================================
+# 渲染（工作进程中执行）
+# ================================================================
+
+def init_chart_worker():
+    """工作进程初始化：导入面向对象渲染器，字体族只解析一次（只保留已安装的中文字体）"""
+    import modules.figure_renderer  # noqa: F401
+    from modules.fonts import configure_matplotlib
+
+    configure_matplotlib()
+    warnings.filterwarnings("ignore", category=UserWarning, message=".*Glyph.*missing.*")
+
+
+def _font(size: Optional[float], weight: str = "normal") -> dict:
+    """字体参数：未指定的字号不传入，保留 matplotlib 对标题/坐标轴的默认字号"""
+    options = {} if size is None else {"fontsize": size}
+    if weight != "normal":
+        options["fontweight"] = weight
+    return options
+
+
+def _draw_panel(ax, panel: ChartPanel):
+    """在坐标系上绘制单个面板"""
+    if panel.kind not in CHART_KINDS:
+        raise ValueError(f"不支持的图表类型: {panel.kind}")
+    positions = range(len(panel.labels))
+
+    if panel.kind == "pie":
+        ax.pie(panel.values, labels=panel.labels, autopct=panel.autopct)
+    elif panel.kind in ("bar", "barh"):
+        draw = ax.bar if panel.kind == "bar" else ax.barh
+        bars = draw(range(len(panel.values)), panel.values, color=panel.color)
+        if panel.kind == "bar":
+            ax.set_xticks(positions)
+            ax.set_xticklabels(panel.labels, rotation=panel.tick_rotation,
+                               ha=panel.tick_align, **_font(panel.tick_size))
+        else:
+            ax.set_yticks(positions)
+            ax.set_yticklabels(panel.labels, **_font(panel.tick_size))
+        _annotate_bars(ax, bars, panel)
+    else:
+        for i, series in enumerate(panel.values):
+            name = panel.series_names[i] if i < len(panel.series_names) else None
+            ax.plot(range(len(series)), series, marker=panel.marker, markersize=panel.markersize,
+                    linewidth=panel.linewidth, label=name)
+        step = max(1, panel.tick_step)
+        ax.set_xticks(range(0, len(panel.labels), step))
+        ax.set_xticklabels(list(panel.labels)[::step], rotation=panel.tick_rotation,
+                           ha=panel.tick_align, **_font(panel.tick_size))
+        if panel.series_names:
+            ax.legend(loc='upper left', **_font(panel.legend_size))
+
+    if panel.xlabel:
+        ax.set_xlabel(panel.xlabel, **_font(panel.label_size))
+    if panel.ylabel:
+        ax.set_ylabel(panel.ylabel, **_font(panel.label_size))
+    if panel.title:
+        ax.set_title(panel.title, **_font(panel.title_size, panel.title_weight))
+    if panel.grid:
+        ax.grid(True, axis=panel.grid, alpha=0.3)
+
+
+def _annotate_bars(ax, bars, panel: ChartPanel):
+    """在柱端外侧标注数值"""
+    if not panel.annotations:
+        return
+    offset = max(panel.values) * panel.annotation_offset if len(panel.values) else 0
+    style = _font(panel.annotation_size, panel.annotation_weight)
+    for bar, text in zip(bars, panel.annotations):
+        if panel.kind == "bar":
+            ax.text(bar.get_x() + bar.get_width() / 2., bar.get_height() + offset, text,
+                    ha='center', va='bottom', **style)
+        else:
+            ax.text(bar.get_width() + offset, bar.get_y() + bar.get_height() / 2., text,
+                    ha='left', va='center', **style)
+
+
+def render_chart(spec: ChartSpec) -> str:
+    """
+    渲染单张图表并保存（进程池工作单元；使用当前线程的 Figure 模板，不经过 pyplot）
+
+    Args:
+        spec: 图表描述
+
+    Returns:
+        图表路径
+    """
+    from modules.figure_renderer import get_figure_renderer
+
+    path = Path(spec.path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    renderer = get_figure_renderer()
+    fig, axes = renderer.axes(spec.figsize, [panel.kind for panel in spec.panels])
+    for ax, panel in zip(axes, spec.panels):
+        _draw_panel(ax, panel)
+    renderer.save(fig, path, spec.dpi, spec.bbox_inches, spec.tight_layout)
+    return str(path)
+
+
+# ================================================================
+# 渲染服务
+# ================================================================
+
+class ChartRenderService:
+    """图表渲染服务：进程池批量渲染，结果按提交顺序返回"""
+
+    def __init__(self, workers: Optional[int] = None, min_parallel: int = CHART_PARALLEL_MIN,
+                 use_cache: bool = CHART_CACHE_ENABLED):
+        """
+        初始化渲染服务（进程池在首次批量渲染时创建，之后复用）
+
+        Args:
+            workers: 工作进程数，None 使用配置 CHART_WORKERS（0 表示全部CPU）
+            min_parallel: 启用进程池的最少图表数
+            use_cache: 是否按内容哈希复用未变化的图表
+        """
+        self.workers = resolve_worker_count(CHART_WORKERS if workers is None else workers)
+        self.min_parallel = min_parallel
+        # 进程池按 workers 创建、被所有请求复用；显式使用 forkserver/spawn，
+        # 不从已有MTM监视线程和请求线程的Web进程中 fork
+        self._pool = ParallelExecutor(self.workers, mp_context=default_mp_context(), initializer=init_chart_worker)
+        self._inline = ParallelExecutor(1, initializer=init_chart_worker)
+        self.cache = ChartCache() if use_cache else None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def shutdown(self):
+        """关闭进程池"""
+        self._pool.shutdown()
+
+    def render(self, specs: Sequence[ChartSpec], profile: Optional[str] = None) -> List[Optional[Path]]:
+        """
+        批量渲染图表
+
+        Args:
+            specs: 图表描述列表
+            profile: 渲染配置档，None 使用当前上下文的配置档
+
+        Returns:
+            与 specs 顺序一致的图表路径，渲染失败的为None（打印警告，不影响其他图表）
+        """
+        settings = resolve_profile(profile)
+        specs = [apply_profile(spec, settings) for spec in specs]
+        if not specs:
+            return []
+        if self.cache is None:
+            return self._render(specs)
+
+        # 锁只保护缓存清单的查找与更新；渲染在锁外进行，并发请求各用各线程的 Figure 模板
+        keys = [chart_key(spec) for spec in specs]
+        paths: List[Optional[Path]] = [None] * len(specs)
+        pending = []
+        with self._lock:
+            for i, (spec, key) in enumerate(zip(specs, keys)):
+                if self.cache.lookup(Path(spec.path), key):
+                    paths[i] = Path(spec.path)
+                else:
+                    pending.append(i)
+
+        rendered = self._render([specs[i] for i in pending])
+        with self._lock:
+            for i, path in zip(pending, rendered):
+                paths[i] = path
+                if path is None:
+                    self.cache.forget(Path(specs[i].path))
+                else:
+                    self.cache.store(path, keys[i])
+            self.cache.flush()
+
+        hits = len(specs) - len(pending)
+        if hits:
+            print(f"  ✓ 图表缓存命中 {hits}/{len(specs)}")
+        return paths
+
+    def _render(self, specs: List[ChartSpec]) -> List[Optional[Path]]:
+        """渲染图表（数量达到 min_parallel 时使用进程池）"""
+        if not specs:
+            return []
+        executor = self._pool if len(specs) >= self.min_parallel else self._inline
+        outcomes = executor.map(render_chart, specs)
+
+        paths = []
+        for spec, outcome in zip(specs, outcomes):
+            if outcome.ok:
+                paths.append(Path(outcome.value))
+            else:
+                print(f"  ⚠️ 图表生成失败 {Path(spec.path).name}: {outcome.error.splitlines()[0]}")
+                paths.append(None)
+        return paths
+
+
+_default_service: Optional[ChartRenderService] = None
+_default_lock = threading.Lock()
+
+
+def get_chart_service() -> ChartRenderService:
+    """进程内共享的渲染服务（工作进程预热一次，多次分析复用）"""
+    global _default_service
+    with _default_lock:
+        if _default_service is None:
+            _default_service = ChartRenderService()
+        return _default_service
+
+
+def render_charts(specs: Sequence[ChartSpec], profile: Optional[str] = None) -> List[Optional[Path]]:
+    """便捷函数：使用共享渲染服务批量渲染图表（profile 为None时使用当前上下文的配置档）"""
+    return get_chart_service().render(specs, profile)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+Combined Analysis Service - 一次性全量分析
+=============================================================================
+数据只加载、筛选、映射一次，聚合立方体只构建一次，
+在同一进程内依次完成 Weekly / Top Issue / Top Model 分析；
+每项分析完成后即提交PPT生成任务，与后续分析并行写出
+=============================================================================
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import COMBINED_DECK_WORKERS, PPT_NATIVE_CHARTS
+from data import DataManager, LazyDataset, ShipmentVolumes, data_window
+from modules.mtm_manager import MTMManager
+from modules.aggregate_cube import build_cube
+from utils.memory import MemoryTracker
+from services.weekly_analysis import WeeklyAnalysisService
+from services.top_issue_analysis import TopIssueAnalysisService
+from services.top_model_analysis import TopModelAnalysisService
+from services.report_service import (
+    generate_weekly_report,
+    generate_top_issue_report,
+    generate_top_model_report
+)
+
+
+# 各分析的输出子目录
+ANALYSIS_SUBDIRS = {
+    "weekly": "weekly",
+    "top_issue": "top_issue",
+    "top_model": "top_model",
+}
+
+
+def _timed(func, *args, **kwargs):
+    """执行函数并返回 (结果, 耗时秒)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_all_analysis(
+    data_source: str,
+    mtm_file: Optional[str],
+    output_dir: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    filter_unmapped: bool = False,
+    resolve_family: bool = False,
+    mtm_manager: Optional[MTMManager] = None,
+    top_n: int = 10,
+    generate_ppt: bool = False,
+    batch_name: str = "2024-2025",
+    template_path: Optional[str] = None,
+    use_llm: bool = False,
+    llm_config: Optional[Dict] = None,
+    formats: Optional[Iterable[str]] = None,
+    memory_tracker: Optional[MemoryTracker] = None,
+    shipments: Optional[str] = None,
+    native_charts: bool = PPT_NATIVE_CHARTS
+) -> Dict:
+    """
+    一次加载，完成 Weekly / Top Issue / Top Model 全部分析
+
+    Args:
+        data_source: 数据文件路径
+        mtm_file: MTM映射文件路径（传入mtm_manager时可为None）
+        output_dir: 输出根目录（各分析写入 weekly / top_issue / top_model 子目录）
+        start_date: 开始日期
+        end_date: 结束日期
+        filter_unmapped: 是否过滤未映射的MTM
+        resolve_family: 是否将未映射MTM按系列前缀解析
+        mtm_manager: 已加载的MTM管理器，为None时从mtm_file加载
+        top_n: Top Issue / Top Model 的 N
+        generate_ppt: 是否生成PPT
+        batch_name: 批次名称
+        template_path: PPT模板路径
+        use_llm: 是否使用LLM
+        llm_config: LLM配置参数
+        formats: 需要写出的产物格式，None 使用默认，空序列表示仅统计
+        memory_tracker: 内存统计器，为None时不统计
+        shipments: 出货量来源（Excel路径或"database"），提供时Top Issue / Top Model附每万台比率
+        native_charts: PPT是否使用原生图表（由分布表构建），否则嵌入PNG
+
+    Returns:
+        {"weekly"/"top_issue"/"top_model": 分析结果, "ppt_paths": {...},
+         "errors": {...}, "output_dirs": {...}, "timings": {...}}
+    """
+    overall_start = time.perf_counter()
+    output_root = Path(output_dir)
+    output_dirs = {name: output_root / sub for name, sub in ANALYSIS_SUBDIRS.items()}
+    timings = {}
+    memory = memory_tracker or MemoryTracker(enabled=False)
+
+    # 1. 加载、筛选、映射（仅一次）
+    print("\n🔄 加载数据...")
+    prepare_start = time.perf_counter()
+    with memory.stage("prepare"):
+        data_manager = DataManager()
+        df = data_manager.read_excel(data_source)
+        print(f"✓ 成功读取 {len(df)} 条记录")
+        # 出货量窗口：未指定的端点取数据的最早 / 最晚日期
+        shipment_window = data_window(df, start_date, end_date)
+
+        # 日期筛选 + MTM映射 + 过滤未映射：融合为一次掩码求值（Weekly需要全部列）
+        print("\n🔄 MTM映射处理...")
+        if mtm_manager is None:
+            mtm_manager = MTMManager(Path(mtm_file))
+        df = (
+            LazyDataset(df)
+            .filter_date_range(start_date, end_date)
+            .map_mtm(mtm_manager, resolve_family)
+            .filter_unmapped(filter_unmapped)
+            .collect()
+        )
+        mtm_manager.print_statistics()
+
+        cube = build_cube(df)
+        volumes = None
+        if shipments:
+            volumes = ShipmentVolumes.load(shipments).volumes(
+                mtm_manager, *shipment_window, resolve_family
+            )
+            print(f"✓ 出货量：{len(volumes)} 个机型")
+    timings["prepare"] = time.perf_counter() - prepare_start
+
+    results = {}
+    errors = {}
+    ppt_paths = {}
+    deck_futures = {}
+
+    # 2. 三项分析依次执行（各自的图表、Excel在分析内生成，彼此串行）；
+    #    只有PPT生成提交到后台线程，与后续分析重叠
+    with ThreadPoolExecutor(max_workers=COMBINED_DECK_WORKERS, thread_name_prefix="qcr-deck") as pool:
+        analyses = [
+            ("weekly", WeeklyAnalysisService, generate_weekly_report),
+            ("top_issue", TopIssueAnalysisService, generate_top_issue_report),
+            ("top_model", TopModelAnalysisService, generate_top_model_report),
+        ]
+        for name, service_cls, report_func in analyses:
+            service = service_cls(output_dirs[name])
+            try:
+                with memory.stage(name):
+                    if name == "weekly":
+                        service.print_model_list(df)
+                        result, elapsed = _timed(
+                            service.analyze, df, start_date, end_date, use_llm, llm_config, cube, formats
+                        )
+                    else:
+                        result, elapsed = _timed(
+                            service.analyze, df, top_n, use_llm, llm_config, cube, formats, volumes
+                        )
+            except Exception as e:
+                print(f"⚠️ {name} 分析失败: {e}")
+                errors[name] = str(e)
+                continue
+
+            timings[name] = elapsed
+            results[name] = result
+            if generate_ppt and result:
+                deck_futures[name] = pool.submit(
+                    _timed, report_func, service.get_ppt_payload(), str(output_dirs[name]),
+                    batch_name, template_path, use_llm, llm_config, native_charts
+                )
+
+        for name, future in deck_futures.items():
+            try:
+                ppt_paths[name], timings[f"{name}_ppt"] = future.result()
+                print(f"✓ PPT: {ppt_paths[name]}")
+            except Exception as e:
+                print(f"⚠️ {name} PPT生成失败: {e}")
+                errors[f"{name}_ppt"] = str(e)
+
+    timings["total"] = time.perf_counter() - overall_start
+    _print_timing_report(timings)
+
+    return {
+        **results,
+        "ppt_paths": ppt_paths,
+        "errors": errors,
+        "output_dirs": output_dirs,
+        "timings": timings,
+        "total_records": len(df),
+    }
+
+
+def _print_timing_report(timings: Dict):
+    """输出各阶段实测耗时"""
+    print("\n⏱️ 耗时统计:")
+    for stage, seconds in timings.items():
+        if stage != "total":
+            print(f"  {stage}: {seconds:.1f}s")
+    print(f"  合并运行总耗时: {timings['total']:.1f}s")
+
+
+def print_baseline_comparison(timings: Dict, baseline: Dict[str, float]):
+    """
+    输出合并运行与实测的三次单独运行的耗时对比
+
+    Args:
+        timings: run_all_analysis 返回的耗时字典
+        baseline: 单项模式 → 单独运行实测耗时（秒，含进程启动）
+    """
+    separate = sum(baseline.values())
+    total = timings["total"]
+    print("\n⏱️ 与单独运行对比（实测）:")
+    for mode, seconds in baseline.items():
+        print(f"  单独运行 {mode}: {seconds:.1f}s")
+    print(f"  三次单独运行合计: {separate:.1f}s（含各自的进程启动）")
+    print(f"  合并运行: {total:.1f}s（进程内计时）")
+    if total > 0:
+        print(f"  节省: {separate - total:.1f}s ({separate / total:.2f}x)")
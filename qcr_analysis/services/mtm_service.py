@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+MTM Mapping Service - 常驻MTM映射服务
+=============================================================================
+Web进程启动时加载一次标准MTM映射，后台线程监视文件变化并原子热替换；
+请求直接使用常驻映射，无需重复上传和解析，也支持单次请求覆盖
+=============================================================================
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import MTM_CANONICAL_FILE, MTM_WATCH_INTERVAL
+from data.mtm_cache import compute_file_hash, load_mtm_mappings
+from modules.mtm_manager import MTMManager
+
+
+class MTMMappingService:
+    """常驻MTM映射服务：加载一次，监视变化，原子热替换"""
+
+    def __init__(self, mtm_file_path: Optional[Path] = None, poll_interval: float = MTM_WATCH_INTERVAL):
+        """
+        初始化MTM映射服务
+
+        Args:
+            mtm_file_path: 标准MTM映射文件路径，默认使用配置 MTM_CANONICAL_FILE
+            poll_interval: 文件变化轮询间隔（秒）
+        """
+        self.mtm_file_path = Path(mtm_file_path or MTM_CANONICAL_FILE)
+        self.poll_interval = poll_interval
+
+        self._manager = None
+        self._source_hash = None
+        self._signature = None
+        # 最近一次解析失败（损坏或为空）的 (签名, 内容哈希)：文件再次变化前不重复解析和告警
+        self._failed = None
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = None
+
+        self.reload_if_changed()
+        if self._manager is None:
+            # 标准映射文件尚不存在：先提供空映射，文件出现后由监视线程加载
+            self._manager = MTMManager(self.mtm_file_path)
+
+    @property
+    def manager(self) -> MTMManager:
+        """当前生效的MTM管理器（引用替换是原子的，读取无需加锁）"""
+        return self._manager
+
+    def _file_signature(self):
+        """文件的 (修改时间, 大小) 签名，文件不存在时返回None"""
+        try:
+            stat = self.mtm_file_path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload_if_changed(self) -> bool:
+        """
+        检查标准映射文件，内容变化时重建管理器并原子替换
+
+        Returns:
+            是否发生了替换
+        """
+        with self._reload_lock:
+            signature = self._file_signature()
+            if signature is None or signature == self._signature:
+                return False
+            if self._failed is not None and signature == self._failed[0]:
+                return False
+
+            # 签名变化后再比对内容哈希，避免仅修改时间变化时重复解析
+            try:
+                source_hash = compute_file_hash(self.mtm_file_path)
+            except OSError as e:
+                print(f"警告：读取标准MTM映射文件失败: {e}")
+                return False
+            if source_hash == self._source_hash:
+                self._signature = signature
+                self._failed = None
+                return False
+            if self._failed is not None and source_hash == self._failed[1]:
+                # 仅修改时间变化、内容仍是解析失败的那一版
+                self._failed = (signature, source_hash)
+                return False
+
+            # 先解析再替换：文件损坏或尚未保存完整时保留当前映射，
+            # 记录失败的 (签名, 哈希)，文件再次变化（如保存完整）后才重试
+            try:
+                mappings = load_mtm_mappings(self.mtm_file_path)
+            except Exception as e:
+                print(f"警告：解析标准MTM映射文件失败，继续使用当前映射（文件变化后重试）: {e}")
+                self._failed = (signature, source_hash)
+                return False
+            if not mappings:
+                print(f"警告：标准MTM映射文件中没有映射记录，继续使用当前映射（文件变化后重试）: {self.mtm_file_path}")
+                self._failed = (signature, source_hash)
+                return False
+
+            new_manager = MTMManager(self.mtm_file_path, mappings=mappings)
+            self._manager = new_manager
+            self._signature = signature
+            self._source_hash = source_hash
+            self._failed = None
+            print(f"✓ 标准MTM映射已加载: {self.mtm_file_path} ({len(new_manager.file_mappings)} 条)")
+            return True
+
+    def start_watching(self):
+        """启动后台监视线程（守护线程，进程退出时自动结束）"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, name="mtm-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """停止后台监视线程"""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_interval + 1)
+            self._watcher = None
+
+    def _watch_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                print(f"警告：MTM映射热加载失败: {e}")
+
+    def get_manager(self, override_path: Optional[Path] = None) -> MTMManager:
+        """
+        获取本次请求使用的MTM管理器
+
+        Args:
+            override_path: 单次请求上传的覆盖映射文件，为None时使用常驻映射
+
+        Returns:
+            MTM管理器
+        """
+        if override_path is not None:
+            return MTMManager(Path(override_path))
+        return self._manager
+
+    def has_mappings(self) -> bool:
+        """常驻映射是否可用"""
+        return len(self._manager.file_mappings) > 0
+
+    def get_status(self) -> Dict:
+        """获取服务状态"""
+        return {
+            "mtm_file": str(self.mtm_file_path),
+            "exists": self.mtm_file_path.exists(),
+            "mappings_count": len(self._manager.file_mappings),
+            "source_hash": self._source_hash,
+            "watching": self._watcher is not None and self._watcher.is_alive(),
+            "poll_interval": self.poll_interval,
+        }
@@ -7,8 +7,9 @@ from datetime import datetime
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
-from modules.ppt_generator import PPTGenerator
 from modules.llm_service import LLMService
+from modules.pareto import pareto_table
+from config import LLM_COVERAGE_THRESHOLD, LLM_FOCUS_THRESHOLD, PPT_NATIVE_CHARTS
 from prompts import (
     TOP_ISSUE_SUMMARY_PROMPT,
     TOP_MODEL_OVERVIEW_PROMPT,
@@ -62,20 +63,83 @@ def set_table_style(table):
                 paragraph.font.name = '微软雅黑'
                 paragraph.font.size = Pt(10)
 
+def _pareto_for(payload, llm_config, by):
+    """按LLM参数中的阈值取结果矩阵的覆盖度计算（近似模式没有矩阵时返回None）"""
+    matrix = payload.get("matrix")
+    if matrix is None:
+        return None, None
+    llm_config = llm_config or {}
+    table = pareto_table(
+        matrix,
+        llm_config.get("coverage", LLM_COVERAGE_THRESHOLD),
+        llm_config.get("focus", LLM_FOCUS_THRESHOLD),
+        by
+    )
+    return matrix, table
+
+
+def _weekly_summary_payload(payload):
+    """Weekly 分析载荷转为 PPTGenerator 的首页/详情页载荷（按机型、分类后缀归组）"""
+    model_details = {}
+    for entry in payload.get("summaries_7d", []) + payload.get("summaries_non7d", []):
+        model_details.setdefault(entry["model"], {})[entry["suffix"]] = entry
+    return {
+        **payload,
+        "unique_models": list(model_details),
+        "model_details": model_details,
+        "model_non7d_chart_path": payload.get("model_non_7d_chart_path"),
+    }
+
+
 class ReportService:
     """报告生成服务"""
     
-    def __init__(self, output_dir: str or Path):
+    def __init__(self, output_dir: str or Path, native_charts: bool = PPT_NATIVE_CHARTS):
+        """
+        Args:
+            output_dir: PPT输出目录
+            native_charts: 是否插入原生图表（由分布表构建，可编辑），否则嵌入分析生成的PNG
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.native_charts = native_charts
+    
+    def _add_chart(self, slide, kind, frame, label_column, value_column, image_path,
+                   left, top, width, height, title="", limit=None):
+        """添加图表：原生模式由分布表构建，否则按宽度嵌入PNG（图片缺失时跳过）"""
+        if self.native_charts:
+            from modules.ppt_charts import add_native_chart, frame_chart_data
+
+            add_native_chart(
+                slide, kind, frame_chart_data(frame, label_column, value_column, limit),
+                left, top, width, height, title, '微软雅黑'
+            )
+        elif image_path and Path(image_path).exists():
+            try:
+                slide.shapes.add_picture(str(image_path), left, top, width=width)
+            except Exception:
+                pass
     
     def generate_weekly_ppt(self, payload, batch_name, template_path=None, use_llm=False, llm_config=None):
         """生成Weekly Report PPT"""
+        from modules.ppt_generator import PPTGenerator
+
         ppt_filename = f"weekly_report_{batch_name}.pptx"
         ppt_path = self.output_dir / ppt_filename
         
-        ppt_generator = PPTGenerator(template_path=template_path, use_llm=use_llm, llm_config=llm_config)
-        ppt_generator.generate_complete_ppt(summary_payload=payload, output_path=str(ppt_path))
+        llm_service = None
+        if use_llm:
+            llm_config = llm_config or {}
+            llm_service = LLMService(
+                api_key=llm_config.get("api_key"),
+                api_url=llm_config.get("api_url"),
+                model=llm_config.get("model"),
+            )
+        ppt_generator = PPTGenerator(
+            template_path=Path(template_path) if template_path else None,
+            native_charts=self.native_charts
+        )
+        ppt_generator.generate(_weekly_summary_payload(payload), ppt_path, use_llm, llm_service, llm_config)
         
         return ppt_path
     
@@ -141,11 +205,10 @@ class ReportService:
                 pass
         
         # 总览图（右侧，自适应）
-        if summary_chart and Path(summary_chart).exists():
-            try:
-                overview_slide.shapes.add_picture(str(summary_chart), Inches(5.0), Inches(1.5), width=Inches(4.5))
-            except Exception:
-                pass
+        self._add_chart(
+            overview_slide, "bar", issue_stats, "Issue名称", "数量", summary_chart,
+            Inches(5.0), Inches(1.5), Inches(4.5), Inches(3.5), f"Top {top_n} Issue分布"
+        )
         
         # AI总结（11号，左对齐，底部）
         if ai_overview:
@@ -153,8 +216,12 @@ class ReportService:
             set_body_style(ai_tb, f"📊 AI洞察：{ai_overview}", 11)
 
         
+        # 各Issue的机型覆盖度（矩阵按列，一次算出）
+        matrix, pareto = _pareto_for(payload, llm_config, "col")
+        
         # 【页2-11：Issue详情页】（前10个Issue）
         for detail in issue_details[:10]:
+            facts = pareto.facts(matrix.col_index(detail['issue_name'])) if pareto else None
             detail_slide = prs.slides.add_slide(prs.slide_layouts[6] if len(prs.slide_layouts) > 6 else prs.slide_layouts[0])
             
             # 标题（28号，居中）
@@ -163,23 +230,24 @@ class ReportService:
             
             # 统计信息（11号，左对齐）
             stats_text = f"数量：{detail['count']} ({detail['percentage']}%)\n机型数：{detail['model_count']}"
+            if facts is not None and facts.total > 0:
+                stats_text += f"\n{facts.headline('机型')}"
             stats_tb = detail_slide.shapes.add_textbox(Inches(0.5), Inches(1.0), Inches(9), Inches(0.6))
             set_body_style(stats_tb, stats_text, 11)
             
             # 机型分布图（自适应大小）
-            chart_path = detail.get("chart_path")
-            if chart_path and Path(chart_path).exists():
-                try:
-                    detail_slide.shapes.add_picture(str(chart_path), Inches(0.5), Inches(1.8), width=Inches(9))
-                except Exception:
-                    pass
+            self._add_chart(
+                detail_slide, "barh", detail.get("model_distribution"), "机型名称", "数量",
+                detail.get("chart_path"), Inches(0.5), Inches(1.8), Inches(9), Inches(3.2),
+                f"{detail['issue_name']} - 机型分布", limit=15
+            )
             
             # AI洞察（11号，左对齐）
             if use_llm:
                 try:
                     model_dist = detail.get("model_distribution")
                     if model_dist is not None and len(model_dist) > 0:
-                        ai_insight = self._summarize_issue_detail(detail['issue_name'], model_dist, llm_config)
+                        ai_insight = self._summarize_issue_detail(detail['issue_name'], model_dist, llm_config, facts)
                         insight_tb = detail_slide.shapes.add_textbox(Inches(0.5), Inches(5.0), Inches(9), Inches(0.5))
                         set_body_style(insight_tb, f"💡 AI洞察：{ai_insight}", 11)
                 except Exception:
@@ -188,18 +256,20 @@ class ReportService:
         prs.save(str(ppt_path))
         return ppt_path
     
-    def _summarize_model_llm(self, model_name, category_dist, llm_config):
-        """对单个机型的分类分布使用LLM生成摘要（简化版）"""
+    def _summarize_model_llm(self, model_name, category_dist, llm_config, facts=None):
+        """对单个机型的分类分布使用LLM生成摘要（简化版；有覆盖度结论时只附结论涉及的分类）"""
         try:
             llm = LLMService(
                 api_key=llm_config.get("api_key") if llm_config else None,
                 api_url=llm_config.get("api_url") if llm_config else None,
                 model=llm_config.get("model") if llm_config else None,
             )
-            top_rows = category_dist.head(10)
+            top_rows = category_dist.head(min(max(facts.listed, 1), 10) if facts else 10)
             lines = ["分类\t数量\t占比"]
             for _, row in top_rows.iterrows():
                 lines.append(f"{row['分类']}\t{row['数量']}\t{row['占比(%)']}")
+            if facts is not None:
+                lines.append("预计算结论（直接引用）：\n" + facts.describe())
             table_text = "\n".join(lines)
             
             prompt = (
@@ -230,17 +300,19 @@ class ReportService:
         )
         return llm.call_api([{"role": "user", "content": prompt}], timeout=int(llm_config.get("timeout", 60)) if llm_config else 60)
 
-    def _summarize_issue_detail(self, issue_name, model_dist, llm_config):
-        """针对单个Issue的机型分布，给出PQM视角洞察"""
+    def _summarize_issue_detail(self, issue_name, model_dist, llm_config, facts=None):
+        """针对单个Issue的机型分布，给出PQM视角洞察（有覆盖度结论时只附结论涉及的机型）"""
         llm = LLMService(
             api_key=llm_config.get("api_key") if llm_config else None,
             api_url=llm_config.get("api_url") if llm_config else None,
             model=llm_config.get("model") if llm_config else None,
         )
-        top_rows = model_dist.head(10)
+        top_rows = model_dist.head(min(max(facts.listed, 1), 10) if facts else 10)
         lines = ["机型\t数量\t占比"]
         for _, row in top_rows.iterrows():
             lines.append(f"{row['机型名称']}\t{row['数量']}\t{row['占比(%)']}")
+        if facts is not None:
+            lines.append("预计算结论（直接引用）：\n" + facts.describe("机型"))
         table_text = "\n".join(lines)
         prompt = (
             "你是PQM质量专家，请针对该Issue的机型分布给出一句洞察，不超过50字，"
@@ -334,21 +406,23 @@ class ReportService:
             except Exception:
                 pass
         
-        # 整体分布图或对比图（右侧，自适应）
-        chart_to_show = overall_chart or comparison_chart
-        if chart_to_show and Path(chart_to_show).exists():
-            try:
-                overview_slide.shapes.add_picture(str(chart_to_show), Inches(5.2), Inches(1.2), width=Inches(4.3))
-            except Exception:
-                pass
+        # 整体分布图或对比图（右侧，自适应；原生图表为Top N机型分类数）
+        self._add_chart(
+            overview_slide, "barh", top_models, "机型名称", "分类数", overall_chart or comparison_chart,
+            Inches(5.2), Inches(1.2), Inches(4.3), Inches(3.8), f"Top {top_n} 机型分类数"
+        )
         
         # AI总结（11号，左对齐，底部）
         if ai_overview:
             ai_tb = overview_slide.shapes.add_textbox(Inches(0.5), Inches(5.0), Inches(9), Inches(0.5))
             set_body_style(ai_tb, f"📊 AI洞察：{ai_overview}", 11)
         
+        # 各机型的分类覆盖度（矩阵按行，一次算出）
+        matrix, pareto = _pareto_for(payload, llm_config, "row")
+        
         # 【页2-11：Model详情页】（前10个机型）
         for detail in model_details[:10]:
+            facts = pareto.facts(matrix.row_index(detail['model_name'])) if pareto else None
             detail_slide = prs.slides.add_slide(prs.slide_layouts[6] if len(prs.slide_layouts) > 6 else prs.slide_layouts[0])
             
             # 标题（28号，居中）
@@ -368,23 +442,30 @@ class ReportService:
                 f"记录数：{detail['total_records']}"
                 f"{top5_text}"
             )
+            if facts is not None and facts.total > 0:
+                stats_text += f"\n{facts.headline()}"
             stats_tb = detail_slide.shapes.add_textbox(Inches(0.5), Inches(1.0), Inches(4.5), Inches(2.0))
             set_body_style(stats_tb, stats_text, 11)
             
-            # 分类分布图（自适应大小）
-            chart_path = detail.get("chart_path")
-            if chart_path and Path(chart_path).exists():
-                try:
-                    detail_slide.shapes.add_picture(str(chart_path), Inches(0.5), Inches(3.2), width=Inches(9))
-                except Exception:
-                    pass
+            # 分类分布图（自适应大小；原生图表放在统计信息右侧）
+            if self.native_charts:
+                self._add_chart(
+                    detail_slide, "barh", category_dist, "分类", "数量", None,
+                    Inches(5.2), Inches(1.0), Inches(4.3), Inches(3.9),
+                    f"{detail['model_name']} - 分类分布", limit=20
+                )
+            else:
+                self._add_chart(
+                    detail_slide, "barh", category_dist, "分类", "数量", detail.get("chart_path"),
+                    Inches(0.5), Inches(3.2), Inches(9), None
+                )
             
             # AI解读（11号，左对齐）
             if use_llm:
                 try:
                     category_dist = detail.get("category_distribution")
                     if category_dist is not None and len(category_dist) > 0:
-                        ai_insight = self._summarize_model_llm(detail['model_name'], category_dist, llm_config)
+                        ai_insight = self._summarize_model_llm(detail['model_name'], category_dist, llm_config, facts)
                         insight_tb = detail_slide.shapes.add_textbox(Inches(0.5), Inches(5.0), Inches(9), Inches(0.5))
                         set_body_style(insight_tb, f"💡 AI解读：{ai_insight}", 11)
                 except Exception:
@@ -393,18 +474,21 @@ class ReportService:
         prs.save(str(ppt_path))
         return ppt_path
 
-def create_report_service(output_dir):
-    return ReportService(output_dir)
+def create_report_service(output_dir, native_charts=PPT_NATIVE_CHARTS):
+    return ReportService(output_dir, native_charts)
 
-def generate_weekly_report(payload, output_dir, batch_name, template_path=None, use_llm=False, llm_config=None):
-    service = ReportService(output_dir)
+def generate_weekly_report(payload, output_dir, batch_name, template_path=None, use_llm=False, llm_config=None,
+                           native_charts=PPT_NATIVE_CHARTS):
+    service = ReportService(output_dir, native_charts)
     return service.generate_weekly_ppt(payload, batch_name, template_path, use_llm, llm_config)
 
-def generate_top_issue_report(payload, output_dir, batch_name, template_path=None, use_llm=False, llm_config=None):
-    service = ReportService(output_dir)
+def generate_top_issue_report(payload, output_dir, batch_name, template_path=None, use_llm=False, llm_config=None,
+                              native_charts=PPT_NATIVE_CHARTS):
+    service = ReportService(output_dir, native_charts)
     return service.generate_top_issue_ppt(payload, batch_name, template_path, use_llm, llm_config)
 
-def generate_top_model_report(payload, output_dir, batch_name, template_path=None, use_llm=False, llm_config=None):
-    service = ReportService(output_dir)
+def generate_top_model_report(payload, output_dir, batch_name, template_path=None, use_llm=False, llm_config=None,
+                              native_charts=PPT_NATIVE_CHARTS):
+    service = ReportService(output_dir, native_charts)
     return service.generate_top_model_ppt(payload, batch_name, template_path, use_llm, llm_config)
 
@@ -8,120 +8,273 @@ Top Issue Analysis Service - 热点问题分析服务
 """
 
 import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from pathlib import Path
-from typing import Dict, List, Optional
-from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from datetime import date, datetime
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from config import MATPLOTLIB_FONTS
+from config import APPROX_SKETCH_EPSILON, PPT_NATIVE_CHARTS
 from modules.llm_service import LLMService
+from modules.aggregate_cube import AggregateCube, CUBE_DIMENSIONS, build_cube
+from modules.sketches import SpaceSaving
+from modules.analysis_results import IssueDetail, TopIssueResult
+from data.shipment_volumes import RATE_COLUMN, issue_rates, per_units
+from services.artifact_writers import ArtifactWriters
+from services.chart_service import ChartPanel, ChartSpec, render_charts
 from prompts import TOP_ISSUE_SUMMARY_PROMPT
 
-# 设置中文字体
-matplotlib.rcParams['font.family'] = MATPLOTLIB_FONTS
-matplotlib.rcParams['axes.unicode_minus'] = False
-
 
 class TopIssueAnalysisService:
     """Top Issue分析服务"""
     
+    # 只读取聚合立方体的维度列（LazyDataset 只需物化这些列）
+    REQUIRED_COLUMNS = CUBE_DIMENSIONS
+    
     def __init__(self, output_dir: str or Path):
-        """初始化Top Issue分析服务"""
+        """初始化Top Issue分析服务（不创建目录，产物写出时按需创建）"""
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        
         self.top_issue_dir = self.output_dir / "Top_Issue分析"
-        self.top_issue_dir.mkdir(parents=True, exist_ok=True)
-        
         self.charts_dir = self.top_issue_dir / "charts"
-        self.charts_dir.mkdir(parents=True, exist_ok=True)
         
+        self.result: Optional[TopIssueResult] = None
         self.results = {}
+        
+        self.writers = ArtifactWriters({
+            "excel": self._write_excel,
+            "png": self._write_charts,
+            "txt": self._write_text_report,
+            "ppt": self._write_ppt,
+        })
     
-    def analyze(
+    def compute(
         self,
-        df: pd.DataFrame,
+        df: Optional[pd.DataFrame],
         top_n: int = 10,
-        use_llm: bool = False,
-        llm_config: Optional[Dict] = None
-    ) -> Dict:
-        """执行Top Issue完整分析流程"""
-        print("\n" + "="*70)
-        print(f"🔥 Top {top_n} Issue 分析")
-        print("="*70)
+        cube: Optional[AggregateCube] = None,
+        volumes: Optional[pd.Series] = None
+    ) -> Optional[TopIssueResult]:
+        """
+        纯计算：统计Top N Issue及其机型分布，不写出任何文件
         
-        if len(df) == 0 or '分类' not in df.columns:
-            print("❌ 错误：数据为空或缺少'分类'列")
-            return {}
+        Args:
+            df: 数据DataFrame（传入cube时可为None）
+            top_n: Top N数量
+            cube: 数据集的聚合立方体
+            volumes: 机型出货量（ShipmentVolumes.volumes），提供时增加每万台比率列
+            
+        Returns:
+            TopIssueResult；数据为空时返回None
+        """
+        if cube is None:
+            if df is None or len(df) == 0 or '分类' not in df.columns:
+                print("❌ 错误：数据为空或缺少'分类'列")
+                return None
+            cube = build_cube(df)
+        elif cube.total_records == 0:
+            print("❌ 错误：数据为空")
+            return None
         
         # 1. 统计Top N Issue
         print(f"\n📊 统计Top {top_n} Issue...")
-        issue_counts = df['分类'].value_counts().head(top_n)
+        issue_counts = cube.value_counts('分类').head(top_n)
         
         issue_stats = pd.DataFrame({
             '排名': range(1, len(issue_counts) + 1),
             'Issue名称': issue_counts.index,
             '数量': issue_counts.values,
-            '占比(%)': (issue_counts.values / len(df) * 100).round(2)
+            '占比(%)': (issue_counts.values / cube.total_records * 100).round(2)
         })
         issue_stats['累计占比(%)'] = issue_stats['占比(%)'].cumsum().round(2)
         
         print(f"✓ 统计了Top {len(issue_stats)} Issue")
         
-        # 保存统计表
-        stats_path = self.top_issue_dir / f"Top{top_n}_Issue统计.xlsx"
-        issue_stats.to_excel(stats_path, index=False)
+        # 2. 分析机型分布（机型 × 分类 稀疏矩阵按列切片）
+        matrix = cube.matrix('机型名称', '分类')
+        if volumes is not None:
+            issue_stats[RATE_COLUMN] = issue_rates(matrix, volumes).reindex(issue_stats['Issue名称']).to_numpy()
+            covered = int(volumes.index.isin(matrix.row_labels).sum())
+            print(f"✓ 已关联出货量：{covered}/{len(matrix.row_labels)} 个机型有出货量")
+        issue_details = self._analyze_issue_models(matrix, issue_stats, volumes)
         
-        # 2. 生成总览图
-        summary_chart = self._generate_summary_chart(issue_stats, top_n)
+        return TopIssueResult(
+            issue_stats=issue_stats,
+            issue_details=issue_details,
+            total_records=cube.total_records,
+            top_n=top_n,
+            matrix=matrix
+        )
+    
+    def compute_approx(
+        self,
+        chunks: Iterable[pd.DataFrame],
+        mtm_manager,
+        top_n: int = 10,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        filter_unmapped: bool = False,
+        resolve_family: bool = False,
+        epsilon: float = APPROX_SKETCH_EPSILON
+    ) -> Optional[TopIssueResult]:
+        """
+        近似计算：逐块处理明细，用SpaceSaving草图统计Top N Issue / 机型，内存与数据量无关
+        
+        每个数量旁给出误差上界，真实值在 [数量 - 误差上界, 数量] 之间；
+        各Issue的机型分布来自 (分类, 机型) 组合草图，只包含追踪到的组合
+        
+        Args:
+            chunks: 原始明细数据块（如 DataManager.iter_excel 的结果）
+            mtm_manager: MTM管理器
+            top_n: Top N数量
+            start_date: 开始日期
+            end_date: 结束日期
+            filter_unmapped: 是否过滤未映射的MTM
+            resolve_family: 是否将未映射MTM按系列前缀解析
+            epsilon: 相对误差（误差 ≤ epsilon × 记录数）
+            
+        Returns:
+            TopIssueResult（error_bound 为全局误差上界）；没有记录时返回None
+        """
+        from data.lazy_dataset import stream_collect
+        
+        issues = SpaceSaving.with_error(epsilon)
+        models = SpaceSaving.with_error(epsilon)
+        pairs = SpaceSaving.with_error(epsilon)
+        total_records = 0
+        
+        print(f"\n📊 流式统计Top {top_n} Issue（SpaceSaving，{issues.capacity}个计数器）...")
+        chunks = stream_collect(
+            chunks, mtm_manager, CUBE_DIMENSIONS, start_date, end_date, filter_unmapped, resolve_family
+        )
+        for i, chunk in enumerate(chunks, 1):
+            total_records += len(chunk)
+            issues.update(chunk['分类'])
+            models.update(chunk['机型名称'])
+            pair_counts = chunk.groupby(['分类', '机型名称'], sort=False).size()
+            pairs.update_counts(pair_counts.index, pair_counts.to_numpy())
+            print(f"  - 第{i}块: 累计 {total_records} 条记录")
+        
+        if total_records == 0:
+            print("❌ 错误：数据为空")
+            return None
+        
+        issue_top = issues.top(top_n, 'Issue名称')
+        issue_stats = pd.DataFrame({
+            '排名': range(1, len(issue_top) + 1),
+            'Issue名称': issue_top['Issue名称'],
+            '数量': issue_top['数量'],
+            '误差上界': issue_top['误差上界'],
+            '占比(%)': (issue_top['数量'] / total_records * 100).round(2)
+        })
+        issue_stats['累计占比(%)'] = issue_stats['占比(%)'].cumsum().round(2)
+        
+        model_top = models.top(top_n, '机型名称')
+        model_stats = pd.DataFrame({
+            '排名': range(1, len(model_top) + 1),
+            '机型名称': model_top['机型名称'],
+            '数量': model_top['数量'],
+            '误差上界': model_top['误差上界'],
+            '占比(%)': (model_top['数量'] / total_records * 100).round(2)
+        })
+        
+        error_bound = max(issues.error_bound, models.error_bound, pairs.error_bound)
+        print(f"✓ 统计了Top {len(issue_stats)} Issue / Top {len(model_stats)} 机型"
+              f"（共 {total_records} 条，误差上界 {error_bound}，保证 ≤ {total_records / issues.capacity:.1f}）")
+        
+        # 各Issue的机型分布：从组合草图中按分类切片
+        pair_top = pairs.top()
+        pair_top['分类'] = [key[0] for key in pair_top['取值']]
+        pair_top['机型名称'] = [key[1] for key in pair_top['取值']]
+        issue_details = []
+        for idx, row in issue_stats.iterrows():
+            model_dist = pair_top.loc[pair_top['分类'] == row['Issue名称'], ['机型名称', '数量', '误差上界']]
+            model_dist = model_dist.reset_index(drop=True)
+            model_dist['占比(%)'] = (model_dist['数量'] / row['数量'] * 100).round(2)
+            issue_details.append(IssueDetail(
+                rank=idx + 1,
+                issue_name=row['Issue名称'],
+                count=row['数量'],
+                percentage=row['占比(%)'],
+                model_distribution=model_dist
+            ))
+        
+        return TopIssueResult(
+            issue_stats=issue_stats,
+            issue_details=issue_details,
+            total_records=total_records,
+            top_n=top_n,
+            model_stats=model_stats,
+            error_bound=error_bound
+        )
+    
+    def write(self, result: TopIssueResult, formats: Optional[Iterable[str]] = None, **options) -> Dict[str, Path]:
+        """
+        按需写出产物
+        
+        Args:
+            result: compute() 的结果
+            formats: 需要的格式（excel / png / txt / ppt），None 使用默认，空序列表示不写出
+            **options: 传给写出器的参数（PPT: batch_name, template_path, use_llm, llm_config, native_charts）
+            
+        Returns:
+            本次写出的 {产物名: 路径}
+        """
+        written = self.writers.run(result, formats, **options)
+        self.results = result.to_dict()
+        return written
+    
+    def analyze(
+        self,
+        df: Optional[pd.DataFrame],
+        top_n: int = 10,
+        use_llm: bool = False,
+        llm_config: Optional[Dict] = None,
+        cube: Optional[AggregateCube] = None,
+        formats: Optional[Iterable[str]] = None,
+        volumes: Optional[pd.Series] = None
+    ) -> Dict:
+        """执行Top Issue完整分析流程（计算 + 按需写出；传入cube时df可为None）"""
+        print("\n" + "="*70)
+        print(f"🔥 Top {top_n} Issue 分析")
+        print("="*70)
         
-        # 3. 分析机型分布
-        issue_details = self._analyze_issue_models(df, issue_stats)
+        self.result = self.compute(df, top_n, cube, volumes)
+        if self.result is None:
+            return {}
+        self.write(self.result, formats)
         
-        # 4. 生成报告
-        report_path = self._generate_report(df, issue_stats, issue_details)
+        print("\n✅ Top Issue分析完成")
+        return self.results
+    
+    def analyze_approx(
+        self,
+        chunks: Iterable[pd.DataFrame],
+        mtm_manager,
+        top_n: int = 10,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        filter_unmapped: bool = False,
+        resolve_family: bool = False,
+        formats: Optional[Iterable[str]] = None
+    ) -> Dict:
+        """执行近似Top Issue分析流程（流式草图计算 + 按需写出）"""
+        print("\n" + "="*70)
+        print(f"🔥 Top {top_n} Issue 分析（近似，流式）")
+        print("="*70)
         
-        self.results = {
-            "issue_stats": issue_stats,
-            "issue_details": issue_details,
-            "summary_chart": summary_chart,
-            "report_path": report_path,
-            "total_records": len(df),
-            "top_n": top_n
-        }
+        self.result = self.compute_approx(
+            chunks, mtm_manager, top_n, start_date, end_date, filter_unmapped, resolve_family
+        )
+        if self.result is None:
+            return {}
+        self.write(self.result, formats)
         
         print("\n✅ Top Issue分析完成")
         return self.results
     
-    def _generate_summary_chart(self, issue_stats, top_n):
-        """生成总览图（带数据标签）"""
-        plt.figure(figsize=(16, 8))
-        bars = plt.bar(range(len(issue_stats)), issue_stats['数量'])
-        plt.xlabel("Issue分类", fontsize=13)
-        plt.ylabel("数量", fontsize=13)
-        plt.title(f"Top {top_n} Issue分布", fontsize=14, fontweight='bold')
-        plt.xticks(range(len(issue_stats)), issue_stats['Issue名称'], rotation=45, ha='right', fontsize=10)
-        
-        # 添加数值标签
-        for i, bar in enumerate(bars):
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + max(issue_stats['数量']) * 0.01,
-                    f'{int(height)}\n({issue_stats.iloc[i]["占比(%)"]}%)',
-                    ha='center', va='bottom', fontsize=9, fontweight='bold')
-        
-        plt.tight_layout()
-        chart_path = self.charts_dir / "Top_Issue总览图.png"
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        return chart_path
-    
-    def _analyze_issue_models(self, df, issue_stats):
-        """分析每个Issue的机型分布"""
+    def _analyze_issue_models(self, matrix, issue_stats, volumes=None) -> List[IssueDetail]:
+        """分析每个Issue的机型分布（取 机型 × 分类 稀疏矩阵的列；有出货量时附每万台比率）"""
         issue_details = []
         
         print(f"\n📊 分析每个Issue的机型分布...")
@@ -129,77 +282,123 @@ class TopIssueAnalysisService:
             issue_name = row['Issue名称']
             issue_count = row['数量']
             
-            # 筛选该Issue的数据
-            issue_df = df[df['分类'] == issue_name]
-            
             # 统计机型分布
-            model_dist = issue_df['机型名称'].value_counts().reset_index()
-            model_dist.columns = ['机型名称', '数量']
+            model_dist = matrix.col_frame(matrix.col_index(issue_name), '机型名称', '数量')
             model_dist['占比(%)'] = (model_dist['数量'] / issue_count * 100).round(2)
+            if volumes is not None:
+                model_dist[RATE_COLUMN] = per_units(model_dist['数量'], volumes.reindex(model_dist['机型名称']))
             
-            # 保存机型分布Excel
-            safe_name = self._safe_filename(issue_name)
-            model_dist_path = self.top_issue_dir / f"{idx+1:02d}_{safe_name}_机型分布.xlsx"
-            model_dist.to_excel(model_dist_path, index=False)
-            
-            # 生成机型分布图
-            chart_path = None
-            if len(model_dist) >= 2:
-                chart_path = self._generate_model_chart(issue_name, model_dist, idx+1)
-            
-            issue_details.append({
-                'rank': idx + 1,
-                'issue_name': issue_name,
-                'count': issue_count,
-                'percentage': row['占比(%)'],
-                'model_count': len(model_dist),
-                'model_distribution': model_dist,
-                'model_dist_path': model_dist_path,
-                'chart_path': chart_path
-            })
+            issue_details.append(IssueDetail(
+                rank=idx + 1,
+                issue_name=issue_name,
+                count=issue_count,
+                percentage=row['占比(%)'],
+                model_distribution=model_dist
+            ))
             
             print(f"  - Issue #{idx+1}: {issue_name} ({issue_count}条) -> {len(model_dist)}款机型")
         
         print(f"✓ 完成 {len(issue_details)} 个Issue的机型分布分析")
         return issue_details
     
-    def _generate_model_chart(self, issue_name, model_dist, rank):
-        """生成单个Issue的机型分布图（带数据标签）"""
-        import re
-        
-        # 只显示前15个机型
-        display_data = model_dist.head(15)
-        
-        fig, ax = plt.subplots(figsize=(14, 8))
-        bars = ax.barh(range(len(display_data)), display_data['数量'])
+    # ================================================================
+    # 写出器
+    # ================================================================
+    
+    def _write_excel(self, result: TopIssueResult, **options) -> Dict[str, Path]:
+        """统计表及逐Issue机型分布表"""
+        self.top_issue_dir.mkdir(parents=True, exist_ok=True)
+        stats_path = self.top_issue_dir / f"Top{result.top_n}_Issue统计.xlsx"
+        result.issue_stats.to_excel(stats_path, index=False)
+        if result.model_stats is not None:
+            result.model_stats.to_excel(self.top_issue_dir / f"Top{result.top_n}_机型统计.xlsx", index=False)
         
-        ax.set_yticks(range(len(display_data)))
-        ax.set_yticklabels(display_data['机型名称'], fontsize=10)
-        ax.set_xlabel("数量", fontsize=13)
-        ax.set_title(
-            f"Issue: {issue_name}\n机型分布 (共{len(model_dist)}款机型)",
-            fontsize=14, fontweight='bold'
+        for detail in result.issue_details:
+            safe_name = self._safe_filename(detail.issue_name)
+            detail.model_dist_path = self.top_issue_dir / f"{detail.rank:02d}_{safe_name}_机型分布.xlsx"
+            detail.model_distribution.to_excel(detail.model_dist_path, index=False)
+        return {"stats_path": stats_path}
+    
+    def _write_charts(self, result: TopIssueResult, **options) -> Dict[str, Path]:
+        """总览图及逐Issue机型分布图（一批交给图表渲染服务）"""
+        charted = [detail for detail in result.issue_details if len(detail.model_distribution) >= 2]
+        specs = [self._summary_chart_spec(result.issue_stats, result.top_n)]
+        specs += [
+            self._model_chart_spec(detail.issue_name, detail.model_distribution, detail.rank)
+            for detail in charted
+        ]
+        paths = render_charts(specs)
+        for detail, path in zip(charted, paths[1:]):
+            detail.chart_path = path
+        return {"summary_chart": paths[0]}
+    
+    def _write_text_report(self, result: TopIssueResult, **options) -> Dict[str, Path]:
+        return {"report_path": self._generate_report(result.total_records, result.issue_stats, result.error_bound)}
+    
+    def _write_ppt(self, result: TopIssueResult, batch_name: str = "2024-2025", template_path: Optional[str] = None,
+                   use_llm: bool = False, llm_config: Optional[Dict] = None, native_charts: Optional[bool] = None,
+                   **options) -> Dict[str, Path]:
+        from services.report_service import generate_top_issue_report
+        self.results = result.to_dict()
+        ppt_path = generate_top_issue_report(
+            self.get_ppt_payload(), str(self.output_dir), batch_name, template_path, use_llm, llm_config,
+            PPT_NATIVE_CHARTS if native_charts is None else native_charts
         )
-        
-        # 添加数值标签
-        for i, bar in enumerate(bars):
-            width = bar.get_width()
-            percentage = display_data.iloc[i]['占比(%)']
-            ax.text(
-                width + max(display_data['数量']) * 0.01,
-                bar.get_y() + bar.get_height()/2.,
-                f'{int(width)} ({percentage:.1f}%)',
-                ha='left', va='center', fontsize=9, fontweight='bold'
-            )
-        
-        plt.tight_layout()
-        
+        return {"ppt_path": ppt_path}
+    
+    def _summary_chart_spec(self, issue_stats, top_n) -> ChartSpec:
+        """总览图（带数据标签）"""
+        return ChartSpec(
+            path=self.charts_dir / "Top_Issue总览图.png",
+            panels=[ChartPanel(
+                kind="bar",
+                values=issue_stats['数量'].tolist(),
+                labels=issue_stats['Issue名称'].astype(str).tolist(),
+                title=f"Top {top_n} Issue分布",
+                title_size=14,
+                title_weight='bold',
+                xlabel="Issue分类",
+                ylabel="数量",
+                label_size=13,
+                tick_size=10,
+                tick_rotation=45,
+                tick_align='right',
+                annotations=[
+                    f'{int(count)}\n({pct}%)' for count, pct in zip(issue_stats['数量'], issue_stats['占比(%)'])
+                ],
+                annotation_offset=0.01,
+                annotation_size=9,
+                annotation_weight='bold',
+            )],
+            figsize=(16, 8),
+        )
+    
+    def _model_chart_spec(self, issue_name, model_dist, rank) -> ChartSpec:
+        """单个Issue的机型分布图（带数据标签，只显示前15个机型）"""
+        display_data = model_dist.head(15)
         safe_name = self._safe_filename(issue_name)
-        chart_path = self.charts_dir / f"{rank:02d}_{safe_name}_机型分布.png"
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return chart_path
+        return ChartSpec(
+            path=self.charts_dir / f"{rank:02d}_{safe_name}_机型分布.png",
+            panels=[ChartPanel(
+                kind="barh",
+                values=display_data['数量'].tolist(),
+                labels=display_data['机型名称'].astype(str).tolist(),
+                title=f"Issue: {issue_name}\n机型分布 (共{len(model_dist)}款机型)",
+                title_size=14,
+                title_weight='bold',
+                xlabel="数量",
+                label_size=13,
+                tick_size=10,
+                annotations=[
+                    f'{int(count)} ({pct:.1f}%)'
+                    for count, pct in zip(display_data['数量'], display_data['占比(%)'])
+                ],
+                annotation_offset=0.01,
+                annotation_size=9,
+                annotation_weight='bold',
+            )],
+            figsize=(14, 8),
+        )
     
     def _safe_filename(self, name, max_len=50):
         """清理文件名"""
@@ -209,16 +408,24 @@ class TopIssueAnalysisService:
             name = name[:max_len]
         return name.strip()
     
-    def _generate_report(self, df, issue_stats, issue_details):
-        """生成文本报告"""
+    def _generate_report(self, total_records, issue_stats, error_bound=None):
+        """生成文本报告（近似模式在每个数量后注明误差上界）"""
         lines = ["="*70, "Top Issue 分析报告", "="*70]
-        lines.append(f"总记录数: {len(df)}")
+        lines.append(f"总记录数: {total_records}")
         lines.append(f"Top N: {len(issue_stats)}")
+        if error_bound is not None:
+            lines.append(f"近似统计（SpaceSaving）: 真实值在 [数量 - 误差, 数量] 之间，全局误差上界 {error_bound}")
         lines.append("")
         
         for idx, row in issue_stats.iterrows():
-            lines.append(f"{row['排名']}. {row['Issue名称']}: {row['数量']}条 ({row['占比(%)']}%)")
+            if error_bound is None:
+                lines.append(f"{row['排名']}. {row['Issue名称']}: {row['数量']}条 ({row['占比(%)']}%)")
+            else:
+                lines.append(
+                    f"{row['排名']}. {row['Issue名称']}: {row['数量']}条 (误差 ≤ {row['误差上界']}, {row['占比(%)']}%)"
+                )
         
+        self.top_issue_dir.mkdir(parents=True, exist_ok=True)
         report_path = self.top_issue_dir / "Top_Issue分析报告.txt"
         with open(report_path, 'w', encoding='utf-8') as f:
             f.write("\n".join(lines))
@@ -229,8 +436,18 @@ class TopIssueAnalysisService:
         return self.results
 
 
-def run_top_issue_analysis(df, output_dir, top_n=10, use_llm=False, llm_config=None):
+def run_top_issue_analysis(df, output_dir, top_n=10, use_llm=False, llm_config=None, cube=None, formats=None,
+                           volumes=None):
     """便捷函数：运行Top Issue分析"""
     service = TopIssueAnalysisService(output_dir)
-    return service.analyze(df, top_n, use_llm, llm_config)
+    return service.analyze(df, top_n, use_llm, llm_config, cube, formats, volumes)
+
 
+
+def run_top_issue_approx(chunks, mtm_manager, output_dir, top_n=10, start_date=None, end_date=None,
+                         filter_unmapped=False, resolve_family=False, formats=None):
+    """便捷函数：运行近似Top Issue分析（流式，内存与数据量无关）"""
+    service = TopIssueAnalysisService(output_dir)
+    return service.analyze_approx(
+        chunks, mtm_manager, top_n, start_date, end_date, filter_unmapped, resolve_family, formats
+    )
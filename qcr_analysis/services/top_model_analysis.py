@@ -9,68 +9,92 @@ Top Model Analysis Service - 热门机型分析服务
 """
 
 import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
+from datetime import date
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from config import MATPLOTLIB_FONTS
+from config import SUFFIX_AUDIT_REASONS, APPROX_HLL_PRECISION, APPROX_SKETCH_EPSILON, PPT_NATIVE_CHARTS
 from modules.llm_service import LLMService
+from modules.aggregate_cube import AggregateCube, CUBE_DIMENSIONS, build_cube
+from modules.sketches import HyperLogLog, SpaceSaving
+from modules.analysis_results import ModelDetail, TopModelResult
+from data.shipment_volumes import RATE_COLUMN, VOLUME_COLUMN, per_units
+from services.artifact_writers import ArtifactWriters
+from services.chart_service import ChartPanel, ChartSpec, render_charts
 from prompts import TOP_MODEL_OVERVIEW_PROMPT
 
-# 设置中文字体
-matplotlib.rcParams['font.family'] = MATPLOTLIB_FONTS
-matplotlib.rcParams['axes.unicode_minus'] = False
-
 
 class TopModelAnalysisService:
     """Top Model分析服务 - 基于分类数量"""
     
+    # 只读取聚合立方体的维度列（LazyDataset 只需物化这些列）
+    REQUIRED_COLUMNS = CUBE_DIMENSIONS
+    
     def __init__(self, output_dir: str or Path):
-        """初始化Top Model分析服务"""
+        """初始化Top Model分析服务（不创建目录，产物写出时按需创建）"""
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        
         self.top_model_dir = self.output_dir / "Top_Model分析"
-        self.top_model_dir.mkdir(parents=True, exist_ok=True)
-        
         self.charts_dir = self.top_model_dir / "charts"
-        self.charts_dir.mkdir(parents=True, exist_ok=True)
         
+        self.result: Optional[TopModelResult] = None
         self.results = {}
+        
+        self.writers = ArtifactWriters({
+            "excel": self._write_excel,
+            "png": self._write_charts,
+            "txt": self._write_text_report,
+            "ppt": self._write_ppt,
+        })
     
-    def analyze(
+    def compute(
         self,
-        df: pd.DataFrame,
+        df: Optional[pd.DataFrame],
         top_n: int = 15,
-        use_llm: bool = False,
-        llm_config: Optional[Dict] = None
-    ) -> Dict:
-        """执行Top Model完整分析流程"""
-        print("\n" + "="*70)
-        print(f"🏆 Top {top_n} Model 分析（基于分类数量）")
-        print("="*70)
+        cube: Optional[AggregateCube] = None,
+        volumes: Optional[pd.Series] = None
+    ) -> Optional[TopModelResult]:
+        """
+        纯计算：统计机型分类数及Top机型详情，不写出任何文件
         
-        if len(df) == 0 or '机型名称' not in df.columns or '分类' not in df.columns:
-            print("❌ 错误：数据为空或缺少必需列（需要'机型名称'和'分类'）")
-            return {}
+        Args:
+            df: 数据DataFrame（传入cube时可为None）
+            top_n: Top N数量
+            cube: 数据集的聚合立方体
+            volumes: 机型出货量（ShipmentVolumes.volumes），提供时增加出货量与每万台比率列
+            
+        Returns:
+            TopModelResult；数据为空时返回None
+        """
+        if cube is None:
+            if df is None or len(df) == 0 or '机型名称' not in df.columns or '分类' not in df.columns:
+                print("❌ 错误：数据为空或缺少必需列（需要'机型名称'和'分类'）")
+                return None
+            cube = build_cube(df)
+        elif cube.total_records == 0:
+            print("❌ 错误：数据为空")
+            return None
         
         # 1. 计算分类数（使用"分类"列）
         print(f"\n📊 统计所有机型的分类数...")
-        model_stats = df.groupby('机型名称').agg({
-            '分类': 'nunique',
-            '机型名称': 'count'
-        }).rename(columns={'分类': '分类数', '机型名称': '记录数'})
+        category_counts = cube.nunique('机型名称', '分类')
+        model_stats = pd.DataFrame({
+            '分类数': category_counts,
+            '记录数': cube.value_counts('机型名称').reindex(category_counts.index),
+        }).sort_index()
         
         model_stats = model_stats.reset_index()
         model_stats['平均每类记录数'] = (model_stats['记录数'] / model_stats['分类数']).round(1)
         model_stats = model_stats.sort_values('分类数', ascending=False)
         model_stats['排名'] = range(1, len(model_stats) + 1)
         model_stats = model_stats[['排名', '机型名称', '分类数', '记录数', '平均每类记录数']]
+        if volumes is not None:
+            units = volumes.reindex(model_stats['机型名称'])
+            model_stats[VOLUME_COLUMN] = units.astype('Int64').array
+            model_stats[RATE_COLUMN] = per_units(model_stats['记录数'], units.to_numpy(dtype='float64'))
+            print(f"✓ 已关联出货量：{int(model_stats[VOLUME_COLUMN].notna().sum())}/{len(model_stats)} 个机型有出货量")
         
         print(f"✓ 共统计 {len(model_stats)} 个机型")
         
@@ -79,96 +103,296 @@ class TopModelAnalysisService:
         print(f"\n✓ Top {top_n} 机型:")
         for idx, row in top_models.iterrows():
             print(f"   {row['排名']}. {row['机型名称']}: {row['分类数']}个分类, {row['记录数']}条记录")
-
-        # 保存 Top N 统计表
-        top_stats_path = self.top_model_dir / f"Top{top_n}_Model统计.xlsx"
-        top_models.to_excel(top_stats_path, index=False)
         
-        # 3. 生成图表
-        overall_chart = self._generate_overall_chart(model_stats)
-        comparison_chart = self._generate_comparison_chart(top_models, top_n)
+        # 3. 详细分析（机型 × 分类 稀疏矩阵按行切片）
+        matrix = cube.matrix('机型名称', '分类')
+        model_details = self._analyze_top_models(cube, matrix, top_models, volumes)
+        
+        return TopModelResult(
+            model_stats=model_stats,
+            top_models=top_models,
+            model_details=model_details,
+            total_records=cube.total_records,
+            top_n=top_n,
+            matrix=matrix
+        )
+    
+    def compute_approx(
+        self,
+        chunks: Iterable[pd.DataFrame],
+        mtm_manager,
+        top_n: int = 15,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        filter_unmapped: bool = False,
+        resolve_family: bool = False,
+        precision: int = APPROX_HLL_PRECISION,
+        epsilon: float = APPROX_SKETCH_EPSILON
+    ) -> Optional[TopModelResult]:
+        """
+        近似计算：逐块处理明细，分类数由每个机型的 HyperLogLog 估计，内存只与机型数有关
         
-        # 4. 详细分析
-        model_details = self._analyze_top_models(df, top_models)
+        记录数及7天 / 质量问题数按机型精确累加；各机型的分类分布来自
+        (机型, 分类) 组合的SpaceSaving草图，带误差上界列
         
-        # 5. 生成报告
-        report_path = self._generate_report(model_stats, top_models, model_details, top_n)
+        Args:
+            chunks: 原始明细数据块（如 DataManager.iter_excel 的结果）
+            mtm_manager: MTM管理器
+            top_n: Top N数量
+            start_date: 开始日期
+            end_date: 结束日期
+            filter_unmapped: 是否过滤未映射的MTM
+            resolve_family: 是否将未映射MTM按系列前缀解析
+            precision: HyperLogLog 寄存器位数
+            epsilon: 分类分布草图的相对误差
+            
+        Returns:
+            TopModelResult（relative_error 为分类数的相对标准误差）；没有记录时返回None
+        """
+        from data.lazy_dataset import stream_collect
         
-        self.results = {
-            "model_stats": model_stats,
-            "top_models": top_models,
-            "model_details": model_details,
-            "overall_chart": overall_chart,
-            "comparison_chart": comparison_chart,
-            "report_path": report_path,
-            "total_records": len(df),
-            "total_models": len(model_stats),
-            "top_n": top_n
-        }
+        distinct = HyperLogLog(precision)
+        pairs = SpaceSaving.with_error(epsilon)
+        tallies = pd.DataFrame(columns=['记录数', '7天', '质量'], dtype='int64')
+        total_records = 0
         
-        print("\n✅ Top Model分析完成")
-        return self.results
+        print(f"\n📊 流式统计机型分类数（HyperLogLog，每机型 {distinct.m} 个寄存器）...")
+        chunks = stream_collect(
+            chunks, mtm_manager, CUBE_DIMENSIONS, start_date, end_date, filter_unmapped, resolve_family
+        )
+        for i, chunk in enumerate(chunks, 1):
+            total_records += len(chunk)
+            chunk = chunk[chunk['机型名称'].notna()]
+            distinct.update(chunk['机型名称'], chunk['分类'])
+            
+            models = chunk['机型名称']
+            chunk_tally = pd.DataFrame({
+                '记录数': models.value_counts(),
+                '7天': models[chunk['审核原因'].isin(SUFFIX_AUDIT_REASONS['7天无理由'])].value_counts(),
+                '质量': models[chunk['审核原因'].isin(SUFFIX_AUDIT_REASONS['非7天无理由'])].value_counts(),
+            }).fillna(0).astype('int64')
+            tallies = tallies.add(chunk_tally, fill_value=0).astype('int64')
+            
+            pair_counts = chunk.groupby(['机型名称', '分类'], sort=False).size()
+            pairs.update_counts(pair_counts.index, pair_counts.to_numpy())
+            print(f"  - 第{i}块: 累计 {total_records} 条记录, {len(distinct)} 个机型")
+        
+        if total_records == 0 or len(distinct) == 0:
+            print("❌ 错误：数据为空")
+            return None
+        
+        # 1. 分类数估计（四舍五入为整数，与精确统计的列一致）
+        estimates = distinct.estimate().round().astype('int64')
+        model_stats = pd.DataFrame({
+            '分类数': estimates,
+            '记录数': tallies['记录数'].reindex(estimates.index),
+        }).sort_index()
+        model_stats.index.name = '机型名称'
+        
+        model_stats = model_stats.reset_index()
+        model_stats['平均每类记录数'] = (model_stats['记录数'] / model_stats['分类数']).round(1)
+        model_stats = model_stats.sort_values('分类数', ascending=False)
+        model_stats['排名'] = range(1, len(model_stats) + 1)
+        model_stats = model_stats[['排名', '机型名称', '分类数', '记录数', '平均每类记录数']]
+        
+        print(f"✓ 共统计 {len(model_stats)} 个机型（分类数相对误差约 ±{distinct.relative_error * 100:.1f}%）")
+        
+        # 2. 提取Top N
+        top_models = model_stats.head(top_n)
+        print(f"\n✓ Top {top_n} 机型:")
+        for idx, row in top_models.iterrows():
+            print(f"   {row['排名']}. {row['机型名称']}: ≈{row['分类数']}个分类, {row['记录数']}条记录")
+        
+        # 3. 详细分析：分类分布来自组合草图
+        pair_top = pairs.top()
+        pair_top['机型名称'] = [key[0] for key in pair_top['取值']]
+        pair_top['分类'] = [key[1] for key in pair_top['取值']]
+        model_details = []
+        for idx, row in top_models.iterrows():
+            model_name = row['机型名称']
+            model_records = row['记录数']
+            category_dist = pair_top.loc[pair_top['机型名称'] == model_name, ['分类', '数量', '误差上界']]
+            category_dist = category_dist.reset_index(drop=True)
+            category_dist['占比(%)'] = (category_dist['数量'] / model_records * 100).round(2)
+            
+            return_7day_count = int(tallies.at[model_name, '7天'])
+            quality_count = int(tallies.at[model_name, '质量'])
+            model_details.append(ModelDetail(
+                rank=row['排名'],
+                model_name=model_name,
+                category_count=row['分类数'],
+                total_records=model_records,
+                avg_per_category=row['平均每类记录数'],
+                category_distribution=category_dist,
+                return_7day_count=return_7day_count,
+                return_7day_pct=round(return_7day_count / model_records * 100, 1) if model_records > 0 else 0,
+                quality_count=quality_count,
+                quality_pct=round(quality_count / model_records * 100, 1) if model_records > 0 else 0
+            ))
+        
+        return TopModelResult(
+            model_stats=model_stats,
+            top_models=top_models,
+            model_details=model_details,
+            total_records=total_records,
+            top_n=top_n,
+            relative_error=distinct.relative_error
+        )
     
-    def _generate_overall_chart(self, model_stats):
-        """生成整体分布图（带数据标签）"""
-        display_data = model_stats.head(30)
-        fig, ax = plt.subplots(figsize=(14, 10))
-        bars = ax.barh(range(len(display_data)), display_data['分类数'])
-        ax.set_yticks(range(len(display_data)))
-        ax.set_yticklabels(display_data['机型名称'], fontsize=10)
-        ax.set_xlabel("分类数", fontsize=13)
-        ax.set_title("机型分类复杂度分布 (Top 30)", fontsize=14, fontweight='bold')
+    def write(self, result: TopModelResult, formats: Optional[Iterable[str]] = None, **options) -> Dict[str, Path]:
+        """
+        按需写出产物
         
-        # 添加数值标签
-        for i, bar in enumerate(bars):
-            width = bar.get_width()
-            ax.text(
-                width + max(display_data['分类数']) * 0.01,
-                bar.get_y() + bar.get_height()/2.,
-                f'{int(width)}',
-                ha='left', va='center', fontsize=9, fontweight='bold'
-            )
+        Args:
+            result: compute() 的结果
+            formats: 需要的格式（excel / png / txt / ppt），None 使用默认，空序列表示不写出
+            **options: 传给写出器的参数（PPT: batch_name, template_path, use_llm, llm_config, native_charts）
+            
+        Returns:
+            本次写出的 {产物名: 路径}
+        """
+        written = self.writers.run(result, formats, **options)
+        self.results = result.to_dict()
+        return written
+    
+    def analyze(
+        self,
+        df: Optional[pd.DataFrame],
+        top_n: int = 15,
+        use_llm: bool = False,
+        llm_config: Optional[Dict] = None,
+        cube: Optional[AggregateCube] = None,
+        formats: Optional[Iterable[str]] = None,
+        volumes: Optional[pd.Series] = None
+    ) -> Dict:
+        """执行Top Model完整分析流程（计算 + 按需写出；传入cube时df可为None）"""
+        print("\n" + "="*70)
+        print(f"🏆 Top {top_n} Model 分析（基于分类数量）")
+        print("="*70)
         
-        plt.tight_layout()
-        chart_path = self.charts_dir / "整体机型问题复杂度分布.png"
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        return chart_path
+        self.result = self.compute(df, top_n, cube, volumes)
+        if self.result is None:
+            return {}
+        self.write(self.result, formats)
+        
+        print("\n✅ Top Model分析完成")
+        return self.results
     
-    def _generate_comparison_chart(self, top_models, top_n):
-        """生成对比图（带数据标签）"""
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 10))
+    def analyze_approx(
+        self,
+        chunks: Iterable[pd.DataFrame],
+        mtm_manager,
+        top_n: int = 15,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        filter_unmapped: bool = False,
+        resolve_family: bool = False,
+        formats: Optional[Iterable[str]] = None
+    ) -> Dict:
+        """执行近似Top Model分析流程（流式草图计算 + 按需写出）"""
+        print("\n" + "="*70)
+        print(f"🏆 Top {top_n} Model 分析（近似，流式）")
+        print("="*70)
         
-        # 分类数对比
-        bars1 = ax1.barh(range(len(top_models)), top_models['分类数'])
-        ax1.set_yticks(range(len(top_models)))
-        ax1.set_yticklabels(top_models['机型名称'], fontsize=10)
-        ax1.set_xlabel("分类数", fontsize=12)
-        ax1.set_title(f"Top {top_n} 机型分类数对比", fontsize=13, fontweight='bold')
-        for i, bar in enumerate(bars1):
-            width = bar.get_width()
-            ax1.text(width + max(top_models['分类数']) * 0.01, bar.get_y() + bar.get_height()/2.,
-                    f'{int(width)}', ha='left', va='center', fontsize=9, fontweight='bold')
+        self.result = self.compute_approx(
+            chunks, mtm_manager, top_n, start_date, end_date, filter_unmapped, resolve_family
+        )
+        if self.result is None:
+            return {}
+        self.write(self.result, formats)
         
-        # 记录数对比
-        bars2 = ax2.barh(range(len(top_models)), top_models['记录数'])
-        ax2.set_yticks(range(len(top_models)))
-        ax2.set_yticklabels(top_models['机型名称'], fontsize=10)
-        ax2.set_xlabel("记录数", fontsize=12)
-        ax2.set_title(f"Top {top_n} 机型记录数对比", fontsize=13, fontweight='bold')
-        for i, bar in enumerate(bars2):
-            width = bar.get_width()
-            ax2.text(width + max(top_models['记录数']) * 0.01, bar.get_y() + bar.get_height()/2.,
-                    f'{int(width)}', ha='left', va='center', fontsize=9, fontweight='bold')
+        print("\n✅ Top Model分析完成")
+        return self.results
+    
+    # ================================================================
+    # 写出器
+    # ================================================================
+    
+    def _write_excel(self, result: TopModelResult, **options) -> Dict[str, Path]:
+        """Top N 统计表及逐机型详细数据"""
+        self.top_model_dir.mkdir(parents=True, exist_ok=True)
+        top_stats_path = self.top_model_dir / f"Top{result.top_n}_Model统计.xlsx"
+        result.top_models.to_excel(top_stats_path, index=False)
         
-        plt.tight_layout()
-        chart_path = self.charts_dir / f"Top{top_n}_机型对比图.png"
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        return chart_path
+        for detail in result.model_details:
+            safe_name = self._safe_filename(detail.model_name)
+            detail.detail_path = self.top_model_dir / f"{detail.rank:02d}_{safe_name}_详细数据.xlsx"
+            with pd.ExcelWriter(detail.detail_path, engine='openpyxl') as writer:
+                detail.category_distribution.to_excel(writer, sheet_name='分类分布', index=False)
+        return {"stats_path": top_stats_path}
+    
+    def _write_charts(self, result: TopModelResult, **options) -> Dict[str, Path]:
+        """整体分布图、对比图及逐机型分类分布图（一批交给图表渲染服务）"""
+        specs = [
+            self._overall_chart_spec(result.model_stats),
+            self._comparison_chart_spec(result.top_models, result.top_n),
+        ]
+        specs += [
+            self._model_detail_chart_spec(detail.model_name, detail.category_distribution, detail.rank)
+            for detail in result.model_details
+        ]
+        paths = render_charts(specs)
+        for detail, path in zip(result.model_details, paths[2:]):
+            detail.chart_path = path
+        return {"overall_chart": paths[0], "comparison_chart": paths[1]}
+    
+    def _write_text_report(self, result: TopModelResult, **options) -> Dict[str, Path]:
+        return {"report_path": self._generate_report(
+            result.model_stats, result.top_models, result.top_n, result.relative_error
+        )}
     
-    def _analyze_top_models(self, df, top_models):
-        """分析每个Top机型的详细情况"""
+    def _write_ppt(self, result: TopModelResult, batch_name: str = "2024-2025", template_path: Optional[str] = None,
+                   use_llm: bool = False, llm_config: Optional[Dict] = None, native_charts: Optional[bool] = None,
+                   **options) -> Dict[str, Path]:
+        from services.report_service import generate_top_model_report
+        self.results = result.to_dict()
+        ppt_path = generate_top_model_report(
+            self.get_ppt_payload(), str(self.output_dir), batch_name, template_path, use_llm, llm_config,
+            PPT_NATIVE_CHARTS if native_charts is None else native_charts
+        )
+        return {"ppt_path": ppt_path}
+    
+    @staticmethod
+    def _count_panel(data, value_column, title, xlabel, label_size=13, title_size=14) -> ChartPanel:
+        """机型横向柱状图面板（柱端标注数值）"""
+        values = data[value_column].tolist()
+        return ChartPanel(
+            kind="barh",
+            values=values,
+            labels=data['机型名称'].astype(str).tolist(),
+            title=title,
+            title_size=title_size,
+            title_weight='bold',
+            xlabel=xlabel,
+            label_size=label_size,
+            tick_size=10,
+            annotations=[f'{int(value)}' for value in values],
+            annotation_offset=0.01,
+            annotation_size=9,
+            annotation_weight='bold',
+        )
+    
+    def _overall_chart_spec(self, model_stats) -> ChartSpec:
+        """整体分布图（带数据标签）"""
+        return ChartSpec(
+            path=self.charts_dir / "整体机型问题复杂度分布.png",
+            panels=[self._count_panel(model_stats.head(30), '分类数', "机型分类复杂度分布 (Top 30)", "分类数")],
+            figsize=(14, 10),
+        )
+    
+    def _comparison_chart_spec(self, top_models, top_n) -> ChartSpec:
+        """对比图：分类数与记录数并排（带数据标签）"""
+        return ChartSpec(
+            path=self.charts_dir / f"Top{top_n}_机型对比图.png",
+            panels=[
+                self._count_panel(top_models, '分类数', f"Top {top_n} 机型分类数对比", "分类数", 12, 13),
+                self._count_panel(top_models, '记录数', f"Top {top_n} 机型记录数对比", "记录数", 12, 13),
+            ],
+            figsize=(18, 10),
+        )
+    
+    def _analyze_top_models(self, cube, matrix, top_models, volumes=None) -> List[ModelDetail]:
+        """分析每个Top机型的详细情况（分类分布取稀疏矩阵的行，7天/质量数从立方体统计）"""
         model_details = []
         
         print(f"\n📊 分析每个Top机型的问题分布...")
@@ -177,87 +401,63 @@ class TopModelAnalysisService:
             category_count = row['分类数']
             total_records = row['记录数']
             
-            # 筛选该机型的数据
-            model_df = df[df['机型名称'] == model_name]
-            
             # 统计问题分类分布（使用"分类"列）
-            category_dist = model_df['分类'].value_counts().reset_index()
-            category_dist.columns = ['分类', '数量']
+            category_dist = matrix.row_frame(matrix.row_index(model_name), '分类', '数量')
             category_dist['占比(%)'] = (category_dist['数量'] / total_records * 100).round(2)
+            if volumes is not None:
+                category_dist[RATE_COLUMN] = per_units(category_dist['数量'], volumes.get(model_name, 0))
             
             # 统计7天 vs 质量问题
-            return_7day_count = (model_df['审核原因'] == '7天无理由').sum()
-            quality_count = model_df['审核原因'].isin([
-                '15天质量换新', '180天只换不修', '质量维修'
-            ]).sum()
-            
-            return_7day_pct = (return_7day_count / total_records * 100).round(1) if total_records > 0 else 0
-            quality_pct = (quality_count / total_records * 100).round(1) if total_records > 0 else 0
-            
-            # 保存详细数据
-            safe_name = self._safe_filename(model_name)
-            detail_path = self.top_model_dir / f"{idx+1:02d}_{safe_name}_详细数据.xlsx"
-            
-            with pd.ExcelWriter(detail_path, engine='openpyxl') as writer:
-                category_dist.to_excel(writer, sheet_name='分类分布', index=False)
+            return_7day_count = cube.count({'机型名称': model_name, '审核原因': SUFFIX_AUDIT_REASONS['7天无理由']})
+            quality_count = cube.count({'机型名称': model_name, '审核原因': SUFFIX_AUDIT_REASONS['非7天无理由']})
             
-            # 生成单个机型的图表
-            chart_path = self._generate_model_detail_chart(model_name, category_dist, idx+1)
+            return_7day_pct = round(return_7day_count / total_records * 100, 1) if total_records > 0 else 0
+            quality_pct = round(quality_count / total_records * 100, 1) if total_records > 0 else 0
             
-            model_details.append({
-                'rank': idx + 1,
-                'model_name': model_name,
-                'category_count': category_count,
-                'total_records': total_records,
-                'avg_per_category': row['平均每类记录数'],
-                'category_distribution': category_dist,
-                'return_7day_count': return_7day_count,
-                'return_7day_pct': return_7day_pct,
-                'quality_count': quality_count,
-                'quality_pct': quality_pct,
-                'detail_path': detail_path,
-                'chart_path': chart_path
-            })
+            model_details.append(ModelDetail(
+                rank=idx + 1,
+                model_name=model_name,
+                category_count=category_count,
+                total_records=total_records,
+                avg_per_category=row['平均每类记录数'],
+                category_distribution=category_dist,
+                return_7day_count=return_7day_count,
+                return_7day_pct=return_7day_pct,
+                quality_count=quality_count,
+                quality_pct=quality_pct
+            ))
             
             print(f"  - 机型 #{idx+1}: {model_name} ({category_count}个分类, {total_records}条记录)")
         
         print(f"✓ 完成 {len(model_details)} 个机型的详细分析")
         return model_details
     
-    def _generate_model_detail_chart(self, model_name, category_dist, rank):
-        """生成单个机型的详细图表（带数据标签）"""
+    def _model_detail_chart_spec(self, model_name, category_dist, rank) -> ChartSpec:
+        """单个机型的分类分布图（显示数量和占比，只显示前20个分类）"""
         display_data = category_dist.head(20)
-        
-        fig, ax = plt.subplots(figsize=(14, 10))
-        bars = ax.barh(range(len(display_data)), display_data['数量'])
-        
-        ax.set_yticks(range(len(display_data)))
-        ax.set_yticklabels(display_data['分类'], fontsize=10)
-        ax.set_xlabel("数量", fontsize=13)
-        ax.set_title(
-            f"机型: {model_name}\n分类分布 (Top 20, 共{len(category_dist)}类)",
-            fontsize=14, fontweight='bold'
-        )
-        
-        # 添加数值标签（显示数量和占比）
-        for i, bar in enumerate(bars):
-            width = bar.get_width()
-            percentage = display_data.iloc[i]['占比(%)']
-            ax.text(
-                width + max(display_data['数量']) * 0.01,
-                bar.get_y() + bar.get_height()/2.,
-                f'{int(width)} ({percentage:.1f}%)',
-                ha='left', va='center', fontsize=9, fontweight='bold'
-            )
-        
-        plt.tight_layout()
-        
         safe_name = self._safe_filename(model_name)
-        chart_path = self.charts_dir / f"{rank:02d}_{safe_name}_分类分布.png"
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return chart_path
+        return ChartSpec(
+            path=self.charts_dir / f"{rank:02d}_{safe_name}_分类分布.png",
+            panels=[ChartPanel(
+                kind="barh",
+                values=display_data['数量'].tolist(),
+                labels=display_data['分类'].astype(str).tolist(),
+                title=f"机型: {model_name}\n分类分布 (Top 20, 共{len(category_dist)}类)",
+                title_size=14,
+                title_weight='bold',
+                xlabel="数量",
+                label_size=13,
+                tick_size=10,
+                annotations=[
+                    f'{int(count)} ({pct:.1f}%)'
+                    for count, pct in zip(display_data['数量'], display_data['占比(%)'])
+                ],
+                annotation_offset=0.01,
+                annotation_size=9,
+                annotation_weight='bold',
+            )],
+            figsize=(14, 10),
+        )
     
     def _safe_filename(self, name, max_len=50):
         """清理文件名"""
@@ -267,15 +467,18 @@ class TopModelAnalysisService:
             name = name[:max_len]
         return name.strip()
     
-    def _generate_report(self, model_stats, top_models, model_details, top_n):
-        """生成报告"""
+    def _generate_report(self, model_stats, top_models, top_n, relative_error=None):
+        """生成报告（近似模式注明分类数的相对误差）"""
         lines = ["="*70, f"Top {top_n} Model 分析报告", "="*70]
         lines.append(f"总机型数: {len(model_stats)}")
+        if relative_error is not None:
+            lines.append(f"近似统计（HyperLogLog）: 分类数相对标准误差约 ±{relative_error * 100:.1f}%")
         lines.append("")
         
         for idx, row in top_models.iterrows():
             lines.append(f"{row['排名']}. {row['机型名称']}: {row['分类数']}个分类")
         
+        self.top_model_dir.mkdir(parents=True, exist_ok=True)
         report_path = self.top_model_dir / f"Top{top_n}_Model分析报告.txt"
         with open(report_path, 'w', encoding='utf-8') as f:
             f.write("\n".join(lines))
@@ -286,8 +489,18 @@ class TopModelAnalysisService:
         return self.results
 
 
-def run_top_model_analysis(df, output_dir, top_n=15, use_llm=False, llm_config=None):
+def run_top_model_analysis(df, output_dir, top_n=15, use_llm=False, llm_config=None, cube=None, formats=None,
+                           volumes=None):
     """便捷函数：运行Top Model分析"""
     service = TopModelAnalysisService(output_dir)
-    return service.analyze(df, top_n, use_llm, llm_config)
+    return service.analyze(df, top_n, use_llm, llm_config, cube, formats, volumes)
 
+
+
+def run_top_model_approx(chunks, mtm_manager, output_dir, top_n=15, start_date=None, end_date=None,
+                         filter_unmapped=False, resolve_family=False, formats=None):
+    """便捷函数：运行近似Top Model分析（流式，内存只与机型数有关）"""
+    service = TopModelAnalysisService(output_dir)
+    return service.analyze_approx(
+        chunks, mtm_manager, top_n, start_date, end_date, filter_unmapped, resolve_family, formats
+    )
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+Trend Analysis Service - 周趋势分析服务
+=============================================================================
+按ISO周统计机型与分类的记录数、占比、环比变化及滚动N周合计，
+输出"上升榜"：指定周相对上一周恶化最明显的机型 / 分类
+=============================================================================
+"""
+
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import TREND_ROLLING_WEEKS, TREND_MIN_COUNT, TREND_CHART_WEEKS
+from modules.trend_engine import WeeklyTrend, iso_week_start
+from modules.analysis_results import TrendResult
+from services.artifact_writers import ArtifactWriters
+from services.chart_service import ChartPanel, ChartSpec, render_charts
+
+
+class TrendAnalysisService:
+    """周趋势分析服务"""
+
+    # 日期列默认取首列，需保留全部列
+    REQUIRED_COLUMNS = None
+
+    def __init__(self, output_dir: str or Path):
+        """初始化周趋势分析服务（不创建目录，产物写出时按需创建）"""
+        self.output_dir = Path(output_dir)
+        self.trend_dir = self.output_dir / "Trend分析"
+        self.charts_dir = self.trend_dir / "charts"
+
+        self.result: Optional[TrendResult] = None
+        self.results = {}
+
+        self.writers = ArtifactWriters({
+            "excel": self._write_excel,
+            "png": self._write_charts,
+            "txt": self._write_text_report,
+        })
+
+    def compute(
+        self,
+        df: pd.DataFrame,
+        top_n: int = 10,
+        week: Optional[str] = None,
+        date_column: Optional[str] = None,
+        rolling_weeks: int = TREND_ROLLING_WEEKS,
+        min_count: int = TREND_MIN_COUNT
+    ) -> Optional[TrendResult]:
+        """
+        纯计算：按ISO周统计机型 / 分类趋势及上升榜，不写出任何文件
+
+        Args:
+            df: 数据DataFrame（需要日期列、'机型名称'和'分类'）
+            top_n: 上升榜条数
+            week: 对比的ISO周（如 2025-W07），为None时取数据中的最后一周
+            date_column: 日期列名，为None时使用第一列
+            rolling_weeks: 滚动合计窗口周数
+            min_count: 上升榜本周最少记录数
+
+        Returns:
+            TrendResult；数据为空或缺少必需列时返回None
+        """
+        if df is None or len(df) == 0 or '机型名称' not in df.columns or '分类' not in df.columns:
+            print("❌ 错误：数据为空或缺少必需列（需要日期列、'机型名称'和'分类'）")
+            return None
+        if date_column is None:
+            date_column = df.columns[0]
+
+        # 1. ISO周分桶（只计算一次，两个维度共用）
+        print(f"\n📊 按ISO周统计（日期列: {date_column}）...")
+        week_starts = iso_week_start(df[date_column])
+        model_trend = WeeklyTrend(week_starts, df['机型名称'], rolling_weeks)
+        category_trend = WeeklyTrend(week_starts, df['分类'], rolling_weeks)
+
+        if len(model_trend.weeks) == 0:
+            print("❌ 错误：日期列无法解析")
+            return None
+
+        position = model_trend.week_position(week)
+        if position < 0:
+            print(f"❌ 错误：数据中不存在 {week}")
+            return None
+        labels = model_trend.week_labels
+        current_week = labels[position]
+        previous_week = labels[position - 1] if position > 0 else None
+        print(f"✓ 共 {len(labels)} 周（{labels[0]} ~ {labels[-1]}），对比 {current_week} vs {previous_week or '无'}")
+
+        weekly_totals = pd.DataFrame({
+            'ISO周': labels,
+            '周一': pd.to_datetime(model_trend.weeks).date,
+            '记录数': model_trend.totals,
+        })
+        weekly_totals['环比变化'] = weekly_totals['记录数'].diff().fillna(0).astype(int)
+
+        # 2. 上升榜
+        model_risers = model_trend.risers('机型名称', current_week, min_count, top_n)
+        category_risers = category_trend.risers('分类', current_week, min_count, top_n)
+
+        print(f"\n📈 机型上升榜 ({current_week}):")
+        for _, row in model_risers.iterrows():
+            print(f"   {row['排名']}. {row['机型名称']}: {row['上周']} → {row['本周']} (+{row['环比变化']})")
+        print(f"\n📈 分类上升榜 ({current_week}):")
+        for _, row in category_risers.iterrows():
+            print(f"   {row['排名']}. {row['分类']}: {row['上周']} → {row['本周']} (+{row['环比变化']})")
+
+        return TrendResult(
+            model_trend=model_trend,
+            category_trend=category_trend,
+            weekly_totals=weekly_totals,
+            model_risers=model_risers,
+            category_risers=category_risers,
+            current_week=current_week,
+            previous_week=previous_week,
+            total_records=len(df),
+            top_n=top_n
+        )
+
+    def write(self, result: TrendResult, formats: Optional[Iterable[str]] = None, **options) -> Dict[str, Path]:
+        """
+        按需写出产物
+
+        Args:
+            result: compute() 的结果
+            formats: 需要的格式（excel / png / txt），None 使用默认，空序列表示不写出
+
+        Returns:
+            本次写出的 {产物名: 路径}
+        """
+        written = self.writers.run(result, formats, **options)
+        self.results = result.to_dict()
+        return written
+
+    def analyze(
+        self,
+        df: pd.DataFrame,
+        top_n: int = 10,
+        week: Optional[str] = None,
+        formats: Optional[Iterable[str]] = None
+    ) -> Dict:
+        """执行周趋势完整分析流程（计算 + 按需写出）"""
+        print("\n" + "="*70)
+        print("📈 周趋势分析（ISO周环比）")
+        print("="*70)
+
+        self.result = self.compute(df, top_n, week)
+        if self.result is None:
+            return {}
+        self.write(self.result, formats)
+
+        print("\n✅ 周趋势分析完成")
+        return self.results
+
+    # ================================================================
+    # 写出器
+    # ================================================================
+
+    def _write_excel(self, result: TrendResult, **options) -> Dict[str, Path]:
+        """汇总表（每周记录数 + 上升榜）及机型 / 分类的周矩阵"""
+        self.trend_dir.mkdir(parents=True, exist_ok=True)
+        summary_path = self.trend_dir / "周趋势汇总.xlsx"
+        with pd.ExcelWriter(summary_path, engine='openpyxl') as writer:
+            result.weekly_totals.to_excel(writer, sheet_name='每周记录数', index=False)
+            result.model_risers.to_excel(writer, sheet_name='机型上升榜', index=False)
+            result.category_risers.to_excel(writer, sheet_name='分类上升榜', index=False)
+
+        written = {"summary_path": summary_path}
+        for key, name, trend in (
+            ("model_trend_path", "机型", result.model_trend),
+            ("category_trend_path", "分类", result.category_trend),
+        ):
+            path = self.trend_dir / f"{name}周趋势.xlsx"
+            with pd.ExcelWriter(path, engine='openpyxl') as writer:
+                trend.frame(trend.counts).to_excel(writer, sheet_name='周记录数')
+                trend.frame(trend.shares().round(2)).to_excel(writer, sheet_name='周占比(%)')
+                trend.frame(trend.deltas()).to_excel(writer, sheet_name='环比变化')
+                trend.frame(trend.rolling()).to_excel(writer, sheet_name=f'滚动{trend.rolling_weeks}周合计')
+            written[key] = path
+        return written
+
+    def _write_charts(self, result: TrendResult, **options) -> Dict[str, Path]:
+        """每周记录数走势图及上升榜走势图（一批交给图表渲染服务）"""
+        specs = {
+            "totals_chart": self._totals_chart_spec(result.weekly_totals),
+            "model_risers_chart": self._risers_chart_spec(
+                result.model_trend, result.model_risers, '机型名称', "机型上升榜走势"
+            ),
+            "category_risers_chart": self._risers_chart_spec(
+                result.category_trend, result.category_risers, '分类', "分类上升榜走势"
+            ),
+        }
+        return dict(zip(specs, render_charts(list(specs.values()))))
+
+    def _write_text_report(self, result: TrendResult, **options) -> Dict[str, Path]:
+        return {"report_path": self._generate_report(result)}
+
+    def _totals_chart_spec(self, weekly_totals) -> ChartSpec:
+        """每周记录数走势图"""
+        return ChartSpec(
+            path=self.charts_dir / "每周记录数走势.png",
+            panels=[ChartPanel(
+                kind="line",
+                values=[weekly_totals['记录数'].tolist()],
+                labels=weekly_totals['ISO周'].astype(str).tolist(),
+                title="每周记录数走势",
+                title_size=14,
+                title_weight='bold',
+                ylabel="记录数",
+                label_size=12,
+                # 多年数据时横轴标签抽稀，最多约26个
+                tick_step=max(1, len(weekly_totals) // 26),
+                tick_rotation=60,
+                tick_size=8,
+                marker='o',
+                markersize=3,
+                linewidth=2,
+                grid='both',
+            )],
+            figsize=(14, 6),
+        )
+
+    def _risers_chart_spec(self, trend, risers, key_name, title) -> ChartSpec:
+        """上升榜前5项最近N周的走势图"""
+        counts = trend.frame(trend.counts).tail(TREND_CHART_WEEKS)
+        keys = list(risers[key_name].head(5))
+        return ChartSpec(
+            path=self.charts_dir / f"{title}.png",
+            panels=[ChartPanel(
+                kind="line",
+                values=[counts[key].tolist() for key in keys],
+                labels=[str(week) for week in counts.index],
+                series_names=[str(key)[:40] for key in keys],
+                legend_size=9,
+                title=f"{title}（最近{len(counts)}周）",
+                title_size=14,
+                title_weight='bold',
+                ylabel="记录数",
+                label_size=12,
+                tick_rotation=45,
+                tick_size=9,
+                marker='o',
+                linewidth=2,
+                grid='both',
+            )],
+            figsize=(14, 7),
+        )
+
+    def _generate_report(self, result: TrendResult):
+        """生成报告"""
+        lines = ["="*70, "周趋势分析报告", "="*70]
+        lines.append(f"对比周: {result.current_week} vs {result.previous_week or '无'}")
+        totals = result.weekly_totals.set_index('ISO周')['记录数']
+        lines.append(f"本周记录数: {totals.get(result.current_week, 0)}")
+        if result.previous_week:
+            lines.append(f"上周记录数: {totals.get(result.previous_week, 0)}")
+
+        for title, risers, key_name in (
+            ("机型上升榜", result.model_risers, '机型名称'),
+            ("分类上升榜", result.category_risers, '分类'),
+        ):
+            lines.append("")
+            lines.append(f"【{title}】")
+            if risers.empty:
+                lines.append("  无明显上升项")
+            for _, row in risers.iterrows():
+                lines.append(
+                    f"  {row['排名']}. {row[key_name]}: {row['上周']} → {row['本周']} "
+                    f"(+{row['环比变化']}, 占比 {row['占比变化(pp)']:+.2f}pp)"
+                )
+
+        self.trend_dir.mkdir(parents=True, exist_ok=True)
+        report_path = self.trend_dir / "周趋势分析报告.txt"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+        return report_path
+
+
+def run_trend_analysis(df, output_dir, top_n=10, week=None, formats=None):
+    """便捷函数：运行周趋势分析"""
+    service = TrendAnalysisService(output_dir)
+    return service.analyze(df, top_n, week, formats)
@@ -8,19 +8,33 @@ Weekly Analysis Service - 周报分析服务
 =============================================================================
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 from datetime import date
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
+from config import PPT_NATIVE_CHARTS
+
 # 导入现有模块（完全复用）
-from modules.data_analyzer import DataAnalyzer
+from modules.data_analyzer import (
+    DataAnalyzer,
+    compute_audit_reasons,
+    compute_model_distribution,
+    compute_model_issues,
+    build_text_report
+)
+from modules.analysis_results import WeeklyResult
+from services.artifact_writers import ArtifactWriters
+from services.chart_service import render_charts
 from modules.llm_service import LLMService
-from data import DataManager
+from data import DataManager, LazyDataset
 from modules.mtm_manager import MTMManager
+from modules.grouped_engine import GroupedFrame
+from modules.aggregate_cube import AggregateCube, build_cube
 
 
 class WeeklyAnalysisService:
@@ -29,108 +43,210 @@ class WeeklyAnalysisService:
     提供7天无理由和非7天无理由的完整分析流程
     """
     
+    # 汇总表与机型明细写出全部原始列
+    REQUIRED_COLUMNS = None
+    
     def __init__(self, output_dir: str or Path):
         """
-        初始化Weekly分析服务
+        初始化Weekly分析服务（不创建目录，产物写出时按需创建）
         
         Args:
             output_dir: 输出目录路径
         """
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
         
         # 使用现有的DataAnalyzer（完全复用）
         self.analyzer = DataAnalyzer(self.output_dir)
         
         # 结果缓存
+        self.result: Optional[WeeklyResult] = None
         self.results = {}
         self.summary_excel_path = self.output_dir / "weekly_summary.xlsx"
+        
+        self.writers = ArtifactWriters({
+            "excel": self._write_excel,
+            "png": self._write_charts,
+            "txt": self._write_text_report,
+            "ppt": self._write_ppt,
+        })
     
-    def analyze(
+    def compute(
         self,
         df: pd.DataFrame,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
-        use_llm: bool = False,
-        llm_config: Optional[Dict] = None
-    ) -> Dict:
+        cube: Optional[AggregateCube] = None
+    ) -> WeeklyResult:
         """
-        执行Weekly Report完整分析流程
+        纯计算：完成全部统计，不写出任何文件
         
         Args:
             df: 输入数据DataFrame（必须包含'机型名称'列）
             start_date: 开始日期
             end_date: 结束日期
-            use_llm: 是否使用LLM生成摘要
-            llm_config: LLM配置参数
+            cube: 数据集的聚合立方体，为None时构建（同一数据集命中缓存）
             
         Returns:
-            分析结果字典
+            WeeklyResult
         """
-        print("\n" + "="*70)
-        print("📊 Weekly Report 分析")
-        print("="*70)
-        
         # 1. 数据分类（完全复制原有逻辑）
         print("\n📊 开始数据分析...")
         cond_7d = df["审核原因"] == "7天无理由"
         cond_non_7d = df["审核原因"].isin(["15天质量换新", "180天只换不修", "质量维修"])
         
-        df_7d = df[cond_7d].copy()
-        df_non_7d = df[cond_non_7d].copy()
+        # 只记录行号，不复制明细数据
+        rows_7d = np.flatnonzero(cond_7d.to_numpy())
+        rows_non_7d = np.flatnonzero(cond_non_7d.to_numpy())
         
-        print(f"  7天无理由记录: {len(df_7d)} 条")
-        print(f"  非7天无理由记录: {len(df_non_7d)} 条")
+        print(f"  7天无理由记录: {len(rows_7d)} 条")
+        print(f"  非7天无理由记录: {len(rows_non_7d)} 条")
+        
+        # 聚合立方体：审核原因、机型分布、文本报告均由其切片得到
+        if cube is None:
+            cube = build_cube(df)
         
         # 2. 审核原因统计
         print("\n📈 统计审核原因...")
-        reason_stats, reason_chart_path = self.analyzer.analyze_audit_reasons(df)
+        reason_stats = compute_audit_reasons(df, cube)
         
         # 3. 机型分布统计
         print("\n📈 统计机型分布...")
-        model_7d_dist, model_7d_chart_path = self.analyzer.analyze_model_distribution(
-            df_7d, "7天无理由"
-        )
-        model_non_7d_dist, model_non_7d_chart_path = self.analyzer.analyze_model_distribution(
-            df_non_7d, "非7天无理由"
-        )
+        models = df[["机型名称"]]
+        model_7d_dist = compute_model_distribution(models.take(rows_7d), "7天无理由", cube)
+        model_non_7d_dist = compute_model_distribution(models.take(rows_non_7d), "非7天无理由", cube)
         
         # 4. 机型问题分析
         print("\n📈 分析机型问题分类...")
         print("  7天无理由机型分析:")
-        summaries_7d = self.analyzer.analyze_model_issues(df_7d, "7天无理由")
+        model_issues_7d = compute_model_issues(df, "7天无理由", rows_7d)
         print("\n  非7天无理由机型分析:")
-        summaries_non7d = self.analyzer.analyze_model_issues(df_non_7d, "非7天无理由")
+        model_issues_non7d = compute_model_issues(df, "非7天无理由", rows_non_7d)
         
-        # 5. 生成文本报告
-        print("\n📝 生成文本报告...")
-        self.analyzer.generate_text_report(df, df_7d, df_non_7d, start_date, end_date)
+        return WeeklyResult(
+            total_df=df,
+            rows_7d=rows_7d,
+            rows_non_7d=rows_non_7d,
+            reason_stats=reason_stats,
+            model_7d_dist=model_7d_dist,
+            model_non_7d_dist=model_non_7d_dist,
+            model_issues_7d=model_issues_7d,
+            model_issues_non7d=model_issues_non7d,
+            report_lines=build_text_report(cube, start_date, end_date),
+            start_date=start_date,
+            end_date=end_date,
+            cube=cube,
+        )
+    
+    def write(self, result: WeeklyResult, formats: Optional[Iterable[str]] = None, **options) -> Dict[str, Path]:
+        """
+        按需写出产物
         
-        # 6. 保存结果
-        self.results = {
-            "total_df": df,
-            "df_7d": df_7d,
-            "df_non_7d": df_non_7d,
-            "reason_stats": reason_stats,
-            "reason_chart": reason_chart_path,
-            "model_7d_dist": model_7d_dist,
-            "model_7d_chart": model_7d_chart_path,
-            "model_non_7d_dist": model_non_7d_dist,
-            "model_non_7d_chart": model_non_7d_chart_path,
-            "summaries_7d": summaries_7d,
-            "summaries_non7d": summaries_non7d,
-            "start_date": start_date,
-            "end_date": end_date,
-        }
-
-        # 导出关键数据到Excel，便于留档
-        self._export_summary_excel()
+        Args:
+            result: compute() 的结果
+            formats: 需要的格式（excel / png / txt / ppt），None 使用默认，空序列表示不写出
+            **options: 传给写出器的参数（PPT: batch_name, template_path, use_llm, llm_config, native_charts）
+            
+        Returns:
+            本次写出的 {产物名: 路径}
+        """
+        formats = self.writers.resolve(formats)
+        
+        # 逐机型产物：Excel与PNG在同一工作单元中生成，进程池只分发一次
+        self.analyzer.write_model_issues(
+            result.model_issues_7d + result.model_issues_non7d,
+            write_excel="excel" in formats,
+            write_png="png" in formats
+        )
+        written = self.writers.run(result, formats, **options)
+        self.results = result.to_dict()
+        return written
+    
+    def analyze(
+        self,
+        df: pd.DataFrame,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        use_llm: bool = False,
+        llm_config: Optional[Dict] = None,
+        cube: Optional[AggregateCube] = None,
+        formats: Optional[Iterable[str]] = None
+    ) -> Dict:
+        """
+        执行Weekly Report完整分析流程（计算 + 按需写出）
+        
+        Args:
+            df: 输入数据DataFrame（必须包含'机型名称'列）
+            start_date: 开始日期
+            end_date: 结束日期
+            use_llm: 是否使用LLM生成摘要
+            llm_config: LLM配置参数
+            cube: 数据集的聚合立方体，为None时构建（同一数据集命中缓存）
+            formats: 需要写出的产物格式，None 使用默认，空序列表示仅统计
+            
+        Returns:
+            分析结果字典
+        """
+        print("\n" + "="*70)
+        print("📊 Weekly Report 分析")
+        print("="*70)
+        
+        self.result = self.compute(df, start_date, end_date, cube)
+        self.results = self.result.to_dict()
+        self.write(self.result, formats)
         
         print("\n✅ Weekly Report分析完成")
         print("="*70)
         
         return self.results
     
+    # ================================================================
+    # 写出器
+    # ================================================================
+    
+    def _write_excel(self, result: WeeklyResult, **options) -> Dict[str, Path]:
+        """统计表：审核原因、机型分布及Weekly汇总"""
+        written = {"reason_excel": self.analyzer.write_audit_reasons_excel(result.reason_stats)}
+        for key, dist, suffix in (
+            ("model_7d_excel", result.model_7d_dist, "7天无理由"),
+            ("model_non_7d_excel", result.model_non_7d_dist, "非7天无理由"),
+        ):
+            path = self.analyzer.write_model_distribution_excel(dist, suffix)
+            if path:
+                written[key] = path
+        
+        # 导出关键数据到Excel，便于留档
+        if self._export_summary_excel(result):
+            written["summary_excel"] = self.summary_excel_path
+        return written
+    
+    def _write_charts(self, result: WeeklyResult, **options) -> Dict[str, Path]:
+        """饼图：审核原因占比及机型分布（一次交给图表渲染服务）"""
+        specs = {"reason_chart": self.analyzer.audit_reasons_chart_spec(result.reason_stats)}
+        for key, dist, suffix in (
+            ("model_7d_chart", result.model_7d_dist, "7天无理由"),
+            ("model_non_7d_chart", result.model_non_7d_dist, "非7天无理由"),
+        ):
+            spec = self.analyzer.model_distribution_chart_spec(dist, suffix)
+            if spec:
+                specs[key] = spec
+        paths = render_charts(list(specs.values()))
+        return {key: path for key, path in zip(specs, paths) if path}
+    
+    def _write_text_report(self, result: WeeklyResult, **options) -> Dict[str, Path]:
+        print("\n📝 生成文本报告...")
+        return {"report_path": self.analyzer.write_text_report(result.report_lines)}
+    
+    def _write_ppt(self, result: WeeklyResult, batch_name: str = "2024-2025", template_path: Optional[str] = None,
+                   use_llm: bool = False, llm_config: Optional[Dict] = None, native_charts: Optional[bool] = None,
+                   **options) -> Dict[str, Path]:
+        from services.report_service import generate_weekly_report
+        self.results = result.to_dict()
+        ppt_path = generate_weekly_report(
+            self.get_ppt_payload(), str(self.output_dir), batch_name, template_path, use_llm, llm_config,
+            PPT_NATIVE_CHARTS if native_charts is None else native_charts
+        )
+        return {"ppt_path": ppt_path}
+    
     def _detect_date_column(self, df: pd.DataFrame) -> str:
         """智能选择日期列"""
         # 优先常用列名
@@ -198,13 +314,18 @@ class WeeklyAnalysisService:
         unique_models = df['机型名称'].unique()
         print(f"共 {len(unique_models)} 个机型:\n")
         
-        model_stats = df.groupby('机型名称').size().reset_index(name='记录数')
-        model_stats = model_stats.sort_values('记录数', ascending=False)
+        # 一次分区得到各机型记录数与首条MTM
+        groups = GroupedFrame(df, '机型名称')
+        model_stats = pd.DataFrame({
+            '机型名称': groups.keys,
+            '记录数': groups.sizes,
+            'MTM': groups.first('MTM').to_numpy(),
+        }).sort_values(['记录数', '机型名称'], ascending=[False, True])
         
         for idx, row in model_stats.iterrows():
             model_name = row['机型名称']
             count = row['记录数']
-            sample_mtm = df[df['机型名称'] == model_name]['MTM'].iloc[0]
+            sample_mtm = row['MTM']
             is_mapped = (model_name != sample_mtm)
             status = "✓" if is_mapped else "⊗"
             print(f"  {status} {model_name[:60]:60s} - {count:5d} 条记录")
@@ -217,21 +338,22 @@ class WeeklyAnalysisService:
         """获取分析结果"""
         return self.results
 
-    def _export_summary_excel(self):
+    def _export_summary_excel(self, result: WeeklyResult) -> bool:
         """导出Weekly关键数据到Excel"""
-        if not self.results:
-            return
         try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
             with pd.ExcelWriter(self.summary_excel_path, engine="openpyxl") as writer:
                 # 原始拆分数据
-                self.results["df_7d"].to_excel(writer, sheet_name="7天无理由", index=False)
-                self.results["df_non_7d"].to_excel(writer, sheet_name="非7天无理由", index=False)
+                result.df_7d.to_excel(writer, sheet_name="7天无理由", index=False)
+                result.df_non_7d.to_excel(writer, sheet_name="非7天无理由", index=False)
                 # 统计表
-                self.results["reason_stats"].to_excel(writer, sheet_name="审核原因统计", index=False)
-                self.results["model_7d_dist"].to_excel(writer, sheet_name="7天机型分布", index=False)
-                self.results["model_non_7d_dist"].to_excel(writer, sheet_name="非7天机型分布", index=False)
+                result.reason_stats.to_excel(writer, sheet_name="审核原因统计", index=False)
+                result.model_7d_dist.to_excel(writer, sheet_name="7天机型分布", index=False)
+                result.model_non_7d_dist.to_excel(writer, sheet_name="非7天机型分布", index=False)
+            return True
         except Exception as e:
             print(f"导出Weekly汇总Excel失败: {e}")
+            return False
 
 
 # ================================================================
@@ -240,13 +362,16 @@ class WeeklyAnalysisService:
 
 def run_weekly_analysis(
     data_source: str,
-    mtm_file: str,
+    mtm_file: Optional[str],
     output_dir: str,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     filter_unmapped: bool = False,
     use_database: bool = False,
+    resolve_family: bool = False,
+    mtm_manager: Optional[MTMManager] = None,
     use_llm: bool = False,
+    formats: Optional[Iterable[str]] = None,
     **kwargs
 ) -> Dict:
     """
@@ -254,13 +379,16 @@ def run_weekly_analysis(
     
     Args:
         data_source: 数据源路径或"database"
-        mtm_file: MTM映射文件路径
+        mtm_file: MTM映射文件路径（传入mtm_manager时可为None）
         output_dir: 输出目录
         start_date: 开始日期
         end_date: 结束日期
         filter_unmapped: 是否过滤未映射的MTM
         use_database: 是否使用数据库
+        resolve_family: 是否将未映射MTM按系列前缀解析
+        mtm_manager: 已加载的MTM管理器（如Web常驻映射），为None时从mtm_file加载
         use_llm: 是否使用LLM
+        formats: 需要写出的产物格式，None 使用默认，空序列表示仅统计
         **kwargs: 其他参数
         
     Returns:
@@ -275,32 +403,26 @@ def run_weekly_analysis(
         df = data_manager.read_from_database(start_date, end_date)
     else:
         df = data_manager.read_excel(data_source)
-        if start_date or end_date:
-            df = data_manager.filter_by_date_range(df, start_date, end_date)
     
     print(f"✓ 成功读取 {len(df)} 条记录")
     
-    # 2. MTM映射
+    # 2. 日期筛选 + MTM映射 + 过滤未映射：融合为一次掩码求值
     print("\n🔄 MTM映射处理...")
-    mtm_manager = MTMManager(Path(mtm_file))
-    df = mtm_manager.map_dataframe(df)
+    if mtm_manager is None:
+        mtm_manager = MTMManager(Path(mtm_file))
+    dataset = LazyDataset(df).map_mtm(mtm_manager, resolve_family).filter_unmapped(filter_unmapped)
+    if not use_database:
+        dataset.filter_date_range(start_date, end_date)
+    df = dataset.collect(WeeklyAnalysisService.REQUIRED_COLUMNS)
     mtm_manager.print_statistics()
     
-    # 3. 过滤未映射（如果需要）
-    if filter_unmapped:
-        print("\n🔍 过滤未映射的MTM...")
-        original_count = len(df)
-        df = data_manager.filter_unmapped_mtm(df)
-        print(f"✓ 已过滤 {original_count - len(df)} 条未映射的记录")
-        print(f"✓ 剩余 {len(df)} 条已映射的记录用于分析")
-    
     # 4. 执行分析
     service = WeeklyAnalysisService(output_dir)
     service.print_model_list(df)
     
     # 传递LLM配置
     llm_config = kwargs.get('llm_config')
-    results = service.analyze(df, start_date, end_date, use_llm, llm_config)
+    results = service.analyze(df, start_date, end_date, use_llm, llm_config, formats=formats)
     
     return results
 
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""QCR分析工具 - 单元测试（与逐行 pandas 实现对照，验证各统计引擎的等价性与误差界）"""
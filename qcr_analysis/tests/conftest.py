@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+测试公共设置
+=============================================================================
+- 缓存目录指向临时目录（config 在导入时读取 QCR_CACHE_DIR，必须先于业务模块设置），
+  测试不会读写仓库内的 cache/
+- 提供小型明细数据集：机型/审核原因/分类取值有重复、有空值，日期跨多天
+=============================================================================
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("QCR_CACHE_DIR", tempfile.mkdtemp(prefix="qcr_test_cache_"))
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+MODELS = ["ThinkBook 14", "ThinkBook 16", "YOGA Air", "拯救者 Y9000P", "小新 Pro 14", None]
+REASONS = ["7天无理由", "15天质量换新", "180天只换不修", "质量维修", None]
+CATEGORIES = ["无法开机", "屏幕闪屏", "键盘-凸起", "转轴-歪斜", "无理由退货", "系统运行慢", None]
+
+
+def make_records(rows: int = 3000, seed: int = 7) -> pd.DataFrame:
+    """生成明细记录（取值分布不均匀，保证计数有并列也有差异）"""
+    rng = np.random.default_rng(seed)
+    weights = lambda n: (w := rng.random(n) ** 2 + 0.05) / w.sum()
+    return pd.DataFrame({
+        "日期": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 40, rows), unit="D"),
+        "MTM": rng.choice([f"21K{i:02d}00CD" for i in range(12)], rows),
+        "机型名称": rng.choice(np.array(MODELS, dtype=object), rows, p=weights(len(MODELS))),
+        "审核原因": rng.choice(np.array(REASONS, dtype=object), rows, p=weights(len(REASONS))),
+        "分类": rng.choice(np.array(CATEGORIES, dtype=object), rows, p=weights(len(CATEGORIES))),
+    })
+
+
+@pytest.fixture
+def records() -> pd.DataFrame:
+    return make_records()
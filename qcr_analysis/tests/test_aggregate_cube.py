@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""聚合立方体：查询结果与明细数据上的 pandas 统计一致，分片合并与整体构建完全相同"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.aggregate_cube import (
+    AggregateCube, CUBE_DIMENSIONS, _count_combined, _decode_cells, _encode_rows, _merge_cells, build_cube,
+)
+
+WHERE_CASES = [
+    None,
+    {"审核原因": "7天无理由"},
+    {"审核原因": ["15天质量换新", "180天只换不修", "质量维修"]},
+    {"机型名称": "ThinkBook 14", "审核原因": "质量维修"},
+    {"分类": "不存在的分类"},
+]
+
+
+def _filter(df, where):
+    mask = np.ones(len(df), dtype=bool)
+    for dim, values in (where or {}).items():
+        values = [values] if isinstance(values, str) else values
+        mask &= df[dim].isin(values).to_numpy()
+    return df[mask]
+
+
+def assert_same_cube(actual: AggregateCube, expected: AggregateCube):
+    assert actual.total_records == expected.total_records
+    for dim in CUBE_DIMENSIONS:
+        assert list(actual.labels[dim]) == list(expected.labels[dim])
+        assert (actual.codes[dim] == expected.codes[dim]).all()
+    assert (actual.counts == expected.counts).all()
+
+
+@pytest.mark.parametrize("where", WHERE_CASES)
+@pytest.mark.parametrize("by", CUBE_DIMENSIONS)
+def test_value_counts_match_pandas(records, by, where):
+    cube = AggregateCube.from_dataframe(records)
+    expected = _filter(records, where)[by].value_counts()
+    actual = cube.value_counts(by, where)
+    assert list(actual.index) == list(expected.index)
+    assert (actual.to_numpy() == expected.to_numpy()).all()
+
+
+@pytest.mark.parametrize("where", WHERE_CASES)
+def test_count_and_nunique_match_pandas(records, where):
+    cube = AggregateCube.from_dataframe(records)
+    subset = _filter(records, where)
+    assert cube.count(where) == len(subset)
+
+    expected = subset.dropna(subset=["机型名称"]).groupby("机型名称", sort=False)["分类"].nunique()
+    actual = cube.nunique("机型名称", "分类", where)
+    assert actual.sort_index().to_dict() == expected.sort_index().to_dict()
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 7])
+def test_merged_shards_equal_whole_build(records, shards):
+    bounds = np.linspace(0, len(records), shards + 1).astype(int)
+    labels, combined, sizes = _encode_rows(records)
+    parts = [_count_combined(combined[start:stop], start) for start, stop in zip(bounds[:-1], bounds[1:])]
+    cell_keys, counts = _merge_cells(parts)
+    merged = AggregateCube(labels, _decode_cells(cell_keys, sizes), counts, len(records))
+    assert_same_cube(merged, AggregateCube.from_dataframe(records))
+
+
+def test_sharded_build_in_process_pool_equals_whole_build(records):
+    sharded = AggregateCube.from_dataframe_sharded(records, workers=2)
+    assert_same_cube(sharded, AggregateCube.from_dataframe(records))
+
+
+def test_counts_frame_round_trip(records):
+    cube = AggregateCube.from_dataframe(records)
+    rebuilt = AggregateCube.from_counts(cube.to_counts_frame(), total_records=len(records))
+    for by in CUBE_DIMENSIONS:
+        pd.testing.assert_series_equal(rebuilt.value_counts(by), cube.value_counts(by))
+
+
+def test_build_cache_reuses_cube_for_same_data(records):
+    first = build_cube(records)
+    assert build_cube(records.copy()) is first
+    assert build_cube(records.iloc[:-1]) is not first
+
+
+@pytest.mark.parametrize("window", [(None, None), ("2025-01-05", "2025-01-20")])
+def test_daily_partials_cube_equals_row_level(records, tmp_path, window):
+    from data.daily_partials import DailyPartialStore
+    from modules.mtm_manager import MTMManager
+
+    mappings = {f"21K{i:02d}00CD": f"机型{i % 5}" for i in range(9)}
+    manager = MTMManager(mappings=mappings)
+    start, end = (pd.Timestamp(d).date() if d else None for d in window)
+
+    store = DailyPartialStore("test", store_dir=tmp_path)
+    store.update(records, "日期")
+    cube = store.build_cube(manager, start, end, filter_unmapped=True)
+
+    rows = records.drop(columns="机型名称")
+    if start:
+        rows = rows[(rows["日期"].dt.date >= start) & (rows["日期"].dt.date <= end)]
+    rows = rows.assign(机型名称=rows["MTM"].map(manager.get_model_name))
+    rows = rows[rows["机型名称"] != rows["MTM"]]
+
+    assert cube.count() == len(rows)
+    # 分片合并后并列项按日期先后排序，只比较计数
+    for by in CUBE_DIMENSIONS:
+        assert cube.value_counts(by).to_dict() == rows[by].value_counts().to_dict()
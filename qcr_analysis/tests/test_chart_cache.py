@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""图表内容哈希缓存：键的稳定性、清单命中、跨目录复用，以及渲染服务重跑时不再绘制"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+import services.chart_service as chart_service
+from modules.chart_cache import MANIFEST_NAME, ChartCache, chart_key
+from services.chart_service import ChartPanel, ChartRenderService, ChartSpec
+
+
+def make_spec(path, values=(3, 5, 2), dpi=60):
+    panel = ChartPanel(kind="bar", values=list(values), labels=["无法开机", "屏幕闪屏", "键盘"], title="分类")
+    return ChartSpec(path=Path(path), panels=[panel], figsize=(4, 3), dpi=dpi)
+
+
+def test_key_ignores_directory_but_not_content(tmp_path):
+    key = chart_key(make_spec(tmp_path / "a" / "chart.png"))
+    assert key == chart_key(make_spec(tmp_path / "b" / "other.png"))
+    assert key != chart_key(make_spec(tmp_path / "a" / "chart.svg"))
+    assert key != chart_key(make_spec(tmp_path / "a" / "chart.png", values=(3, 5, 3)))
+    assert key != chart_key(make_spec(tmp_path / "a" / "chart.png", dpi=150))
+
+
+def test_manifest_hit_shared_copy_and_invalidation(tmp_path):
+    store = tmp_path / "store"
+    first = tmp_path / "run1" / "chart.png"
+    first.parent.mkdir()
+    first.write_bytes(b"png-v1")
+
+    cache = ChartCache(store)
+    assert not cache.lookup(first, "k1")
+    cache.store(first, "k1")
+    cache.flush()
+    assert (first.parent / MANIFEST_NAME).exists()
+
+    # 新的缓存实例从清单命中
+    assert ChartCache(store).lookup(first, "k1")
+    assert not ChartCache(store).lookup(first, "k2")
+
+    # 其他输出目录从共享存储复制
+    second = tmp_path / "run2" / "chart.png"
+    cache = ChartCache(store)
+    assert cache.lookup(second, "k1")
+    assert second.read_bytes() == b"png-v1"
+
+    # 图片被改动：清单不再匹配，从共享存储恢复
+    first.write_bytes(b"edited")
+    cache = ChartCache(store)
+    assert cache.lookup(first, "k1")
+    assert first.read_bytes() == b"png-v1"
+
+    cache.forget(second)
+    cache.flush()
+    (store / "k1.png").unlink()
+    assert not ChartCache(store).lookup(second, "k1")
+
+
+def test_eviction_keeps_most_recent_entries(tmp_path):
+    store = tmp_path / "store"
+    cache = ChartCache(store, max_entries=2)
+    for i in range(4):
+        chart = tmp_path / "out" / f"c{i}.png"
+        chart.parent.mkdir(exist_ok=True)
+        chart.write_bytes(f"png{i}".encode())
+        cache.store(chart, f"k{i}")
+        os.utime(store / f"k{i}.png", (1_000_000 + i, 1_000_000 + i))
+    cache.flush()
+    assert sorted(p.name for p in store.iterdir()) == ["k2.png", "k3.png"]
+
+
+def test_service_rerun_skips_rendering(tmp_path, monkeypatch, capsys):
+    pytest.importorskip("matplotlib")
+    specs = [make_spec(tmp_path / f"chart_{i}.png", values=(i, i + 1, 2)) for i in range(3)]
+    with ChartRenderService(workers=1, use_cache=True) as service:
+        service.cache = ChartCache(tmp_path / "store")
+        paths = service.render(specs, profile="report")
+        assert paths == [spec.path for spec in specs]
+        assert all(path.exists() for path in paths)
+        stamps = [path.stat().st_mtime_ns for path in paths]
+
+        def fail(spec):
+            raise AssertionError(f"不应重新渲染 {spec.path}")
+
+        monkeypatch.setattr(chart_service, "render_chart", fail)
+        capsys.readouterr()
+        assert service.render(specs, profile="report") == paths
+        assert "图表缓存命中 3/3" in capsys.readouterr().out
+        assert [path.stat().st_mtime_ns for path in paths] == stamps
+
+        # 数据变化的图表才重新渲染（此处渲染函数已替换为失败，结果为None，清单记录被移除）
+        changed = specs[:2] + [make_spec(specs[2].path, values=(9, 9, 9))]
+        result = service.render(changed, profile="report")
+        assert result[:2] == paths[:2] and result[2] is None
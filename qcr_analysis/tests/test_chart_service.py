@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""图表渲染服务：进程池大小由 workers 决定（不受首批图表数限制），不以 fork 启动"""
+
+from pathlib import Path
+
+import pytest
+
+from services.chart_service import ChartPanel, ChartRenderService, ChartSpec
+
+
+def make_specs(directory, count):
+    return [
+        ChartSpec(path=Path(directory) / f"chart_{i}.png",
+                  panels=[ChartPanel(kind="bar", values=[i + 1, 2, 3], labels=["a", "b", "c"])],
+                  figsize=(3, 2), dpi=40)
+        for i in range(count)
+    ]
+
+
+def test_pool_keeps_configured_size_across_batches(tmp_path):
+    pytest.importorskip("matplotlib")
+    with ChartRenderService(workers=3, min_parallel=2, use_cache=False) as service:
+        first = service.render(make_specs(tmp_path / "first", 2), profile="draft")
+        pool = service._pool
+        assert pool.mp_context.get_start_method() in ("forkserver", "spawn")
+        assert pool._pool._max_workers == 3
+
+        second = service.render(make_specs(tmp_path / "second", 7), profile="draft")
+        assert service._pool._pool is pool._pool and pool._pool._max_workers == 3
+        assert all(path is not None and path.exists() for path in first + second)
+        assert [path.name for path in second] == [f"chart_{i}.png" for i in range(7)]
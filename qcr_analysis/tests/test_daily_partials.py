@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""按天分片：日期指纹只在内容变化时重新聚合，更正后的导出中消失的日期随之删除"""
+
+
+import pandas as pd
+
+from data.daily_partials import DailyPartialStore, source_namespace
+from modules.mtm_manager import MTMManager
+
+MANAGER = MTMManager(mappings={f"21K{i:02d}00CD": f"机型{i % 5}" for i in range(12)})
+
+
+def window_counts(df):
+    """明细在 MTM 维度上的计数（与分片合并结果对照）"""
+    return df["MTM"].value_counts().to_dict()
+
+
+def test_fingerprint_ignores_row_order_and_detects_edits(records, tmp_path):
+    store = DailyPartialStore("fp", store_dir=tmp_path)
+    assert len(store.update(records, "日期")) == records["日期"].nunique()
+
+    shuffled = records.sample(frac=1, random_state=3)
+    assert store.update(shuffled, "日期") == []
+
+    edited = records.copy()
+    day = edited["日期"].iloc[10]
+    edited.loc[edited.index[10], "分类"] = "新分类"
+    assert store.update(edited, "日期") == [day.date()]
+
+    # 新实例从磁盘读取索引，同样不需要重新聚合
+    assert DailyPartialStore("fp", store_dir=tmp_path).update(edited, "日期") == []
+
+
+def test_day_missing_from_corrected_export_is_removed(records, tmp_path):
+    store = DailyPartialStore("removed", store_dir=tmp_path)
+    store.update(records, "日期")
+    gone = pd.Timestamp("2025-01-10")
+    corrected = records[records["日期"] != gone]
+
+    assert gone.date() in store.update(corrected, "日期")
+    assert gone.date() not in store.days()
+    assert not (store.store_dir / "2025-01-10.pkl").exists()
+
+    reopened = DailyPartialStore("removed", store_dir=tmp_path)
+    assert gone.date() not in reopened.days()
+    cube = store.build_cube(MANAGER)
+    assert cube.count() == len(corrected)
+
+
+def test_days_outside_input_range_are_kept(records, tmp_path):
+    store = DailyPartialStore("rolling", store_dir=tmp_path)
+    january = records[records["日期"] < "2025-01-20"]
+    later = records[records["日期"] >= "2025-01-20"]
+    store.update(january, "日期")
+    store.update(later, "日期")
+
+    assert store.days() == sorted(records["日期"].dt.date.unique())
+    # 默认窗口为最近一次输入的日期范围
+    assert store.input_range == (later["日期"].min().date(), later["日期"].max().date())
+    merged = store.load_counts().groupby("MTM")["数量"].sum().to_dict()
+    assert merged == window_counts(records)
+    recent = store.load_counts(*store.input_range).groupby("MTM")["数量"].sum().to_dict()
+    assert recent == window_counts(later)
+
+
+def test_unparseable_dates_are_skipped_and_reported(records, tmp_path, capsys):
+    broken = records.astype({"日期": object})
+    broken.loc[broken.index[:5], "日期"] = "不是日期"
+    broken.loc[broken.index[5:8], "日期"] = None
+
+    store = DailyPartialStore("broken", store_dir=tmp_path)
+    store.update(broken, "日期")
+    assert "8 条记录的日期为空或无法解析" in capsys.readouterr().out
+    total = store.load_counts()["数量"].sum()
+    assert total == 3000 - 8
+
+
+def test_source_namespace_separates_sources(tmp_path):
+    first, second = tmp_path / "导出A.xlsx", tmp_path / "sub" / "导出A.xlsx"
+    second.parent.mkdir()
+    first.touch()
+    second.touch()
+    assert source_namespace(first) == source_namespace(str(first))
+    assert source_namespace(first) != source_namespace(second)
+    assert source_namespace(first).startswith("导出A_")
+    assert source_namespace("qcr_records") != source_namespace("qcr_records_2025")
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""EWMA基线：向量化推进与逐序列标量递推一致，分批推进与一次推进结果相同"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from modules.ewma_baseline import EWMABaseline
+
+ALPHA = 0.2
+SETTINGS = dict(z_threshold=3.0, min_count=3, warmup_days=5)
+
+
+def scalar_reference(series_counts, alpha, z_threshold, min_count, warmup_days):
+    """单个序列的逐日递推（从首个非零计数开始计龄）"""
+    mean = var = 0.0
+    age = 0
+    alerts = []
+    for d, count in enumerate(series_counts):
+        if age == 0 and count == 0:
+            continue
+        sd = max(var, mean, 1.0) ** 0.5
+        z = (count - mean) / sd
+        if age >= warmup_days and count >= min_count and z >= z_threshold:
+            alerts.append((d, int(count), mean, sd, z))
+        diff = count - mean
+        mean += alpha * diff
+        var = (1 - alpha) * (var + alpha * diff * diff)
+        age += 1
+    return mean, var, age, alerts
+
+
+def make_counts(days=60, series=6, seed=3):
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(rng.uniform(0.5, 6, series), size=(days, series)).astype(float)
+    counts[:20, 4] = 0          # 第20天才出现的序列
+    counts[45, 1] += 40          # 预热后的突增
+    counts[2, 2] += 40           # 预热期内的突增（不告警）
+    return counts
+
+
+def test_vectorised_advance_matches_scalar_recurrence():
+    counts = make_counts()
+    baseline = EWMABaseline(alpha=ALPHA)
+    baseline.positions([("机型", i) for i in range(counts.shape[1])])
+    alerts = baseline.advance(counts, **SETTINGS)
+
+    for i in range(counts.shape[1]):
+        mean, var, age, expected = scalar_reference(counts[:, i], ALPHA, **SETTINGS)
+        assert baseline.mean[i] == pytest.approx(mean)
+        assert baseline.var[i] == pytest.approx(var)
+        assert baseline.age[i] == age
+        actual = [(d, c, m, s, z) for d, j, c, m, s, z in alerts if j == i]
+        assert [a[:2] for a in actual] == [e[:2] for e in expected]
+        for a, e in zip(actual, expected):
+            assert a[2:] == pytest.approx(e[2:])
+
+    flagged = {(d, i) for d, i, *_ in alerts}
+    assert (45, 1) in flagged
+    assert (2, 2) not in flagged
+
+
+def test_advancing_in_batches_equals_single_pass():
+    counts = make_counts()
+    whole = EWMABaseline(alpha=ALPHA)
+    whole.positions([("机型", i) for i in range(counts.shape[1])])
+    whole_alerts = whole.advance(counts, **SETTINGS)
+
+    # 先只登记前4个序列，后两个序列在第二批导入时才出现；中途经过pickle持久化
+    split = EWMABaseline(alpha=ALPHA)
+    split.positions([("机型", i) for i in range(4)])
+    first = split.advance(counts[:30, :4], **SETTINGS)
+    split = pickle.loads(pickle.dumps(split))
+    columns = split.positions([("机型", i) for i in range(counts.shape[1])])
+    second = split.advance(counts[30:, columns], **SETTINGS)
+
+    merged = first + [(d + 30, *rest) for d, *rest in second]
+    # 后两个序列在前30天已有计数，分批推进时从第30天才开始计龄，只比较前4个序列
+    keep = lambda alerts: [(d, i, c) for d, i, c, *_ in alerts if i < 4]
+    assert keep(merged) == keep(whole_alerts)
+    np.testing.assert_allclose(split.mean[:4], whole.mean[:4])
+    np.testing.assert_allclose(split.var[:4], whole.var[:4])
+    assert (split.age[:4] == whole.age[:4]).all()
+
+
+def test_new_series_start_at_zero_and_respect_warmup():
+    baseline = EWMABaseline(alpha=ALPHA)
+    baseline.positions([("A",)])
+    baseline.advance(np.full((10, 1), 2.0), **SETTINGS)
+
+    new_column = baseline.positions([("A",), ("B",)])
+    assert list(new_column) == [0, 1]
+    assert baseline.mean[1] == 0 and baseline.age[1] == 0
+
+    # B 首次出现即突增：处于预热期，不告警
+    alerts = baseline.advance(np.array([[2.0, 50.0]]), **SETTINGS)
+    assert all(i != 1 for _, i, *_ in alerts)
+    assert baseline.age[1] == 1
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""分组执行引擎：与逐组布尔筛选 + value_counts 的结果一致"""
+
+import numpy as np
+import pandas as pd
+
+from modules.grouped_engine import GroupedFrame
+
+
+def test_groups_follow_unique_order_and_keep_row_order(records):
+    grouped = GroupedFrame(records, "机型名称", "分类")
+
+    assert list(grouped.keys) == list(records["机型名称"].dropna().unique())
+    for i, key, group in grouped:
+        expected = records[records["机型名称"] == key]
+        pd.testing.assert_frame_equal(group, expected)
+        assert (grouped.positions(i) == np.flatnonzero(records["机型名称"] == key)).all()
+
+
+def test_value_counts_match_pandas(records):
+    grouped = GroupedFrame(records, "机型名称", "分类")
+
+    for i, key, _ in grouped:
+        expected = (
+            records.loc[records["机型名称"] == key, "分类"]
+            .value_counts()
+            .rename_axis("分类")
+            .reset_index(name="数量")
+        )
+        actual = grouped.value_counts(i, "分类", "数量")
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected, check_dtype=False)
+
+
+def test_nunique_count_where_and_first(records):
+    grouped = GroupedFrame(records, "机型名称", "分类")
+    keyed = records.dropna(subset=["机型名称"]).groupby("机型名称", sort=False)
+
+    assert (grouped.nunique() == keyed["分类"].nunique().reindex(grouped.keys).to_numpy()).all()
+
+    mask = (records["审核原因"] == "7天无理由").to_numpy()
+    expected = records[mask].groupby("机型名称")["分类"].size().reindex(grouped.keys, fill_value=0)
+    assert (grouped.count_where(mask) == expected.to_numpy()).all()
+
+    pd.testing.assert_series_equal(
+        grouped.first("MTM"), keyed["MTM"].first().reindex(grouped.keys), check_names=False
+    )
+
+
+def test_index_of_unknown_key(records):
+    grouped = GroupedFrame(records, "机型名称")
+    assert grouped.index_of("不存在的机型") == -1
+    assert grouped.index_of(grouped.keys[0]) == 0
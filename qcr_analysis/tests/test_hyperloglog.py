@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""HyperLogLog草图：按键去重计数的误差范围，以及分片合并与一次更新等价"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.sketches import HyperLogLog
+
+CARDINALITIES = {"机型A": 3, "机型B": 40, "机型C": 800, "机型D": 5_000, "机型E": 30_000}
+
+
+def make_pairs(seed=5, repeat=3):
+    """每个键的取值按 CARDINALITIES 去重，且每个取值重复出现 repeat 次"""
+    rng = np.random.default_rng(seed)
+    keys, values = [], []
+    for key, distinct in CARDINALITIES.items():
+        keys += [key] * distinct * repeat
+        values += [f"{key}-分类{i}" for i in range(distinct)] * repeat
+    order = rng.permutation(len(keys))
+    return pd.Series(keys).iloc[order].reset_index(drop=True), pd.Series(values).iloc[order].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("precision", [10, 12, 14])
+def test_estimates_within_error_bound(precision):
+    keys, values = make_pairs()
+    sketch = HyperLogLog(precision).update(keys, values)
+    estimates = sketch.estimate()
+
+    for key, distinct in CARDINALITIES.items():
+        if distinct <= 40:
+            # 小基数走线性计数，几乎精确
+            assert estimates[key] == pytest.approx(distinct, abs=1)
+        else:
+            # 4倍标准误差
+            assert abs(estimates[key] / distinct - 1) <= 4 * sketch.relative_error
+
+
+def test_sharded_merge_equals_single_pass():
+    keys, values = make_pairs()
+    whole = HyperLogLog(11).update(keys, values)
+
+    shards = [HyperLogLog(11) for _ in range(4)]
+    for i, (k, v) in enumerate(zip(np.array_split(keys, 7), np.array_split(values, 7))):
+        shards[i % 4].update(k, v)
+    merged = HyperLogLog(11)
+    for shard in reversed(shards):
+        merged.merge(shard)
+
+    assert sorted(merged.keys) == sorted(whole.keys)
+    pd.testing.assert_series_equal(
+        merged.estimate().sort_index(), whole.estimate().sort_index())
+    rows = [merged.keys.index(key) for key in whole.keys]
+    assert (merged.registers[rows] == whole.registers).all()
+
+
+def test_duplicates_and_nulls_do_not_count():
+    sketch = HyperLogLog(10)
+    sketch.update(["A", "A", "A", None, "B"], ["x", "x", "y", "z", None])
+    sketch.update(["A"], ["x"])
+    estimates = sketch.estimate()
+    assert list(estimates.index) == ["A"]
+    assert estimates["A"] == pytest.approx(2, abs=0.1)
+
+
+def test_invalid_precision_and_merge():
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""MTM映射缓存：按 内容哈希 + 工作表 命中与失效，损坏的缓存回退为重新解析"""
+
+import pandas as pd
+import pytest
+
+import data.mtm_cache as mtm_cache
+from data.mtm_cache import _cache_path, compute_file_hash, load_mtm_mappings, parse_mtm_file
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # 每个测试使用独立的缓存目录（内容相同的表格哈希相同，否则会命中其他测试写入的缓存）
+    monkeypatch.setattr(mtm_cache, "CACHE_DIR", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def mapping_file(tmp_path):
+    path = tmp_path / "MTM.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({"MTM": ["21K000CD", "21K001CD"], "机型名称": ["X1", "X1 Carbon"]}).to_excel(
+            writer, sheet_name="标准映射", index=False)
+        # 无表头的第二个工作表
+        pd.DataFrame([["83AB0001", "YOGA Air"]]).to_excel(writer, sheet_name="Sheet 2", index=False, header=False)
+    return path
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    calls = []
+    parse = mtm_cache.parse_mtm_file
+    monkeypatch.setattr(mtm_cache, "parse_mtm_file", lambda p, s=0: calls.append(s) or parse(p, s))
+    return calls
+
+
+def test_parse_with_and_without_header(mapping_file):
+    assert parse_mtm_file(mapping_file) == {"21K000CD": "X1", "21K001CD": "X1 Carbon"}
+    assert parse_mtm_file(mapping_file, "Sheet 2") == {"83AB0001": "YOGA Air"}
+
+
+def test_cache_hit_and_sheet_key(mapping_file, parses):
+    first = load_mtm_mappings(mapping_file, use_cache=True)
+    assert load_mtm_mappings(mapping_file, use_cache=True) == first
+    assert parses == [0]
+
+    # 同一文件的其他工作表是独立的缓存项；0 与 "标准映射" 指向同一工作表但键不同
+    source_hash = compute_file_hash(mapping_file)
+    assert load_mtm_mappings(mapping_file, use_cache=True, sheet_name="Sheet 2") == {"83AB0001": "YOGA Air"}
+    assert load_mtm_mappings(mapping_file, use_cache=True, sheet_name="标准映射") == first
+    assert parses == [0, "Sheet 2", "标准映射"]
+    paths = {_cache_path(source_hash, sheet) for sheet in (0, "0", "Sheet 2", "标准映射")}
+    assert len(paths) == 4
+    assert all(path.name.startswith(f"mtm_v{mtm_cache._CACHE_FORMAT_VERSION}_{source_hash}_") for path in paths)
+
+
+def test_content_change_invalidates(mapping_file, parses):
+    load_mtm_mappings(mapping_file, use_cache=True)
+    pd.DataFrame({"MTM": ["21K000CD"], "机型名称": ["X1 Gen 12"]}).to_excel(mapping_file, index=False)
+    assert load_mtm_mappings(mapping_file, use_cache=True) == {"21K000CD": "X1 Gen 12"}
+    assert parses == [0, 0]
+
+
+def test_corrupt_or_mismatched_cache_is_reparsed(mapping_file, parses):
+    expected = load_mtm_mappings(mapping_file, use_cache=True)
+    cache_path = _cache_path(compute_file_hash(mapping_file))
+
+    cache_path.write_bytes(b"truncated")
+    assert load_mtm_mappings(mapping_file, use_cache=True) == expected
+    assert len(parses) == 2
+
+    # 重新写入的缓存可再次命中
+    assert load_mtm_mappings(mapping_file, use_cache=True) == expected
+    assert len(parses) == 2
+
+    # 缓存内容记录的工作表不一致（如旧格式）时不使用
+    other = _cache_path(compute_file_hash(mapping_file), "Sheet 2")
+    other.write_bytes(cache_path.read_bytes())
+    assert load_mtm_mappings(mapping_file, use_cache=True, sheet_name="Sheet 2") == {"83AB0001": "YOGA Air"}
+    assert parses[-1] == "Sheet 2"
+
+
+def test_cache_disabled(mapping_file, parses):
+    load_mtm_mappings(mapping_file, use_cache=False)
+    load_mtm_mappings(mapping_file, use_cache=False)
+    assert parses == [0, 0]
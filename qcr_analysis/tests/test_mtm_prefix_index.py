@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""MTM系列前缀索引：与逐个键比对的暴力实现一致"""
+
+import os
+
+import pandas as pd
+
+from modules.mtm_prefix_index import MTMPrefixIndex
+
+MAPPINGS = {
+    "21K0A00BCD": "ThinkBook 14",
+    "21K0A01BCD": "ThinkBook 14",
+    "21K0B00BCD": "ThinkBook 16",
+    "21K1000ACD": "YOGA Air",
+    "82XV0012CD": "小新 Pro 14",
+    "82XV0034CD": "小新 Pro 14",
+    "82XW0001CD": "拯救者 Y9000P",
+}
+
+
+def brute_force(mappings, query, min_prefix_len):
+    """最长公共前缀 → 共享该前缀的全部键 → 机型唯一时解析"""
+    keys = sorted(mappings)
+    lcp = max(len(os.path.commonprefix([query, key])) for key in keys)
+    if lcp < min_prefix_len:
+        return None
+    prefix = query[:lcp]
+    names = {mappings[key] for key in keys if key.startswith(prefix)}
+    return (names.pop(), prefix) if len(names) == 1 else None
+
+
+def test_resolve_matches_brute_force():
+    queries = [
+        "21K0A99ZZZ",   # 唯一落在 ThinkBook 14
+        "21K0C00BCD",   # 前缀 21K0 同时覆盖 ThinkBook 14/16，无法确定
+        "21K1000XYZ",   # YOGA Air
+        "82XV9999CD",   # 小新 Pro 14（两个键同名）
+        "82XZ0000CD",   # 前缀 82X 覆盖两个机型
+        "99999999",     # 无公共前缀
+        "21K0A00BCD",   # 已知键本身
+        "21",           # 短于最小前缀
+    ]
+    index = MTMPrefixIndex(MAPPINGS, min_prefix_len=4)
+    resolved = index.resolve(queries)
+
+    for query in queries:
+        expected = brute_force(MAPPINGS, query, 4)
+        if expected is None:
+            assert query not in resolved.index, query
+        else:
+            assert tuple(resolved.loc[query, ["机型名称", "匹配前缀"]]) == expected, query
+
+
+def test_min_prefix_length_is_respected():
+    index = MTMPrefixIndex(MAPPINGS, min_prefix_len=8)
+    resolved = index.resolve(["21K0A0XXXX", "82XV0012ZZ"])
+    assert "21K0A0XXXX" not in resolved.index
+    assert resolved.loc["82XV0012ZZ", "机型名称"] == "小新 Pro 14"
+
+
+def test_empty_inputs():
+    assert MTMPrefixIndex({}).resolve(["21K0A00BCD"]).empty
+    assert MTMPrefixIndex(MAPPINGS).resolve(pd.Series([None], dtype=object)).empty
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""常驻MTM映射服务：内容变化时热替换，损坏或为空的文件在再次变化前不重复解析"""
+
+import os
+
+import pandas as pd
+
+import services.mtm_service as mtm_service
+from services.mtm_service import MTMMappingService
+
+
+def write_mapping(path, rows):
+    pd.DataFrame(rows, columns=["MTM", "机型名称"]).to_excel(path, index=False)
+
+
+def bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_corrupt_file_is_not_reparsed_until_it_changes(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "MTM.xlsx"
+    write_mapping(path, [("21K000CD", "X1")])
+    service = MTMMappingService(path, poll_interval=0.01)
+    assert service.manager.file_mappings == {"21K000CD": "X1"}
+
+    parses = []
+    load = mtm_service.load_mtm_mappings
+    monkeypatch.setattr(mtm_service, "load_mtm_mappings", lambda p: parses.append(p) or load(p))
+
+    # 损坏：保留当前映射，只解析与告警一次
+    path.write_bytes(b"not an excel file")
+    capsys.readouterr()
+    assert not service.reload_if_changed()
+    assert not service.reload_if_changed()
+    assert len(parses) == 1
+    assert capsys.readouterr().out.count("解析标准MTM映射文件失败") == 1
+    assert service.manager.file_mappings == {"21K000CD": "X1"}
+
+    # 仅修改时间变化、内容相同：不重新解析
+    bump_mtime(path)
+    assert not service.reload_if_changed()
+    assert len(parses) == 1
+
+    # 空映射同样只告警一次
+    write_mapping(path, [])
+    bump_mtime(path)
+    assert not service.reload_if_changed()
+    assert not service.reload_if_changed()
+    assert len(parses) == 2
+
+    # 文件修复后重新加载
+    write_mapping(path, [("21K000CD", "X1"), ("21K001CD", "X1 Carbon")])
+    bump_mtime(path)
+    assert service.reload_if_changed()
+    assert len(parses) == 3
+    assert service.manager.file_mappings == {"21K000CD": "X1", "21K001CD": "X1 Carbon"}
+    assert not service.reload_if_changed()
+
+
+def test_missing_file_starts_empty(tmp_path):
+    path = tmp_path / "MTM.xlsx"
+    service = MTMMappingService(path)
+    assert not service.has_mappings()
+
+    write_mapping(path, [("21K000CD", "X1")])
+    assert service.reload_if_changed()
+    assert service.has_mappings()
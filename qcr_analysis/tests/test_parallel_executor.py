@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""并行执行器：有序结果、逐任务异常、进程池大小与启动方式、损坏后重建"""
+
+import math
+import os
+
+from modules.parallel_executor import ParallelExecutor
+
+
+def test_results_keep_order_and_capture_errors():
+    with ParallelExecutor(2) as executor:
+        results = executor.map(math.factorial, [5, -1, 3, 4])
+    assert [r.value for r in results] == [120, None, 6, 24]
+    assert [r.ok for r in results] == [True, False, True, True]
+    assert results[1].error.startswith("ValueError")
+
+
+def test_pool_sized_from_workers_not_first_batch():
+    with ParallelExecutor(3) as executor:
+        executor.map(abs, [-1, -2])
+        assert executor._pool._max_workers == 3
+        assert executor.mp_context.get_start_method() in ("forkserver", "spawn")
+        assert [r.value for r in executor.map(abs, range(-30, 0))] == list(range(30, 0, -1))
+
+
+def test_broken_pool_is_rebuilt():
+    with ParallelExecutor(2, chunk_size=1) as executor:
+        results = executor.map(os._exit, [1, 1])
+        assert not any(r.ok for r in results)
+        assert "BrokenProcessPool" in results[0].error
+        assert [r.value for r in executor.map(abs, [-1, -2, -3])] == [1, 2, 3]
+
+
+def test_single_worker_runs_inline():
+    with ParallelExecutor(1) as executor:
+        assert [r.value for r in executor.map(abs, [-7, -8])] == [7, 8]
+        assert executor._pool is None
+
+
+
+def test_model_artifacts_in_batches_match_inline(records, tmp_path):
+    import pandas as pd
+    from modules.data_analyzer import DataAnalyzer, compute_model_issues
+
+    df = records.assign(审核原因="7天无理由").dropna(subset=["机型名称"]).reset_index(drop=True)
+    issues = compute_model_issues(df, "7天无理由")
+    outputs = {}
+    for workers in (1, 2):
+        out = tmp_path / str(workers)
+        DataAnalyzer(out, workers=workers).write_model_issues(issues, write_png=False)
+        outputs[workers] = {p.relative_to(out): pd.read_excel(p) for p in out.rglob("*.xlsx")}
+
+    assert outputs[1].keys() == outputs[2].keys() and len(outputs[1]) == 2 * len(issues)
+    for name, frame in outputs[1].items():
+        pd.testing.assert_frame_equal(frame, outputs[2][name])
+    for item in issues:
+        detail = next(v for k, v in outputs[2].items() if k.name == f"{item.clean_model}_7天无理由_详细数据.xlsx")
+        assert len(detail) == item.total_records
+        assert list(detail["MTM"]) == list(item.model_data["MTM"])
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Pareto覆盖度：覆盖集合 / 重点集合与逐机型 value_counts 累加的结果一致"""
+
+import numpy as np
+import pytest
+
+from modules.llm_service import LLMService
+from modules.pareto import ParetoFacts, pareto_table
+from modules.sparse_matrix import SparseCountMatrix
+
+
+def reference(counts, coverage_threshold, focus_threshold):
+    """逐项累加：未达到覆盖阈值时继续加入下一项"""
+    total = counts.sum()
+    coverage, cumulative = [], 0
+    for name, count in counts.items():
+        if cumulative * 100 >= coverage_threshold * total:
+            break
+        coverage.append((name, int(count)))
+        cumulative += count
+    focus = [(name, int(count)) for name, count in counts.items() if count * 100 >= focus_threshold * total]
+    return coverage, focus
+
+
+@pytest.mark.parametrize("coverage_threshold,focus_threshold", [(80, 10), (50, 25), (100, 0), (1, 100)])
+@pytest.mark.parametrize("by", ["row", "col"])
+def test_prefixes_match_cumulative_reference(records, coverage_threshold, focus_threshold, by):
+    matrix = SparseCountMatrix.from_frame(records, "机型名称", "分类")
+    key_col, value_col = ("机型名称", "分类") if by == "row" else ("分类", "机型名称")
+    labels = matrix.row_labels if by == "row" else matrix.col_labels
+    table = pareto_table(matrix, coverage_threshold, focus_threshold, by)
+
+    for i, label in enumerate(labels):
+        counts = records.loc[records[key_col] == label, value_col].value_counts()
+        coverage, focus = reference(counts, coverage_threshold, focus_threshold)
+        facts = table.facts(i)
+        assert facts.total == counts.sum() and facts.distinct == len(counts)
+        assert [(name, count) for name, count, _ in facts.coverage] == coverage
+        assert [(name, count) for name, count, _ in facts.focus] == focus
+        assert facts.coverage_share == round(sum(c for _, c in coverage) / counts.sum() * 100, 2)
+
+    summary = table.to_frame().set_index("标签")
+    assert list(summary["覆盖数"]) == [len(table.facts(i).coverage) for i in range(len(labels))]
+
+
+def test_exact_threshold_boundary_uses_integer_arithmetic():
+    # 5/10 恰好 50%：覆盖集合只需第一项；3/10 恰好 30%：计入重点
+    rows = np.zeros(10, dtype=np.int64)
+    cols = np.array([0] * 5 + [1] * 3 + [2] * 2)
+    matrix = SparseCountMatrix.from_codes(rows, cols, ["A"], ["x", "y", "z"])
+    facts = pareto_table(matrix, 50, 30).facts(0)
+
+    assert [name for name, _, _ in facts.coverage] == ["x"]
+    assert [name for name, _, _ in facts.focus] == ["x", "y"]
+    assert facts.listed == 2
+    assert facts.headline() == "覆盖50%：1/3个分类；重点（≥30%）：x、y"
+
+
+def test_cached_and_empty_facts(records):
+    matrix = SparseCountMatrix.from_frame(records, "机型名称", "分类")
+    assert pareto_table(matrix, 80, 10) is pareto_table(matrix, 80.0, 10.0)
+    # 结果挂在矩阵实例上：另一矩阵（即使内容相同）重新计算，释放矩阵即释放结果
+    other = SparseCountMatrix.from_frame(records, "机型名称", "分类")
+    assert pareto_table(other, 80, 10) is not pareto_table(matrix, 80, 10)
+    assert len(matrix.derived) == 1
+
+    empty = pareto_table(matrix, 80, 10).facts(-1)
+    assert isinstance(empty, ParetoFacts)
+    assert empty.total == 0 and empty.coverage_share == 0.0
+    assert "分布较为分散" in empty.describe()
+
+
+def test_prompt_keeps_top_n_rows():
+    # 第一项即覆盖50%、无其他重点：结论只涉及1项，但提示词要求判断 Top2/Top3，表格至少保留 Top-N
+    rows = np.zeros(20, dtype=np.int64)
+    cols = np.array([0] * 10 + [1] * 4 + [2] * 3 + [3] * 2 + [4])
+    matrix = SparseCountMatrix.from_codes(rows, cols, ["A"], ["a", "b", "c", "d", "e"])
+    facts = pareto_table(matrix, 50, 60).facts(0)
+    assert facts.listed == 1
+
+    category_rows = [
+        {"Category": name, "Count": str(count), "Share": f"{share:.2f}"}
+        for name, count, share in pareto_table(matrix, 100, 60)._items(0, 5)
+    ]
+    content = LLMService(api_key="test").build_prompt(category_rows, 3, 50, 60, facts)["content"]
+    table = content.split("## 输入数据表格\n", 1)[1].split("\n\n", 1)[0].splitlines()
+    assert [line.split("\t")[0] for line in table[1:4]] == ["a", "b", "c"]
+    assert table[4] == "其余2个分类合计\t3\t15.0"
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""出货量：期间解析、按窗口筛选与部分月份按天折算、默认窗口取数据日期范围"""
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from data.shipment_volumes import ShipmentVolumes, data_window, parse_periods
+from modules.mtm_manager import MTMManager
+
+
+def test_parse_periods_formats():
+    values = pd.Series(["202501", "2025-02", "2025年3月", "2025/04/15", 202505.0, "2025-13", None, "abc"])
+    months = parse_periods(values)
+    assert [str(m) for m in months[:5]] == ["2025-01", "2025-02", "2025-03", "2025-04", "2025-05"]
+    assert months[5:].isna().all()
+
+
+def test_partial_month_proration():
+    shipments = ShipmentVolumes(pd.DataFrame({
+        "机型名称": ["A", "A", "A", "B"],
+        "月份": ["202501", "2025年2月", "2025-03", "202501"],
+        "出货量": [3100, 2800, 3100, 310],
+    }))
+    # 1月整月 + 2月 15/28 天：3100 + 1500
+    volumes = shipments.volumes(start_date=date(2025, 1, 1), end_date=date(2025, 2, 15))
+    assert volumes.to_dict() == {"A": 4600, "B": 310}
+
+    # 1月 17~31 日：15/31 天
+    volumes = shipments.volumes(start_date=date(2025, 1, 17), end_date=date(2025, 1, 31))
+    assert volumes.to_dict() == {"A": 1500, "B": 150}
+
+    # 未指定窗口时为全部期间合计
+    assert shipments.volumes().to_dict() == {"A": 9000, "B": 310}
+
+
+def test_mtm_keyed_volumes_are_mapped():
+    manager = MTMManager(mappings={"21K000CD": "ThinkPad X1", "21K001CD": "ThinkPad X1"})
+    shipments = ShipmentVolumes(pd.DataFrame({"MTM": ["21K000CD", "21K001CD", "99Z0"], "销量": [10, 20, 30]}))
+    assert shipments.volumes(manager).to_dict() == {"ThinkPad X1": 30, "99Z0": 30}
+    with pytest.raises(ValueError):
+        shipments.volumes()
+
+
+def test_default_window_follows_data(records):
+    # 明细覆盖 1/1 ~ 2/9：出货量取1月整月与2月 9/28 天，而不是全部期间
+    first, last = data_window(records)
+    assert (first, last) == (date(2025, 1, 1), date(2025, 2, 9))
+    assert data_window(records, date(2025, 1, 10)) == (date(2025, 1, 10), date(2025, 2, 9))
+    assert data_window(records.iloc[:0]) == (None, None)
+
+    shipments = ShipmentVolumes(pd.DataFrame({
+        "机型名称": ["A"] * 3, "月份": ["2025-01", "2025-02", "2025-03"], "出货量": [3100, 2800, 3100],
+    }))
+    assert shipments.volumes(None, first, last).to_dict() == {"A": 3100 + 900}
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""SpaceSaving草图：分块更新后的估计值、误差上界与精确频次对照"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.sketches import SpaceSaving
+
+
+def zipf_stream(size=50_000, distinct=2_000, seed=11):
+    rng = np.random.default_rng(seed)
+    ranks = rng.zipf(1.3, size=size * 2)
+    ranks = ranks[ranks <= distinct][:size]
+    return pd.Series([f"问题{r:04d}" for r in ranks], dtype=object)
+
+
+def feed(sketch, stream, chunk=3_000):
+    for start in range(0, len(stream), chunk):
+        sketch.update(stream.iloc[start:start + chunk])
+    return sketch
+
+
+@pytest.mark.parametrize("capacity", [50, 200, 1000])
+def test_estimates_bracket_true_counts(capacity):
+    stream = zipf_stream()
+    truth = stream.value_counts()
+    sketch = feed(SpaceSaving(capacity), stream)
+    n = len(stream)
+    assert sketch.total == n
+
+    top = sketch.top()
+    actual = truth.reindex(top["取值"]).fillna(0).to_numpy()
+    assert (top["数量"].to_numpy() >= actual).all()
+    assert (top["数量"].to_numpy() - top["误差上界"].to_numpy() <= actual).all()
+    assert (top["误差上界"] <= n / capacity).all()
+    assert sketch.error_bound <= n / capacity
+
+    # 真实频次超过 N / capacity 的项一定被追踪
+    tracked = set(top["取值"])
+    assert set(truth[truth > n / capacity].index) <= tracked
+
+
+def test_exact_when_capacity_covers_all_keys():
+    stream = zipf_stream(size=5_000, distinct=100)
+    truth = stream.value_counts()
+    sketch = feed(SpaceSaving(len(truth) + 1), stream, chunk=700)
+
+    assert sketch.error_bound == 0
+    top = sketch.top(key_name="审核原因").set_index("审核原因")
+    assert (top["误差上界"] == 0).all()
+    assert top["数量"].to_dict() == truth.to_dict()
+
+
+def test_top_n_order_and_nulls():
+    sketch = SpaceSaving.with_error(0.01)
+    assert sketch.capacity == 100
+    sketch.update(["A", "B", None, "A", np.nan, "C", "A", "B"])
+    assert sketch.total == 6
+    top = sketch.top(2)
+    assert list(top["取值"]) == ["A", "B"]
+    assert list(top["数量"]) == [3, 2]
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        SpaceSaving(0)
+    with pytest.raises(ValueError):
+        SpaceSaving.with_error(1.5)
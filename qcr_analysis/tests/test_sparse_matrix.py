@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""稀疏计数矩阵：行/列分布、边际统计、Top K 与逐组 value_counts 一致"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.sparse_matrix import SparseCountMatrix
+
+
+def expected_counts(records, key_col, key, value_col, label_name, count_name):
+    return (
+        records.loc[records[key_col] == key, value_col]
+        .value_counts()
+        .rename_axis(label_name)
+        .reset_index(name=count_name)
+    )
+
+
+def test_rows_and_columns_match_value_counts(records):
+    matrix = SparseCountMatrix.from_frame(records, "机型名称", "分类")
+    assert list(matrix.row_labels) == list(records["机型名称"].dropna().unique())
+    assert list(matrix.col_labels) == list(records["分类"].dropna().unique())
+
+    for i, model in enumerate(matrix.row_labels):
+        expected = expected_counts(records, "机型名称", model, "分类", "分类", "数量")
+        actual = matrix.row_frame(i, "分类", "数量")
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+    for j, category in enumerate(matrix.col_labels):
+        expected = expected_counts(records, "分类", category, "机型名称", "机型名称", "数量")
+        actual = matrix.col_frame(j, "机型名称", "数量")
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+    assert matrix.row_frame(matrix.row_index("不存在的机型")).empty
+
+
+def test_marginals_match_groupby(records):
+    matrix = SparseCountMatrix.from_frame(records, "机型名称", "分类")
+    pairs = records.dropna(subset=["机型名称", "分类"])
+    by_row = pairs.groupby("机型名称", sort=False)["分类"]
+    by_col = pairs.groupby("分类", sort=False)["机型名称"]
+
+    assert matrix.total == len(pairs)
+    assert matrix.nnz == len(pairs.drop_duplicates(["机型名称", "分类"]))
+    assert (matrix.row_totals == by_row.size().reindex(matrix.row_labels).to_numpy()).all()
+    assert (matrix.row_nnz == by_row.nunique().reindex(matrix.row_labels).to_numpy()).all()
+    assert (matrix.col_totals == by_col.size().reindex(matrix.col_labels).to_numpy()).all()
+    assert (matrix.col_nnz == by_col.nunique().reindex(matrix.col_labels).to_numpy()).all()
+
+    row_shares = matrix.shares("row")
+    np.testing.assert_allclose(np.bincount(matrix.entry_rows, weights=row_shares), 1.0)
+
+
+@pytest.mark.parametrize("by", ["row", "col"])
+def test_top_k_and_concentration(records, by):
+    matrix = SparseCountMatrix.from_frame(records, "机型名称", "分类")
+    key_col, value_col = ("机型名称", "分类") if by == "row" else ("分类", "机型名称")
+    labels = matrix.row_labels if by == "row" else matrix.col_labels
+
+    top = matrix.top_k(3, by=by, row_name="机型名称", col_name="分类")
+    concentration = matrix.concentration(by=by, k=3).set_index("标签")
+    for label in labels:
+        counts = records.loc[records[key_col] == label, value_col].value_counts()
+        head = top[top[key_col] == label]
+        assert list(head[value_col]) == list(counts.index[:3])
+        assert list(head["数量"]) == list(counts.iloc[:3])
+        assert list(head["名次"]) == list(range(1, len(head) + 1))
+
+        share = counts / counts.sum()
+        assert concentration.loc[label, "前3占比(%)"] == pytest.approx(round(share.iloc[:3].sum() * 100, 2))
+        assert concentration.loc[label, "HHI"] == pytest.approx(round((share ** 2).sum(), 4))
+
+
+def test_weighted_codes_equal_expanded_records():
+    rows = np.array([0, 1, 0, 2, -1, 1])
+    cols = np.array([1, 0, 1, 0, 0, -1])
+    weights = np.array([2, 5, 3, 1, 9, 4])
+    weighted = SparseCountMatrix.from_codes(rows, cols, ["A", "B", "C", "D"], ["x", "y"], weights)
+    expanded = SparseCountMatrix.from_codes(
+        np.repeat(rows, weights), np.repeat(cols, weights), ["A", "B", "C", "D"], ["x", "y"])
+
+    assert weighted.shape == (4, 2)
+    for name in ("indptr", "indices", "data"):
+        assert (getattr(weighted, name) == getattr(expanded, name)).all()
+    assert list(weighted.row_totals) == [5, 5, 1, 0]
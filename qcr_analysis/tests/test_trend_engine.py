@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""周趋势：ISO周分桶、环比与上升榜和 pandas 逐周 groupby 的结果一致"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.trend_engine import WeeklyTrend, iso_week_label, iso_week_start
+
+
+def weekly_reference(records, key):
+    """按 ISO周一 × 键 的 groupby 计数，补齐空周（周 × 键 的稠密表）"""
+    dates = pd.to_datetime(records["日期"])
+    monday = (dates - pd.to_timedelta(dates.dt.weekday, unit="D")).dt.normalize()
+    counts = records.assign(_week=monday).groupby(["_week", key], sort=True).size().unstack(fill_value=0)
+    weeks = pd.date_range(counts.index.min(), counts.index.max(), freq="7D")
+    return counts.reindex(weeks, fill_value=0)
+
+
+def test_iso_week_start_and_label():
+    dates = pd.Series(["2025-01-05", "2025-01-06", "2024-12-30", None])
+    starts = iso_week_start(dates)
+    assert [str(d) for d in starts[:3]] == ["2024-12-30", "2025-01-06", "2024-12-30"]
+    assert np.isnat(starts[3])
+    # 2024-12-30 属于 2025 年第1周
+    assert iso_week_label(starts[0]) == "2025-W01"
+
+
+@pytest.mark.parametrize("key", ["机型名称", "分类"])
+def test_counts_and_deltas_match_groupby(records, key):
+    trend = WeeklyTrend(iso_week_start(records["日期"]), records[key], rolling_weeks=3)
+    reference = weekly_reference(records, key)
+
+    counts = trend.frame(trend.counts)[reference.columns]
+    assert (counts.to_numpy() == reference.to_numpy()).all()
+    deltas = trend.frame(trend.deltas())[reference.columns]
+    assert (deltas.to_numpy() == reference.diff().fillna(reference).to_numpy()).all()
+    rolling = trend.frame(trend.rolling())[reference.columns]
+    assert (rolling.to_numpy() == reference.rolling(3, min_periods=1).sum().to_numpy()).all()
+
+
+def test_risers_match_reference(records):
+    trend = WeeklyTrend(iso_week_start(records["日期"]), records["分类"], rolling_weeks=2)
+    reference = weekly_reference(records, "分类")
+    week = trend.week_labels[-2]
+    current, previous = reference.iloc[-2], reference.iloc[-3]
+
+    risers = trend.risers("分类", week, min_count=2)
+    delta = current - previous
+    expected = delta[(delta > 0) & (current >= 2)]
+    assert risers["排名"].tolist() == list(range(1, len(expected) + 1))
+    assert risers["环比变化"].tolist() == sorted(expected.tolist(), reverse=True)
+    assert dict(zip(risers["分类"], risers["本周"])) == current[expected.index].to_dict()
+
+    share_change = (current / current.sum() - previous / previous.sum()) * 100
+    assert np.allclose(risers["占比变化(pp)"], share_change[risers["分类"]].round(2))
+    baseline = reference.iloc[-4:-2].mean()
+    assert np.allclose(risers["前2周均值"], baseline[risers["分类"]].round(1))
+
+    assert trend.risers("分类", week, min_count=2, top_n=2)["分类"].tolist() == risers["分类"].head(2).tolist()
+    assert trend.risers("分类", "1999-W01").empty
+
+
+def test_gap_weeks_are_zero_filled():
+    dates = pd.Series(pd.to_datetime(["2025-01-06", "2025-01-07", "2025-01-27"]))
+    trend = WeeklyTrend(iso_week_start(dates), pd.Series(["A", "B", "A"]))
+    assert trend.week_labels == ["2025-W02", "2025-W03", "2025-W04", "2025-W05"]
+    assert trend.totals.tolist() == [2, 0, 0, 1]
+    # 空周之后重新出现：与0比较
+    risers = trend.risers("机型名称")
+    assert risers[["机型名称", "本周", "上周", "本周占比(%)", "上周占比(%)"]].values.tolist() == [["A", 1, 0, 100.0, 0.0]]
@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
-"""QCR分析工具 - 工具包"""
+"""QCR分析工具 - 工具包（导出项在首次访问时才导入，避免启动时加载 pandas）"""
 
-from .helpers import parse_date, format_percentage, parse_percentage
+from .lazy import lazy_exports
 
-__all__ = [
-    'parse_date',
-    'format_percentage',
-    'parse_percentage',
-]
+# 导出名 → 所在子模块
+_EXPORTS = {
+    'parse_date': '.helpers',
+    'format_percentage': '.helpers',
+    'parse_percentage': '.helpers',
+    'MemoryTracker': '.memory',
+    'enable_copy_on_write': '.memory',
+    'detached': '.memory',
+}
 
+__all__ = ['lazy_exports', *_EXPORTS]
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+包导出项延迟导入
+=============================================================================
+PEP 562：包的 __init__ 只声明 导出名 → 所在模块，首次访问导出项时才导入对应模块，
+只用到一项功能时不必加载整个包的依赖（matplotlib、python-pptx、sqlalchemy 等）
+=============================================================================
+"""
+
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    生成包级别的 __getattr__ / __dir__
+
+    用法（包的 __init__.py 中）::
+
+        __getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+
+    Args:
+        package: 包名（__name__），相对模块名以此为基准解析
+        exports: 导出名 → 所在模块（".子模块" 或绝对模块名）
+
+    Returns:
+        (__getattr__, __dir__)；导入后的对象写回包的命名空间，之后访问不再经过 __getattr__
+    """
+    def __getattr__(name: str):
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name, package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+内存统计工具
+=============================================================================
+- enable_copy_on_write: 开启pandas写时复制（全局选项，只由程序入口调用，导入时不修改）
+- detached: 写时复制开启时原样返回筛选结果，否则返回副本（保持原有的防御性 .copy() 语义）
+- MemoryTracker: 按阶段记录常驻内存（RSS）、进程峰值RSS与阶段内分配峰值
+常驻内存优先使用 psutil，未安装时读取 /proc/self/statm；峰值RSS使用 resource 模块，
+均不可用的平台只记录阶段内分配峰值
+=============================================================================
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def enable_copy_on_write():
+    """开启pandas写时复制（pandas 3.0 起默认开启且无法关闭）；修改全局选项，只应在程序入口调用"""
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def copy_on_write_enabled() -> bool:
+    """当前是否启用写时复制（pandas 2.x 的 "warn" 模式不算启用）"""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def detached(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    返回与来源互不影响的DataFrame
+
+    Args:
+        df: 筛选结果或缓存的DataFrame
+
+    Returns:
+        写时复制开启时原样返回（修改时才复制），否则返回深拷贝
+    """
+    return df if copy_on_write_enabled() else df.copy()
+
+
+def current_rss() -> Optional[int]:
+    """当前进程常驻内存（字节），无法获取时返回None"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss() -> Optional[int]:
+    """进程启动以来的峰值常驻内存（字节），无法获取时返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _format_mb(value: Optional[int]) -> str:
+    return f"{value / 1024 / 1024:8.1f}" if value is not None else "     n/a"
+
+
+@dataclass
+class MemoryStage:
+    """单个阶段的内存统计"""
+    name: str
+    seconds: float
+    rss_before: Optional[int]
+    rss_after: Optional[int]
+    peak_rss: Optional[int]
+    alloc_peak: Optional[int]
+
+    @property
+    def rss_delta(self) -> Optional[int]:
+        if self.rss_before is None or self.rss_after is None:
+            return None
+        return self.rss_after - self.rss_before
+
+
+class MemoryTracker:
+    """按阶段统计内存占用"""
+
+    def __init__(self, enabled: bool = True, trace_allocations: bool = True):
+        """
+        初始化内存统计
+
+        Args:
+            enabled: 为False时 stage() 不做任何统计
+            trace_allocations: 是否用 tracemalloc 统计阶段内分配峰值（numpy/pandas缓冲区也会计入，有一定开销）
+        """
+        self.enabled = enabled
+        self.trace_allocations = trace_allocations
+        self.stages: List[MemoryStage] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        统计一个阶段
+
+        Args:
+            name: 阶段名称
+        """
+        if not self.enabled:
+            yield
+            return
+
+        tracing = self.trace_allocations
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            alloc_base = tracemalloc.get_traced_memory()[0]
+
+        rss_before = current_rss()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            alloc_peak = None
+            if tracing:
+                alloc_peak = tracemalloc.get_traced_memory()[1] - alloc_base
+            self.stages.append(MemoryStage(
+                name=name,
+                seconds=time.perf_counter() - start,
+                rss_before=rss_before,
+                rss_after=current_rss(),
+                peak_rss=peak_rss(),
+                alloc_peak=alloc_peak,
+            ))
+
+    def stop(self):
+        """停止分配追踪"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def report(self):
+        """输出各阶段内存统计"""
+        if not self.stages:
+            return
+        print("\n🧠 内存统计 (MB):")
+        print(f"  {'阶段':<16}{'耗时(s)':>8}{'RSS':>10}{'RSS变化':>10}{'峰值RSS':>10}{'分配峰值':>10}")
+        for s in self.stages:
+            delta = s.rss_delta
+            delta_text = f"{delta / 1024 / 1024:+8.1f}" if delta is not None else "     n/a"
+            print(
+                f"  {s.name:<16}{s.seconds:>8.1f}  {_format_mb(s.rss_after)}  {delta_text}"
+                f"  {_format_mb(s.peak_rss)}  {_format_mb(s.alloc_peak)}"
+            )
@@ -14,6 +14,16 @@ def create_app():
     app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024
     app.config['UPLOAD_FOLDER'].mkdir(parents=True, exist_ok=True)
     
+    # 写时复制：请求间共享的数据在修改时才复制（由WSGI服务器直接加载应用时同样生效）
+    from utils.memory import enable_copy_on_write
+    enable_copy_on_write()
+    
+    # 常驻MTM映射：启动时加载一次，后台监视文件变化热替换
+    from services.mtm_service import MTMMappingService
+    mtm_service = MTMMappingService()
+    mtm_service.start_watching()
+    app.config['MTM_SERVICE'] = mtm_service
+    
     from .routes import register_routes
     register_routes(app)
     
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """路由定义"""
+from functools import wraps
 from flask import render_template, request, jsonify, send_file
 from werkzeug.utils import secure_filename
 from pathlib import Path
@@ -7,12 +8,19 @@ from datetime import date
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent))
-from data import DataManager
-from modules.mtm_manager import MTMManager
+from config import CATEGORY_SUFFIXES, PPT_NATIVE_CHARTS, CHART_PROFILE
+from data import DataManager, DailyPartialStore, LazyDataset
+from services.top_issue_analysis import TopIssueAnalysisService
+from services.top_model_analysis import TopModelAnalysisService
+from services.chart_service import chart_profile
+from modules.analysis_results import frame_records
 from services import (
     run_weekly_analysis, 
     run_top_issue_analysis, 
     run_top_model_analysis,
+    run_trend_analysis,
+    run_anomaly_detection,
+    run_all_analysis,
     generate_weekly_report,
     generate_top_issue_report,
     generate_top_model_report
@@ -35,17 +43,27 @@ def register_routes(app):
     def top_model_form():
         return render_template('top_model_form.html')
     
+    @app.route('/trend')
+    def trend_form():
+        return render_template('trend_form.html')
+    
+    @app.route('/all')
+    def all_form():
+        return render_template('all_form.html')
+    
     @app.route('/api/analyze/weekly', methods=['POST'])
+    @_with_chart_profile
     def analyze_weekly():
         try:
             data_file = request.files.get('data_file')
-            mtm_file = request.files.get('mtm_file')
+            if not data_file:
+                return jsonify({'error': '请上传数据文件'}), 400
             
-            if not data_file or not mtm_file:
-                return jsonify({'error': '请上传数据文件和MTM文件'}), 400
+            mtm_manager = _resolve_mtm_manager(app)
+            if mtm_manager is None:
+                return jsonify({'error': '请上传MTM文件（服务器未配置标准MTM映射）'}), 400
             
             data_path = _save_file(data_file, app)
-            mtm_path = _save_file(mtm_file, app)
             
             start_date = _parse_date(request.form.get('start_date'))
             end_date = _parse_date(request.form.get('end_date'))
@@ -56,7 +74,8 @@ def register_routes(app):
                 output_dir = Path(custom_output.strip())
             else:
                 output_dir = app.config['UPLOAD_FOLDER'] / 'results' / 'weekly'
-            output_dir.mkdir(parents=True, exist_ok=True)
+            if not _stats_only():
+                output_dir.mkdir(parents=True, exist_ok=True)
             
             # LLM配置
             use_llm = request.form.get('use_llm') == 'true'
@@ -75,13 +94,16 @@ def register_routes(app):
             
             results = run_weekly_analysis(
                 data_source=str(data_path),
-                mtm_file=str(mtm_path),
+                mtm_file=None,
+                mtm_manager=mtm_manager,
                 output_dir=str(output_dir),
                 start_date=start_date,
                 end_date=end_date,
                 filter_unmapped=request.form.get('filter_unmapped') == 'true',
+                resolve_family=request.form.get('resolve_family') == 'true',
                 use_llm=use_llm,
-                llm_config=llm_config
+                llm_config=llm_config,
+                formats=_artifact_formats()
             )
             if not results:
                 return jsonify({'error': '数据为空或缺少必需列，无法生成周报'}), 400
@@ -89,7 +111,7 @@ def register_routes(app):
             # 生成PPT（如果需要）
             ppt_path = None
             ppt_download = None
-            if request.form.get('generate_ppt') == 'true':
+            if request.form.get('generate_ppt') == 'true' and not _stats_only():
                 from services.weekly_analysis import WeeklyAnalysisService
                 service = WeeklyAnalysisService(output_dir)
                 service.results = results  # 注入结果
@@ -104,7 +126,8 @@ def register_routes(app):
                     batch_name=batch_name,
                     template_path=template_path,
                     use_llm=use_llm,
-                    llm_config=llm_config
+                    llm_config=llm_config,
+                    native_charts=_native_charts()
                 )
                 # 如果是默认目录，生成下载URL；否则用户需通过"打开输出目录"访问
                 if not custom_output or not custom_output.strip():
@@ -120,8 +143,9 @@ def register_routes(app):
             return jsonify({
                 'success': True,
                 'total_records': len(results['total_df']),
-                'records_7d': len(results['df_7d']),
-                'records_non_7d': len(results['df_non_7d']),
+                'records_7d': results['records_7d'],
+                'records_non_7d': results['records_non_7d'],
+                'stats': _frame_stats(results, 'reason_stats', 'model_7d_dist', 'model_non_7d_dist'),
                 'output_dir': str(output_dir),
                 'ppt_path': str(ppt_path) if ppt_path else None,
                 'ppt_download_url': ppt_download
@@ -132,30 +156,31 @@ def register_routes(app):
             return jsonify({'error': str(e)}), 500
     
     @app.route('/api/analyze/top_issue', methods=['POST'])
+    @_with_chart_profile
     def analyze_top_issue():
         try:
             data_file = request.files.get('data_file')
-            mtm_file = request.files.get('mtm_file')
+            if not data_file:
+                return jsonify({'error': '请上传数据文件'}), 400
             
-            if not data_file or not mtm_file:
-                return jsonify({'error': '请上传数据文件和MTM文件'}), 400
+            mtm_manager = _resolve_mtm_manager(app)
+            if mtm_manager is None:
+                return jsonify({'error': '请上传MTM文件（服务器未配置标准MTM映射）'}), 400
             
             data_path = _save_file(data_file, app)
-            mtm_path = _save_file(mtm_file, app)
             
             data_manager = DataManager()
             df = data_manager.read_excel(str(data_path))
             
             start_date = _parse_date(request.form.get('start_date'))
             end_date = _parse_date(request.form.get('end_date'))
-            if start_date or end_date:
-                df = data_manager.filter_by_date_range(df, start_date, end_date)
-            
-            mtm_manager = MTMManager(Path(mtm_path))
-            df = mtm_manager.map_dataframe(df)
-            
-            if request.form.get('filter_unmapped') == 'true':
-                df = data_manager.filter_unmapped_mtm(df)
+            df = (
+                LazyDataset(df)
+                .filter_date_range(start_date, end_date)
+                .map_mtm(mtm_manager, request.form.get('resolve_family') == 'true')
+                .filter_unmapped(request.form.get('filter_unmapped') == 'true')
+                .collect(TopIssueAnalysisService.REQUIRED_COLUMNS)
+            )
             
             # 输出目录：用户指定或默认
             custom_output = request.form.get('output_dir')
@@ -163,7 +188,8 @@ def register_routes(app):
                 output_dir = Path(custom_output.strip())
             else:
                 output_dir = app.config['UPLOAD_FOLDER'] / 'results' / 'top_issue'
-            output_dir.mkdir(parents=True, exist_ok=True)
+            if not _stats_only():
+                output_dir.mkdir(parents=True, exist_ok=True)
             
             top_n = int(request.form.get('top_n', 10))
             use_llm = request.form.get('use_llm') == 'true'
@@ -179,15 +205,15 @@ def register_routes(app):
                     'coverage': float(request.form.get('llm_coverage', 80)),
                     'focus': float(request.form.get('llm_focus', 10))
                 }
-            results = run_top_issue_analysis(df, str(output_dir), top_n, use_llm=use_llm, llm_config=llm_config)
+            results = run_top_issue_analysis(df, str(output_dir), top_n, use_llm=use_llm, llm_config=llm_config,
+                                             formats=_artifact_formats())
             if not results:
                 return jsonify({'error': '数据为空或缺少必需列，无法生成Top Issue分析'}), 400
             
             # 生成PPT（如果需要）
             ppt_path = None
             ppt_download = None
-            if request.form.get('generate_ppt') == 'true':
-                from services.top_issue_analysis import TopIssueAnalysisService
+            if request.form.get('generate_ppt') == 'true' and not _stats_only():
                 service = TopIssueAnalysisService(output_dir)
                 service.results = results  # 注入结果
                 payload = service.get_ppt_payload()
@@ -201,7 +227,8 @@ def register_routes(app):
                     batch_name=batch_name,
                     template_path=template_path,
                     use_llm=use_llm,
-                    llm_config=llm_config
+                    llm_config=llm_config,
+                    native_charts=_native_charts()
                 )
                 # 如果是默认目录，生成下载URL；否则用户需通过"打开输出目录"访问
                 if not custom_output or not custom_output.strip():
@@ -218,6 +245,7 @@ def register_routes(app):
                 'success': True,
                 'total_records': results['total_records'],
                 'top_n': results['top_n'],
+                'stats': _frame_stats(results, 'issue_stats'),
                 'output_dir': str(output_dir),
                 'ppt_path': str(ppt_path) if ppt_path else None,
                 'ppt_download_url': ppt_download
@@ -226,30 +254,31 @@ def register_routes(app):
             return jsonify({'error': str(e)}), 500
     
     @app.route('/api/analyze/top_model', methods=['POST'])
+    @_with_chart_profile
     def analyze_top_model():
         try:
             data_file = request.files.get('data_file')
-            mtm_file = request.files.get('mtm_file')
+            if not data_file:
+                return jsonify({'error': '请上传数据文件'}), 400
             
-            if not data_file or not mtm_file:
-                return jsonify({'error': '请上传数据文件和MTM文件'}), 400
+            mtm_manager = _resolve_mtm_manager(app)
+            if mtm_manager is None:
+                return jsonify({'error': '请上传MTM文件（服务器未配置标准MTM映射）'}), 400
             
             data_path = _save_file(data_file, app)
-            mtm_path = _save_file(mtm_file, app)
             
             data_manager = DataManager()
             df = data_manager.read_excel(str(data_path))
             
             start_date = _parse_date(request.form.get('start_date'))
             end_date = _parse_date(request.form.get('end_date'))
-            if start_date or end_date:
-                df = data_manager.filter_by_date_range(df, start_date, end_date)
-            
-            mtm_manager = MTMManager(Path(mtm_path))
-            df = mtm_manager.map_dataframe(df)
-            
-            if request.form.get('filter_unmapped') == 'true':
-                df = data_manager.filter_unmapped_mtm(df)
+            df = (
+                LazyDataset(df)
+                .filter_date_range(start_date, end_date)
+                .map_mtm(mtm_manager, request.form.get('resolve_family') == 'true')
+                .filter_unmapped(request.form.get('filter_unmapped') == 'true')
+                .collect(TopModelAnalysisService.REQUIRED_COLUMNS)
+            )
             
             # 输出目录：用户指定或默认
             custom_output = request.form.get('output_dir')
@@ -257,7 +286,8 @@ def register_routes(app):
                 output_dir = Path(custom_output.strip())
             else:
                 output_dir = app.config['UPLOAD_FOLDER'] / 'results' / 'top_model'
-            output_dir.mkdir(parents=True, exist_ok=True)
+            if not _stats_only():
+                output_dir.mkdir(parents=True, exist_ok=True)
             
             top_n = int(request.form.get('top_n', 15))
             use_llm = request.form.get('use_llm') == 'true'
@@ -273,15 +303,15 @@ def register_routes(app):
                     'coverage': float(request.form.get('llm_coverage', 80)),
                     'focus': float(request.form.get('llm_focus', 10))
                 }
-            results = run_top_model_analysis(df, str(output_dir), top_n, use_llm=use_llm, llm_config=llm_config)
+            results = run_top_model_analysis(df, str(output_dir), top_n, use_llm=use_llm, llm_config=llm_config,
+                                             formats=_artifact_formats())
             if not results:
                 return jsonify({'error': '数据为空或缺少必需列，无法生成Top Model分析'}), 400
             
             # 生成PPT（如果需要）
             ppt_path = None
             ppt_download = None
-            if request.form.get('generate_ppt') == 'true':
-                from services.top_model_analysis import TopModelAnalysisService
+            if request.form.get('generate_ppt') == 'true' and not _stats_only():
                 service = TopModelAnalysisService(output_dir)
                 service.results = results  # 注入结果
                 payload = service.get_ppt_payload()
@@ -295,7 +325,8 @@ def register_routes(app):
                     batch_name=batch_name,
                     template_path=template_path,
                     use_llm=use_llm,
-                    llm_config=llm_config
+                    llm_config=llm_config,
+                    native_charts=_native_charts()
                 )
                 # 如果是默认目录，生成下载URL；否则用户需通过"打开输出目录"访问
                 if not custom_output or not custom_output.strip():
@@ -313,6 +344,7 @@ def register_routes(app):
                 'total_records': results['total_records'],
                 'total_models': results['total_models'],
                 'top_n': results['top_n'],
+                'stats': _frame_stats(results, 'top_models'),
                 'output_dir': str(output_dir),
                 'ppt_path': str(ppt_path) if ppt_path else None,
                 'ppt_download_url': ppt_download
@@ -320,6 +352,201 @@ def register_routes(app):
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/analyze/trend', methods=['POST'])
+    @_with_chart_profile
+    def analyze_trend():
+        """按ISO周统计机型 / 分类的环比变化及上升榜"""
+        try:
+            data_file = request.files.get('data_file')
+            if not data_file:
+                return jsonify({'error': '请上传数据文件'}), 400
+            
+            mtm_manager = _resolve_mtm_manager(app)
+            if mtm_manager is None:
+                return jsonify({'error': '请上传MTM文件（服务器未配置标准MTM映射）'}), 400
+            
+            data_path = _save_file(data_file, app)
+            
+            data_manager = DataManager()
+            df = data_manager.read_excel(str(data_path))
+            
+            start_date = _parse_date(request.form.get('start_date'))
+            end_date = _parse_date(request.form.get('end_date'))
+            df = (
+                LazyDataset(df)
+                .filter_date_range(start_date, end_date)
+                .map_mtm(mtm_manager, request.form.get('resolve_family') == 'true')
+                .filter_unmapped(request.form.get('filter_unmapped') == 'true')
+                .collect()
+            )
+            
+            # 输出目录：用户指定或默认
+            custom_output = request.form.get('output_dir')
+            if custom_output and custom_output.strip():
+                output_dir = Path(custom_output.strip())
+            else:
+                output_dir = app.config['UPLOAD_FOLDER'] / 'results' / 'trend'
+            if not _stats_only():
+                output_dir.mkdir(parents=True, exist_ok=True)
+            
+            top_n = int(request.form.get('top_n', 10))
+            week = (request.form.get('week') or '').strip() or None
+            results = run_trend_analysis(df, str(output_dir), top_n, week, formats=_artifact_formats())
+            if not results:
+                return jsonify({'error': '数据为空、缺少必需列或指定的周不存在，无法生成趋势分析'}), 400
+            
+            return jsonify({
+                'success': True,
+                'total_records': results['total_records'],
+                'current_week': results['current_week'],
+                'previous_week': results['previous_week'],
+                'stats': _frame_stats(results, 'model_risers', 'category_risers'),
+                'output_dir': str(output_dir)
+            })
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/analyze/anomaly', methods=['POST'])
+    @_with_chart_profile
+    def analyze_anomaly():
+        """导入数据后增量推进EWMA基线，返回新增日期中的突增告警"""
+        try:
+            data_file = request.files.get('data_file')
+            if not data_file:
+                return jsonify({'error': '请上传数据文件'}), 400
+            
+            mtm_manager = _resolve_mtm_manager(app)
+            if mtm_manager is None:
+                return jsonify({'error': '请上传MTM文件（服务器未配置标准MTM映射）'}), 400
+            
+            data_path = _save_file(data_file, app)
+            
+            data_manager = DataManager()
+            df = data_manager.read_excel(str(data_path))
+            store = DailyPartialStore()
+            store.update(df)
+            
+            # 输出目录：用户指定或默认
+            custom_output = request.form.get('output_dir')
+            if custom_output and custom_output.strip():
+                output_dir = Path(custom_output.strip())
+            else:
+                output_dir = app.config['UPLOAD_FOLDER'] / 'results' / 'anomaly'
+            if not _stats_only():
+                output_dir.mkdir(parents=True, exist_ok=True)
+            
+            suffix = (request.form.get('suffix') or '').strip() or None
+            if suffix is not None and suffix not in CATEGORY_SUFFIXES:
+                return jsonify({'error': f'未知的分类后缀: {suffix}'}), 400
+            results = run_anomaly_detection(
+                store, mtm_manager, str(output_dir), suffix,
+                filter_unmapped=request.form.get('filter_unmapped') == 'true',
+                resolve_family=request.form.get('resolve_family') == 'true',
+                formats=_artifact_formats()
+            )
+            if not results:
+                return jsonify({'error': '没有可用的按天数据，无法进行异常检测'}), 400
+            
+            return jsonify({
+                'success': True,
+                'last_day': results['last_day'].isoformat() if results['last_day'] else None,
+                'processed_days': len(results['processed_days']),
+                'rebuilt': results['rebuilt'],
+                'series_count': results['series_count'],
+                'stats': _frame_stats(results, 'alerts'),
+                'output_dir': str(output_dir)
+            })
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/analyze/all', methods=['POST'])
+    @_with_chart_profile
+    def analyze_all():
+        """一次上传、一次加载，完成全部三项分析"""
+        try:
+            data_file = request.files.get('data_file')
+            if not data_file:
+                return jsonify({'error': '请上传数据文件'}), 400
+            
+            mtm_manager = _resolve_mtm_manager(app)
+            if mtm_manager is None:
+                return jsonify({'error': '请上传MTM文件（服务器未配置标准MTM映射）'}), 400
+            
+            data_path = _save_file(data_file, app)
+            
+            # 输出目录：用户指定或默认（各分析写入子目录）
+            custom_output = request.form.get('output_dir')
+            if custom_output and custom_output.strip():
+                output_dir = Path(custom_output.strip())
+            else:
+                output_dir = app.config['UPLOAD_FOLDER'] / 'results' / 'all'
+            if not _stats_only():
+                output_dir.mkdir(parents=True, exist_ok=True)
+            
+            use_llm = request.form.get('use_llm') == 'true'
+            llm_config = None
+            if use_llm:
+                from config import KIMI_API_KEY, KIMI_API_URL, KIMI_MODEL
+                llm_config = {
+                    'api_key': KIMI_API_KEY,
+                    'api_url': KIMI_API_URL,
+                    'model': KIMI_MODEL,
+                    'timeout': int(request.form.get('llm_timeout', 60)),
+                    'top_n': int(request.form.get('llm_top_n', 3)),
+                    'coverage': float(request.form.get('llm_coverage', 80)),
+                    'focus': float(request.form.get('llm_focus', 10))
+                }
+            
+            results = run_all_analysis(
+                data_source=str(data_path),
+                mtm_file=None,
+                mtm_manager=mtm_manager,
+                output_dir=str(output_dir),
+                start_date=_parse_date(request.form.get('start_date')),
+                end_date=_parse_date(request.form.get('end_date')),
+                filter_unmapped=request.form.get('filter_unmapped') == 'true',
+                resolve_family=request.form.get('resolve_family') == 'true',
+                top_n=int(request.form.get('top_n', 10)),
+                generate_ppt=request.form.get('generate_ppt') == 'true' and not _stats_only(),
+                formats=_artifact_formats(),
+                batch_name=request.form.get('batch_name', '2024-2025'),
+                template_path=request.form.get('ppt_template'),
+                use_llm=use_llm,
+                llm_config=llm_config,
+                native_charts=_native_charts()
+            )
+            
+            # 默认目录下生成下载URL；自定义目录需通过"打开输出目录"访问
+            ppt_downloads = {}
+            for name, ppt_path in results['ppt_paths'].items():
+                ppt_downloads[name] = None
+                if not custom_output or not custom_output.strip():
+                    try:
+                        rel_path = Path(ppt_path).relative_to(app.config['UPLOAD_FOLDER'] / 'results')
+                        ppt_downloads[name] = f"/download/{rel_path.as_posix()}"
+                    except Exception:
+                        pass
+            
+            return jsonify({
+                'success': True,
+                'total_records': results['total_records'],
+                'output_dir': str(output_dir),
+                'output_dirs': {k: str(v) for k, v in results['output_dirs'].items()},
+                'ppt_paths': {k: str(v) for k, v in results['ppt_paths'].items()},
+                'ppt_download_urls': ppt_downloads,
+                'errors': results['errors'],
+                'timings': {k: round(v, 2) for k, v in results['timings'].items()}
+            })
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/mtm/status')
+    def mtm_status():
+        """常驻MTM映射状态"""
+        return jsonify(app.config['MTM_SERVICE'].get_status())
+
     @app.route('/download/<path:filepath>')
     def download_file(filepath):
         """下载文件"""
@@ -337,6 +564,44 @@ def register_routes(app):
             print(f"下载文件失败: {e}")
             return jsonify({'error': str(e)}), 500
 
+def _resolve_mtm_manager(app):
+    """本次请求的MTM管理器：上传了MTM文件则作为单次覆盖，否则使用常驻映射"""
+    mtm_service = app.config['MTM_SERVICE']
+    mtm_file = request.files.get('mtm_file')
+    if mtm_file and mtm_file.filename:
+        return mtm_service.get_manager(_save_file(mtm_file, app))
+    if mtm_service.has_mappings():
+        return mtm_service.get_manager()
+    return None
+
+def _stats_only():
+    """仅统计：跳过全部文件写出，只返回JSON统计结果"""
+    return request.form.get('stats_only') == 'true'
+
+def _chart_profile():
+    """本次请求的图表渲染配置档（勾选"快速预览"时使用 draft）"""
+    return 'draft' if request.form.get('preview') == 'true' else CHART_PROFILE
+
+def _with_chart_profile(view):
+    """在请求处理期间切换图表渲染配置档"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with chart_profile(_chart_profile()):
+            return view(*args, **kwargs)
+    return wrapper
+
+def _native_charts():
+    """PPT是否使用原生图表（表单勾选、配置 QCR_PPT_NATIVE_CHARTS 开启，或草稿图表时保持PPT完整质量）"""
+    return request.form.get('native_charts') == 'true' or PPT_NATIVE_CHARTS or _chart_profile() == 'draft'
+
+def _artifact_formats():
+    """本次请求需要写出的产物格式（None 表示默认格式）"""
+    return () if _stats_only() else None
+
+def _frame_stats(results, *keys):
+    """将结果中的统计表转为JSON记录"""
+    return {key: frame_records(results.get(key)) for key in keys}
+
 def _save_file(file, app):
     filename = secure_filename(file.filename)
     filepath = app.config['UPLOAD_FOLDER'] / filename